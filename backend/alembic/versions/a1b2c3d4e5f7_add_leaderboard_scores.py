@@ -0,0 +1,53 @@
+"""add leaderboard_scores table and leaderboard opt-in
+
+Revision ID: a1b2c3d4e5f7
+Revises: f0a1b2c3d4e5
+Create Date: 2026-10-17 21:00:00.000000
+
+Leaderboard scores per user and period (app.leaderboards), indexed per
+board for rank / top-N range reads. Boards are opt-in, so nothing is
+backfilled: a user's rows are built from history when they opt in, and
+kept current by awards from then on.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a1b2c3d4e5f7'
+down_revision: Union[str, None] = 'f0a1b2c3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BOARD_COLUMNS = ('xp', 'sessions', 'volume', 'streak_weeks')
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('leaderboard_visible', sa.Boolean(), nullable=True, server_default='false'))
+    op.add_column('users', sa.Column('leaderboard_name', sa.String(length=30), nullable=True))
+    op.create_table(
+        'leaderboard_scores',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('period', sa.String(length=10), primary_key=True),
+        sa.Column('visible', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('xp', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('volume', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('streak_weeks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('streak_week', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    for column in BOARD_COLUMNS:
+        op.create_index(
+            f'ix_leaderboard_scores_{column}', 'leaderboard_scores',
+            ['period', 'visible', sa.text(f'{column} DESC'), 'user_id'],
+        )
+
+
+def downgrade() -> None:
+    for column in BOARD_COLUMNS:
+        op.drop_index(f'ix_leaderboard_scores_{column}', table_name='leaderboard_scores')
+    op.drop_table('leaderboard_scores')
+    op.drop_column('users', 'leaderboard_name')
+    op.drop_column('users', 'leaderboard_visible')
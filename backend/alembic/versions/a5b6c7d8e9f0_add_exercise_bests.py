@@ -0,0 +1,63 @@
+"""add exercise_bests personal-record index
+
+Revision ID: a5b6c7d8e9f0
+Revises: f4a5b6c7d8e9
+Create Date: 2026-10-17 15:00:00.000000
+
+Per-user, per-exercise best reps / weight over completed normal sets, the
+number of completed sessions with the exercise and the latest of them.
+PR detection on completion reads these rows instead of scanning history.
+Backfilled from existing sessions + sets; kept current by app.exercise_bests.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a5b6c7d8e9f0'
+down_revision: Union[str, None] = 'f4a5b6c7d8e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exercise_bests',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('exercise_id', sa.Integer(), sa.ForeignKey('exercises.id'), primary_key=True),
+        sa.Column('max_reps', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_weight', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('session_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_session_id', sa.Integer(), nullable=True),
+    )
+
+    op.execute("""
+        INSERT INTO exercise_bests (user_id, exercise_id, max_reps, max_weight, session_count, last_session_id)
+        SELECT
+            s.user_id,
+            st.exercise_id,
+            COALESCE(MAX(st.reps), 0),
+            COALESCE(MAX(st.weight_kg), 0),
+            COUNT(DISTINCT s.id),
+            (
+                SELECT s2.id
+                FROM sessions s2
+                JOIN sets st2 ON st2.session_id = s2.id
+                WHERE s2.user_id = s.user_id
+                  AND st2.exercise_id = st.exercise_id
+                  AND s2.completed_at IS NOT NULL
+                  AND COALESCE(st2.set_type, 'normal') = 'normal'
+                ORDER BY s2.completed_at DESC, s2.id DESC
+                LIMIT 1
+            )
+        FROM sets st
+        JOIN sessions s ON st.session_id = s.id
+        WHERE s.completed_at IS NOT NULL
+          AND COALESCE(st.set_type, 'normal') = 'normal'
+        GROUP BY s.user_id, st.exercise_id;
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('exercise_bests')
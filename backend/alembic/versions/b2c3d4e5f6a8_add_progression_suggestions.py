@@ -0,0 +1,36 @@
+"""add progression_suggestions table
+
+Revision ID: b2c3d4e5f6a8
+Revises: a1b2c3d4e5f7
+Create Date: 2026-10-17 23:00:00.000000
+
+Stored progression suggestions per (user, routine, day), keyed by the
+routine's latest completed session (app.progression_suggestions). Nothing
+is backfilled: rows are computed on the next completion or first view.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b2c3d4e5f6a8'
+down_revision: Union[str, None] = 'a1b2c3d4e5f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'progression_suggestions',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('routine_id', sa.Integer(), sa.ForeignKey('routines.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day_index', sa.Integer(), primary_key=True),
+        sa.Column('last_session_id', sa.Integer(), nullable=True),
+        sa.Column('suggestions', sa.JSON(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('progression_suggestions')
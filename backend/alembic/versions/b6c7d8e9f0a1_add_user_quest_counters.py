@@ -0,0 +1,39 @@
+"""add user_quest_counters table
+
+Revision ID: b6c7d8e9f0a1
+Revises: a5b6c7d8e9f0
+Create Date: 2026-10-17 16:00:00.000000
+
+Lifetime and per-week quest progress counters, advanced by per-completion
+deltas (app.quest_counters). Not backfilled here: each user's rows are
+initialised from their history on their next completion.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b6c7d8e9f0a1'
+down_revision: Union[str, None] = 'a5b6c7d8e9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_quest_counters',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('period', sa.String(length=10), primary_key=True),
+        sa.Column('sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sets', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('volume', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('routine_sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duration_sec', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('weight_prs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rep_prs', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_quest_counters')
@@ -0,0 +1,44 @@
+"""add progression_report_jobs table
+
+Revision ID: c3d4e5f6a7b9
+Revises: b2c3d4e5f6a8
+Create Date: 2026-10-18 10:00:00.000000
+
+Background progression-report generation (app.progression_report_jobs).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c3d4e5f6a7b9'
+down_revision: Union[str, None] = 'b2c3d4e5f6a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'progression_report_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('routine_id', sa.Integer(), sa.ForeignKey('routines.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_context', sa.Text(), nullable=True),
+        sa.Column('use_joker', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('status', sa.String(length=10), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('report_id', sa.Integer(), sa.ForeignKey('progression_reports.id'), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_progression_report_jobs_id', 'progression_report_jobs', ['id'])
+    op.create_index('ix_progression_report_jobs_status_id', 'progression_report_jobs', ['status', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_progression_report_jobs_status_id', table_name='progression_report_jobs')
+    op.drop_index('ix_progression_report_jobs_id', table_name='progression_report_jobs')
+    op.drop_table('progression_report_jobs')
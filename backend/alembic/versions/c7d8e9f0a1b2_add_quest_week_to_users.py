@@ -0,0 +1,28 @@
+"""add quest_week to users
+
+Revision ID: c7d8e9f0a1b2
+Revises: b6c7d8e9f0a1
+Create Date: 2026-10-17 17:00:00.000000
+
+ISO week ("2026-W42") whose weekly quests a user has been rotated to. The
+scheduler's weekly rotation job stamps it for every user; GET
+/api/gamification/quests only rotates lazily when it is stale.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c7d8e9f0a1b2'
+down_revision: Union[str, None] = 'b6c7d8e9f0a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('quest_week', sa.String(length=10), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'quest_week')
@@ -0,0 +1,68 @@
+"""add user_daily_stats rollup table
+
+Revision ID: d2e3f4a5b6c7
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-17 09:00:00.000000
+
+Per-user, per-day rollup of completed sessions (count, normal-set volume,
+normal-set count, tracked duration) backing GET /api/stats/weekly.
+Backfilled from existing sessions + sets; kept current by app.daily_stats.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd2e3f4a5b6c7'
+down_revision: Union[str, None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_daily_stats',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('volume', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('set_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duration_seconds', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duration_sessions', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        day_expr = "(s.completed_at AT TIME ZONE 'UTC')::date"
+    else:
+        day_expr = "date(s.completed_at)"
+
+    op.execute(f"""
+        INSERT INTO user_daily_stats
+            (user_id, day, sessions, volume, set_count, duration_seconds, duration_sessions)
+        SELECT
+            s.user_id,
+            {day_expr},
+            COUNT(*),
+            COALESCE(SUM(agg.volume), 0),
+            COALESCE(SUM(agg.set_count), 0),
+            COALESCE(SUM(CASE WHEN s.duration_seconds > 0 THEN s.duration_seconds ELSE 0 END), 0),
+            SUM(CASE WHEN s.duration_seconds > 0 THEN 1 ELSE 0 END)
+        FROM sessions s
+        LEFT JOIN (
+            SELECT
+                session_id,
+                SUM(CASE WHEN weight_kg > 0 AND reps > 0 THEN weight_kg * reps ELSE 0 END) AS volume,
+                COUNT(*) AS set_count
+            FROM sets
+            WHERE COALESCE(set_type, 'normal') = 'normal'
+            GROUP BY session_id
+        ) agg ON agg.session_id = s.id
+        WHERE s.completed_at IS NOT NULL
+        GROUP BY s.user_id, {day_expr};
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_daily_stats')
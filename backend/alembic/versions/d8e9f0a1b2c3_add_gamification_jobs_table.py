@@ -0,0 +1,42 @@
+"""add gamification_jobs table
+
+Revision ID: d8e9f0a1b2c3
+Revises: c7d8e9f0a1b2
+Create Date: 2026-10-17 18:00:00.000000
+
+Outbox for the post-completion gamification pipeline (app.gamification_outbox).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd8e9f0a1b2c3'
+down_revision: Union[str, None] = 'c7d8e9f0a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'gamification_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('session_id', name='uq_gamification_jobs_session_id'),
+    )
+    op.create_index('ix_gamification_jobs_id', 'gamification_jobs', ['id'])
+    op.create_index('ix_gamification_jobs_status_id', 'gamification_jobs', ['status', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gamification_jobs_status_id', table_name='gamification_jobs')
+    op.drop_index('ix_gamification_jobs_id', table_name='gamification_jobs')
+    op.drop_table('gamification_jobs')
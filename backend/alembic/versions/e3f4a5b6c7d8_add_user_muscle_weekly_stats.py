@@ -0,0 +1,84 @@
+"""add user_muscle_weekly_stats rollup table
+
+Revision ID: e3f4a5b6c7d8
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-17 12:00:00.000000
+
+Per-user, per-ISO-week, per-muscle rollup of completed normal sets, with
+primary and secondary-muscle credit kept apart, backing
+GET /api/stats/muscles. Backfilled from existing sessions + sets; kept
+current by app.muscle_stats.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e3f4a5b6c7d8'
+down_revision: Union[str, None] = 'd2e3f4a5b6c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_muscle_weekly_stats',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('week', sa.Date(), primary_key=True),
+        sa.Column('muscle', sa.String(), primary_key=True),
+        sa.Column('sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('primary_sets', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('primary_volume', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('secondary_sets', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('secondary_volume', sa.Float(), nullable=False, server_default='0'),
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        week_expr = "date_trunc('week', s.completed_at AT TIME ZONE 'UTC')::date"
+    else:
+        week_expr = "date(s.completed_at, 'weekday 0', '-6 days')"
+
+    # Primary muscle falls back to muscle_group, then 'Other' (empty strings count as missing)
+    primary_expr = "COALESCE(NULLIF(e.muscle, ''), NULLIF(e.muscle_group, ''), 'Other')"
+
+    op.execute(f"""
+        INSERT INTO user_muscle_weekly_stats
+            (user_id, week, muscle, sessions, primary_sets, primary_volume, secondary_sets, secondary_volume)
+        SELECT
+            credit.user_id,
+            credit.week,
+            credit.muscle,
+            COUNT(DISTINCT CASE WHEN credit.is_primary = 1 THEN credit.session_id END),
+            SUM(CASE WHEN credit.is_primary = 1 THEN 1 ELSE 0 END),
+            COALESCE(SUM(CASE WHEN credit.is_primary = 1 THEN credit.volume ELSE 0 END), 0),
+            SUM(CASE WHEN credit.is_primary = 0 THEN 1 ELSE 0 END),
+            COALESCE(SUM(CASE WHEN credit.is_primary = 0 THEN credit.volume ELSE 0 END), 0)
+        FROM (
+            SELECT s.user_id, {week_expr} AS week, {primary_expr} AS muscle, 1 AS is_primary, s.id AS session_id,
+                   COALESCE(st.weight_kg, e.default_weight_kg) * COALESCE(st.reps, 0) AS volume
+            FROM sets st
+            JOIN sessions s ON st.session_id = s.id
+            JOIN exercises e ON st.exercise_id = e.id
+            WHERE s.completed_at IS NOT NULL
+              AND COALESCE(st.set_type, 'normal') = 'normal'
+              AND st.reps > 0
+            UNION ALL
+            SELECT s.user_id, {week_expr}, e.secondary_muscle, 0, s.id,
+                   COALESCE(st.weight_kg, e.default_weight_kg) * COALESCE(st.reps, 0)
+            FROM sets st
+            JOIN sessions s ON st.session_id = s.id
+            JOIN exercises e ON st.exercise_id = e.id
+            WHERE s.completed_at IS NOT NULL
+              AND COALESCE(st.set_type, 'normal') = 'normal'
+              AND st.reps > 0
+              AND NULLIF(e.secondary_muscle, '') IS NOT NULL
+              AND e.secondary_muscle <> {primary_expr}
+        ) credit
+        GROUP BY credit.user_id, credit.week, credit.muscle;
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_muscle_weekly_stats')
@@ -0,0 +1,56 @@
+"""add reward_ledger table
+
+Revision ID: e9f0a1b2c3d4
+Revises: d8e9f0a1b2c3
+Create Date: 2026-10-17 19:00:00.000000
+
+Append-only XP / coin / joker ledger (app.reward_ledger). Existing balances
+are carried in as one opening_balance entry per user; sessions completed
+before this revision have no award entry and are reversed by re-deriving
+their reward, as before.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e9f0a1b2c3d4'
+down_revision: Union[str, None] = 'd8e9f0a1b2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reward_ledger',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=True),
+        sa.Column('source', sa.String(length=30), nullable=False),
+        sa.Column('xp', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('coins', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('jokers', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('detail', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index('ix_reward_ledger_id', 'reward_ledger', ['id'])
+    op.create_index('ix_reward_ledger_user_id_id', 'reward_ledger', ['user_id', 'id'])
+    op.create_index('ix_reward_ledger_session_id', 'reward_ledger', ['session_id'])
+
+    # Total experience = sum of level * 100 over completed levels + progress in the current one
+    op.execute("""
+        INSERT INTO reward_ledger (user_id, source, xp, coins, jokers)
+        SELECT id, 'opening_balance',
+               50 * COALESCE(level, 1) * (COALESCE(level, 1) - 1) + COALESCE(experience, 0),
+               COALESCE(currency, 0),
+               COALESCE(joker_tokens, 0)
+        FROM users
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reward_ledger_session_id', table_name='reward_ledger')
+    op.drop_index('ix_reward_ledger_user_id_id', table_name='reward_ledger')
+    op.drop_index('ix_reward_ledger_id', table_name='reward_ledger')
+    op.drop_table('reward_ledger')
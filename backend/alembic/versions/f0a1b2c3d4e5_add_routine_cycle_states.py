@@ -0,0 +1,36 @@
+"""add routine_cycle_states table
+
+Revision ID: f0a1b2c3d4e5
+Revises: e9f0a1b2c3d4
+Create Date: 2026-10-17 20:00:00.000000
+
+Per (user, routine) bitmask of the days completed in the current cycle
+(app.routine_cycles). Rows are built from history on a routine's next
+completion, so nothing is backfilled here.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f0a1b2c3d4e5'
+down_revision: Union[str, None] = 'e9f0a1b2c3d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'routine_cycle_states',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('routine_id', sa.Integer(), sa.ForeignKey('routines.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day_mask', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('cycle_started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('prev_day_mask', sa.BigInteger(), nullable=True),
+        sa.Column('prev_cycle_started_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('routine_cycle_states')
@@ -0,0 +1,26 @@
+"""add (user_id, completed_at) index on sessions
+
+Revision ID: f4a5b6c7d8e9
+Revises: e3f4a5b6c7d8
+Create Date: 2026-10-17 14:00:00.000000
+
+Backs the per-user newest-first session windows (effort trend's last-N
+and date-range paging) so they read only the rows they return.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'f4a5b6c7d8e9'
+down_revision: Union[str, None] = 'e3f4a5b6c7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sessions_user_id_completed_at', 'sessions', ['user_id', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_user_id_completed_at', table_name='sessions')
@@ -0,0 +1,150 @@
+"""Per-user daily training rollup (``user_daily_stats``).
+
+A completed session counts towards the row for the UTC calendar day of its
+``completed_at``. Whenever a write touches a completed session (completion,
+set edits, duration edits, delete) only that one day is recomputed, so the
+cost of keeping the rollup fresh never depends on the user's history length.
+
+The same refresh also recomputes the week's muscle-volume rollup
+(``app.muscle_stats``), so every write path keeps both tables current.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user_daily_stats import UserDailyStats
+from app.muscle_stats import rebuild_user_muscle_stats, refresh_muscle_week
+from app.training_calendar import week_monday
+
+
+def stat_day(dt: datetime) -> date:
+    """Calendar day a completion timestamp is bucketed into (UTC)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date()
+
+
+def _normal_set_filter():
+    return func.coalesce(SetModel.set_type, "normal") == "normal"
+
+
+def _set_aggregates_by_session(db: DBSession, session_ids: list[int]) -> dict[int, tuple[float, int]]:
+    """{session_id: (normal-set volume, normal-set count)} in one grouped query."""
+    if not session_ids:
+        return {}
+    volume_expr = case(
+        (and_(SetModel.weight_kg > 0, SetModel.reps > 0), SetModel.weight_kg * SetModel.reps),
+        else_=0,
+    )
+    rows = (
+        db.query(
+            SetModel.session_id,
+            func.coalesce(func.sum(volume_expr), 0),
+            func.count(SetModel.id),
+        )
+        .filter(SetModel.session_id.in_(session_ids), _normal_set_filter())
+        .group_by(SetModel.session_id)
+        .all()
+    )
+    return {sid: (float(volume or 0), int(count or 0)) for sid, volume, count in rows}
+
+
+def _apply_totals(row: UserDailyStats, sessions: list, aggregates: dict[int, tuple[float, int]]) -> None:
+    row.sessions = len(sessions)
+    row.volume = sum(aggregates.get(sid, (0.0, 0))[0] for sid, _ in sessions)
+    row.set_count = sum(aggregates.get(sid, (0.0, 0))[1] for sid, _ in sessions)
+    tracked = [d for _, d in sessions if d and d > 0]
+    row.duration_seconds = sum(tracked)
+    row.duration_sessions = len(tracked)
+
+
+def refresh_daily_stats(db: DBSession, user_id: int, day: date) -> None:
+    """Recompute the rollup row for one (user, day) and its week's muscle rows. Caller commits."""
+    _refresh_day(db, user_id, day)
+    refresh_muscle_week(db, user_id, week_monday(day))
+
+
+def _refresh_day(db: DBSession, user_id: int, day: date) -> None:
+    db.flush()
+
+    # Pad the window by a day on each side so naive / offset timestamps from
+    # any driver still land in the candidate set; stat_day() decides exactly.
+    window_start = datetime.combine(day - timedelta(days=1), time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(day + timedelta(days=2), time.min, tzinfo=timezone.utc)
+    candidates = (
+        db.query(SessionModel.id, SessionModel.completed_at, SessionModel.duration_seconds)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.completed_at.isnot(None),
+            SessionModel.completed_at >= window_start,
+            SessionModel.completed_at < window_end,
+        )
+        .all()
+    )
+    sessions = [(sid, duration) for sid, completed_at, duration in candidates if stat_day(completed_at) == day]
+
+    row = db.get(UserDailyStats, (user_id, day))
+    if not sessions:
+        if row is not None:
+            db.delete(row)
+        return
+
+    if row is None:
+        row = UserDailyStats(user_id=user_id, day=day)
+        db.add(row)
+    aggregates = _set_aggregates_by_session(db, [sid for sid, _ in sessions])
+    _apply_totals(row, sessions, aggregates)
+
+
+def sync_session_day(db: DBSession, session: SessionModel) -> None:
+    """Refresh the rollup day a completed session belongs to (no-op for drafts)."""
+    if session is None or session.completed_at is None:
+        return
+    refresh_daily_stats(db, session.user_id, stat_day(session.completed_at))
+
+
+def rebuild_user_daily_stats(db: DBSession, user_id: int) -> int:
+    """Drop and rebuild every daily (and weekly muscle) rollup row for a user.
+    Returns the number of daily rows written.
+
+    Used after bulk writes that bypass the API (demo seed, backup import).
+    """
+    rebuild_user_muscle_stats(db, user_id)
+    db.flush()
+    db.query(UserDailyStats).filter(UserDailyStats.user_id == user_id).delete(synchronize_session=False)
+
+    completed = (
+        db.query(SessionModel.id, SessionModel.completed_at, SessionModel.duration_seconds)
+        .filter(SessionModel.user_id == user_id, SessionModel.completed_at.isnot(None))
+        .all()
+    )
+    by_day: dict[date, list] = {}
+    for sid, completed_at, duration in completed:
+        by_day.setdefault(stat_day(completed_at), []).append((sid, duration))
+
+    aggregates = _set_aggregates_by_session(db, [sid for sid, _, _ in completed])
+    for day, sessions in by_day.items():
+        row = UserDailyStats(user_id=user_id, day=day)
+        _apply_totals(row, sessions, aggregates)
+        db.add(row)
+    return len(by_day)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user_ids = [uid for (uid,) in db.query(User.id).all()]
+        rows = 0
+        for uid in user_ids:
+            rows += rebuild_user_daily_stats(db, uid)
+            db.commit()
+        print(f"✅ Rebuilt {rows} daily stats rows (and weekly muscle rows) for {len(user_ids)} users")
+    finally:
+        db.close()
@@ -20,6 +20,10 @@ from contextlib import contextmanager
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
+from app.daily_stats import rebuild_user_daily_stats
+from app.exercise_bests import rebuild_user_exercise_bests
+from app.quest_counters import rebuild_user_quest_counters
+from app.reward_ledger import record_opening_balance
 from app.database import SessionLocal
 from app.models.routine import Routine
 from app.models.session import Session as SessionModel, Set as SetModel
@@ -184,6 +188,7 @@ def import_data(filepath: str, session_factory: SessionFactory = SessionLocal) -
             )
             db.add(user)
             db.flush()
+            record_opening_balance(db, user)
             existing_emails.add(user.email)
             added["users"] += 1
 
@@ -267,6 +272,13 @@ def import_data(filepath: str, session_factory: SessionFactory = SessionLocal) -
 
         db.commit()
 
+        # Imported rows bypass the API write paths, so rebuild the rollups.
+        for user_id in set(user_map.values()):
+            rebuild_user_daily_stats(db, user_id)
+            rebuild_user_exercise_bests(db, user_id)
+            rebuild_user_quest_counters(db, user_id)
+        db.commit()
+
     print(
         f"✅ Imported {added['users']} users, {added['routines']} routines, "
         f"{added['sessions']} sessions, {added['sets']} sets from {filepath}"
@@ -0,0 +1,162 @@
+"""
+In-memory snapshots of the unauthenticated demo endpoints.
+
+The landing page hits a handful of ``/demo`` endpoints for anonymous
+visitors. Their responses only change when the demo data is re-seeded, so
+each (endpoint, query params) variant is rendered to JSON once, kept in
+memory with a strong ETag, and served from there. A background task started
+with the app renders the landing-page variants up front and re-renders every
+known variant on a schedule, which is also how a re-seed (``seed_demo`` runs
+as a separate process) becomes visible. Repeat traffic costs no database
+work, and clients holding a current ETag get a bodyless 304.
+
+Builders are registered by the routers that own the endpoints, so this
+module doesn't import them.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session as DBSession
+
+from app.config import get_env
+
+logger = logging.getLogger(__name__)
+
+DEMO_SNAPSHOT_REFRESH_SECONDS = int(get_env("DEMO_SNAPSHOT_REFRESH_SECONDS", "600"))
+DEMO_SNAPSHOT_MAX_VARIANTS = int(get_env("DEMO_SNAPSHOT_MAX_VARIANTS", "256"))
+DEMO_CACHE_CONTROL = f"public, max-age={min(DEMO_SNAPSHOT_REFRESH_SECONDS, 300)}"
+
+Builder = Callable[..., Any]
+
+
+@dataclass(frozen=True)
+class DemoSnapshot:
+    body: bytes
+    etag: str
+    built_at: datetime
+
+
+def _render(value: Any) -> DemoSnapshot:
+    # Same encoding as FastAPI's JSONResponse
+    body = json.dumps(
+        jsonable_encoder(value), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+    return DemoSnapshot(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', built_at=datetime.now(timezone.utc))
+
+
+class DemoSnapshotStore:
+    """Rendered demo responses keyed by (endpoint, params); bounded, oldest-used evicted first."""
+
+    def __init__(self, max_variants: int = DEMO_SNAPSHOT_MAX_VARIANTS):
+        self.max_variants = max_variants
+        self._builders: dict[str, Builder] = {}
+        self._snapshots: OrderedDict[tuple, DemoSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+        # Serialises builds so a burst of misses renders each variant once
+        self._build_lock = threading.Lock()
+
+    def register(self, endpoint: str, builder: Builder) -> None:
+        self._builders[endpoint] = builder
+
+    def _store(self, key: tuple, snapshot: DemoSnapshot) -> None:
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_variants:
+                self._snapshots.popitem(last=False)
+
+    def peek(self, key: tuple) -> DemoSnapshot | None:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+            return snapshot
+
+    def get(self, db: DBSession, endpoint: str, params: tuple = ()) -> DemoSnapshot:
+        key = (endpoint, params)
+        snapshot = self.peek(key)
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            snapshot = self.peek(key)
+            if snapshot is None:
+                snapshot = _render(self._builders[endpoint](db, *params))
+                self._store(key, snapshot)
+        return snapshot
+
+    def refresh(self, db: DBSession, defaults: tuple[tuple, ...] = ()) -> int:
+        """Re-render every known variant plus ``defaults``. Returns the number rendered."""
+        with self._lock:
+            keys = list(dict.fromkeys([*self._snapshots, *defaults]))
+        rendered = 0
+        with self._build_lock:
+            for endpoint, params in keys:
+                try:
+                    self._store((endpoint, params), _render(self._builders[endpoint](db, *params)))
+                    rendered += 1
+                except Exception:
+                    db.rollback()
+                    logger.exception("Demo snapshot %s%s failed to refresh", endpoint, params)
+        return rendered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+
+demo_snapshots = DemoSnapshotStore()
+
+# Variants the landing page requests on first paint; rendered at startup.
+DEFAULT_VARIANTS: tuple[tuple, ...] = (
+    ("stats.progress", (None, None, None, 120)),
+    ("stats.effort", (12, None, None, 0)),
+    ("stats.cardio_exercises", (100,)),
+    ("sessions.history", (0, 300)),
+    ("gamification.stats", ()),
+    ("gamification.quests", ()),
+    ("gamification.shop", ()),
+)
+
+
+def demo_response(request: Request, db: DBSession, endpoint: str, params: tuple = ()) -> Response:
+    """Serve a demo snapshot with ETag / Cache-Control (304 when the client's copy is current)."""
+    snapshot = demo_snapshots.get(db, endpoint, params)
+    headers = {"ETag": snapshot.etag, "Cache-Control": DEMO_CACHE_CONTROL}
+    if snapshot.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def refresh_demo_snapshots() -> int:
+    """Re-render all demo snapshots with a fresh DB session (startup and scheduled refresh)."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return demo_snapshots.refresh(db, DEFAULT_VARIANTS)
+    finally:
+        db.close()
+
+
+async def run_demo_snapshot_refresher() -> None:
+    """Background loop: render at startup, then every DEMO_SNAPSHOT_REFRESH_SECONDS."""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_demo_snapshots)
+        except Exception:
+            logger.exception("Demo snapshot refresh failed")
+        await asyncio.sleep(DEMO_SNAPSHOT_REFRESH_SECONDS)
@@ -24,7 +24,8 @@ def _sync_admin_membership(db: Session, user: User) -> User:
         db.refresh(user)
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Plain def: the user lookup is a blocking query, so FastAPI runs it in the threadpool
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -0,0 +1,51 @@
+"""
+Shape-preserving downsampling for chart series.
+
+Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps the first and last
+points and, for each of the ``max_points - 2`` equal-width buckets in between,
+the point forming the largest triangle with the previously kept point and the
+average of the next bucket. Peaks and troughs survive, unlike stride sampling.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+
+def lttb_indices(y: np.ndarray, max_points: Optional[int], x: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the points to keep, in ascending order.
+
+    ``x`` defaults to the point positions (evenly spaced). Returns every index
+    when ``max_points`` is None, below 3, or not smaller than the series.
+    """
+    n = len(y)
+    if max_points is None or max_points < 3 or n <= max_points:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # Bucket i (1..max_points-2) covers [edges[i-1], edges[i]) of the interior points
+    edges = (np.linspace(1, n - 1, max_points - 1)).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    prev = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[prev] - avg_x) * (by - y[prev]) - (x[prev] - bx) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+
+    return keep
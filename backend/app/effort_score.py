@@ -6,16 +6,30 @@ this exact day of this exact routine. The very first cycle of any routine
 day produces no score (used as the reference for future cycles).
 
 A session with no routine_id / day_index cannot be paired and is skipped.
+
+Backfill (e.g. after changing the weights)::
+
+    python -m app.effort_score [--dry-run] [--workers N] [--batch-size N]
 """
 from __future__ import annotations
 
-from typing import Dict, Iterable, Optional
+import argparse
+from dataclasses import dataclass
+from typing import Optional
 
+import numpy as np
 from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session as DBSession
 
 from app.models.session import Session as SessionModel, Set as SetModel
 from app.models.user import User
+from app.training_history import (
+    TrainingHistory,
+    load_training_history,
+    session_exercise_stats,
+    session_volume,
+)
+from app.user_batches import DEFAULT_BATCH_SIZE, run_in_processes
 
 
 def _clamp(value: float, low: float, high: float) -> float:
@@ -42,45 +56,12 @@ def _prior_paired_sessions_query(db: DBSession, user_id: int, session: SessionMo
     )
 
 
-def _session_volume(sets: Iterable[SetModel]) -> float:
-    total = 0.0
-    for s in sets:
-        weight = float(s.weight_kg or 0)
-        reps = int(s.reps or 0)
-        if reps <= 0:
-            continue
-        total += weight * reps
-    return total
-
-
-def _volume_factor(db: DBSession, user_id: int, session: SessionModel, current_volume: float) -> float:
-    if not session.completed_at:
-        return 50.0
-
-    previous_sessions = (
-        _prior_paired_sessions_query(db, user_id, session)
-        .with_entities(SessionModel.id)
-        .limit(10)
-        .all()
-    )
-    prev_ids = [sid for (sid,) in previous_sessions]
-
-    if not prev_ids:
-        return 50.0
-
-    volumes = []
-    for sid in prev_ids:
-        prev_sets = (
-            db.query(SetModel)
-            .filter(SetModel.session_id == sid, _is_normal_set_filter())
-            .all()
-        )
-        volumes.append(_session_volume(prev_sets))
-
-    if not volumes:
+def _volume_factor(current_volume: float, prior_volumes: list[float]) -> float:
+    """``prior_volumes``: the last (up to 10) paired sessions' volumes."""
+    if not prior_volumes:
         return 50.0
 
-    avg_volume = sum(volumes) / len(volumes)
+    avg_volume = sum(prior_volumes) / len(prior_volumes)
     if avg_volume <= 0:
         return 50.0
 
@@ -89,21 +70,14 @@ def _volume_factor(db: DBSession, user_id: int, session: SessionModel, current_v
     return _clamp(50.0 + ((ratio - 1.0) * 230.0), 0.0, 100.0)
 
 
-def _failure_factor(current_sets: list[SetModel]) -> float:
-    exercise_ids = {s.exercise_id for s in current_sets}
-    if not exercise_ids:
+def _failure_factor(exercises: int, failed_exercises: int) -> float:
+    if exercises == 0:
         return 0.0
 
-    total = len(exercise_ids)
     # Realistic ceiling: failing the last set of half your exercises is already
     # very intense. Cap both the denominator and the numerator at total/2 so
     # that "last set to failure on half the exercises" scores 100.
-    cap = total / 2.0
-    failed_exercises = len({
-        s.exercise_id
-        for s in current_sets
-        if bool(s.to_failure)
-    })
+    cap = exercises / 2.0
     capped_failed = min(float(failed_exercises), cap)
     return (capped_failed / cap) * 100.0
 
@@ -115,53 +89,21 @@ def _self_rating_factor(session: SessionModel) -> float:
     return float(rating * 10)
 
 
-def _progression_factor(db: DBSession, user_id: int, session: SessionModel, current_sets: list[SetModel]) -> float:
-    if not session.completed_at:
-        return 50.0
-
-    sets_by_exercise: Dict[int, list[SetModel]] = {}
-    for s in current_sets:
-        sets_by_exercise.setdefault(s.exercise_id, []).append(s)
-
-    if not sets_by_exercise:
-        return 50.0
-
-    # Restrict comparison to prior sessions of THIS routine + day_index only.
-    paired_session_ids = [
-        sid for (sid,) in
-        _prior_paired_sessions_query(db, user_id, session)
-        .with_entities(SessionModel.id)
-        .all()
-    ]
-    if not paired_session_ids:
+def _progression_factor(current_bests: dict[int, tuple[float, int]],
+                        prior_bests: dict[int, tuple[float, int]]) -> float:
+    """Share of the session's exercises that beat their best (weight, reps) in prior paired sessions."""
+    if not current_bests:
         return 50.0
 
     comparable = 0
     progressed = 0
 
-    for exercise_id, ex_sets in sets_by_exercise.items():
-        prev_best = (
-            db.query(
-                sa_func.max(SetModel.weight_kg).label("max_weight"),
-                sa_func.max(SetModel.reps).label("max_reps"),
-            )
-            .filter(
-                SetModel.session_id.in_(paired_session_ids),
-                SetModel.exercise_id == exercise_id,
-                _is_normal_set_filter(),
-            )
-            .first()
-        )
-
-        prev_weight = float(prev_best.max_weight or 0) if prev_best else 0.0
-        prev_reps = int(prev_best.max_reps or 0) if prev_best else 0
-
+    for exercise_id, (curr_weight, curr_reps) in current_bests.items():
+        prev_weight, prev_reps = prior_bests.get(exercise_id, (0.0, 0))
         if prev_weight <= 0 and prev_reps <= 0:
             continue
 
         comparable += 1
-        curr_weight = max(float(s.weight_kg or 0) for s in ex_sets)
-        curr_reps = max(int(s.reps or 0) for s in ex_sets)
 
         if (curr_weight > prev_weight) or (curr_reps > prev_reps):
             progressed += 1
@@ -173,48 +115,47 @@ def _progression_factor(db: DBSession, user_id: int, session: SessionModel, curr
     return 10.0 + (progressed / comparable) * 90.0
 
 
-def compute_effort_score(db: DBSession, user_id: int, session: SessionModel) -> Optional[float]:
-    """Compute a 0-100 effort score for a completed session.
-
-    Returns None when:
-      - the user didn't self-rate this session, OR
-      - the session is not tied to a routine + day_index, OR
-      - this is the first cycle of this (routine, day_index) — no reference yet.
-    """
-    if session.self_rated_effort is None:
-        return None
-
-    # Effort is only meaningful when paired against a prior same-day session.
-    if session.routine_id is None or session.day_index is None:
-        return None
-
-    has_prior_paired = (
-        _prior_paired_sessions_query(db, user_id, session)
-        .with_entities(SessionModel.id)
-        .limit(1)
-        .first()
-    )
-    if not has_prior_paired:
-        return None
-
-    user = db.query(User).filter(User.id == user_id).first()
-    settings = (user.settings or {}) if user else {}
+@dataclass
+class _SessionInputs:
+    """What scoring needs from the session itself (normal sets only)."""
+    volume: float
+    bests: dict[int, tuple[float, int]]  # exercise_id -> (max weight or 0, max reps or 0)
+    exercises: int
+    failed_exercises: int
+
+
+def _session_inputs(history: TrainingHistory) -> dict[int, _SessionInputs]:
+    """Per-session scoring inputs for every session in ``history``."""
+    volumes = session_volume(history)
+    stats = session_exercise_stats(history)
+    inputs = {
+        int(sid): _SessionInputs(volume=float(volumes[i]), bests={}, exercises=0, failed_exercises=0)
+        for i, sid in enumerate(history.session_ids)
+    }
+    for s_idx, ex_idx, max_weight, max_reps in zip(stats.session_idx, stats.exercise_idx, stats.max_weight, stats.max_reps):
+        entry = inputs[int(history.session_ids[s_idx])]
+        entry.bests[int(history.exercise_ids[ex_idx])] = (float(max_weight), int(max_reps))
+        entry.exercises += 1
+
+    if history.to_failure.any():
+        failed = np.unique(
+            history.session_idx[history.to_failure].astype(np.int64) * max(history.n_exercises, 1)
+            + history.exercise_idx[history.to_failure]
+        )
+        for s_idx in failed // max(history.n_exercises, 1):
+            inputs[int(history.session_ids[s_idx])].failed_exercises += 1
+    return inputs
 
-    current_sets = (
-        db.query(SetModel)
-        .filter(SetModel.session_id == session.id, _is_normal_set_filter())
-        .all()
-    )
 
-    current_volume = _session_volume(current_sets)
-    volume_factor = _volume_factor(db, user_id, session, current_volume)
+def _score(session: SessionModel, current: Optional[_SessionInputs], prior_volumes: list[float],
+           prior_bests: dict[int, tuple[float, int]], failure_enabled: bool) -> float:
+    current = current or _SessionInputs(volume=0.0, bests={}, exercises=0, failed_exercises=0)
+    volume_factor = _volume_factor(current.volume, prior_volumes)
     self_factor = _self_rating_factor(session)
-    progression_factor = _progression_factor(db, user_id, session, current_sets)
-
-    failure_enabled = bool(settings.get("failure_tracking_enabled"))
+    progression_factor = _progression_factor(current.bests, prior_bests)
 
     if failure_enabled:
-        failure_factor = _failure_factor(current_sets)
+        failure_factor = _failure_factor(current.exercises, current.failed_exercises)
         score = (
             (volume_factor * 0.15)
             + (failure_factor * 0.30)
@@ -230,3 +171,171 @@ def compute_effort_score(db: DBSession, user_id: int, session: SessionModel) ->
         )
 
     return round(_clamp(score, 0.0, 100.0), 1)
+
+
+def _scoreable(session: SessionModel) -> bool:
+    # Effort is only meaningful for self-rated sessions paired against a prior same-day session.
+    return (
+        session.self_rated_effort is not None
+        and session.routine_id is not None
+        and session.day_index is not None
+        and session.completed_at is not None
+    )
+
+
+def compute_effort_score(db: DBSession, user_id: int, session: SessionModel,
+                         settings: Optional[dict] = None) -> Optional[float]:
+    """Compute a 0-100 effort score for a completed session.
+
+    Returns None when:
+      - the user didn't self-rate this session, OR
+      - the session is not tied to a routine + day_index, OR
+      - this is the first cycle of this (routine, day_index) — no reference yet.
+
+    Pass the user's ``settings`` when the caller has them loaded. Reads the
+    paired sessions' ids, the session's own sets, and two grouped
+    aggregates over the paired sessions (volume per session, maxima per
+    exercise).
+    """
+    if not _scoreable(session):
+        return None
+
+    paired_ids = [sid for (sid,) in _prior_paired_sessions_query(db, user_id, session).with_entities(SessionModel.id)]
+    if not paired_ids:
+        return None
+
+    if settings is None:
+        settings = db.query(User.settings).filter(User.id == user_id).scalar() or {}
+
+    current = _session_inputs(load_training_history(db, user_id, session_ids=[session.id])).get(session.id)
+
+    # Last 10 paired sessions; ones with no normal sets still count, at zero volume.
+    recent = paired_ids[:10]
+    volume = sa_func.sum(sa_func.coalesce(SetModel.weight_kg, 0) * SetModel.reps)
+    volume_by_session = dict(
+        db.query(SetModel.session_id, volume)
+        .filter(SetModel.session_id.in_(recent), SetModel.reps > 0, _is_normal_set_filter())
+        .group_by(SetModel.session_id)
+        .all()
+    )
+    prior_volumes = [float(volume_by_session.get(sid) or 0.0) for sid in recent]
+
+    prior_bests = {}
+    if current is not None and current.bests:
+        paired = _prior_paired_sessions_query(db, user_id, session).with_entities(SessionModel.id).order_by(None)
+        prior_bests = {
+            exercise_id: (float(max_weight or 0), int(max_reps or 0))
+            for exercise_id, max_weight, max_reps in db.query(
+                SetModel.exercise_id, sa_func.max(SetModel.weight_kg), sa_func.max(SetModel.reps),
+            )
+            .filter(
+                SetModel.session_id.in_(paired.scalar_subquery()),
+                SetModel.exercise_id.in_(list(current.bests)),
+                _is_normal_set_filter(),
+            )
+            .group_by(SetModel.exercise_id)
+        }
+
+    return _score(session, current, prior_volumes, prior_bests, bool(settings.get("failure_tracking_enabled")))
+
+
+# ── Backfill ─────────────────────────────────────────────────────────────────
+
+
+def _user_scores(sessions: list, history: TrainingHistory, failure_enabled: bool) -> dict[int, Optional[float]]:
+    """Scores for one user's completed sessions, walking each routine day in completion order."""
+    inputs = _session_inputs(history)
+    by_day: dict[tuple[int, int], list] = {}
+    for s in sessions:
+        if s.routine_id is not None and s.day_index is not None:
+            by_day.setdefault((s.routine_id, s.day_index), []).append(s)
+
+    scores: dict[int, Optional[float]] = {s.id: None for s in sessions}
+    for day_sessions in by_day.values():
+        day_sessions.sort(key=lambda s: (s.completed_at, s.id))
+        volumes: list[float] = []  # most recent first
+        bests: dict[int, tuple[float, int]] = {}
+        i = 0
+        while i < len(day_sessions):
+            # Sessions completed at the same instant are not each other's prior
+            j = i
+            while j < len(day_sessions) and day_sessions[j].completed_at == day_sessions[i].completed_at:
+                j += 1
+            group = day_sessions[i:j]
+            for s in group:
+                if volumes and s.self_rated_effort is not None:
+                    scores[s.id] = _score(s, inputs.get(s.id), volumes[:10], bests, failure_enabled)
+            for s in group:
+                current = inputs.get(s.id)
+                volumes.insert(0, current.volume if current else 0.0)
+                for exercise_id, (weight, reps) in (current.bests.items() if current else ()):
+                    prev_weight, prev_reps = bests.get(exercise_id, (0.0, 0))
+                    bests[exercise_id] = (max(weight, prev_weight), max(reps, prev_reps))
+            i = j
+    return scores
+
+
+def backfill_users(db: DBSession, user_ids: list[int], dry_run: bool = False) -> int:
+    """Recompute ``effort_score`` for every completed session of these users. Returns rows changed.
+
+    One session query for the batch, one set load per user, one bulk update
+    and commit per batch.
+    """
+    settings = dict(db.query(User.id, User.settings).filter(User.id.in_(user_ids)))
+    sessions_by_user: dict[int, list] = {}
+    for row in db.query(
+        SessionModel.id, SessionModel.user_id, SessionModel.routine_id, SessionModel.day_index,
+        SessionModel.completed_at, SessionModel.self_rated_effort, SessionModel.effort_score,
+    ).filter(SessionModel.user_id.in_(user_ids), SessionModel.completed_at.isnot(None)):
+        sessions_by_user.setdefault(row.user_id, []).append(row)
+
+    updates = []
+    for user_id, sessions in sessions_by_user.items():
+        failure_enabled = bool((settings.get(user_id) or {}).get("failure_tracking_enabled"))
+        scores = _user_scores(sessions, load_training_history(db, user_id), failure_enabled)
+        updates.extend(
+            {"id": s.id, "effort_score": scores[s.id]}
+            for s in sessions
+            if s.effort_score != scores[s.id]
+        )
+
+    if updates and not dry_run:
+        db.bulk_update_mappings(SessionModel, updates)
+        db.commit()
+    return len(updates)
+
+
+def backfill_effort_scores(user_ids: Optional[list[int]] = None, dry_run: bool = False, workers: int = 1,
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Recompute every session's effort score (e.g. after the weights change), across ``workers`` processes.
+
+    Cached stats responses pick up the new scores when their TTL expires.
+    """
+    from app.database import SessionLocal
+
+    if user_ids is None:
+        db = SessionLocal()
+        try:
+            user_ids = [uid for (uid,) in db.query(User.id).order_by(User.id)]
+        finally:
+            db.close()
+
+    return sum(run_in_processes(backfill_users, user_ids, dry_run, workers, batch_size))
+
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description="Recompute effort scores for all completed sessions.")
+    parser.add_argument("--dry-run", action="store_true", help="only count the scores that would change")
+    parser.add_argument("--workers", type=int, default=1, help="processes to spread user batches over")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="users per batch / transaction")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids", help="limit to these users")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    changed = backfill_effort_scores(args.user_ids, dry_run=args.dry_run, workers=args.workers,
+                                     batch_size=args.batch_size)
+    verb = "would change" if args.dry_run else "changed"
+    print(f"{'🔎' if args.dry_run else '✅'} Effort score backfill {verb} {changed} sessions "
+          f"in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,208 @@
+"""Per-user personal-record index (``exercise_bests``).
+
+One row per (user, exercise) with the best reps / weight over the user's
+completed normal sets, the number of completed sessions that included the
+exercise and the latest of them. PR detection reads one row per exercise in
+the just-completed session instead of scanning the user's history, so
+completion cost no longer grows with training history.
+
+Write paths:
+  - completion folds the session in (``record_session_bests``) right after
+    PR detection, so the table never contains a session that hasn't been
+    through detection yet;
+  - set edits on a completed session and session deletes recompute only the
+    touched exercises (``refresh_exercise_bests``);
+  - bulk writes that bypass the API (demo seed, backup import) rebuild the
+    user (``rebuild_user_exercise_bests``).
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.exercise_best import ExerciseBest
+from app.models.session import Session as SessionModel, Set as SetModel
+
+# (max_reps, max_weight, session_count); missing values count as 0
+Bests = tuple[int, float, int]
+
+
+def _normal_set_filter():
+    return func.coalesce(SetModel.set_type, "normal") == "normal"
+
+
+def session_bests(db: DBSession, session_id: int) -> dict[int, tuple[int, float]]:
+    """{exercise_id: (max reps, max weight)} over one session's normal sets."""
+    return {
+        ex_id: (int(reps or 0), float(weight or 0))
+        for ex_id, reps, weight in db.query(
+            SetModel.exercise_id, func.max(SetModel.reps), func.max(SetModel.weight_kg),
+        )
+        .filter(SetModel.session_id == session_id, _normal_set_filter())
+        .group_by(SetModel.exercise_id)
+    }
+
+
+def load_exercise_bests(db: DBSession, user_id: int, exercise_ids: Iterable[int]) -> dict[int, ExerciseBest]:
+    """Rows for the given exercises (primary-key lookups, one query)."""
+    exercise_ids = list(exercise_ids)
+    if not exercise_ids:
+        return {}
+    return {
+        row.exercise_id: row
+        for row in db.query(ExerciseBest).filter(
+            ExerciseBest.user_id == user_id,
+            ExerciseBest.exercise_id.in_(exercise_ids),
+        )
+    }
+
+
+def as_bests(row: ExerciseBest | None) -> Bests:
+    if row is None:
+        return 0, 0.0, 0
+    return row.max_reps or 0, row.max_weight or 0.0, row.session_count or 0
+
+
+def record_session_bests(db: DBSession, user_id: int, session_id: int,
+                         current: dict[int, tuple[int, float]], rows: dict[int, ExerciseBest]) -> None:
+    """Fold a newly completed session into the index. Caller commits."""
+    for ex_id, (reps, weight) in current.items():
+        row = rows.get(ex_id)
+        if row is None:
+            row = ExerciseBest(user_id=user_id, exercise_id=ex_id, max_reps=0, max_weight=0.0, session_count=0)
+            db.add(row)
+        row.max_reps = max(row.max_reps or 0, reps)
+        row.max_weight = max(row.max_weight or 0.0, weight)
+        row.session_count = (row.session_count or 0) + 1
+        row.last_session_id = session_id
+
+
+def bests_without_session(db: DBSession, user_id: int, session_id: int,
+                          current: dict[int, tuple[int, float]]) -> dict[int, Bests]:
+    """Bests over every other completed session, for a session already in the index.
+
+    Where the session doesn't hold the record the stored value already is the
+    answer; only exercises whose record it matches are re-aggregated.
+    """
+    rows = load_exercise_bests(db, user_id, current)
+    result: dict[int, Bests] = {}
+    holders = []
+    for ex_id, (reps, weight) in current.items():
+        max_reps, max_weight, count = as_bests(rows.get(ex_id))
+        result[ex_id] = (max_reps, max_weight, max(0, count - 1))
+        if reps >= max_reps or weight >= max_weight:
+            holders.append(ex_id)
+
+    if holders:
+        others = {
+            ex_id: (int(reps or 0), float(weight or 0))
+            for ex_id, reps, weight in db.query(
+                SetModel.exercise_id, func.max(SetModel.reps), func.max(SetModel.weight_kg),
+            )
+            .join(SessionModel, SetModel.session_id == SessionModel.id)
+            .filter(
+                SessionModel.user_id == user_id,
+                SessionModel.completed_at.isnot(None),
+                SessionModel.id != session_id,
+                SetModel.exercise_id.in_(holders),
+                _normal_set_filter(),
+            )
+            .group_by(SetModel.exercise_id)
+        }
+        for ex_id in holders:
+            max_reps, max_weight = others.get(ex_id, (0, 0.0))
+            result[ex_id] = (max_reps, max_weight, result[ex_id][2])
+    return result
+
+
+def _recompute(db: DBSession, user_id: int, exercise_ids: list[int] | None) -> dict[int, dict]:
+    """{exercise_id: row values} from the user's completed sessions (one grouped query)."""
+    query = (
+        db.query(
+            SetModel.exercise_id,
+            SessionModel.id,
+            func.max(SetModel.reps),
+            func.max(SetModel.weight_kg),
+        )
+        .join(SessionModel, SetModel.session_id == SessionModel.id)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.completed_at.isnot(None),
+            _normal_set_filter(),
+        )
+    )
+    if exercise_ids is not None:
+        query = query.filter(SetModel.exercise_id.in_(exercise_ids))
+    query = (
+        query.group_by(SetModel.exercise_id, SessionModel.id, SessionModel.completed_at)
+        .order_by(SessionModel.completed_at.asc(), SessionModel.id.asc())
+    )
+
+    values: dict[int, dict] = {}
+    for ex_id, sid, reps, weight in query:
+        acc = values.setdefault(ex_id, {"max_reps": 0, "max_weight": 0.0, "session_count": 0})
+        acc["max_reps"] = max(acc["max_reps"], int(reps or 0))
+        acc["max_weight"] = max(acc["max_weight"], float(weight or 0))
+        acc["session_count"] += 1
+        acc["last_session_id"] = sid
+    return values
+
+
+def refresh_exercise_bests(db: DBSession, user_id: int, exercise_ids: Iterable[int]) -> None:
+    """Recompute the rows of the given exercises from scratch. Caller commits."""
+    exercise_ids = list(set(exercise_ids))
+    if not exercise_ids:
+        return
+    db.flush()
+    values = _recompute(db, user_id, exercise_ids)
+    rows = load_exercise_bests(db, user_id, exercise_ids)
+    for ex_id in exercise_ids:
+        row = rows.get(ex_id)
+        if ex_id not in values:
+            if row is not None:
+                db.delete(row)
+            continue
+        if row is None:
+            row = ExerciseBest(user_id=user_id, exercise_id=ex_id)
+            db.add(row)
+        for key, value in values[ex_id].items():
+            setattr(row, key, value)
+
+
+def sync_session_bests(db: DBSession, session: SessionModel, exercise_ids: Iterable[int]) -> None:
+    """Repair the index after a set write on a completed session (no-op for drafts)."""
+    if session is None or session.completed_at is None:
+        return
+    refresh_exercise_bests(db, session.user_id, exercise_ids)
+
+
+def session_exercise_ids(db: DBSession, session_id: int) -> list[int]:
+    return [ex_id for (ex_id,) in db.query(SetModel.exercise_id).filter(SetModel.session_id == session_id).distinct()]
+
+
+def rebuild_user_exercise_bests(db: DBSession, user_id: int) -> int:
+    """Drop and rebuild every row for a user. Returns the number of rows written."""
+    db.flush()
+    db.query(ExerciseBest).filter(ExerciseBest.user_id == user_id).delete(synchronize_session=False)
+    values = _recompute(db, user_id, None)
+    for ex_id, row_values in values.items():
+        db.add(ExerciseBest(user_id=user_id, exercise_id=ex_id, **row_values))
+    return len(values)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user_ids = [uid for (uid,) in db.query(User.id).all()]
+        rows = 0
+        for uid in user_ids:
+            rows += rebuild_user_exercise_bests(db, uid)
+            db.commit()
+        print(f"✅ Rebuilt {rows} exercise bests rows for {len(user_ids)} users")
+    finally:
+        db.close()
@@ -0,0 +1,195 @@
+"""
+In-memory snapshot of the system exercise catalog.
+
+System exercises (``user_id IS NULL``) are read on hot paths that only need
+to look things up: swap alternatives for a plateau, ``/api/exercises/suggest``
+on every change to the day being edited, and the catalog sent with every AI
+request. They change only through the admin CRUD endpoints (and re-seeding),
+so the whole catalog is loaded once into an immutable snapshot with indexes
+by muscle, muscle group, equipment and difficulty level, and those paths
+become dictionary and set lookups. The snapshot also holds the compiled
+bodyweight progression chains, which name exercises of the catalog.
+
+Admin writes bump the catalog version and the next read rebuilds the
+snapshot; it is also built once at startup. The snapshot is process-local
+(the API runs a single uvicorn worker); the TTL bounds staleness for
+changes made by other processes (``seed_data``, SQL).
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy.orm import Session as DBSession
+
+from app.config import get_env
+from app.models.exercise import Exercise
+from app.models.progression import ExerciseProgression
+from app.progression_chains import ChainGraph, compile_chains
+
+logger = logging.getLogger(__name__)
+
+EXERCISE_CATALOG_TTL_SECONDS = float(get_env("EXERCISE_CATALOG_TTL_SECONDS", "300"))
+
+# What an exercise with no equipment set counts as
+NO_EQUIPMENT = "none (bodyweight)"
+
+
+@lru_cache(maxsize=1024)
+def equipment_tokens(equipment: Optional[str]) -> frozenset[str]:
+    """Lower-cased parts of an equipment string; multi-equipment is written like "Dumbbell, Bench"."""
+    return frozenset(part.strip() for part in (equipment or NO_EQUIPMENT).lower().split(","))
+
+
+@lru_cache(maxsize=1024)
+def required_equipment(equipment: Optional[str]) -> frozenset[str]:
+    """Equipment an exercise needs beyond bodyweight; "other" (bands, functional gear) needs nothing."""
+    tokens = equipment_tokens(equipment)
+    if "other" in tokens:
+        return frozenset()
+    return frozenset(t for t in tokens if "bodyweight" not in t and t != "none")
+
+
+@dataclass(frozen=True)
+class CatalogExercise:
+    id: int
+    name: str
+    muscle: Optional[str]
+    secondary_muscle: Optional[str]
+    muscle_group: Optional[str]
+    equipment: Optional[str]
+    type: Optional[str]
+    is_bodyweight: bool
+    difficulty_level: int
+    difficulty_factor: float
+    bw_ratio: Optional[float]
+
+
+@dataclass(frozen=True)
+class ExerciseCatalog:
+    """System exercises in id order, with lookup indexes. Never mutated once built."""
+    version: int
+    built_at: float
+    exercises: tuple[CatalogExercise, ...]
+    by_id: dict[int, CatalogExercise]
+    by_muscle: dict[str, tuple[CatalogExercise, ...]]
+    by_muscle_group: dict[str, tuple[CatalogExercise, ...]]
+    by_equipment: dict[str, frozenset[int]]  # lower(coalesce(equipment, "none (bodyweight)")) -> ids
+    levels: tuple[int, ...]  # sorted distinct difficulty levels
+    up_to_level: tuple[tuple[CatalogExercise, ...], ...]  # per level: the exercises at or below it
+    chains: ChainGraph  # bodyweight progression chains (exercise_progressions)
+
+    def up_to_difficulty(self, max_difficulty: float) -> tuple[CatalogExercise, ...]:
+        """Exercises with ``difficulty_level <= max_difficulty``, in id order."""
+        i = bisect.bisect_right(self.levels, max_difficulty)
+        return self.up_to_level[i - 1] if i else ()
+
+
+def _index(exercises: tuple[CatalogExercise, ...], key) -> dict:
+    groups: dict = {}
+    for ex in exercises:
+        for k in key(ex):
+            groups.setdefault(k, []).append(ex)
+    return groups
+
+
+_lock = threading.Lock()
+_version = 0
+_catalog: Optional[ExerciseCatalog] = None
+
+
+def _build(db: DBSession, version: int) -> ExerciseCatalog:
+    rows = db.query(Exercise).filter(Exercise.user_id.is_(None)).order_by(Exercise.id).all()
+    exercises = tuple(
+        CatalogExercise(
+            id=ex.id,
+            name=ex.name,
+            muscle=ex.muscle,
+            secondary_muscle=ex.secondary_muscle,
+            muscle_group=ex.muscle_group,
+            equipment=ex.equipment,
+            type=ex.type,
+            is_bodyweight=bool(ex.is_bodyweight),
+            difficulty_level=ex.difficulty_level if ex.difficulty_level is not None else 1,
+            difficulty_factor=ex.difficulty_factor if ex.difficulty_factor is not None else 1.0,
+            bw_ratio=ex.bw_ratio,
+        )
+        for ex in rows
+    )
+    levels = tuple(sorted({ex.difficulty_level for ex in exercises}))
+    return ExerciseCatalog(
+        version=version,
+        built_at=time.monotonic(),
+        exercises=exercises,
+        by_id={ex.id: ex for ex in exercises},
+        by_muscle={k: tuple(v) for k, v in _index(exercises, lambda ex: [ex.muscle] if ex.muscle else []).items()},
+        by_muscle_group={
+            k: tuple(v) for k, v in _index(exercises, lambda ex: [ex.muscle_group] if ex.muscle_group else []).items()
+        },
+        by_equipment={
+            k: frozenset(ex.id for ex in v)
+            for k, v in _index(exercises, lambda ex: [(ex.equipment or NO_EQUIPMENT).lower()]).items()
+        },
+        levels=levels,
+        up_to_level=tuple(tuple(ex for ex in exercises if ex.difficulty_level <= level) for level in levels),
+        chains=compile_chains(
+            db.query(ExerciseProgression, Exercise.name)
+            .join(Exercise, ExerciseProgression.exercise_id == Exercise.id)
+            .order_by(ExerciseProgression.id)
+        ),
+    )
+
+
+def _fresh(catalog: Optional[ExerciseCatalog]) -> bool:
+    return (
+        catalog is not None
+        and catalog.version == _version
+        and time.monotonic() - catalog.built_at < EXERCISE_CATALOG_TTL_SECONDS
+    )
+
+
+def get_catalog(db: DBSession) -> ExerciseCatalog:
+    """The current catalog snapshot, rebuilt (two queries) if the version moved or the TTL ran out."""
+    global _catalog
+    catalog = _catalog
+    if _fresh(catalog):
+        return catalog
+    with _lock:
+        # Another request may have rebuilt it while we waited
+        if not _fresh(_catalog):
+            _catalog = _build(db, _version)
+        return _catalog
+
+
+def bump_catalog_version() -> None:
+    """Make the next read rebuild the snapshot.
+
+    Call after committing a change to a system exercise or to ``exercise_progressions``.
+    """
+    global _version
+    with _lock:
+        _version += 1
+
+
+def clear_catalog() -> None:
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def warm_catalog() -> None:
+    """Build the snapshot at startup so the first requests don't pay for it."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        get_catalog(db)
+    except Exception:
+        logger.exception("Loading the exercise catalog failed; it will load on first use")
+    finally:
+        db.close()
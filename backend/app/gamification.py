@@ -7,6 +7,12 @@ from sqlalchemy import func as sa_func
 from app.models.user import User
 from app.models.session import Session as SessionModel, Set as SetModel
 from app.models.quest import Quest, UserQuest
+from app.training_calendar import TrainingCalendar, load_training_calendar
+from app.quest_counters import load_quest_counters, record_session_completion, remove_session_completion
+from app.reward_ledger import balance_snapshot, record_change, session_award_entry
+from app.exercise_bests import as_bests, bests_without_session, load_exercise_bests, record_session_bests, session_bests
+from app.routine_cycles import record_cycle_day, remove_cycle_day
+from app.leaderboards import refresh_streak, update_scores
 from datetime import datetime, timezone, timedelta
 
 
@@ -49,15 +55,10 @@ def _current_iso_week_str():
     return f"{iso[0]}-W{iso[1]:02d}"
 
 
-def _count_weekly_xp_sessions(db: Session, user_id: int) -> int:
+def _count_weekly_xp_sessions(db: Session, user_id: int, calendar: TrainingCalendar | None = None) -> int:
     """Count completed sessions this week using the immutable streak_eligible_at."""
-    monday, sunday = _get_week_boundaries()
-    return db.query(sa_func.count(SessionModel.id)).filter(
-        SessionModel.user_id == user_id,
-        SessionModel.streak_eligible_at.isnot(None),
-        SessionModel.streak_eligible_at >= monday,
-        SessionModel.streak_eligible_at <= sunday,
-    ).scalar() or 0
+    calendar = calendar or load_training_calendar(db, user_id)
+    return calendar.count(datetime.now(timezone.utc))
 
 
 def _to_utc(dt: datetime | None) -> datetime:
@@ -98,98 +99,32 @@ def _streak_coins(streak_weeks: int) -> int:
     return 0
 
 
-def compute_streak_weeks(db: Session, user_id: int) -> int:
+def compute_streak_weeks(db: Session, user_id: int, calendar: TrainingCalendar | None = None,
+                         user: User | None = None) -> int:
     """
     Compute consecutive weeks with >= 1 completed session, looking back from
     the current week. If the current week has no sessions yet, we still check
     from last week (the streak hasn't died until the week ends).
     """
     now = datetime.now(timezone.utc)
-    start_of_week = now - timedelta(days=now.weekday())
-    start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # Fetch all streak-eligible session dates (immutable, not editable by user)
-    dates = [
-        d for (d,) in db.query(SessionModel.streak_eligible_at).filter(
-            SessionModel.user_id == user_id,
-            SessionModel.streak_eligible_at.isnot(None),
-        ).all()
-    ]
-
-    streak = 0
-    for i in range(52):
-        target_start = start_of_week - timedelta(weeks=i)
-        target_end = target_start + timedelta(days=6)
-
-        has_session = any(
-            target_start.date() <= d.date() <= target_end.date()
-            for d in dates
-        ) if dates else False
+    calendar = calendar or load_training_calendar(db, user_id)
 
-        if has_session:
-            streak += 1
-        else:
-            # Current week with no sessions is OK (streak alive until week ends)
-            if i == 0:
-                # Check if user used a joker this week
-                user = db.query(User).filter(User.id == user_id).first()
-                if user and user.streak_reward_week == _current_iso_week_str():
-                    streak += 1  # Joker-covered week
-                continue
-            break
+    # An empty current week still counts if the user used a joker this week
+    joker_week = False
+    if not calendar.has_sessions(now):
+        if user is None:
+            user = db.query(User).filter(User.id == user_id).first()
+        joker_week = bool(user and user.streak_reward_week == _current_iso_week_str())
 
-    return streak
+    return calendar.streak(now, max_weeks=52, current_week_covered=joker_week)
 
 
 def _check_routine_completion(db: Session, user_id: int, session_obj) -> bool:
     """
     Check if completing this session means all days of the routine are done.
-    Returns True if routine cycle is now complete.
+    Returns True if routine cycle is now complete (see app.routine_cycles).
     """
-    if not session_obj or not session_obj.routine_id:
-        return False
-
-    from app.models.routine import Routine
-    from app.models.routine_completion import RoutineCompletion
-
-    routine = db.get(Routine, session_obj.routine_id)
-    if not routine or not routine.days:
-        return False
-
-    total_days = len(routine.days)
-    if total_days < 1:
-        return False
-
-    # Find the most recent completion for this routine
-    last_completion = db.query(RoutineCompletion).filter(
-        RoutineCompletion.user_id == user_id,
-        RoutineCompletion.routine_id == routine.id,
-    ).order_by(RoutineCompletion.completed_at.desc()).first()
-
-    # Get all completed sessions for this routine since last completion
-    query = db.query(SessionModel.day_index).filter(
-        SessionModel.user_id == user_id,
-        SessionModel.routine_id == routine.id,
-        SessionModel.completed_at.isnot(None),
-    )
-    if last_completion:
-        query = query.filter(SessionModel.completed_at > last_completion.completed_at)
-
-    completed_day_indices = {row[0] for row in query.all() if row[0] is not None}
-    expected_indices = set(range(total_days))
-
-    if completed_day_indices >= expected_indices:
-        # All days completed! Record the completion using an explicit Python timestamp
-        # so the microsecond precision is consistent with session completed_at values.
-        new_completion = RoutineCompletion(
-            user_id=user_id,
-            routine_id=routine.id,
-            completed_at=datetime.now(timezone.utc),
-        )
-        db.add(new_completion)
-        return True
-
-    return False
+    return record_cycle_day(db, session_obj)
 
 
 def _did_session_complete_routine_cycle(db: Session, user_id: int, session_obj: SessionModel | None) -> bool:
@@ -232,63 +167,14 @@ def _did_session_complete_routine_cycle(db: Session, user_id: int, session_obj:
     return completed_day_indices >= expected_indices and session_obj.day_index in expected_indices
 
 
-def _detect_prs(db: Session, user_id: int, session_id: int):
-    """
-    Compare each exercise in `session_id` against all previous sessions
-    for this user.  Returns (rep_prs, weight_prs, total_pr_xp_gained).
-    """
-    # Get all sets in this session, grouped by exercise
-    current_sets = db.query(SetModel).filter(
-        SetModel.session_id == session_id,
-        sa_func.coalesce(SetModel.set_type, "normal") == "normal",
-    ).all()
-    if not current_sets:
-        return 0, 0, 0
-
-    exercises: dict[int, list] = {}
-    for s in current_sets:
-        exercises.setdefault(s.exercise_id, []).append(s)
-
-    # All completed session ids for this user EXCEPT the current one
-    prev_session_ids = [
-        sid for (sid,) in db.query(SessionModel.id).filter(
-            SessionModel.user_id == user_id,
-            SessionModel.completed_at.isnot(None),
-            SessionModel.id != session_id
-        ).all()
-    ]
-
+def _score_prs(current_best: dict[int, tuple[int, float]], previous: dict[int, tuple[int, float, int]]):
+    """(rep_prs, weight_prs, total_pr_xp) for a session's bests against prior bests."""
     rep_prs = 0
     weight_prs = 0
     total_pr_xp = 0
 
-    for ex_id, sets in exercises.items():
-        if not prev_session_ids:
-            # First session ever → establishing baseline, not a PR
-            continue
-
-        # Best previous reps & weight for this exercise
-        prev_best = db.query(
-            sa_func.max(SetModel.reps).label("max_reps"),
-            sa_func.max(SetModel.weight_kg).label("max_weight")
-        ).filter(
-            SetModel.session_id.in_(prev_session_ids),
-            SetModel.exercise_id == ex_id,
-            sa_func.coalesce(SetModel.set_type, "normal") == "normal",
-        ).first()
-
-        prev_max_reps = prev_best.max_reps if prev_best and prev_best.max_reps else 0
-        prev_max_weight = prev_best.max_weight if prev_best and prev_best.max_weight else 0
-
-        curr_max_reps = max((s.reps or 0) for s in sets)
-        curr_max_weight = max((s.weight_kg or 0) for s in sets)
-
-        # Count how many historical sessions actually had this exercise to scale the PR reward
-        prev_sessions_count = db.query(sa_func.count(sa_func.distinct(SetModel.session_id))).filter(
-            SetModel.session_id.in_(prev_session_ids),
-            SetModel.exercise_id == ex_id,
-            sa_func.coalesce(SetModel.set_type, "normal") == "normal",
-        ).scalar() or 0
+    for ex_id, (curr_max_reps, curr_max_weight) in current_best.items():
+        prev_max_reps, prev_max_weight, prev_sessions_count = previous.get(ex_id, (0, 0, 0))
 
         # Scaling multiplier: Starts at 1.0, increases by 0.05 per past session, caps at 5.0x base PR XP
         multiplier = min(5.0, 1.0 + (prev_sessions_count * 0.05))
@@ -304,25 +190,64 @@ def _detect_prs(db: Session, user_id: int, session_id: int):
     return rep_prs, weight_prs, total_pr_xp
 
 
+def _detect_prs(db: Session, user_id: int, session_id: int):
+    """
+    Compare each exercise in the just-completed `session_id` against the
+    user's exercise_bests index, then fold the session into it.
+    Returns (rep_prs, weight_prs, total_pr_xp_gained).
+    """
+    current_best = session_bests(db, session_id)
+    if not current_best:
+        return 0, 0, 0
+
+    # An exercise never done before has no row, so a first session only
+    # establishes the baseline.
+    rows = load_exercise_bests(db, user_id, current_best)
+    result = _score_prs(current_best, {ex_id: as_bests(row) for ex_id, row in rows.items()})
+    record_session_bests(db, user_id, session_id, current_best, rows)
+    return result
+
+
+def _detect_removed_prs(db: Session, user_id: int, session_id: int):
+    """
+    Same as _detect_prs for a session that is already in the index (delete):
+    compares against the bests of every other completed session.
+    """
+    current_best = session_bests(db, session_id)
+    if not current_best:
+        return 0, 0, 0
+    return _score_prs(current_best, bests_without_session(db, user_id, session_id, current_best))
+
+
 # ── Coin Deduction ──────────────────────────────────────────────────────────
 
-def deduct_coins(db: Session, user: User, amount: int, use_joker: bool = False):
+def check_funds(user: User, amount: int, use_joker: bool = False) -> None:
+    """Raise HTTP 402 unless deduct_coins(user, amount, use_joker) would succeed."""
+    if use_joker and (user.joker_tokens or 0) > 0:
+        return
+    balance = user.currency or 0
+    if balance < amount:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Not enough coins. Need {amount}, have {balance}."
+        )
+
+
+def deduct_coins(db: Session, user: User, amount: int, use_joker: bool = False, source: str = "spend"):
     """
     Deduct coins from user. If use_joker=True and user has tokens, consume
     a joker instead. Raises HTTP 402 if insufficient funds.
     """
+    before = balance_snapshot(user)
     if use_joker and (user.joker_tokens or 0) > 0:
         user.joker_tokens -= 1
+        record_change(db, user, before, source)
         db.flush()
         return  # Free via joker
 
-    balance = user.currency or 0
-    if balance < amount:
-        raise HTTPException(
-            status_code=402,
-            detail=f"Not enough coins. Need {amount}, have {balance}."
-        )
-    user.currency = balance - amount
+    check_funds(user, amount)
+    user.currency = (user.currency or 0) - amount
+    record_change(db, user, before, source)
     db.flush()
 
 
@@ -334,17 +259,27 @@ def award_session_xp(db: Session, user: User, session_id: int) -> dict:
     checks routine completion, streak rewards, level-ups, and quest progress.
     Returns a summary dict for the frontend.
     """
+    result = apply_session_award(db, user, session_id)
+    db.commit()
+    db.refresh(user)
+    return result
+
+
+def apply_session_award(db: Session, user: User, session_id: int) -> dict:
+    """award_session_xp without the commit, so the outbox can commit it with its job row."""
+    before = balance_snapshot(user)
     rep_prs, weight_prs, pr_xp_gained = _detect_prs(db, user.id, session_id)
 
     session_obj = db.get(SessionModel, session_id)
     effort_score = None
     if session_obj:
         from app.effort_score import compute_effort_score
-        effort_score = compute_effort_score(db, user.id, session_obj)
+        effort_score = compute_effort_score(db, user.id, session_obj, user.settings)
         session_obj.effort_score = effort_score
 
     # Weekly XP cap: count completed sessions this week (including this one)
-    weekly_sessions = _count_weekly_xp_sessions(db, user.id)
+    calendar = load_training_calendar(db, user.id)
+    weekly_sessions = _count_weekly_xp_sessions(db, user.id, calendar)
     xp_capped = weekly_sessions > WEEKLY_XP_CAP
 
     # Base XP (0 if capped)
@@ -369,18 +304,26 @@ def award_session_xp(db: Session, user: User, session_id: int) -> dict:
         # Award currency on level up (10 coins per level reached)
         user.currency = (user.currency or 0) + 10
 
+    # What was granted is kept so a delete can reverse exactly this
+    record_change(db, user, before, "session", session_id=session_id, detail={
+        "base_xp": base_xp,
+        "routine_bonus": routine_bonus,
+        "pr_xp": pr_xp_gained,
+        "rep_prs": rep_prs,
+        "weight_prs": weight_prs,
+        "routine_completed": routine_completed,
+    })
+
     # Weekly streak check-in reward (no longer auto-awarded on session completion)
     streak_coins = 0
     joker_awarded = False
     streak_weeks = 0
 
     # Quest progression
-    _update_quest_progress(db, user)
-
-    db.commit()
-    db.refresh(user)
     if session_obj:
-        db.refresh(session_obj)
+        record_session_completion(db, session_obj, rep_prs=rep_prs, weight_prs=weight_prs)
+        update_scores(db, user, session_obj.completed_at, xp_delta=xp_gained, calendar=calendar)
+    _update_quest_progress(db, user)
 
     return {
         "xp_gained": xp_gained,
@@ -413,7 +356,7 @@ def _week_str_to_monday(week_str: str) -> datetime:
     return first_monday + timedelta(weeks=w - 1)
 
 
-def compute_unclaimed_streak_data(db: Session, user: User) -> dict:
+def compute_unclaimed_streak_data(db: Session, user: User, calendar: TrainingCalendar | None = None) -> dict:
     """
     Compute unclaimed streak weeks and total coins due.
     Each week with a session after streak_reward_week earns coins based on the
@@ -422,24 +365,11 @@ def compute_unclaimed_streak_data(db: Session, user: User) -> dict:
     """
     last_claimed = user.streak_reward_week or ""
     current_iso = _current_iso_week_str()
+    calendar = calendar or load_training_calendar(db, user.id)
 
-    all_dates = [
-        d for (d,) in db.query(SessionModel.streak_eligible_at).filter(
-            SessionModel.user_id == user.id,
-            SessionModel.streak_eligible_at.isnot(None),
-        ).all()
-        if d is not None
-    ]
-
-    all_weeks_set: set[str] = set()
-    for d in all_dates:
-        iso = d.isocalendar()
-        all_weeks_set.add(f"{iso[0]}-W{iso[1]:02d}")
-
-    all_weeks = sorted(all_weeks_set)
-    unclaimed = [w for w in all_weeks if w > last_claimed and w <= current_iso]
+    unclaimed = [w for w in calendar.week_strs() if w > last_claimed and w <= current_iso]
 
-    current_streak = compute_streak_weeks(db, user.id)
+    current_streak = compute_streak_weeks(db, user.id, calendar=calendar, user=user)
 
     if not unclaimed:
         return {
@@ -453,17 +383,8 @@ def compute_unclaimed_streak_data(db: Session, user: User) -> dict:
     coins_per_week = []
     total_coins = 0
     for target_week in unclaimed:
-        target_monday = _week_str_to_monday(target_week)
-        streak_at_week = 0
-        check_monday = target_monday
-        while True:
-            iso = check_monday.isocalendar()
-            ws = f"{iso[0]}-W{iso[1]:02d}"
-            if ws in all_weeks_set:
-                streak_at_week += 1
-                check_monday -= timedelta(weeks=1)
-            else:
-                break
+        # Streak length as of that week: consecutive active weeks ending there
+        streak_at_week = calendar.run_length(_week_str_to_monday(target_week))
         week_coins = _streak_coins(streak_at_week)
         coins_per_week.append((target_week, week_coins))
         total_coins += week_coins
@@ -483,7 +404,8 @@ def compute_unclaimed_streak_data(db: Session, user: User) -> dict:
     }
 
 
-def get_streak_week_slots(db: Session, user_id: int, last_claimed_week: str) -> list:
+def get_streak_week_slots(db: Session, user_id: int, last_claimed_week: str,
+                          calendar: TrainingCalendar | None = None) -> list:
     """
     Return 7 weekly slot dicts for the streak flame row based on streak_eligible_at.
     Index 0 = 6 weeks ago, index 6 = current week.
@@ -492,23 +414,13 @@ def get_streak_week_slots(db: Session, user_id: int, last_claimed_week: str) ->
     start_of_current_week = (now - timedelta(days=now.weekday())).replace(
         hour=0, minute=0, second=0, microsecond=0
     )
-
-    session_dates = [
-        d.replace(tzinfo=timezone.utc) if d.tzinfo is None else d
-        for (d,) in db.query(SessionModel.streak_eligible_at).filter(
-            SessionModel.user_id == user_id,
-            SessionModel.streak_eligible_at.isnot(None),
-        ).all()
-        if d is not None
-    ]
+    calendar = calendar or load_training_calendar(db, user_id)
 
     slots = []
     for i in range(7):
         weeks_back = 6 - i
         week_start = start_of_current_week - timedelta(weeks=weeks_back)
-        week_end = week_start + timedelta(days=7)
 
-        count = sum(1 for d in session_dates if week_start <= d < week_end)
         iso = week_start.isocalendar()
         week_str = f"{iso[0]}-W{iso[1]:02d}"
         claimed = bool(last_claimed_week) and week_str <= last_claimed_week
@@ -516,18 +428,34 @@ def get_streak_week_slots(db: Session, user_id: int, last_claimed_week: str) ->
         slots.append({
             "week": week_str,
             "start_date": week_start.date().isoformat(),
-            "sessions": count,
+            "sessions": calendar.count(week_start),
             "claimed": claimed,
         })
 
     return slots
 
 
+def _reconstruct_session_award(db: Session, user_id: int, session_obj: SessionModel) -> tuple[int, int, int, bool]:
+    """(xp, rep_prs, weight_prs, routine_completed) re-derived for a session awarded before the ledger."""
+    rep_prs, weight_prs, pr_xp_gained = _detect_removed_prs(db, user_id, session_obj.id)
+
+    cap_anchor = _to_utc(session_obj.streak_eligible_at or session_obj.completed_at)
+    weekly_sessions_at_completion = _count_weekly_xp_sessions_at(db, user_id, cap_anchor)
+    xp_capped = weekly_sessions_at_completion > WEEKLY_XP_CAP
+
+    base_xp = 0 if xp_capped else BASE_SESSION_XP
+    routine_completed = _did_session_complete_routine_cycle(db, user_id, session_obj)
+    routine_bonus = ROUTINE_COMPLETE_XP if (routine_completed and not xp_capped) else 0
+    return base_xp + routine_bonus + pr_xp_gained, rep_prs, weight_prs, routine_completed
+
+
 def remove_session_xp(db: Session, user: User, session_id: int):
     """
     Reverts the XP and Levels gained from a session. Should be called
-    BEFORE the session is physically deleted from the database so we can
-    re-run the PR detection and know exactly how much XP it gave.
+    BEFORE the session is physically deleted from the database.
+
+    The amounts come from the session's ledger entry; sessions awarded
+    before the ledger existed fall back to re-running the reward rules.
     """
     session_obj = db.query(SessionModel).filter(
         SessionModel.id == session_id,
@@ -536,19 +464,19 @@ def remove_session_xp(db: Session, user: User, session_id: int):
     if not session_obj or session_obj.completed_at is None:
         return 0
 
-    # Recalculate this session's reward using completion-time aware rules.
-    rep_prs, weight_prs, pr_xp_gained = _detect_prs(db, user.id, session_id)
+    award = session_award_entry(db, user.id, session_id)
+    if award is not None:
+        detail = award.detail or {}
+        xp_to_remove = award.xp
+        rep_prs = detail.get("rep_prs", 0)
+        weight_prs = detail.get("weight_prs", 0)
+        routine_completed = bool(detail.get("routine_completed"))
+    else:
+        xp_to_remove, rep_prs, weight_prs, routine_completed = _reconstruct_session_award(db, user.id, session_obj)
 
-    cap_anchor = _to_utc(session_obj.streak_eligible_at or session_obj.completed_at)
-    weekly_sessions_at_completion = _count_weekly_xp_sessions_at(db, user.id, cap_anchor)
-    xp_capped = weekly_sessions_at_completion > WEEKLY_XP_CAP
-
-    base_xp = 0 if xp_capped else BASE_SESSION_XP
-    routine_completed = _did_session_complete_routine_cycle(db, user.id, session_obj)
-    routine_bonus = ROUTINE_COMPLETE_XP if (routine_completed and not xp_capped) else 0
-
-    xp_to_remove = base_xp + routine_bonus + pr_xp_gained
+    remove_session_completion(db, session_obj, rep_prs=rep_prs, weight_prs=weight_prs)
 
+    before = balance_snapshot(user)
     user.experience -= xp_to_remove
 
     # Handle De-leveling
@@ -561,16 +489,12 @@ def remove_session_xp(db: Session, user: User, session_id: int):
     if user.level == 1 and user.experience < 0:
         user.experience = 0
 
-    # If this session closed a routine cycle, delete that completion marker too.
-    if routine_completed and session_obj.routine_id is not None:
-        from app.models.routine_completion import RoutineCompletion
-        completion = db.query(RoutineCompletion).filter(
-            RoutineCompletion.user_id == user.id,
-            RoutineCompletion.routine_id == session_obj.routine_id,
-            RoutineCompletion.completed_at >= _to_utc(session_obj.completed_at),
-        ).order_by(RoutineCompletion.completed_at.asc()).first()
-        if completion:
-            db.delete(completion)
+    record_change(db, user, before, "session_reversal", session_id=session_id)
+    calendar = load_training_calendar(db, user.id).without(session_obj.streak_eligible_at)
+    update_scores(db, user, session_obj.completed_at, xp_delta=-xp_to_remove, calendar=calendar)
+
+    # Clear its day from the routine cycle; if it closed a cycle, delete that completion marker too.
+    remove_cycle_day(db, session_obj, routine_completed)
 
     db.commit()
     return xp_to_remove
@@ -578,83 +502,43 @@ def remove_session_xp(db: Session, user: User, session_id: int):
 
 # ── Quest Progress ──────────────────────────────────────────────────────────
 
+# Quest req_type -> counter value (see app.quest_counters)
+QUEST_COUNTERS = {
+    "sessions": lambda c: c["sessions"],
+    "sets": lambda c: c["sets"],
+    "volume": lambda c: int(c["volume"]),
+    "routines": lambda c: c["routine_sessions"],
+    "duration": lambda c: int(c["duration_sec"]) // 60,
+    "weight_pr": lambda c: c["weight_prs"],
+    "rep_pr": lambda c: c["rep_prs"],
+}
+
+
 def _update_quest_progress(db: Session, user: User):
-    """Update progress on all active (uncompleted) quests for the user."""
-    active_quests = db.query(UserQuest).filter(
+    """Update progress on all active (uncompleted) quests for the user.
+
+    Progress is read from the lifetime / current-week counters, which
+    completions and edits keep current, so this is two small queries
+    regardless of history length.
+    """
+    active_quests = db.query(UserQuest, Quest).join(
+        Quest, UserQuest.quest_id == Quest.id
+    ).filter(
         UserQuest.user_id == user.id,
         UserQuest.completed == False  # noqa: E712
     ).all()
+    if not active_quests:
+        return
 
-    for uq in active_quests:
-        quest = db.get(Quest, uq.quest_id)
-        if not quest:
-            continue
-
-        # Weekly quests scope to current Monday-Sunday
-        if quest.is_weekly:
-            monday, sunday = _get_week_boundaries()
-            date_filter = [
-                SessionModel.completed_at >= monday,
-                SessionModel.completed_at <= sunday,
-            ]
-        else:
-            date_filter = []
-
-        if quest.req_type == "sessions":
-            q = db.query(sa_func.count(SessionModel.id)).filter(
-                SessionModel.user_id == user.id,
-                SessionModel.completed_at.isnot(None),
-                *date_filter,
-            )
-            count = q.scalar()
-            uq.progress = min(count, quest.req_value)
-
-        elif quest.req_type == "sets":
-            q = db.query(sa_func.count(SetModel.id)).join(SessionModel).filter(
-                SessionModel.user_id == user.id,
-                SessionModel.completed_at.isnot(None),
-                *date_filter,
-            )
-            count = q.scalar()
-            uq.progress = min(count, quest.req_value)
-
-        elif quest.req_type == "volume":
-            q = db.query(
-                sa_func.coalesce(
-                    sa_func.sum(SetModel.weight_kg * SetModel.reps), 0
-                )
-            ).join(SessionModel).filter(
-                SessionModel.user_id == user.id,
-                SessionModel.completed_at.isnot(None),
-                sa_func.coalesce(SetModel.set_type, "normal") != "warmup",
-                *date_filter,
-            )
-            total = q.scalar()
-            uq.progress = min(int(total), quest.req_value)
-
-        elif quest.req_type == "routines":
-            q = db.query(sa_func.count(SessionModel.id)).filter(
-                SessionModel.user_id == user.id,
-                SessionModel.routine_id.isnot(None),
-                SessionModel.completed_at.isnot(None),
-                *date_filter,
-            )
-            count = q.scalar()
-            uq.progress = min(count, quest.req_value)
-
-        elif quest.req_type == "duration":
-            q = db.query(
-                sa_func.coalesce(sa_func.sum(SetModel.duration_sec), 0)
-            ).join(SessionModel).filter(
-                SessionModel.user_id == user.id,
-                SessionModel.completed_at.isnot(None),
-                *date_filter,
-            )
-            total_sec = q.scalar()
-            minutes = int(total_sec) // 60
-            uq.progress = min(minutes, quest.req_value)
-
-        if uq.progress >= quest.req_value:
+    # Weekly quests scope to the current Monday-Sunday
+    lifetime, this_week = load_quest_counters(db, user.id, datetime.now(timezone.utc))
+
+    for uq, quest in active_quests:
+        counter = QUEST_COUNTERS.get(quest.req_type)
+        if counter is not None:
+            uq.progress = min(counter(this_week if quest.is_weekly else lifetime), quest.req_value)
+
+        if (uq.progress or 0) >= quest.req_value:
             uq.completed = True
             uq.completed_at = datetime.now(timezone.utc)
 
@@ -675,6 +559,7 @@ def claim_quest_reward(db: Session, user: User, user_quest_id: int) -> dict:
     quest = db.get(Quest, uq.quest_id)
 
     uq.claimed = True
+    before = balance_snapshot(user)
     user.experience += quest.exp_reward
     user.currency += quest.currency_reward
 
@@ -686,6 +571,8 @@ def claim_quest_reward(db: Session, user: User, user_quest_id: int) -> dict:
         leveled_up = True
         user.currency += 10
 
+    record_change(db, user, before, "quest", detail={"quest_id": quest.id})
+    update_scores(db, user, datetime.now(timezone.utc), xp_delta=quest.exp_reward or 0)
     db.commit()
     db.refresh(user)
 
@@ -700,42 +587,64 @@ def claim_quest_reward(db: Session, user: User, user_quest_id: int) -> dict:
     }
 
 
+QUEST_WEEK_GROUPS = ["A", "B", "C", "D"]
+
+
+def _current_quest_week_group() -> str:
+    """Weekly quest group (A-D) that is in season this ISO week."""
+    current_iso_week = datetime.now(timezone.utc).isocalendar()[1]
+    return QUEST_WEEK_GROUPS[current_iso_week % 4]
+
+
 def assign_quests(db: Session, user_id: int):
     """
     Assign lifetime quests.
     Rotate weekly quests: assign current week, delete old weeks.
+
+    The scheduler's weekly job does this for every user in bulk at the ISO
+    week boundary; this per-user version is the fallback for users it
+    missed (see ensure_quests_assigned) and stamps users.quest_week.
     """
-    # Calculate current week group A, B, C, or D
-    current_iso_week = datetime.now(timezone.utc).isocalendar()[1]
-    week_letters = ["A", "B", "C", "D"]
-    current_week_group = week_letters[current_iso_week % 4]
+    current_week_group = _current_quest_week_group()
 
-    all_quests = db.query(Quest).all()
+    catalog = {
+        quest_id: (is_weekly, week_group)
+        for quest_id, is_weekly, week_group in db.query(Quest.id, Quest.is_weekly, Quest.week_group)
+    }
     user_quests = db.query(UserQuest).filter(UserQuest.user_id == user_id).all()
 
-    # Track existing IDs
-    existing_quest_ids = {uq.quest_id for uq in user_quests}
-
     # Delete old out-of-season weekly quests
+    existing_quest_ids = set()
     for uq in user_quests:
-        q = next((q for q in all_quests if q.id == uq.quest_id), None)
-        if q and q.is_weekly and q.week_group != current_week_group:
+        is_weekly, week_group = catalog.get(uq.quest_id, (False, None))
+        if is_weekly and week_group != current_week_group:
             db.delete(uq)
-            existing_quest_ids.remove(uq.quest_id)
+        else:
+            existing_quest_ids.add(uq.quest_id)
 
     # Assign missing quests
-    new_assignments = []
-    for q in all_quests:
-        if q.id not in existing_quest_ids:
-            if not q.is_weekly or (q.is_weekly and q.week_group == current_week_group):
-                new_assignments.append(UserQuest(user_id=user_id, quest_id=q.id))
-
+    new_assignments = [
+        UserQuest(user_id=user_id, quest_id=quest_id)
+        for quest_id, (is_weekly, week_group) in catalog.items()
+        if quest_id not in existing_quest_ids and (not is_weekly or week_group == current_week_group)
+    ]
     if new_assignments:
         db.add_all(new_assignments)
 
+    db.query(User).filter(User.id == user_id).update(
+        {User.quest_week: _current_iso_week_str()}, synchronize_session="fetch"
+    )
     db.commit()
 
 
+def ensure_quests_assigned(db: Session, user: User) -> bool:
+    """Rotate the user's quests if the weekly job hasn't covered this week yet. Returns True if it did."""
+    if user.quest_week == _current_iso_week_str():
+        return False
+    assign_quests(db, user.id)
+    return True
+
+
 # ── Joker: Save Streak ──────────────────────────────────────────────────────
 
 def use_joker_for_streak(db: Session, user: User) -> dict:
@@ -753,25 +662,21 @@ def use_joker_for_streak(db: Session, user: User) -> dict:
         raise HTTPException(status_code=400, detail="Streak already active this week")
 
     # Check that no sessions exist this week (using immutable streak_eligible_at)
-    monday, sunday = _get_week_boundaries()
-    sessions_this_week = db.query(sa_func.count(SessionModel.id)).filter(
-        SessionModel.user_id == user.id,
-        SessionModel.streak_eligible_at.isnot(None),
-        SessionModel.streak_eligible_at >= monday,
-        SessionModel.streak_eligible_at <= sunday,
-    ).scalar() or 0
-
-    if sessions_this_week > 0:
+    calendar = load_training_calendar(db, user.id)
+    if calendar.has_sessions(datetime.now(timezone.utc)):
         raise HTTPException(status_code=400, detail="You already have sessions this week — no need for a joker")
 
     # Use the joker
+    before = balance_snapshot(user)
     user.joker_tokens -= 1
     user.streak_reward_week = current_week  # Marks this week as "covered"
 
     # Award streak coins for this joker-covered week too
-    streak_weeks = compute_streak_weeks(db, user.id)
+    streak_weeks = compute_streak_weeks(db, user.id, calendar=calendar, user=user)
     streak_coins = _streak_coins(streak_weeks) if streak_weeks > 0 else 0
     user.currency = (user.currency or 0) + streak_coins
+    record_change(db, user, before, "joker_streak", detail={"week": current_week})
+    refresh_streak(db, user, calendar)
 
     db.commit()
     db.refresh(user)
@@ -0,0 +1,224 @@
+"""Post-completion gamification pipeline (``gamification_jobs`` outbox).
+
+Completing a session (``complete_bulk`` or a PUT setting ``completed_at``)
+only saves the session and enqueues a job row in the same transaction; the
+response carries a ``pending`` handle instead of the reward summary. PR
+detection, effort scoring, routine-cycle detection, XP / level-up and quest
+progress then run in ``process_job``, which afterwards precomputes the
+routine's progression suggestions (``app.progression_suggestions``):
+
+  - right after the response is sent (FastAPI background task), which is
+    the normal path;
+  - from ``run_gamification_worker``, started with the app, which sweeps up
+    jobs left pending by a restart or a failed attempt;
+  - inline when the client polls a job that is still pending, and before
+    any edit or delete of the user's completed sessions
+    (``finish_pending_jobs``).
+
+The award and the job's ``done`` status are committed together, and a job
+is claimed with ``FOR UPDATE`` on Postgres, so each session is awarded at
+most once however many of these race. The background paths skip a job that
+is locked (``SKIP LOCKED``); ``finish_pending_jobs`` waits for it, so an edit
+or delete never runs ahead of an award that is still being committed.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import exists
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session as DBSession, sessionmaker
+
+from app.config import get_env
+from app.models.gamification_job import GamificationJob
+from app.models.session import Session as SessionModel
+from app.models.user import User
+from app.stats_cache import bump_stats_version
+
+logger = logging.getLogger(__name__)
+
+GAMIFICATION_WORKER_POLL_SECONDS = float(get_env("GAMIFICATION_WORKER_POLL_SECONDS", "5"))
+GAMIFICATION_JOB_MAX_ATTEMPTS = int(get_env("GAMIFICATION_JOB_MAX_ATTEMPTS", "3"))
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def enqueue_session_award(db: DBSession, user_id: int, session_id: int) -> GamificationJob:
+    """Add the job for a newly completed session (flushed, not committed). Caller commits."""
+    job = GamificationJob(user_id=user_id, session_id=session_id, status=PENDING, attempts=0)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def without_pending_award():
+    """Filter on ``SessionModel`` leaving out completions whose job hasn't run yet.
+
+    Rebuilds from history use it: each pending job adds its own session when
+    it runs, so counting it in the rebuild too would count it twice.
+    """
+    return ~exists().where(GamificationJob.session_id == SessionModel.id, GamificationJob.status == PENDING)
+
+
+def job_handle(job: GamificationJob) -> dict:
+    """What the completion endpoints return in place of the reward summary."""
+    return {"status": job.status, "job_id": job.id}
+
+
+def job_payload(job: GamificationJob) -> dict:
+    return {"job_id": job.id, "session_id": job.session_id, "status": job.status, "result": job.result}
+
+
+def _claim(db: DBSession, job_id: int, wait: bool = False) -> Optional[GamificationJob]:
+    """Lock a pending job, or None if it's done, failed or (unless ``wait``) being processed elsewhere.
+
+    With ``wait`` the lock is waited for; Postgres then re-checks the status,
+    so a job the other worker finished comes back as None.
+    """
+    query = db.query(GamificationJob).filter(GamificationJob.id == job_id, GamificationJob.status == PENDING)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=not wait)
+    return query.first()
+
+
+def process_job(db: DBSession, job_id: int, wait: bool = False) -> Optional[dict]:
+    """Run one job if it is still pending. Returns the reward summary if this call awarded it.
+
+    Commits (or rolls back) ``db``, so it must not carry the caller's own changes.
+    """
+    from app.gamification import apply_session_award
+
+    job = _claim(db, job_id, wait=wait)
+    if job is None:
+        db.rollback()
+        return None
+
+    job.attempts = (job.attempts or 0) + 1
+    try:
+        session_obj = db.get(SessionModel, job.session_id)
+        user = db.get(User, job.user_id)
+        if session_obj is None or session_obj.completed_at is None or user is None:
+            result = None  # deleted before it was processed; nothing to award
+            routine_id = None
+        else:
+            result = apply_session_award(db, user, job.session_id)
+            routine_id = session_obj.routine_id
+        job.status = DONE
+        job.result = result
+        job.error = None
+        job.processed_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        logger.exception("Gamification job %s failed", job_id)
+        _record_failure(db, job_id, exc)
+        return None
+
+    bump_stats_version(job.user_id)
+    if routine_id is not None:
+        _refresh_suggestions(db, job.user_id, routine_id)
+    return result
+
+
+def _refresh_suggestions(db: DBSession, user_id: int, routine_id: int) -> None:
+    """Precompute the routine's progression suggestions; on failure the next view recomputes them."""
+    from app.progression_suggestions import refresh_routine_suggestions
+
+    try:
+        refresh_routine_suggestions(db, user_id, routine_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Refreshing progression suggestions for routine %s failed", routine_id)
+
+
+def _record_failure(db: DBSession, job_id: int, exc: Exception) -> None:
+    job = db.get(GamificationJob, job_id)
+    if job is None:
+        return
+    job.attempts = (job.attempts or 0) + 1
+    job.error = f"{type(exc).__name__}: {exc}"[:2000]
+    if job.attempts >= GAMIFICATION_JOB_MAX_ATTEMPTS:
+        job.status = FAILED
+        job.processed_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def finish_pending_jobs(db: DBSession, user_id: int) -> None:
+    """Run the user's pending jobs now. Call before editing or deleting completed sessions.
+
+    Until its job runs, a completion isn't in exercise_bests / the quest
+    counters yet, and edits repair those incrementally; awarding first keeps
+    PR detection and XP removal working on a consistent index.
+
+    Must be called before the caller changes anything: the jobs run and
+    commit in their own session, a job another worker holds is waited for,
+    and ``db`` is then expired so it reads the awarded state.
+    """
+    job_ids = [
+        job_id for (job_id,) in db.query(GamificationJob.id).filter(
+            GamificationJob.status == PENDING, GamificationJob.user_id == user_id,
+        ).order_by(GamificationJob.id)
+    ]
+    if not job_ids:
+        return
+    jobs_db = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())()
+    try:
+        for job_id in job_ids:
+            process_job(jobs_db, job_id, wait=True)
+    finally:
+        jobs_db.close()
+    db.expire_all()
+
+
+def delete_session_jobs(db: DBSession, session_id: int) -> None:
+    """Drop a deleted session's job (the FK cascades on Postgres; SQLite doesn't enforce it). Caller commits."""
+    db.query(GamificationJob).filter(GamificationJob.session_id == session_id).delete(synchronize_session=False)
+
+
+def process_job_in_background(bind: Engine | Connection, job_id: int) -> None:
+    """Background-task entry point; uses its own session on the request's engine."""
+    db = sessionmaker(autocommit=False, autoflush=False, bind=bind)()
+    try:
+        process_job(db, job_id)
+    finally:
+        db.close()
+
+
+def run_pending_jobs(db: DBSession, limit: int = 100) -> int:
+    """Process up to ``limit`` pending jobs, oldest first. Returns how many were attempted."""
+    job_ids = [
+        job_id for (job_id,) in db.query(GamificationJob.id)
+        .filter(GamificationJob.status == PENDING)
+        .order_by(GamificationJob.id)
+        .limit(limit)
+    ]
+    db.rollback()
+    for job_id in job_ids:
+        process_job(db, job_id)
+    return len(job_ids)
+
+
+def _sweep() -> int:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return run_pending_jobs(db)
+    finally:
+        db.close()
+
+
+async def run_gamification_worker() -> None:
+    """Background loop: process leftover pending jobs every GAMIFICATION_WORKER_POLL_SECONDS."""
+    while True:
+        try:
+            await asyncio.to_thread(_sweep)
+        except Exception:
+            logger.exception("Gamification worker sweep failed")
+        await asyncio.sleep(GAMIFICATION_WORKER_POLL_SECONDS)
@@ -0,0 +1,401 @@
+"""Replay every user's completed sessions through the current reward rules.
+
+After an economy change (XP values, weekly cap, PR scaling, routine
+bonuses) existing accounts keep whatever the old rules granted. This
+re-derives, per user and entirely in memory:
+
+  - each session's award (base XP with the weekly cap, routine-cycle bonus,
+    PR XP) in processing order (``streak_eligible_at``, which is when the
+    live award ran; ``completed_at`` for sessions that predate it);
+  - the routine-cycle completions those sessions close, and each routine's
+    current cycle state;
+  - the quest counters (with PR counts) and unclaimed quest progress;
+  - level / experience from session XP plus claimed quest rewards, and
+    coins adjusted by the difference in level-up coins (everything else
+    that moved coins — streaks, promos, shop, AI — is kept as is).
+  - the all-time and current-week leaderboard rows (week XP is the
+    replayed awards of that week plus quest XP claimed in it).
+
+History is bulk-loaded per batch of users with a handful of grouped
+queries and written back in bulk, one transaction per batch. Batches run
+across a process pool (``--workers``). ``--dry-run`` only reports the
+per-user differences.
+
+    python -m app.gamification_replay --dry-run
+    python -m app.gamification_replay --workers 4
+
+``POST /api/admin/gamification/replay`` runs the same replay in-process,
+batch by batch.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session as DBSession
+
+from app.gamification import (
+    BASE_SESSION_XP, QUEST_COUNTERS, ROUTINE_COMPLETE_XP, WEEKLY_XP_CAP, _score_prs, _to_utc, exp_for_next_level,
+)
+from app.gamification_outbox import finish_pending_jobs
+from app.leaderboards import ALL_TIME
+from app.models.leaderboard_score import LeaderboardScore
+from app.models.quest import Quest, UserQuest
+from app.models.reward_ledger import RewardLedgerEntry
+from app.models.routine import Routine
+from app.models.routine_completion import RoutineCompletion
+from app.models.routine_cycle_state import RoutineCycleState
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user import User
+from app.models.user_quest_counter import UserQuestCounter
+from app.quest_counters import COUNTER_FIELDS, LIFETIME, week_period
+from app.reward_ledger import balance_snapshot, ledger_balances
+from app.training_calendar import week_monday
+from app.user_batches import DEFAULT_BATCH_SIZE, batches, run_in_processes
+
+logger = logging.getLogger(__name__)
+
+
+
+def _level_from_total(total_xp: int) -> tuple[int, int]:
+    """(level, experience into that level) for a total experience amount."""
+    level, experience = 1, max(0, total_xp)
+    while experience >= exp_for_next_level(level):
+        experience -= exp_for_next_level(level)
+        level += 1
+    return level, experience
+
+
+# ── Bulk load ────────────────────────────────────────────────────────────────
+
+def _load_history(db: DBSession, user_ids: list[int], now: datetime) -> dict:
+    """Everything the replay reads for a batch of users, in grouped queries."""
+    sessions = defaultdict(list)
+    for row in (
+        db.query(
+            SessionModel.id, SessionModel.user_id, SessionModel.routine_id, SessionModel.day_index,
+            SessionModel.completed_at, SessionModel.streak_eligible_at,
+        )
+        .filter(SessionModel.user_id.in_(user_ids), SessionModel.completed_at.isnot(None))
+    ):
+        sessions[row.user_id].append(row)
+
+    completed = (
+        db.query(SetModel.session_id, SetModel.exercise_id, SetModel.reps, SetModel.weight_kg,
+                 SetModel.set_type, SetModel.duration_sec)
+        .join(SessionModel, SetModel.session_id == SessionModel.id)
+        .filter(SessionModel.user_id.in_(user_ids), SessionModel.completed_at.isnot(None))
+    )
+    normal = func.coalesce(SetModel.set_type, "normal") == "normal"
+    bests = defaultdict(dict)
+    for session_id, ex_id, reps, weight in (
+        completed.with_entities(SetModel.session_id, SetModel.exercise_id, func.max(SetModel.reps), func.max(SetModel.weight_kg))
+        .filter(normal)
+        .group_by(SetModel.session_id, SetModel.exercise_id)
+    ):
+        bests[session_id][ex_id] = (int(reps or 0), float(weight or 0))
+
+    volume = case(
+        (func.coalesce(SetModel.set_type, "normal") != "warmup", SetModel.weight_kg * SetModel.reps),
+        else_=None,
+    )
+    totals = {
+        session_id: (int(count or 0), float(vol or 0), int(duration or 0))
+        for session_id, count, vol, duration in completed.with_entities(
+            SetModel.session_id, func.count(SetModel.id), func.coalesce(func.sum(volume), 0),
+            func.coalesce(func.sum(SetModel.duration_sec), 0),
+        ).group_by(SetModel.session_id)
+    }
+
+    routine_days = {
+        routine_id: len(days or [])
+        for routine_id, days in db.query(Routine.id, Routine.days).filter(Routine.user_id.in_(user_ids))
+    }
+
+    quests = defaultdict(list)
+    for uq, quest in (
+        db.query(UserQuest, Quest).join(Quest, UserQuest.quest_id == Quest.id).filter(UserQuest.user_id.in_(user_ids))
+    ):
+        quests[uq.user_id].append((uq, quest))
+
+    completions = dict(
+        db.query(RoutineCompletion.user_id, func.count(RoutineCompletion.id))
+        .filter(RoutineCompletion.user_id.in_(user_ids))
+        .group_by(RoutineCompletion.user_id)
+    )
+
+    # Quest XP claimed this week counts towards the weekly board next to the replayed awards
+    monday = datetime.combine(week_monday(now), datetime.min.time(), tzinfo=timezone.utc)
+    quest_week_xp = dict(
+        db.query(RewardLedgerEntry.user_id, func.coalesce(func.sum(RewardLedgerEntry.xp), 0))
+        .filter(
+            RewardLedgerEntry.user_id.in_(user_ids),
+            RewardLedgerEntry.source == "quest",
+            RewardLedgerEntry.created_at >= monday,
+        )
+        .group_by(RewardLedgerEntry.user_id)
+    )
+
+    return {
+        "sessions": sessions, "bests": bests, "totals": totals, "routine_days": routine_days,
+        "quests": quests, "completions": completions, "quest_week_xp": quest_week_xp,
+        "ledger": ledger_balances(db, user_ids=user_ids),
+    }
+
+
+# ── In-memory replay ─────────────────────────────────────────────────────────
+
+def replay_user(user: User, sessions: list, bests: dict, totals: dict, routine_days: dict,
+                quests: list, now: Optional[datetime] = None) -> dict:
+    """Replay one user's history. Returns the new state; touches nothing."""
+    now = now or datetime.now(timezone.utc)
+    ordered = sorted(sessions, key=lambda s: (_to_utc(s.streak_eligible_at or s.completed_at), s.id))
+
+    exercise_bests: dict[int, tuple[int, float, int]] = {}
+    week_sessions: dict = defaultdict(int)
+    cycle_days: dict[int, set] = defaultdict(set)
+    cycle_started: dict[int, datetime] = {}
+    counters: dict[str, dict] = defaultdict(lambda: {f: 0 for f in COUNTER_FIELDS})
+    awards = []
+    week_xp = 0
+    routine_completions = []
+
+    for s in ordered:
+        current = bests.get(s.id, {})
+        rep_prs, weight_prs, pr_xp = _score_prs(current, exercise_bests) if current else (0, 0, 0)
+        for ex_id, (reps, weight) in current.items():
+            max_reps, max_weight, count = exercise_bests.get(ex_id, (0, 0.0, 0))
+            exercise_bests[ex_id] = (max(max_reps, reps), max(max_weight, weight), count + 1)
+
+        anchor = _to_utc(s.streak_eligible_at or s.completed_at)
+        week_sessions[week_monday(anchor)] += 1
+        xp_capped = week_sessions[week_monday(anchor)] > WEEKLY_XP_CAP
+
+        routine_completed = False
+        total_days = routine_days.get(s.routine_id, 0) if s.routine_id is not None else 0
+        if total_days > 0:
+            if s.day_index is not None:
+                cycle_days[s.routine_id].add(s.day_index)
+            if cycle_days[s.routine_id] >= set(range(total_days)):
+                routine_completed = True
+                routine_completions.append((s.routine_id, anchor))
+                cycle_days[s.routine_id] = set()
+                cycle_started[s.routine_id] = anchor
+
+        base_xp = 0 if xp_capped else BASE_SESSION_XP
+        routine_bonus = ROUTINE_COMPLETE_XP if (routine_completed and not xp_capped) else 0
+        if week_period(s.completed_at) == week_period(now):
+            week_xp += base_xp + routine_bonus + pr_xp  # the live award lands on its completion's week
+        awards.append((s.id, base_xp + routine_bonus + pr_xp, {
+            "base_xp": base_xp,
+            "routine_bonus": routine_bonus,
+            "pr_xp": pr_xp,
+            "rep_prs": rep_prs,
+            "weight_prs": weight_prs,
+            "routine_completed": routine_completed,
+        }))
+
+        set_count, volume, duration = totals.get(s.id, (0, 0.0, 0))
+        for period in (LIFETIME, week_period(s.completed_at)):
+            c = counters[period]
+            c["sessions"] += 1
+            c["sets"] += set_count
+            c["volume"] += volume
+            c["routine_sessions"] += 1 if s.routine_id is not None else 0
+            c["duration_sec"] += duration
+            c["rep_prs"] += rep_prs
+            c["weight_prs"] += weight_prs
+
+    lifetime = counters.get(LIFETIME, {f: 0 for f in COUNTER_FIELDS})
+    this_week = counters.get(week_period(now), {f: 0 for f in COUNTER_FIELDS})
+    quest_updates = []
+    quest_xp = 0
+    for uq, quest in quests:
+        if uq.claimed:
+            quest_xp += quest.exp_reward or 0
+            continue
+        counter = QUEST_COUNTERS.get(quest.req_type)
+        progress = uq.progress or 0
+        if counter is not None:
+            progress = min(counter(this_week if quest.is_weekly else lifetime), quest.req_value)
+        completed = progress >= quest.req_value
+        completed_at = (uq.completed_at or now) if completed else None
+        if (progress, completed) != (uq.progress or 0, bool(uq.completed)):
+            quest_updates.append({"id": uq.id, "progress": progress, "completed": completed, "completed_at": completed_at})
+
+    level, experience = _level_from_total(sum(xp for _, xp, _ in awards) + quest_xp)
+    currency = max(0, (user.currency or 0) + 10 * (level - (user.level or 1)))
+
+    return {
+        "level": level,
+        "experience": experience,
+        "currency": currency,
+        "awards": awards,
+        "week": week_period(now),
+        "week_xp": week_xp,
+        "routine_completions": routine_completions,
+        "cycles": {
+            routine_id: (sum(1 << d for d in days if d >= 0), cycle_started.get(routine_id))
+            for routine_id, days in cycle_days.items()
+        },
+        "counters": dict(counters),
+        "quest_updates": quest_updates,
+    }
+
+
+def _diff(user: User, state: dict, old_completions: int) -> Optional[dict]:
+    changes = {}
+    for field in ("level", "experience", "currency"):
+        old = getattr(user, field) or 0
+        if old != state[field]:
+            changes[field] = [old, state[field]]
+    if old_completions != len(state["routine_completions"]):
+        changes["routine_completions"] = [old_completions, len(state["routine_completions"])]
+    if state["quest_updates"]:
+        changes["quests_changed"] = len(state["quest_updates"])
+    return {"user_id": user.id, **changes} if changes else None
+
+
+# ── Write back ───────────────────────────────────────────────────────────────
+
+def _write_back(db: DBSession, user: User, state: dict, ledger: tuple[int, int, int], quest_week_xp: int) -> None:
+    db.query(RoutineCompletion).filter(RoutineCompletion.user_id == user.id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(RoutineCompletion, [
+        {"user_id": user.id, "routine_id": routine_id, "completed_at": completed_at}
+        for routine_id, completed_at in state["routine_completions"]
+    ])
+
+    db.query(RoutineCycleState).filter(RoutineCycleState.user_id == user.id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(RoutineCycleState, [
+        {"user_id": user.id, "routine_id": routine_id, "day_mask": mask, "cycle_started_at": started_at}
+        for routine_id, (mask, started_at) in state["cycles"].items()
+    ])
+
+    db.query(UserQuestCounter).filter(UserQuestCounter.user_id == user.id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(UserQuestCounter, [
+        {"user_id": user.id, "period": period, **values} for period, values in state["counters"].items()
+    ])
+    if state["quest_updates"]:
+        db.bulk_update_mappings(UserQuest, state["quest_updates"])
+
+    user.level = state["level"]
+    user.experience = state["experience"]
+    user.currency = state["currency"]
+
+    # Session entries carry the replayed awards (what a delete reverses); the
+    # replay entry makes the ledger sum to the new balances, also for users
+    # whose balances had drifted from it.
+    session_xp = sum(xp for _, xp, _ in state["awards"])
+    xp_total, coins, jokers = balance_snapshot(user)
+    zero = {f: 0 for f in COUNTER_FIELDS}
+    for period, xp, counters in (
+        (ALL_TIME, xp_total, state["counters"].get(LIFETIME, zero)),
+        (state["week"], state["week_xp"] + quest_week_xp, state["counters"].get(state["week"], zero)),
+    ):
+        db.query(LeaderboardScore).filter(LeaderboardScore.user_id == user.id, LeaderboardScore.period == period).update(
+            {LeaderboardScore.xp: xp, LeaderboardScore.sessions: counters["sessions"],
+             LeaderboardScore.volume: counters["volume"]},
+            synchronize_session=False,
+        )
+    entries = [
+        {"user_id": user.id, "session_id": session_id, "source": "session", "xp": xp, "coins": 0, "jokers": 0, "detail": detail}
+        for session_id, xp, detail in state["awards"]
+    ]
+    entries.append({
+        "user_id": user.id, "session_id": None, "source": "replay", "detail": None,
+        "xp": xp_total - ledger[0] - session_xp, "coins": coins - ledger[1], "jokers": jokers - ledger[2],
+    })
+    db.bulk_insert_mappings(RewardLedgerEntry, entries)
+
+
+def replay_users(db: DBSession, user_ids: list[int], dry_run: bool = True) -> list[dict]:
+    """Replay a batch of users; writes back in one transaction unless ``dry_run``. Returns the diffs."""
+    if not dry_run:
+        for user_id in user_ids:
+            finish_pending_jobs(db, user_id)
+
+    users_query = db.query(User).filter(User.id.in_(user_ids)).order_by(User.id)
+    if not dry_run and db.get_bind().dialect.name == "postgresql":
+        users_query = users_query.with_for_update()
+    users = users_query.all()
+    now = datetime.now(timezone.utc)
+    history = _load_history(db, user_ids, now)
+
+    diffs = []
+    for user in users:
+        state = replay_user(
+            user, history["sessions"].get(user.id, []), history["bests"], history["totals"],
+            history["routine_days"], history["quests"].get(user.id, []), now=now,
+        )
+        diff = _diff(user, state, history["completions"].get(user.id, 0))
+        if diff:
+            diffs.append(diff)
+        if not dry_run:
+            _write_back(db, user, state, history["ledger"].get(user.id, (0, 0, 0)),
+                        history["quest_week_xp"].get(user.id, 0))
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        from app.stats_cache import bump_stats_version
+        for user in users:
+            bump_stats_version(user.id)
+    return diffs
+
+
+def replay_in_batches(db: DBSession, user_ids: list[int], dry_run: bool = True,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> list[dict]:
+    """Replay users batch by batch on one session, one transaction per batch. Returns the diffs."""
+    diffs: list[dict] = []
+    for batch in batches(user_ids, batch_size):
+        diffs.extend(replay_users(db, batch, dry_run=dry_run))
+    return diffs
+
+
+def replay_all(user_ids: Optional[list[int]] = None, dry_run: bool = True, workers: int = 1,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> list[dict]:
+    """Replay the given users (default: everyone) in batches, across ``workers`` processes."""
+    from app.database import SessionLocal
+
+    if user_ids is None:
+        db = SessionLocal()
+        try:
+            user_ids = [uid for (uid,) in db.query(User.id).filter(User.is_demo.isnot(True)).order_by(User.id)]
+        finally:
+            db.close()
+
+    if workers <= 1:
+        db = SessionLocal()
+        try:
+            return replay_in_batches(db, user_ids, dry_run=dry_run, batch_size=batch_size)
+        finally:
+            db.close()
+
+    diffs: list[dict] = []
+    for batch_diffs in run_in_processes(replay_users, user_ids, dry_run, workers, batch_size):
+        diffs.extend(batch_diffs)
+    return diffs
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Replay completed sessions through the current reward rules.")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--workers", type=int, default=1, help="processes to spread user batches over")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="users per batch / transaction")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids", help="limit to these users")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    diffs = replay_all(args.user_ids, dry_run=args.dry_run, workers=args.workers, batch_size=args.batch_size)
+    for diff in diffs:
+        print(json.dumps(diff, default=str))
+    verb = "would change" if args.dry_run else "changed"
+    print(f"{'🔎' if args.dry_run else '✅'} Replay {verb} {len(diffs)} users in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,320 @@
+"""Weekly and all-time leaderboards (``leaderboard_scores``).
+
+Each user has an ``all`` row and one row per training week holding the
+scores boards rank on: XP (total, or gained that week), sessions, volume
+and, on the ``all`` row, the current streak. Session awards and reversals,
+quest claims and joker saves refresh the user's two affected rows (sessions
+and volume are copied from the quest counters, which set edits keep
+current).
+
+Boards are opt-in: ``visible`` on every row mirrors
+``users.leaderboard_visible``, and each board is served by a
+(period, visible, score DESC, user_id) index, so a top-N page is an index
+range read and a rank is a count over the index entries ahead of the user;
+nothing sorts the users table per request.
+
+``python -m app.leaderboards --benchmark 100000`` times those queries
+against synthetic users in a scratch SQLite database.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.leaderboard_score import LeaderboardScore
+from app.models.reward_ledger import RewardLedgerEntry
+from app.models.user import User
+from app.quest_counters import load_quest_counters, rebuild_user_quest_counters
+from app.reward_ledger import total_experience
+from app.training_calendar import TrainingCalendar, load_training_calendar, week_monday
+
+ALL_TIME = "all"
+PERIODS = ("week", "all")
+
+BOARDS = {
+    "xp": LeaderboardScore.xp,
+    "sessions": LeaderboardScore.sessions,
+    "volume": LeaderboardScore.volume,
+    "streak": LeaderboardScore.streak_weeks,
+}
+WEEKLY_BOARDS = ("xp", "sessions", "volume")
+
+# Ledger sources that are earned XP (not balances carried in or corrected)
+_EARNED_SOURCES = ("session", "session_reversal", "quest")
+
+
+def week_key(d: datetime) -> str:
+    """Row period of a week (same key as the quest counters)."""
+    return week_monday(d).isoformat()
+
+
+def display_name(user: User) -> str:
+    return user.leaderboard_name or f"Athlete #{user.id}"
+
+
+# ── Maintenance ──────────────────────────────────────────────────────────────
+
+def _score_rows(db: DBSession, user: User, periods: list[str]) -> dict[str, LeaderboardScore]:
+    db.flush()
+    rows = {
+        row.period: row
+        for row in db.query(LeaderboardScore).filter(
+            LeaderboardScore.user_id == user.id,
+            LeaderboardScore.period.in_(periods),
+        )
+    }
+    for period in periods:
+        if period not in rows:
+            rows[period] = LeaderboardScore(
+                user_id=user.id, period=period, visible=bool(user.leaderboard_visible),
+                xp=0, sessions=0, volume=0.0, streak_weeks=0,
+            )
+            db.add(rows[period])
+    return rows
+
+
+def _set_streak(db: DBSession, row: LeaderboardScore, user: User, calendar: TrainingCalendar) -> None:
+    from app.gamification import compute_streak_weeks
+
+    row.streak_weeks = compute_streak_weeks(db, user.id, calendar=calendar, user=user)
+    row.streak_week = week_monday(datetime.now(timezone.utc))
+
+
+def update_scores(db: DBSession, user: User, when: datetime, xp_delta: int = 0,
+                  calendar: Optional[TrainingCalendar] = None) -> None:
+    """Refresh the user's all-time row and the row of ``when``'s week. Caller commits.
+
+    ``xp_delta`` is added to that week's XP; the all-time XP is read off the
+    user. Pass the user's streak ``calendar`` when the streak may have
+    changed.
+    """
+    week = week_key(when)
+    rows = _score_rows(db, user, [ALL_TIME, week])
+    lifetime, this_week = load_quest_counters(db, user.id, when)
+
+    total = rows[ALL_TIME]
+    total.xp = total_experience(user.level, user.experience)
+    total.sessions = lifetime["sessions"]
+    total.volume = lifetime["volume"]
+    if calendar is not None:
+        _set_streak(db, total, user, calendar)
+
+    weekly = rows[week]
+    weekly.xp = max(0, (weekly.xp or 0) + xp_delta)
+    weekly.sessions = this_week["sessions"]
+    weekly.volume = this_week["volume"]
+
+
+def refresh_streak(db: DBSession, user: User, calendar: TrainingCalendar) -> None:
+    """Recompute only the all-time row's streak (e.g. after a joker save). Caller commits."""
+    _set_streak(db, _score_rows(db, user, [ALL_TIME])[ALL_TIME], user, calendar)
+
+
+def rebuild_user_scores(db: DBSession, user: User, now: Optional[datetime] = None) -> None:
+    """Recompute the user's all-time and current-week rows from their history. Caller commits."""
+    now = now or datetime.now(timezone.utc)
+    week = week_key(now)
+    rows = _score_rows(db, user, [ALL_TIME, week])
+    lifetime, this_week = load_quest_counters(db, user.id, now)
+    if not lifetime["sessions"]:  # counters not initialised yet
+        rebuild_user_quest_counters(db, user.id)
+        lifetime, this_week = load_quest_counters(db, user.id, now)
+
+    total = rows[ALL_TIME]
+    total.xp = total_experience(user.level, user.experience)
+    total.sessions = lifetime["sessions"]
+    total.volume = lifetime["volume"]
+    _set_streak(db, total, user, load_training_calendar(db, user.id))
+
+    monday = datetime.combine(week_monday(now), datetime.min.time(), tzinfo=timezone.utc)
+    weekly = rows[week]
+    weekly.xp = max(0, int(db.query(func.coalesce(func.sum(RewardLedgerEntry.xp), 0)).filter(
+        RewardLedgerEntry.user_id == user.id,
+        RewardLedgerEntry.source.in_(_EARNED_SOURCES),
+        RewardLedgerEntry.created_at >= monday,
+    ).scalar() or 0))
+    weekly.sessions = this_week["sessions"]
+    weekly.volume = this_week["volume"]
+
+
+def set_visibility(db: DBSession, user: User, visible: bool, name: Optional[str] = None) -> None:
+    """Opt in to (or out of) the boards. Opting in builds the user's rows from history. Caller commits."""
+    user.leaderboard_visible = visible
+    if name is not None:
+        user.leaderboard_name = name.strip() or None
+    if visible:
+        rebuild_user_scores(db, user)
+    db.query(LeaderboardScore).filter(LeaderboardScore.user_id == user.id).update(
+        {LeaderboardScore.visible: visible}, synchronize_session=False,
+    )
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+
+def _board_filter(board: str, period: str, now: datetime):
+    """(score column, filters) of a board; raises ValueError for unknown boards."""
+    if board not in BOARDS or period not in PERIODS or (period == "week" and board not in WEEKLY_BOARDS):
+        raise ValueError(f"Unknown leaderboard {board!r} for period {period!r}")
+    column = BOARDS[board]
+    filters = [LeaderboardScore.period == (ALL_TIME if period == ALL_TIME else week_key(now))]
+    if board == "streak":
+        # A streak computed before last week has ended unless a session refreshed it
+        filters += [LeaderboardScore.streak_weeks > 0, LeaderboardScore.streak_week >= week_monday(now) - timedelta(weeks=1)]
+    return column, filters
+
+
+def _entry(rank: int, score, user_id: int, name: str, me_id: Optional[int]) -> dict:
+    return {"rank": rank, "name": name, "score": score, "is_me": user_id == me_id}
+
+
+def top(db: DBSession, board: str, period: str, limit: int = 50, offset: int = 0,
+        me_id: Optional[int] = None, now: Optional[datetime] = None) -> list[dict]:
+    """A page of the board, best first."""
+    now = now or datetime.now(timezone.utc)
+    column, filters = _board_filter(board, period, now)
+    rows = (
+        db.query(column, LeaderboardScore.user_id, User.leaderboard_name)
+        .join(User, User.id == LeaderboardScore.user_id)
+        .filter(*filters, LeaderboardScore.visible == True)  # noqa: E712
+        .order_by(column.desc(), LeaderboardScore.user_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [
+        _entry(offset + i + 1, score, user_id, name or f"Athlete #{user_id}", me_id)
+        for i, (score, user_id, name) in enumerate(rows)
+    ]
+
+
+def around(db: DBSession, user: User, board: str, period: str, k: int = 5,
+           now: Optional[datetime] = None) -> dict:
+    """The user's rank among visible users with up to ``k`` neighbours either side.
+
+    Users who haven't opted in get the rank they would have.
+    """
+    now = now or datetime.now(timezone.utc)
+    column, filters = _board_filter(board, period, now)
+    mine = db.query(column).filter(LeaderboardScore.user_id == user.id, *filters).scalar()
+    if mine is None:
+        return {"rank": None, "score": None, "visible": bool(user.leaderboard_visible), "entries": []}
+
+    visible_others = [*filters, LeaderboardScore.visible == True, LeaderboardScore.user_id != user.id]  # noqa: E712
+    ahead = or_(column > mine, and_(column == mine, LeaderboardScore.user_id < user.id))
+    behind = or_(column < mine, and_(column == mine, LeaderboardScore.user_id > user.id))
+    rank = (db.query(func.count()).select_from(LeaderboardScore).filter(*visible_others, ahead).scalar() or 0) + 1
+
+    def neighbours(condition, order):
+        return (
+            db.query(column, LeaderboardScore.user_id, User.leaderboard_name)
+            .join(User, User.id == LeaderboardScore.user_id)
+            .filter(*visible_others, condition)
+            .order_by(*order)
+            .limit(k)
+            .all()
+        )
+
+    above = neighbours(ahead, (column.asc(), LeaderboardScore.user_id.desc()))[::-1]
+    below = neighbours(behind, (column.desc(), LeaderboardScore.user_id.asc()))
+
+    entries = [
+        _entry(rank - len(above) + i, score, uid, name or f"Athlete #{uid}", user.id)
+        for i, (score, uid, name) in enumerate(above)
+    ]
+    entries.append(_entry(rank, mine, user.id, display_name(user), user.id))
+    entries += [
+        _entry(rank + 1 + i, score, uid, name or f"Athlete #{uid}", user.id)
+        for i, (score, uid, name) in enumerate(below)
+    ]
+    return {"rank": rank, "score": mine, "visible": bool(user.leaderboard_visible), "entries": entries}
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def benchmark(users: int = 100_000, url: str = "sqlite://", samples: int = 50) -> dict[str, float]:
+    """Time top-N and rank±k queries over ``users`` synthetic users. Returns mean ms per query kind."""
+    import random
+    import time
+
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[User.__table__, LeaderboardScore.__table__])
+    now = datetime.now(timezone.utc)
+    week = week_key(now)
+    rng = random.Random(42)
+
+    with engine.begin() as conn:
+        for start in range(0, users, 10_000):
+            ids = range(start + 1, min(users, start + 10_000) + 1)
+            conn.execute(insert(User.__table__), [
+                {"id": i, "email": f"bench{i}@example.com", "password_hash": "x", "level": 1, "experience": 0,
+                 "leaderboard_visible": i % 4 != 0}
+                for i in ids
+            ])
+            rows = []
+            for i in ids:
+                sessions = rng.randint(0, 400)
+                rows.append({"user_id": i, "period": ALL_TIME, "visible": i % 4 != 0, "xp": sessions * rng.randint(40, 90),
+                             "sessions": sessions, "volume": sessions * rng.uniform(2000, 9000),
+                             "streak_weeks": rng.randint(0, 52), "streak_week": week_monday(now)})
+                if i % 3 == 0:
+                    weekly = rng.randint(1, 6)
+                    rows.append({"user_id": i, "period": week, "visible": i % 4 != 0, "xp": weekly * 60,
+                                 "sessions": weekly, "volume": weekly * rng.uniform(2000, 9000), "streak_weeks": 0,
+                                 "streak_week": None})
+            conn.execute(insert(LeaderboardScore.__table__), rows)
+
+    db = sessionmaker(bind=engine)()
+    timings: dict[str, list[float]] = {}
+
+    def timed(name, fn):
+        started = time.perf_counter()
+        fn()
+        timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+    try:
+        members = [db.get(User, rng.randint(1, users)) for _ in range(samples)]
+        for board in BOARDS:
+            for period in PERIODS:
+                if period == "week" and board not in WEEKLY_BOARDS:
+                    continue
+                for member in members:
+                    timed("top50", lambda: top(db, board, period, limit=50, now=now))
+                    timed("top50_page_20", lambda: top(db, board, period, limit=50, offset=1000, now=now))
+                    timed("rank_k5", lambda: around(db, member, board, period, k=5, now=now))
+    finally:
+        db.close()
+        engine.dispose()
+    return {name: sum(values) / len(values) for name, values in timings.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Leaderboard maintenance and benchmark.")
+    parser.add_argument("--benchmark", type=int, metavar="USERS", help="time queries over this many synthetic users")
+    parser.add_argument("--url", default="sqlite://", help="scratch database for --benchmark (default: in-memory SQLite)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for name, ms in benchmark(args.benchmark, args.url).items():
+            print(f"{name:>14}: {ms:7.2f} ms")
+    else:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            opted_in = db.query(User).filter(User.leaderboard_visible.is_(True)).all()
+            for member in opted_in:
+                rebuild_user_scores(db, member)
+            db.commit()
+            print(f"✅ Rebuilt leaderboard scores for {len(opted_in)} users")
+        finally:
+            db.close()
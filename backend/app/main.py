@@ -1,4 +1,6 @@
+import asyncio
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,11 +9,30 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.limiter import limiter
-from app.config import validate_production_environment
+from app.config import is_test_env, validate_production_environment
 
 validate_production_environment()
 
-app = FastAPI(title="Kairos lift API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the exercise catalog; start the demo snapshot refresher and the gamification / report workers."""
+    tasks = []
+    if not is_test_env():
+        from app.demo_snapshots import run_demo_snapshot_refresher
+        from app.exercise_catalog import warm_catalog
+        from app.gamification_outbox import run_gamification_worker
+        from app.progression_report_jobs import run_progression_report_worker
+        warm_catalog()
+        tasks.append(asyncio.create_task(run_demo_snapshot_refresher()))
+        tasks.append(asyncio.create_task(run_gamification_worker()))
+        tasks.append(asyncio.create_task(run_progression_report_worker()))
+    yield
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(title="Kairos lift API", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -41,7 +62,7 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept"],
 )
 
-from app.routers import auth, exercises, routines, sessions, sets, stats, sync, gamification, user_preferences, ai, admin, weight, progression, errors as errors_router
+from app.routers import auth, exercises, routines, sessions, sets, stats, sync, gamification, leaderboards, user_preferences, ai, admin, weight, progression, errors as errors_router
 
 app.include_router(auth.router)
 app.include_router(exercises.router)
@@ -51,6 +72,7 @@ app.include_router(sets.router)
 app.include_router(stats.router)
 app.include_router(sync.router)
 app.include_router(gamification.router)
+app.include_router(leaderboards.router)
 app.include_router(user_preferences.router)
 app.include_router(ai.router)
 app.include_router(admin.router)
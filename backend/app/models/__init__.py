@@ -7,6 +7,16 @@ from .quest import Quest, UserQuest
 from .user_preference import UserPreference
 from .ai_usage_log import AIUsageLog
 from .weight_log import WeightLog
-from .progression import ProgressionReport, ProgressionFeedback, ExerciseProgression
+from .progression import (
+    ProgressionReport, ProgressionReportJob, ProgressionFeedback, ExerciseProgression, RoutineDaySuggestions,
+)
 from .routine_completion import RoutineCompletion
 from .error_log import ErrorLog
+from .user_daily_stats import UserDailyStats
+from .user_muscle_weekly_stats import UserMuscleWeeklyStats
+from .exercise_best import ExerciseBest
+from .user_quest_counter import UserQuestCounter
+from .gamification_job import GamificationJob
+from .reward_ledger import RewardLedgerEntry
+from .routine_cycle_state import RoutineCycleState
+from .leaderboard_score import LeaderboardScore
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from app.database import Base
+
+
+class ExerciseBest(Base):
+    """Per-user personal records for one exercise, over completed normal sets.
+
+    Folded forward when a session is completed and recomputed for the
+    affected exercises when a completed session's sets change or the session
+    is deleted. Maintained by ``app.exercise_bests``.
+    """
+    __tablename__ = "exercise_bests"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    max_reps = Column(Integer, nullable=False, default=0, server_default="0")
+    max_weight = Column(Float, nullable=False, default=0.0, server_default="0")
+    session_count = Column(Integer, nullable=False, default=0, server_default="0")  # completed sessions with the exercise
+    last_session_id = Column(Integer, nullable=True)  # most recently completed of those
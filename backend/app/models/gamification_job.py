@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class GamificationJob(Base):
+    """Outbox row for the post-completion pipeline of one session.
+
+    Written in the same transaction as the completion; PR detection, effort
+    scoring, XP / level-up and quest progress run afterwards and store their
+    summary in ``result``. Processed by ``app.gamification_outbox``.
+    """
+    __tablename__ = "gamification_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, unique=True)
+    status = Column(String(10), nullable=False, default="pending", server_default="pending")  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    result = Column(JSON, nullable=True)  # award_session_xp summary once done
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_gamification_jobs_status_id", "status", "id"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, String, Boolean, Date, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class LeaderboardScore(Base):
+    """One user's leaderboard scores for a period.
+
+    ``period`` is ``"all"`` or the ISO date of a week's Monday (UTC week of
+    ``completed_at``, as in user_quest_counters). ``visible`` mirrors
+    ``users.leaderboard_visible`` so rank and top-N queries stay on the
+    (period, visible, score, user_id) indexes. Streaks only live on the
+    ``"all"`` row. Maintained by ``app.leaderboards``.
+    """
+    __tablename__ = "leaderboard_scores"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(10), primary_key=True)
+    visible = Column(Boolean, nullable=False, default=False, server_default="false")
+    xp = Column(Integer, nullable=False, default=0, server_default="0")  # total ("all") or gained that week
+    sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    volume = Column(Float, nullable=False, default=0.0, server_default="0")  # non-warmup sum(weight_kg * reps)
+    streak_weeks = Column(Integer, nullable=False, default=0, server_default="0")
+    streak_week = Column(Date, nullable=True)  # Monday of the week streak_weeks was computed in
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_leaderboard_scores_xp", "period", "visible", xp.desc(), "user_id"),
+        Index("ix_leaderboard_scores_sessions", "period", "visible", sessions.desc(), "user_id"),
+        Index("ix_leaderboard_scores_volume", "period", "visible", volume.desc(), "user_id"),
+        Index("ix_leaderboard_scores_streak_weeks", "period", "visible", streak_weeks.desc(), "user_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -20,6 +20,35 @@ class ProgressionReport(Base):
     ai_usage_log = relationship("AIUsageLog")
 
 
+class ProgressionReportJob(Base):
+    """One requested progression report, generated in the background.
+
+    The analysis and AI enrichment run outside the request; the report row,
+    the coin (or joker) charge and ``status = done`` are committed together.
+    Processed by ``app.progression_report_jobs``.
+    """
+    __tablename__ = "progression_report_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"), nullable=False)
+    user_context = Column(Text, nullable=True)
+    use_joker = Column(Boolean, nullable=False, default=False, server_default="false")
+    status = Column(String(10), nullable=False, default="pending", server_default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    report_id = Column(Integer, ForeignKey("progression_reports.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # when the current attempt claimed it
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    report = relationship("ProgressionReport")
+
+    __table_args__ = (
+        Index("ix_progression_report_jobs_status_id", "status", "id"),
+    )
+
+
 class ProgressionFeedback(Base):
     __tablename__ = "progression_feedback"
 
@@ -52,3 +81,21 @@ class ExerciseProgression(Base):
     suggested_starting_reps = Column(String, nullable=False, default="4-6")
 
     exercise = relationship("Exercise")
+
+
+class RoutineDaySuggestions(Base):
+    """Stored progression suggestions for one day of a user's routine.
+
+    Valid while ``last_session_id`` is still the routine's latest completed
+    session (NULL: none yet). ``suggestions`` maps every exercise of the
+    day (str id) to its suggestion dict or null. Maintained by
+    ``app.progression_suggestions``.
+    """
+    __tablename__ = "progression_suggestions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"), primary_key=True)
+    day_index = Column(Integer, primary_key=True)
+    last_session_id = Column(Integer, nullable=True)
+    suggestions = Column(JSON, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
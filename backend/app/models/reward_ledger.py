@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RewardLedgerEntry(Base):
+    """One change to a user's XP / coin / joker balances (append-only).
+
+    ``xp`` is the change in total experience (all levels), so level-up coins
+    show up in ``coins`` of the entry that caused them. Session awards and
+    their reversals carry ``session_id``. Written by ``app.reward_ledger``.
+    """
+    __tablename__ = "reward_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id = Column(Integer, nullable=True)  # no FK: entries outlive deleted sessions
+    source = Column(String(30), nullable=False)  # session, session_reversal, quest, streak, onboarding, shop, promo, ...
+    xp = Column(Integer, nullable=False, default=0, server_default="0")
+    coins = Column(Integer, nullable=False, default=0, server_default="0")
+    jokers = Column(Integer, nullable=False, default=0, server_default="0")
+    detail = Column(JSON, nullable=True)  # source-specific breakdown (e.g. PR counts of a session award)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_reward_ledger_user_id_id", "user_id", "id"),
+        Index("ix_reward_ledger_session_id", "session_id"),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, DateTime
+from app.database import Base
+
+
+class RoutineCycleState(Base):
+    """Progress through the current cycle of one user's routine.
+
+    ``day_mask`` has bit ``i`` set once a session for day ``i`` has been
+    completed since ``cycle_started_at`` (the last RoutineCompletion; NULL
+    before the first). ``prev_*`` keep the cycle before it, so deleting the
+    session that closed it can reopen it. Maintained by
+    ``app.routine_cycles``.
+    """
+    __tablename__ = "routine_cycle_states"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    routine_id = Column(Integer, ForeignKey("routines.id", ondelete="CASCADE"), primary_key=True)
+    day_mask = Column(BigInteger, nullable=False, default=0, server_default="0")
+    cycle_started_at = Column(DateTime(timezone=True), nullable=True)
+    prev_day_mask = Column(BigInteger, nullable=True)  # NULL: unknown, rebuilt from history if needed
+    prev_cycle_started_at = Column(DateTime(timezone=True), nullable=True)
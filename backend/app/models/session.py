@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -24,6 +24,11 @@ class Session(Base):
     routine = relationship("Routine")
     sets = relationship("Set", back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Per-user timelines (effort trend, history windows) walk this newest-first
+        Index("ix_sessions_user_id_completed_at", "user_id", "completed_at"),
+    )
+
 class Set(Base):
     __tablename__ = "sets"
 
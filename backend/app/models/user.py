@@ -28,5 +28,8 @@ class User(Base):
     experience = Column(Integer, default=0, server_default="0")
     currency = Column(Integer, default=10, server_default="10")
     streak_reward_week = Column(String, nullable=True)  # ISO week e.g. "2026-W13"
+    quest_week = Column(String(10), nullable=True)  # ISO week whose quests are assigned (set by rotation)
     joker_tokens = Column(Integer, default=0, server_default="0")
+    leaderboard_visible = Column(Boolean, default=False, server_default="false")  # opt-in
+    leaderboard_name = Column(String(30), nullable=True)  # shown instead of the email
     onboarding_progress = Column(JSON, default={}, server_default="{}")
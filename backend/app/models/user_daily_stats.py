@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from app.database import Base
+
+
+class UserDailyStats(Base):
+    """Per-user, per-day rollup of completed training.
+
+    One row per (user, UTC day of ``completed_at``). Maintained by
+    ``app.daily_stats`` whenever a write touches a completed session, so the
+    dashboard reads a few rows instead of the user's full set history.
+    """
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    volume = Column(Float, nullable=False, default=0.0, server_default="0")  # normal sets, sum(weight_kg * reps)
+    set_count = Column(Integer, nullable=False, default=0, server_default="0")  # normal sets
+    duration_seconds = Column(Integer, nullable=False, default=0, server_default="0")  # tracked duration only
+    duration_sessions = Column(Integer, nullable=False, default=0, server_default="0")  # sessions with tracked duration
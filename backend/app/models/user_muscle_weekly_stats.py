@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, Date, String, ForeignKey
+from app.database import Base
+
+
+class UserMuscleWeeklyStats(Base):
+    """Per-user, per-ISO-week, per-muscle rollup of completed normal sets.
+
+    ``week`` is the Monday of the UTC week of the session's ``completed_at``.
+    Primary and secondary credit are stored separately so the secondary
+    fraction is applied at read time. Maintained by ``app.muscle_stats``.
+    """
+    __tablename__ = "user_muscle_weekly_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    week = Column(Date, primary_key=True)
+    muscle = Column(String, primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0, server_default="0")  # sessions training it as primary
+    primary_sets = Column(Integer, nullable=False, default=0, server_default="0")
+    primary_volume = Column(Float, nullable=False, default=0.0, server_default="0")
+    secondary_sets = Column(Integer, nullable=False, default=0, server_default="0")
+    secondary_volume = Column(Float, nullable=False, default=0.0, server_default="0")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, String, ForeignKey
+from app.database import Base
+
+
+class UserQuestCounter(Base):
+    """Running quest-progress totals for one user.
+
+    ``period`` is ``"lifetime"`` or the ISO date of a week's Monday (UTC week
+    of ``completed_at``). Advanced by per-completion deltas and corrected when
+    a completed session is edited or deleted. Maintained by
+    ``app.quest_counters``.
+    """
+    __tablename__ = "user_quest_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(10), primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    sets = Column(Integer, nullable=False, default=0, server_default="0")  # all set types
+    volume = Column(Float, nullable=False, default=0.0, server_default="0")  # non-warmup sum(weight_kg * reps)
+    routine_sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    duration_sec = Column(Integer, nullable=False, default=0, server_default="0")  # sum of set duration_sec
+    weight_prs = Column(Integer, nullable=False, default=0, server_default="0")
+    rep_prs = Column(Integer, nullable=False, default=0, server_default="0")
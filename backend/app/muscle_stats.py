@@ -0,0 +1,198 @@
+"""Per-user weekly muscle-volume rollup (``user_muscle_weekly_stats``).
+
+Each completed normal set with reps credits its exercise's primary muscle
+(``muscle``, falling back to ``muscle_group``) in full, and its
+``secondary_muscle`` separately. Reads weight the secondary credit by
+``SECONDARY_MUSCLE_FRACTION`` (or a per-request override), so changing the
+fraction never requires a rebuild.
+
+Rows are refreshed a whole (user, week) at a time from ``app.daily_stats``
+whenever a write touches a completed session in that week.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session as DBSession
+
+from app.config import get_env
+from app.models.exercise import Exercise
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user_muscle_weekly_stats import UserMuscleWeeklyStats
+from app.training_calendar import week_monday
+
+SECONDARY_MUSCLE_FRACTION = float(get_env("MUSCLE_SECONDARY_FRACTION", "0.5"))
+
+GRANULARITIES = ("total", "week", "month")
+
+
+def _empty_totals() -> dict:
+    return {"sessions": set(), "primary_sets": 0, "primary_volume": 0.0, "secondary_sets": 0, "secondary_volume": 0.0}
+
+
+def _muscle_totals(db: DBSession, session_ids: list[int]) -> dict[str, dict]:
+    """{muscle: totals} over the normal sets of the given sessions (one grouped query)."""
+    if not session_ids:
+        return {}
+    rows = (
+        db.query(
+            SetModel.session_id,
+            Exercise.muscle,
+            Exercise.muscle_group,
+            Exercise.secondary_muscle,
+            func.count(SetModel.id),
+            func.sum(func.coalesce(SetModel.weight_kg, Exercise.default_weight_kg) * func.coalesce(SetModel.reps, 0)),
+        )
+        .join(Exercise, SetModel.exercise_id == Exercise.id)
+        .filter(
+            SetModel.session_id.in_(session_ids),
+            func.coalesce(SetModel.set_type, "normal") == "normal",
+            SetModel.reps > 0,
+        )
+        .group_by(SetModel.session_id, Exercise.muscle, Exercise.muscle_group, Exercise.secondary_muscle)
+        .all()
+    )
+
+    totals: dict[str, dict] = {}
+    for session_id, muscle, muscle_group, secondary, set_count, volume in rows:
+        primary = muscle or muscle_group or "Other"
+        volume = float(volume or 0)
+        acc = totals.setdefault(primary, _empty_totals())
+        acc["sessions"].add(session_id)
+        acc["primary_sets"] += set_count
+        acc["primary_volume"] += volume
+        if secondary and secondary != primary:
+            acc = totals.setdefault(secondary, _empty_totals())
+            acc["secondary_sets"] += set_count
+            acc["secondary_volume"] += volume
+    return totals
+
+
+def _apply_totals(row: UserMuscleWeeklyStats, totals: dict) -> None:
+    row.sessions = len(totals["sessions"])
+    row.primary_sets = totals["primary_sets"]
+    row.primary_volume = totals["primary_volume"]
+    row.secondary_sets = totals["secondary_sets"]
+    row.secondary_volume = totals["secondary_volume"]
+
+
+def refresh_muscle_week(db: DBSession, user_id: int, week: date) -> None:
+    """Recompute every muscle row of one (user, week). Caller commits."""
+    db.flush()
+
+    # Same padded-window approach as the daily rollup; week_monday() decides exactly.
+    window_start = datetime.combine(week - timedelta(days=1), time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(week + timedelta(days=8), time.min, tzinfo=timezone.utc)
+    candidates = (
+        db.query(SessionModel.id, SessionModel.completed_at)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.completed_at.isnot(None),
+            SessionModel.completed_at >= window_start,
+            SessionModel.completed_at < window_end,
+        )
+        .all()
+    )
+    session_ids = [sid for sid, completed_at in candidates if week_monday(completed_at) == week]
+    totals = _muscle_totals(db, session_ids)
+
+    existing = {
+        row.muscle: row
+        for row in db.query(UserMuscleWeeklyStats).filter(
+            UserMuscleWeeklyStats.user_id == user_id,
+            UserMuscleWeeklyStats.week == week,
+        )
+    }
+    for muscle, row in existing.items():
+        if muscle not in totals:
+            db.delete(row)
+    for muscle, muscle_totals in totals.items():
+        row = existing.get(muscle)
+        if row is None:
+            row = UserMuscleWeeklyStats(user_id=user_id, week=week, muscle=muscle)
+            db.add(row)
+        _apply_totals(row, muscle_totals)
+
+
+def rebuild_user_muscle_stats(db: DBSession, user_id: int) -> int:
+    """Drop and rebuild every muscle rollup row for a user. Returns the number of rows written."""
+    db.flush()
+    db.query(UserMuscleWeeklyStats).filter(UserMuscleWeeklyStats.user_id == user_id).delete(synchronize_session=False)
+
+    by_week: dict[date, list[int]] = {}
+    for sid, completed_at in (
+        db.query(SessionModel.id, SessionModel.completed_at)
+        .filter(SessionModel.user_id == user_id, SessionModel.completed_at.isnot(None))
+    ):
+        by_week.setdefault(week_monday(completed_at), []).append(sid)
+
+    written = 0
+    for week, session_ids in by_week.items():
+        for muscle, muscle_totals in _muscle_totals(db, session_ids).items():
+            row = UserMuscleWeeklyStats(user_id=user_id, week=week, muscle=muscle)
+            _apply_totals(row, muscle_totals)
+            db.add(row)
+            written += 1
+    return written
+
+
+def _period(week: date, granularity: str) -> Optional[str]:
+    if granularity == "week":
+        return week.isoformat()
+    if granularity == "month":
+        return week.strftime("%Y-%m")  # weeks belong to the month of their Monday
+    return None
+
+
+def muscle_volume(
+    db: DBSession,
+    user_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "total",
+    secondary_fraction: Optional[float] = None,
+) -> list[dict]:
+    """Set / volume breakdown per muscle from the weekly rollup.
+
+    ``start`` / ``end`` select whole weeks: a week is included when its Monday
+    falls in [Monday of ``start``, ``end``]. With ``granularity`` "week" or
+    "month" every row carries a ``period`` label and rows are ordered by
+    period, then volume; "total" collapses the range into one row per muscle.
+    """
+    fraction = SECONDARY_MUSCLE_FRACTION if secondary_fraction is None else secondary_fraction
+
+    query = db.query(UserMuscleWeeklyStats).filter(UserMuscleWeeklyStats.user_id == user_id)
+    if start is not None:
+        query = query.filter(UserMuscleWeeklyStats.week >= week_monday(start))
+    if end is not None:
+        query = query.filter(UserMuscleWeeklyStats.week <= end)
+
+    buckets: dict[tuple[Optional[str], str], list] = {}
+    for row in query:
+        acc = buckets.setdefault((_period(row.week, granularity), row.muscle), [0, 0, 0, 0.0, 0.0])
+        acc[0] += row.sessions
+        acc[1] += row.primary_sets
+        acc[2] += row.secondary_sets
+        acc[3] += row.primary_volume
+        acc[4] += row.secondary_volume
+
+    result = []
+    for (period, muscle), (sessions, primary_sets, secondary_sets, primary_volume, secondary_volume) in buckets.items():
+        entry = {
+            "muscle": muscle,
+            "total_sets": round(primary_sets + fraction * secondary_sets, 1),
+            "total_volume": int(primary_volume + fraction * secondary_volume),
+            "total_sessions": sessions,
+            "primary_sets": primary_sets,
+            "secondary_sets": secondary_sets,
+        }
+        if granularity != "total":
+            entry = {"period": period, **entry}
+        result.append(entry)
+
+    result.sort(key=lambda x: x["total_volume"], reverse=True)
+    if granularity != "total":
+        result.sort(key=lambda x: x["period"])
+    return result
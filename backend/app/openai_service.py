@@ -3,6 +3,10 @@ OpenAI integration for AI-powered routine generation.
 
 Sends user preferences + a slim exercise catalog to GPT and receives
 back a structured JSON routine matching our Routine.days schema.
+
+The ``async`` calls here never touch the database: callers load what they
+need and store the usage log (``record_ai_usage``) in a worker thread, so
+the event loop only ever waits on OpenAI.
 """
 import os
 import json
@@ -12,6 +16,7 @@ from sqlalchemy.orm import Session
 
 from openai import AsyncOpenAI, AuthenticationError, RateLimitError, APIError
 from fastapi import HTTPException
+from app.exercise_catalog import get_catalog, required_equipment
 
 logger = logging.getLogger(__name__)
 
@@ -170,28 +175,38 @@ def _filter_exercises_by_equipment(exercises: list, preferences) -> list:
             if key in user_equip:
                 allowed.update(mapped)
 
-    def is_allowed(ex):
-        # We can now specify multi-equipment in the DB like "Dumbbell, Bench"
-        eq_str = (ex.equipment or "none (bodyweight)").lower()
-        reqs = [r.strip() for r in eq_str.split(",")]
+    # Multi-equipment is stored like "Dumbbell, Bench"; every part (other than
+    # bodyweight) must be available, and "other" (bands, functional gear) always is
+    return [ex for ex in exercises if required_equipment(ex.equipment) <= allowed]
 
-        # For "other" we allow it (e.g. bands/functional equipment)
-        if "other" in reqs:
-            return True
-        
-        for req in reqs:
-            if "bodyweight" in req or req == "none":
-                continue
-            if req not in allowed:
-                return False
 
-        return True
+def _token_usage(response) -> Dict[str, Any]:
+    """Token counts and cost of one completion (gpt-4o: $2.50/1M prompt, $10.00/1M completion)."""
+    usage = response.usage
+    prompt_tokens = usage.prompt_tokens if usage else 0
+    completion_tokens = usage.completion_tokens if usage else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": usage.total_tokens if usage else 0,
+        "cost_usd": (prompt_tokens * 2.50 / 1_000_000) + (completion_tokens * 10.00 / 1_000_000),
+    }
 
-    return [ex for ex in exercises if is_allowed(ex)]
+
+def record_ai_usage(db: Session, user_id: int, usage_log: Dict[str, Any]):
+    """Add the AIUsageLog row for one OpenAI call (flushed, not committed). Caller commits.
+
+    ``usage_log`` is what the AI call returned: token counts, cost and ``suggested_routine``.
+    """
+    from app.models.ai_usage_log import AIUsageLog
+
+    log = AIUsageLog(user_id=user_id, model=OPENAI_MODEL, status="generated", **usage_log)
+    db.add(log)
+    db.flush()
+    return log
 
 
 async def generate_routine_suggestion(
-    db: Session,
     user,
     preferences,
     exercises: list,
@@ -207,7 +222,8 @@ async def generate_routine_suggestion(
         extra_prompt: Optional free-text from the user
 
     Returns:
-        Dict with keys: name, description, days (matching RoutineCreate schema)
+        Dict with keys: name, description, coach_message, days (matching
+        RoutineCreate schema), and the usage log fields for record_ai_usage
 
     Raises:
         ValueError: If OPENAI_API_KEY is not configured
@@ -284,7 +300,6 @@ async def generate_routine_suggestion(
         raise RuntimeError(f"Unexpected error during routine generation: {e}")
 
     raw = response.choices[0].message.content
-    usage = response.usage
     if not raw:
         raise RuntimeError("OpenAI returned empty response")
 
@@ -315,37 +330,13 @@ async def generate_routine_suggestion(
             if not ex.get("_invalid")
         ]
 
-    # Calculate cost (gpt-4o: $2.50/1M prompt, $10.00/1M completion)
-    prompt_tokens = usage.prompt_tokens if usage else 0
-    completion_tokens = usage.completion_tokens if usage else 0
-    total_tokens = usage.total_tokens if usage else 0
-    
-    cost_usd = (prompt_tokens * 2.50 / 1000000) + (completion_tokens * 10.00 / 1000000)
-
-    # Log the usage
-    from app.models.ai_usage_log import AIUsageLog
-    
-    usage_log = AIUsageLog(
-        user_id=user.id,
-        model=OPENAI_MODEL,
-        prompt_tokens=prompt_tokens,
-        completion_tokens=completion_tokens,
-        total_tokens=total_tokens,
-        cost_usd=cost_usd,
-        suggested_routine=result,
-        status="generated"
-    )
-    db.add(usage_log)
-    db.commit()
-    db.refresh(usage_log)
-
-    return {
-        "ai_usage_id": usage_log.id,
+    routine = {
         "name": result.get("name", "AI Routine"),
         "description": result.get("description", ""),
         "coach_message": result.get("coach_message", ""),
         "days": result["days"],
     }
+    return routine, {**_token_usage(response), "suggested_routine": result}
 
 
 REPLACE_PROMPT = """You are a fitness coach helping to replace specific exercises in an existing workout routine.
@@ -370,7 +361,6 @@ RULES:
 
 
 async def replace_exercises_ai(
-    db,
     user,
     preferences,
     exercises: list,
@@ -379,13 +369,10 @@ async def replace_exercises_ai(
     extra_prompt: str | None = None,
 ):
     """Replace specific exercises in a routine using AI."""
-    import os
-
     api_key = os.getenv("OPENAI_API_KEY", "")
     if not api_key or api_key == "your-openai-key-here":
         raise ValueError("OPENAI_API_KEY is not configured")
 
-    from openai import AsyncOpenAI
     client = AsyncOpenAI(api_key=api_key)
 
     filtered = _filter_exercises_by_equipment(exercises, preferences)
@@ -471,7 +458,6 @@ RULES:
 
 
 async def fill_day_ai(
-    db,
     user,
     preferences,
     exercises: list,
@@ -479,7 +465,10 @@ async def fill_day_ai(
     existing_ids: list[int] | None = None,
     day_name: str | None = None,
 ):
-    """Fill a single day with AI-suggested exercises based on a free-text prompt."""
+    """Fill a single day with AI-suggested exercises based on a free-text prompt.
+
+    Returns the validated exercises and the usage log fields for record_ai_usage.
+    """
     api_key = os.getenv("OPENAI_API_KEY", "").strip()
     if not api_key:
         raise ValueError("OPENAI_API_KEY is not configured")
@@ -542,28 +531,7 @@ async def fill_day_ai(
         if ex.get("exercise_id") in valid_ids and ex.get("exercise_id") not in existing_set
     ]
 
-    # Log usage
-    usage = response.usage
-    prompt_tokens = usage.prompt_tokens if usage else 0
-    completion_tokens = usage.completion_tokens if usage else 0
-    total_tokens = usage.total_tokens if usage else 0
-    cost_usd = (prompt_tokens * 2.50 / 1_000_000) + (completion_tokens * 10.00 / 1_000_000)
-
-    from app.models.ai_usage_log import AIUsageLog
-    log = AIUsageLog(
-        user_id=user.id,
-        model=OPENAI_MODEL,
-        prompt_tokens=prompt_tokens,
-        completion_tokens=completion_tokens,
-        total_tokens=total_tokens,
-        cost_usd=cost_usd,
-        suggested_routine={"fill_day": result},
-        status="generated",
-    )
-    db.add(log)
-    db.commit()
-
-    return {"exercises": validated}
+    return {"exercises": validated}, {**_token_usage(response), "suggested_routine": {"fill_day": result}}
 
 
 # ── Progression Report AI Enrichment ─────────────────────────────────────────
@@ -596,29 +564,13 @@ RULES:
 8. The periodization_note should only be present if the data suggests a phase change is warranted (e.g., user has been training 8+ weeks without a deload)."""
 
 
-async def generate_report_ai(
-    db,
-    user,
-    routine,
-    algorithmic_results: dict,
-    user_context: str = None,
-):
-    """Generate AI enrichment for a progression report."""
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not configured")
-
-    client = AsyncOpenAI(api_key=api_key)
-
-    from app.models.exercise import Exercise
+def build_report_prompt(db, user, routine, algorithmic_results: dict, user_context: str = None) -> str:
+    """The user message of a report request: progress summary, algorithmic suggestions and catalog."""
     from app.models.user_preference import UserPreference
     from app.progression_summary import build_progress_summary, format_summary_for_prompt
 
     preferences = db.query(UserPreference).filter(UserPreference.user_id == user.id).first()
-    exercises = _filter_exercises_by_equipment(
-        db.query(Exercise).filter(Exercise.user_id == None).all(),  # noqa: E711
-        preferences,
-    )
+    exercises = _filter_exercises_by_equipment(get_catalog(db).exercises, preferences)
     catalog_str = _build_exercise_catalog(exercises)
 
     summary = build_progress_summary(user.id, routine.id, db)
@@ -637,13 +589,26 @@ async def generate_report_ai(
     ]
     if user_context:
         user_message_parts.insert(0, f"## User Focus Request\n{user_context}\n")
+    return "\n".join(user_message_parts)
+
+
+async def generate_report_ai(user_message: str) -> tuple[dict, dict]:
+    """Generate AI enrichment for a progression report prompt.
+
+    Returns the parsed result and the usage log fields for record_ai_usage.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not configured")
+
+    client = AsyncOpenAI(api_key=api_key)
 
     try:
         response = await client.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": REPORT_PROMPT},
-                {"role": "user", "content": "\n".join(user_message_parts)},
+                {"role": "user", "content": user_message},
             ],
             response_format={"type": "json_object"},
             max_tokens=2000,
@@ -663,25 +628,4 @@ async def generate_report_ai(
     except json.JSONDecodeError:
         raise RuntimeError("OpenAI returned invalid JSON")
 
-    # Log usage
-    usage = response.usage
-    prompt_tokens = usage.prompt_tokens if usage else 0
-    completion_tokens = usage.completion_tokens if usage else 0
-    total_tokens = usage.total_tokens if usage else 0
-    cost_usd = (prompt_tokens * 2.50 / 1_000_000) + (completion_tokens * 10.00 / 1_000_000)
-
-    from app.models.ai_usage_log import AIUsageLog
-    log = AIUsageLog(
-        user_id=user.id,
-        model=OPENAI_MODEL,
-        prompt_tokens=prompt_tokens,
-        completion_tokens=completion_tokens,
-        total_tokens=total_tokens,
-        cost_usd=cost_usd,
-        suggested_routine=result,
-        status="generated",
-    )
-    db.add(log)
-    db.commit()
-
-    return result
+    return result, {**_token_usage(response), "suggested_routine": result}
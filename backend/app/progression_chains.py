@@ -5,8 +5,14 @@ Each chain maps a movement pattern to an ordered list of exercise names
 (matching the exercises table). Position 0 = easiest regression.
 
 The migration seeds `exercise_progressions` from these definitions,
-resolving names to exercise IDs at migration time.
+resolving names to exercise IDs at migration time; ``compile_chains`` turns
+those rows into the graph the progression engine navigates (held by the
+exercise catalog snapshot, see ``app.exercise_catalog``).
 """
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
 
 # (exercise_name, target_reps_to_advance, target_sets_to_advance, sessions_to_advance,
 #  suggested_starting_sets, suggested_starting_reps)
@@ -113,13 +119,16 @@ CHAINS: dict[str, list[tuple[str, int, int, int, int, str]]] = {
 }
 
 
+# Name -> (chain_name, position); an exercise in several chains keeps its first
+_POSITIONS: dict[str, tuple[str, int]] = {}
+for _chain_name, _exercises in CHAINS.items():
+    for _pos, (_name, *_) in enumerate(_exercises):
+        _POSITIONS.setdefault(_name, (_chain_name, _pos))
+
+
 def get_chain_for_exercise(exercise_name: str) -> tuple[str, int] | None:
     """Return (chain_name, position) if this exercise belongs to any chain."""
-    for chain_name, exercises in CHAINS.items():
-        for pos, (name, *_) in enumerate(exercises):
-            if name == exercise_name:
-                return (chain_name, pos)
-    return None
+    return _POSITIONS.get(exercise_name)
 
 
 def get_next_in_chain(chain_name: str, current_position: int) -> tuple[str, str] | None:
@@ -144,3 +153,70 @@ def get_prev_in_chain(chain_name: str, current_position: int) -> tuple[str, str]
         return None
     name, _, _, _, _, reps = chain[prev_pos]
     return (name, reps)
+
+
+# ── Compiled graph (from the exercise_progressions table) ───────────────────
+
+@dataclass(frozen=True)
+class ChainNode:
+    """One exercise's place in its chain, with its neighbours' exercise ids."""
+    exercise_id: int
+    exercise_name: str
+    chain_name: str
+    position: int
+    target_reps_to_advance: int
+    target_sets_to_advance: int
+    sessions_to_advance: int
+    suggested_starting_sets: int
+    suggested_starting_reps: str
+    prev_id: Optional[int]
+    next_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class ChainGraph:
+    """Chain entries by exercise id and by (chain, position); lookups are dict gets."""
+    by_exercise: dict[int, ChainNode]
+    by_position: dict[tuple[str, int], ChainNode]
+
+    def get(self, exercise_id: int) -> Optional[ChainNode]:
+        return self.by_exercise.get(exercise_id)
+
+    def next(self, node: ChainNode) -> Optional[ChainNode]:
+        """The next progression in the same chain (its own starting sets / reps)."""
+        return self.by_position.get((node.chain_name, node.position + 1))
+
+    def prev(self, node: ChainNode) -> Optional[ChainNode]:
+        """The previous regression in the same chain."""
+        return self.by_position.get((node.chain_name, node.position - 1))
+
+
+def compile_chains(rows: Iterable) -> ChainGraph:
+    """Build the graph from (ExerciseProgression, exercise name) rows in id order.
+
+    Neighbours are the entries at position -1 / +1 of the same chain (a
+    chain exercise missing from the catalog leaves a gap, which ends the
+    chain there). An exercise in several chains is looked up by its first
+    entry.
+    """
+    rows = list(rows)
+    at = {(entry.chain_name, entry.position): entry.exercise_id for entry, _ in rows}
+    by_exercise: dict[int, ChainNode] = {}
+    by_position: dict[tuple[str, int], ChainNode] = {}
+    for entry, name in rows:
+        node = ChainNode(
+            exercise_id=entry.exercise_id,
+            exercise_name=name,
+            chain_name=entry.chain_name,
+            position=entry.position,
+            target_reps_to_advance=entry.target_reps_to_advance,
+            target_sets_to_advance=entry.target_sets_to_advance,
+            sessions_to_advance=entry.sessions_to_advance,
+            suggested_starting_sets=entry.suggested_starting_sets,
+            suggested_starting_reps=entry.suggested_starting_reps,
+            prev_id=at.get((entry.chain_name, entry.position - 1)),
+            next_id=at.get((entry.chain_name, entry.position + 1)),
+        )
+        by_position[(node.chain_name, node.position)] = node
+        by_exercise.setdefault(node.exercise_id, node)
+    return ChainGraph(by_exercise=by_exercise, by_position=by_position)
@@ -17,10 +17,10 @@ from typing import Optional
 from sqlalchemy import desc, func as sa_func
 from sqlalchemy.orm import Session as DBSession
 
+from app.exercise_catalog import CatalogExercise, get_catalog
 from app.models.session import Session as SessionModel, Set as SetModel
 from app.models.exercise import Exercise
 from app.models.routine import Routine
-from app.models.progression import ExerciseProgression
 from app.models.user_preference import UserPreference
 
 logger = logging.getLogger(__name__)
@@ -131,58 +131,101 @@ def _get_weight_increment(exercise: Exercise) -> float:
     return WEIGHT_INCREMENTS["default"]
 
 
-def _get_session_history(
-    user_id: int, exercise_id: int, routine_id: int, db: DBSession, limit: int = MAX_HISTORY
-) -> list[dict]:
+def _load_histories(
+    user_id: int, exercise_ids: list[int], routine_id: int, db: DBSession, limit: int = MAX_HISTORY
+) -> dict[int, list[dict]]:
     """
-    Fetch the last N completed sessions containing this exercise, newest first.
-    Returns list of {session_id, completed_at, sets: [{weight_kg, reps, set_number}]}
+    Fetch, for each exercise, the last N completed sessions of the routine containing it, newest first.
+    One query: the normal sets of these exercises in the routine's last 2N completed sessions.
+    Returns {exercise_id: [{session_id, completed_at, sets: [{weight_kg, reps, set_number, ...}]}]}
     """
-    sessions = (
-        db.query(SessionModel)
+    histories: dict[int, list[dict]] = {eid: [] for eid in exercise_ids}
+    if not exercise_ids:
+        return histories
+
+    recent_sessions = (
+        db.query(SessionModel.id)
         .filter(
             SessionModel.user_id == user_id,
             SessionModel.routine_id == routine_id,
             SessionModel.completed_at.isnot(None),
         )
-        .order_by(desc(SessionModel.completed_at))
-        .limit(limit * 2)  # fetch extra in case some sessions lack this exercise
+        .order_by(desc(SessionModel.completed_at), desc(SessionModel.id))
+        .limit(limit * 2)  # fetch extra in case some sessions lack the exercise
+        .subquery()
+    )
+    rows = (
+        db.query(SetModel, SessionModel.completed_at)
+        .join(SessionModel, SetModel.session_id == SessionModel.id)
+        .filter(
+            SetModel.session_id.in_(db.query(recent_sessions.c.id)),
+            SetModel.exercise_id.in_(exercise_ids),
+            sa_func.coalesce(SetModel.set_type, "normal") == "normal",
+        )
+        .order_by(desc(SessionModel.completed_at), desc(SessionModel.id), SetModel.set_number)
         .all()
     )
 
-    history = []
-    for sess in sessions:
-        exercise_sets = (
-            db.query(SetModel)
-            .filter(
-                SetModel.session_id == sess.id,
-                SetModel.exercise_id == exercise_id,
-                sa_func.coalesce(SetModel.set_type, "normal") == "normal",
-            )
-            .order_by(SetModel.set_number)
-            .all()
-        )
-        if not exercise_sets:
-            continue
-        history.append({
-            "session_id": sess.id,
-            "completed_at": sess.completed_at,
-            "sets": [
-                {
-                    "weight_kg": s.weight_kg or 0,
-                    "reps": s.reps or 0,
-                    "duration_sec": s.duration_sec or 0,
-                    "distance_km": s.distance_km or 0,
-                    "avg_pace": s.avg_pace or 0,
-                    "set_number": s.set_number,
-                }
-                for s in exercise_sets
-            ],
+    for s, completed_at in rows:
+        history = histories[s.exercise_id]
+        if not history or history[-1]["session_id"] != s.session_id:
+            if len(history) >= limit:
+                continue
+            history.append({"session_id": s.session_id, "completed_at": completed_at, "sets": []})
+        history[-1]["sets"].append({
+            "weight_kg": s.weight_kg or 0,
+            "reps": s.reps or 0,
+            "duration_sec": s.duration_sec or 0,
+            "distance_km": s.distance_km or 0,
+            "avg_pace": s.avg_pace or 0,
+            "set_number": s.set_number,
         })
-        if len(history) >= limit:
-            break
 
-    return history
+    return histories
+
+
+@dataclass
+class ProgressionContext:
+    """What one request's analyses share: the routine, the user's tier, the exercises and their histories."""
+    user_id: int
+    routine: Routine
+    experience_tier: str
+    exercises: dict[int, Exercise]
+    histories: dict[int, list[dict]]
+
+
+def _routine_exercise_ids(routine: Routine, day_index: int | None = None) -> list[int]:
+    days = routine.days or []
+    search_days = [days[day_index]] if day_index is not None and 0 <= day_index < len(days) else days
+    ids: list[int] = []
+    for day in search_days:
+        for ex in day.get("exercises", []):
+            eid = ex.get("exercise_id")
+            if eid and eid not in ids:
+                ids.append(eid)
+    return ids
+
+
+def load_progression_context(
+    user_id: int,
+    routine: Routine,
+    db: DBSession,
+    exercise_ids: list[int] | None = None,
+) -> ProgressionContext:
+    """
+    Load everything the analysers need for these exercises (default: every exercise
+    in the routine) in a fixed number of queries, whatever the number of exercises.
+    """
+    if exercise_ids is None:
+        exercise_ids = _routine_exercise_ids(routine)
+    exercises = {e.id: e for e in db.query(Exercise).filter(Exercise.id.in_(exercise_ids))} if exercise_ids else {}
+    return ProgressionContext(
+        user_id=user_id,
+        routine=routine,
+        experience_tier=_get_experience_tier(user_id, db),
+        exercises=exercises,
+        histories=_load_histories(user_id, list(exercises), routine.id, db),
+    )
 
 
 def _find_swap_alternative(
@@ -207,22 +250,14 @@ def _find_swap_alternative(
     if not exercise.muscle:
         return None, None
 
-    # Query candidates: same primary muscle, system exercises only, exclude existing
-    candidates = (
-        db.query(Exercise)
-        .filter(
-            Exercise.muscle == exercise.muscle,
-            Exercise.id.notin_(existing_ids),
-            Exercise.user_id.is_(None),  # system exercises only
-        )
-        .all()
-    )
+    # Candidates: same primary muscle, system exercises only, exclude existing
+    candidates = [c for c in get_catalog(db).by_muscle.get(exercise.muscle, ()) if c.id not in existing_ids]
 
     if not candidates:
         return None, None
 
     # Score candidates: prefer same equipment, similar difficulty
-    def score(c: Exercise) -> float:
+    def score(c: CatalogExercise) -> float:
         s = 0.0
         if c.equipment and exercise.equipment and c.equipment.lower() == exercise.equipment.lower():
             s += 2.0
@@ -371,11 +406,8 @@ def _analyze_bodyweight(
         return None
 
     # Find this exercise in a chain
-    chain_entry = (
-        db.query(ExerciseProgression)
-        .filter(ExerciseProgression.exercise_id == exercise.id)
-        .first()
-    )
+    chains = get_catalog(db).chains
+    chain_entry = chains.get(exercise.id)
     if not chain_entry:
         # Not in a chain — fall back to strength-style analysis (reps-based)
         return _analyze_strength(history, exercise, routine_config, experience_tier, db, routine, day_index)
@@ -405,30 +437,21 @@ def _analyze_bodyweight(
 
     if consecutive_at_target >= sessions_needed:
         # Find next exercise in chain
-        next_entry = (
-            db.query(ExerciseProgression)
-            .filter(
-                ExerciseProgression.chain_name == chain_entry.chain_name,
-                ExerciseProgression.position == chain_entry.position + 1,
-            )
-            .first()
-        )
+        next_entry = chains.next(chain_entry)
         if next_entry:
-            next_exercise = db.get(Exercise, next_entry.exercise_id)
-            if next_exercise:
-                return ProgressionSuggestion(
-                    type="bw_progression",
-                    current=current,
-                    suggested={
-                        "weight": 0,
-                        "reps": next_entry.suggested_starting_reps,
-                        "sets": next_entry.suggested_starting_sets,
-                    },
-                    reason=f"You've hit {target_reps}+ reps for {consecutive_at_target} sessions. Progress to {next_exercise.name} at {next_entry.suggested_starting_sets}×{next_entry.suggested_starting_reps}.",
-                    confidence=0.85,
-                    new_exercise_id=next_exercise.id,
-                    new_exercise_name=next_exercise.name,
-                )
+            return ProgressionSuggestion(
+                type="bw_progression",
+                current=current,
+                suggested={
+                    "weight": 0,
+                    "reps": next_entry.suggested_starting_reps,
+                    "sets": next_entry.suggested_starting_sets,
+                },
+                reason=f"You've hit {target_reps}+ reps for {consecutive_at_target} sessions. Progress to {next_entry.exercise_name} at {next_entry.suggested_starting_sets}×{next_entry.suggested_starting_reps}.",
+                confidence=0.85,
+                new_exercise_id=next_entry.exercise_id,
+                new_exercise_name=next_entry.exercise_name,
+            )
 
     # ── Rep increase suggestion (below target, encourage +1 rep) ────
     if avg_reps < target_reps and len(history) >= 1:
@@ -559,26 +582,32 @@ def analyze_exercise_progression(
     routine_id: int,
     db: DBSession,
     day_index: int | None = None,
+    ctx: ProgressionContext | None = None,
 ) -> ProgressionSuggestion | None:
     """
     Analyse session history for one exercise and return a suggestion (or None).
     This is the main entry point for mode (A) quick suggestions.
+
+    Pass ``ctx`` (see ``load_progression_context``) when analysing several exercises.
     """
-    exercise = db.get(Exercise, exercise_id)
-    if not exercise:
-        return None
+    if ctx is None:
+        routine = db.get(Routine, routine_id)
+        if not routine:
+            return None
+        ctx = load_progression_context(user_id, routine, db, exercise_ids=[exercise_id])
 
-    routine = db.get(Routine, routine_id)
-    if not routine:
+    exercise = ctx.exercises.get(exercise_id)
+    if not exercise:
         return None
 
+    routine = ctx.routine
     routine_config = _get_routine_exercise_config(routine, day_index, exercise_id)
-    history = _get_session_history(user_id, exercise_id, routine_id, db)
+    history = ctx.histories.get(exercise_id)
 
     if not history:
         return None
 
-    experience_tier = _get_experience_tier(user_id, db)
+    experience_tier = ctx.experience_tier
 
     # Route to appropriate analyser
     ex_type = (exercise.type or "Strength").lower()
@@ -596,12 +625,13 @@ def analyze_routine_day(
     routine_id: int,
     day_index: int,
     db: DBSession,
+    ctx: ProgressionContext | None = None,
 ) -> dict[int, dict]:
     """
     Analyse all exercises in a routine day. Returns {exercise_id: suggestion_dict}.
-    Used by the batch endpoint.
+    Used by the batch endpoint; the full report passes one ``ctx`` for every day.
     """
-    routine = db.get(Routine, routine_id)
+    routine = ctx.routine if ctx is not None else db.get(Routine, routine_id)
     if not routine:
         return {}
 
@@ -609,6 +639,9 @@ def analyze_routine_day(
     if day_index < 0 or day_index >= len(days):
         return {}
 
+    if ctx is None:
+        ctx = load_progression_context(user_id, routine, db, exercise_ids=_routine_exercise_ids(routine, day_index))
+
     day = days[day_index]
     results = {}
 
@@ -616,7 +649,7 @@ def analyze_routine_day(
         exercise_id = ex_config.get("exercise_id")
         if not exercise_id:
             continue
-        suggestion = analyze_exercise_progression(user_id, exercise_id, routine_id, db, day_index)
+        suggestion = analyze_exercise_progression(user_id, exercise_id, routine_id, db, day_index, ctx=ctx)
         if suggestion and suggestion.type != "none":
             results[exercise_id] = suggestion.to_dict()
 
@@ -0,0 +1,401 @@
+"""Background progression reports (``progression_report_jobs``).
+
+``POST /api/progression/report/{routine_id}`` only checks that the user can
+pay and enqueues a job (one unfinished job per user); the client polls
+``GET /api/progression/report/jobs/{id}``.
+A job runs in three steps, so no database connection is held while OpenAI
+answers:
+
+  1. analysis (own session, in a thread): the funds are checked again, then
+     algorithmic suggestions for every day of the routine, and the AI prompt;
+  2. AI enrichment, awaited with no session open (if it fails the report
+     carries the algorithmic suggestions only);
+  3. store (own session, in a thread): the coin or joker charge, the AI
+     usage log, the ``ProgressionReport`` row and ``status = done`` in one
+     transaction. A user who can no longer pay gets ``failed`` and is not
+     charged.
+
+At most PROGRESSION_REPORT_CONCURRENCY jobs run at a time per process. Jobs
+start right after the response (FastAPI background task);
+``run_progression_report_worker``, started with the app, picks up jobs left
+pending, or left running by a restart (for longer than
+PROGRESSION_REPORT_STALE_SECONDS).
+
+A job is claimed with a conditional UPDATE that also bumps ``attempts``, and
+the store step only applies while the job is still running on that attempt,
+so each report is charged and stored at most once.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session as DBSession, sessionmaker
+
+from app.config import get_env
+from app.models.progression import ProgressionReport, ProgressionReportJob
+from app.models.routine import Routine
+from app.models.user import User
+from app.stats_cache import bump_stats_version
+
+logger = logging.getLogger(__name__)
+
+PROGRESSION_REPORT_COST = 50
+PROGRESSION_REPORT_CONCURRENCY = int(get_env("PROGRESSION_REPORT_CONCURRENCY", "2"))
+PROGRESSION_REPORT_STALE_SECONDS = float(get_env("PROGRESSION_REPORT_STALE_SECONDS", "300"))
+PROGRESSION_REPORT_MAX_ATTEMPTS = int(get_env("PROGRESSION_REPORT_MAX_ATTEMPTS", "3"))
+PROGRESSION_REPORT_WORKER_POLL_SECONDS = float(get_env("PROGRESSION_REPORT_WORKER_POLL_SECONDS", "10"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+AI_UNAVAILABLE = {
+    "overall_assessment": "AI analysis unavailable. See per-exercise suggestions below.",
+    "periodization_note": None,
+    "exercise_enrichments": {},
+}
+AI_FAILED = {
+    "overall_assessment": "AI analysis unavailable.",
+    "periodization_note": None,
+    "exercise_enrichments": {},
+}
+
+
+def enqueue_report(db: DBSession, user: User, routine_id: int,
+                   user_context: Optional[str] = None, use_joker: bool = False) -> ProgressionReportJob:
+    """Add a report job (flushed, not committed), or return the user's unfinished one for the routine.
+
+    A user has at most one unfinished job: while it runs the charge isn't
+    made yet, so a second one could pass the funds check too and make an AI
+    call nobody pays for. Raises HTTP 409 if the unfinished job is for
+    another routine and HTTP 402 up front if the user can't pay; the charge
+    itself is made when the report is stored. Caller commits.
+    """
+    from app.gamification import check_funds
+
+    query = db.query(User.id).filter(User.id == user.id)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()  # serializes concurrent enqueues for the user
+    query.first()
+
+    existing = (
+        db.query(ProgressionReportJob)
+        .filter(
+            ProgressionReportJob.user_id == user.id,
+            ProgressionReportJob.status.in_((PENDING, RUNNING)),
+        )
+        .order_by(ProgressionReportJob.id.desc())
+        .first()
+    )
+    if existing is not None:
+        if existing.routine_id != routine_id:
+            raise HTTPException(status_code=409, detail="A progression report is already being generated")
+        return existing
+
+    check_funds(user, PROGRESSION_REPORT_COST, use_joker=use_joker)
+    job = ProgressionReportJob(
+        user_id=user.id, routine_id=routine_id, user_context=user_context,
+        use_joker=use_joker, status=PENDING, attempts=0,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def job_payload(job: ProgressionReportJob) -> dict:
+    payload = {"job_id": job.id, "routine_id": job.routine_id, "status": job.status, "error": job.error, "report": None}
+    if job.status == DONE and job.report is not None:
+        payload["report"] = {
+            "report_id": job.report.id,
+            "created_at": str(job.report.created_at),
+            **job.report.report_data,
+        }
+    return payload
+
+
+def _claim(db: DBSession, job_id: int) -> Optional[int]:
+    """Mark a pending (or stale running) job as running. Returns this attempt's number, or None."""
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=PROGRESSION_REPORT_STALE_SECONDS)
+    claimed = (
+        db.query(ProgressionReportJob)
+        .filter(
+            ProgressionReportJob.id == job_id,
+            or_(
+                ProgressionReportJob.status == PENDING,
+                and_(ProgressionReportJob.status == RUNNING, ProgressionReportJob.started_at < stale),
+            ),
+        )
+        .update({
+            ProgressionReportJob.status: RUNNING,
+            ProgressionReportJob.started_at: now,
+            ProgressionReportJob.attempts: ProgressionReportJob.attempts + 1,
+        }, synchronize_session=False)
+    )
+    if not claimed:
+        db.rollback()
+        return None
+    db.commit()
+    return db.query(ProgressionReportJob.attempts).filter(ProgressionReportJob.id == job_id).scalar()
+
+
+def _analyze(db: DBSession, job: ProgressionReportJob) -> Optional[dict]:
+    """Algorithmic suggestions per day name and the AI prompt, or None if the routine is gone."""
+    from app.openai_service import build_report_prompt
+    from app.progression_engine import analyze_routine_day, load_progression_context
+
+    routine = db.query(Routine).filter(Routine.id == job.routine_id, Routine.user_id == job.user_id).first()
+    user = db.get(User, job.user_id)
+    if routine is None or user is None:
+        return None
+
+    # History for the whole routine is loaded once
+    ctx = load_progression_context(user.id, routine, db)
+    algorithmic_results = {}
+    for day_idx, day in enumerate(routine.days or []):
+        day_suggestions = analyze_routine_day(
+            user_id=user.id,
+            routine_id=routine.id,
+            day_index=day_idx,
+            db=db,
+            ctx=ctx,
+        )
+        if day_suggestions:
+            algorithmic_results[day["day_name"]] = day_suggestions
+
+    return {
+        "routine_name": routine.name,
+        "algorithmic_results": algorithmic_results,
+        "prompt": build_report_prompt(db, user, routine, algorithmic_results, job.user_context),
+    }
+
+
+def _report_data(routine_name: str, algorithmic_results: dict, ai_result: dict) -> dict:
+    """Combine the algorithmic suggestions with the AI enrichment."""
+    report_data = {
+        "routine_name": routine_name,
+        "overall_assessment": ai_result.get("overall_assessment", ""),
+        "periodization_note": ai_result.get("periodization_note"),
+        "days": {},
+    }
+
+    enrichments = ai_result.get("exercise_enrichments", {})
+    for day_name, suggestions in algorithmic_results.items():
+        day_report = {}
+        for ex_id_str, suggestion in suggestions.items():
+            ex_id = str(ex_id_str)
+            enrichment = enrichments.get(ex_id, {})
+            alt = enrichment.get("alternative")
+            entry = {
+                **suggestion,
+                "ai_note": enrichment.get("note"),
+            }
+            # For exercise_swap, promote the AI-suggested replacement to the primary target
+            if suggestion.get("type") == "exercise_swap" and alt:
+                entry["new_exercise_id"] = alt.get("exercise_id")
+                entry["new_exercise_name"] = alt.get("name")
+            day_report[ex_id] = entry
+        report_data["days"][day_name] = day_report
+    return report_data
+
+
+def _finish(db: DBSession, job_id: int, status: str, error: Optional[str] = None) -> None:
+    job = db.get(ProgressionReportJob, job_id)
+    if job is None:
+        return
+    job.status = status
+    job.error = error
+    job.processed_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def _record_failure(db: DBSession, job_id: int, exc: Exception) -> None:
+    """Put the job back to pending for the worker, or fail it after the last attempt."""
+    job = db.get(ProgressionReportJob, job_id)
+    if job is None:
+        return
+    job.error = f"{type(exc).__name__}: {exc}"[:2000]
+    if (job.attempts or 0) >= PROGRESSION_REPORT_MAX_ATTEMPTS:
+        job.status = FAILED
+        job.processed_at = datetime.now(timezone.utc)
+    else:
+        job.status = PENDING
+    db.commit()
+
+
+def _open(bind: Engine | Connection) -> DBSession:
+    return sessionmaker(autocommit=False, autoflush=False, bind=bind)()
+
+
+def _start_job(bind: Engine | Connection, job_id: int) -> Optional[dict]:
+    """Step 1: claim the job and run the analysis. None if there is nothing (more) to do."""
+    from app.gamification import check_funds
+
+    db = _open(bind)
+    try:
+        attempt = _claim(db, job_id)
+        if attempt is None:
+            return None
+        job = db.get(ProgressionReportJob, job_id)
+        user = db.get(User, job.user_id)
+        # Coins spent since the enqueue: fail before the AI call rather than at the charge
+        try:
+            if user is not None:
+                check_funds(user, PROGRESSION_REPORT_COST, use_joker=job.use_joker)
+        except HTTPException as exc:
+            db.rollback()
+            _finish(db, job_id, FAILED, exc.detail)
+            return None
+        analysis = _analyze(db, job)
+        if analysis is None:
+            db.rollback()
+            _finish(db, job_id, FAILED, "Routine not found")
+            return None
+        analysis["attempt"] = attempt
+        return analysis
+    except Exception as exc:
+        db.rollback()
+        logger.exception("Progression report job %s failed", job_id)
+        _record_failure(db, job_id, exc)
+        return None
+    finally:
+        db.close()
+
+
+async def _enrich(prompt: str) -> tuple[dict, Optional[dict]]:
+    """Step 2: the AI enrichment and its usage log fields (None when the AI wasn't reached)."""
+    from app.openai_service import generate_report_ai
+
+    try:
+        return await generate_report_ai(prompt)
+    except (ValueError, RuntimeError):
+        return AI_UNAVAILABLE, None
+    except Exception:
+        logger.exception("Progression report AI enrichment failed")
+        return AI_FAILED, None
+
+
+def _store_report(bind: Engine | Connection, job_id: int, analysis: dict,
+                  ai_result: dict, usage_log: Optional[dict]) -> None:
+    """Step 3: charge, store the report and finish the job in one transaction."""
+    from app.gamification import deduct_coins
+    from app.openai_service import record_ai_usage
+
+    db = _open(bind)
+    try:
+        query = db.query(ProgressionReportJob).filter(
+            ProgressionReportJob.id == job_id,
+            ProgressionReportJob.status == RUNNING,
+            ProgressionReportJob.attempts == analysis["attempt"],
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update()
+        job = query.first()
+        if job is None:
+            db.rollback()  # taken over by a later attempt
+            return
+
+        user = db.get(User, job.user_id)
+        try:
+            deduct_coins(db, user, PROGRESSION_REPORT_COST, use_joker=job.use_joker, source="progression_report")
+        except HTTPException as exc:
+            db.rollback()
+            _finish(db, job_id, FAILED, exc.detail)
+            return
+
+        usage_log = record_ai_usage(db, job.user_id, usage_log) if usage_log is not None else None
+
+        report = ProgressionReport(
+            user_id=job.user_id,
+            routine_id=job.routine_id,
+            report_data=_report_data(analysis["routine_name"], analysis["algorithmic_results"], ai_result),
+            ai_usage_log_id=usage_log.id if usage_log is not None else None,
+        )
+        db.add(report)
+        db.flush()
+
+        job.status = DONE
+        job.report_id = report.id
+        job.error = None
+        job.processed_at = datetime.now(timezone.utc)
+        user_id = job.user_id
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        logger.exception("Storing progression report job %s failed", job_id)
+        _record_failure(db, job_id, exc)
+        return
+    finally:
+        db.close()
+
+    bump_stats_version(user_id)
+
+
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _concurrency_slots() -> asyncio.Semaphore:
+    """The semaphore bounding concurrent report jobs on the running event loop."""
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(PROGRESSION_REPORT_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+async def run_report_job(bind: Engine | Connection, job_id: int) -> None:
+    """Run one job end to end (background-task and worker entry point)."""
+    async with _concurrency_slots():
+        analysis = await asyncio.to_thread(_start_job, bind, job_id)
+        if analysis is None:
+            return
+        ai_result, usage_log = await _enrich(analysis["prompt"])
+        await asyncio.to_thread(_store_report, bind, job_id, analysis, ai_result, usage_log)
+
+
+def _due_job_ids(limit: int = 20) -> list[int]:
+    """Jobs no background task is handling: pending for a poll interval, or running but stale."""
+    from app.database import SessionLocal
+
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        return [
+            job_id for (job_id,) in db.query(ProgressionReportJob.id)
+            .filter(or_(
+                and_(
+                    ProgressionReportJob.status == PENDING,
+                    ProgressionReportJob.created_at < now - timedelta(seconds=PROGRESSION_REPORT_WORKER_POLL_SECONDS),
+                ),
+                and_(
+                    ProgressionReportJob.status == RUNNING,
+                    ProgressionReportJob.started_at < now - timedelta(seconds=PROGRESSION_REPORT_STALE_SECONDS),
+                ),
+            ))
+            .order_by(ProgressionReportJob.id)
+            .limit(limit)
+        ]
+    finally:
+        db.close()
+
+
+async def run_progression_report_worker() -> None:
+    """Background loop: run leftover jobs every PROGRESSION_REPORT_WORKER_POLL_SECONDS."""
+    from app.database import engine
+
+    while True:
+        try:
+            job_ids = await asyncio.to_thread(_due_job_ids)
+            await asyncio.gather(*(run_report_job(engine, job_id) for job_id in job_ids))
+        except Exception:
+            logger.exception("Progression report worker sweep failed")
+        await asyncio.sleep(PROGRESSION_REPORT_WORKER_POLL_SECONDS)
@@ -0,0 +1,126 @@
+"""Stored progression suggestions (``progression_suggestions``).
+
+Suggestions for a routine day can only change when the routine's history
+does, so they are computed for every day of the routine right after one of
+its sessions completes (one shared ``ProgressionContext``) and stored per
+(user, routine, day) with the id of the routine's latest completed session.
+
+Reading is one primary-key lookup that only matches while that id is still
+the routine's latest session. Anything else (first view, a completion whose
+refresh hasn't run yet) is a miss: the day is recomputed and stored. Edits
+that change the history without changing its latest session (set edits on
+completed sessions, deleting a session, the routine's days, the user's
+experience level) delete the affected rows.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.progression import RoutineDaySuggestions
+from app.models.routine import Routine
+from app.models.session import Session as SessionModel
+from app.progression_engine import (
+    ProgressionContext,
+    _routine_exercise_ids,
+    analyze_exercise_progression,
+    load_progression_context,
+)
+
+
+def _latest_session_id(db: DBSession, user_id: int, routine_id: int):
+    return (
+        db.query(SessionModel.id)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.routine_id == routine_id,
+            SessionModel.completed_at.isnot(None),
+        )
+        .order_by(SessionModel.completed_at.desc(), SessionModel.id.desc())
+        .limit(1)
+    )
+
+
+def _compute_day(db: DBSession, ctx: ProgressionContext, day_index: int) -> dict[str, Optional[dict]]:
+    suggestions = {}
+    for exercise_id in _routine_exercise_ids(ctx.routine, day_index):
+        suggestion = analyze_exercise_progression(ctx.user_id, exercise_id, ctx.routine.id, db, day_index, ctx=ctx)
+        suggestions[str(exercise_id)] = suggestion.to_dict() if suggestion and suggestion.type != "none" else None
+    return suggestions
+
+
+def _store(db: DBSession, user_id: int, routine_id: int, day_index: int,
+           last_session_id: Optional[int], suggestions: dict) -> None:
+    row = db.get(RoutineDaySuggestions, (user_id, routine_id, day_index))
+    if row is None:
+        row = RoutineDaySuggestions(user_id=user_id, routine_id=routine_id, day_index=day_index)
+        db.add(row)
+    row.last_session_id = last_session_id
+    row.suggestions = suggestions
+    row.computed_at = datetime.now(timezone.utc)
+
+
+def routine_day_suggestions(db: DBSession, user_id: int, routine_id: int,
+                            day_index: int) -> Optional[dict[str, Optional[dict]]]:
+    """Suggestions for every exercise of a routine day (None if the user has no such routine).
+
+    Served from the stored row when it is current; otherwise computed,
+    stored and committed.
+    """
+    stored = (
+        db.query(RoutineDaySuggestions.suggestions)
+        .filter(
+            RoutineDaySuggestions.user_id == user_id,
+            RoutineDaySuggestions.routine_id == routine_id,
+            RoutineDaySuggestions.day_index == day_index,
+            func.coalesce(RoutineDaySuggestions.last_session_id, 0)
+            == func.coalesce(_latest_session_id(db, user_id, routine_id).scalar_subquery(), 0),
+        )
+        .first()
+    )
+    if stored is not None:
+        return stored.suggestions
+
+    routine = db.query(Routine).filter(Routine.id == routine_id, Routine.user_id == user_id).first()
+    if not routine:
+        return None
+    if day_index < 0 or day_index >= len(routine.days or []):
+        return {}
+
+    ctx = load_progression_context(user_id, routine, db, exercise_ids=_routine_exercise_ids(routine, day_index))
+    suggestions = _compute_day(db, ctx, day_index)
+    _store(db, user_id, routine_id, day_index, _latest_session_id(db, user_id, routine_id).scalar(), suggestions)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # stored concurrently by another request
+    return suggestions
+
+
+def refresh_routine_suggestions(db: DBSession, user_id: int, routine_id: int) -> None:
+    """Recompute and store suggestions for every day of the routine. Caller commits."""
+    routine = db.query(Routine).filter(Routine.id == routine_id, Routine.user_id == user_id).first()
+    if not routine:
+        return
+    last_session_id = _latest_session_id(db, user_id, routine_id).scalar()
+    ctx = load_progression_context(user_id, routine, db)
+    for day_index in range(len(routine.days or [])):
+        _store(db, user_id, routine_id, day_index, last_session_id, _compute_day(db, ctx, day_index))
+
+
+def invalidate_suggestions(db: DBSession, user_id: int, routine_id: Optional[int] = None) -> None:
+    """Drop the stored suggestions of one routine (default: all the user's routines). Caller commits."""
+    query = db.query(RoutineDaySuggestions).filter(RoutineDaySuggestions.user_id == user_id)
+    if routine_id is not None:
+        query = query.filter(RoutineDaySuggestions.routine_id == routine_id)
+    query.delete(synchronize_session=False)
+
+
+def invalidate_session_suggestions(db: DBSession, session_obj: SessionModel) -> None:
+    """Drop the stored suggestions a completed session's history feeds into. Caller commits."""
+    if session_obj.completed_at is not None and session_obj.routine_id is not None:
+        invalidate_suggestions(db, session_obj.user_id, session_obj.routine_id)
@@ -5,20 +5,29 @@ Computes per-exercise trends, plateau flags, PRs, NSS trends,
 and consistency metrics. Designed to keep token usage low while
 giving the AI meaningful context.
 
+The per-exercise numbers come from one grouped query (a row per session
+and exercise, with all-time bests as window columns). The training part is
+memoized in the stats cache per (user, routine, latest completed session),
+so repeated prompts for the same routine don't recompute it.
+
 Reused by both Coach Chat (mode B) and Progression Report (mode C).
 """
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
-from sqlalchemy import desc, func
+from sqlalchemy import func
 from sqlalchemy.orm import Session as DBSession
 
+from app.exercise_catalog import get_catalog
 from app.models.session import Session as SessionModel, Set as SetModel
 from app.models.exercise import Exercise
 from app.models.routine import Routine
 from app.models.user_preference import UserPreference
+from app.progression_suggestions import _latest_session_id
+from app.stats_cache import cached_stats
+from app.training_calendar import TrainingCalendar
 # DIFFICULTY_FACTORS and BW_RATIOS available in app.exercise_scoring if needed for NSS
 
 logger = logging.getLogger(__name__)
@@ -68,45 +77,6 @@ def build_progress_summary(
     if not routine:
         return {"overall": {}, "exercises": [], "user_context": {}}
 
-    # ── Overall stats ────────────────────────────────────────────────
-    completed_sessions = (
-        db.query(SessionModel)
-        .filter(
-            SessionModel.user_id == user_id,
-            SessionModel.routine_id == routine_id,
-            SessionModel.completed_at.isnot(None),
-        )
-        .order_by(desc(SessionModel.completed_at))
-        .all()
-    )
-
-    total_sessions = len(completed_sessions)
-
-    # Consistency streak (consecutive weeks)
-    consistency_streak = 0
-    if completed_sessions:
-        now = datetime.now(timezone.utc)
-        current_week_start = now - timedelta(days=now.weekday())
-        week_start = current_week_start
-        for _ in range(52):  # max 1 year
-            week_end = week_start + timedelta(days=7)
-            has_session = any(
-                week_start.date() <= s.completed_at.date() < week_end.date()
-                for s in completed_sessions
-                if s.completed_at
-            )
-            if has_session:
-                consistency_streak += 1
-                week_start -= timedelta(days=7)
-            else:
-                break
-
-    # Weeks active
-    weeks_active = 0
-    if completed_sessions and completed_sessions[-1].completed_at:
-        first_session = completed_sessions[-1].completed_at
-        weeks_active = max(1, (datetime.now(timezone.utc) - first_session).days // 7)
-
     # ── Gather exercises to analyse ──────────────────────────────────
     days = routine.days or []
     if day_index is not None and 0 <= day_index < len(days):
@@ -121,44 +91,70 @@ def build_progress_summary(
             if eid and eid not in exercise_ids:
                 exercise_ids.append(eid)
 
+    # Training part: only changes with the routine's sessions (the key's latest
+    # session; set edits bump the stats version) and with the exercise list.
+    last_session_id = _latest_session_id(db, user_id, routine_id).scalar()
+    progress = cached_stats(
+        "progress_summary", user_id, (routine_id, last_session_id, tuple(exercise_ids)),
+        lambda: _training_progress(db, user_id, routine_id, exercise_ids),
+    )
+
+    # ── User context ─────────────────────────────────────────────────
+    pref = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+    user_context = {
+        "goal": pref.primary_goal if pref else None,
+        "experience": pref.experience_level if pref else None,
+        "injuries": pref.injured_areas if pref and pref.has_injuries == "Yes" else [],
+        "equipment": pref.available_equipment if pref else [],
+        "progression_pace": pref.progression_pace if pref else None,
+    }
+
+    return {
+        "overall": progress["overall"],
+        "exercises": progress["exercises"],
+        "user_context": user_context,
+    }
+
+
+def _training_progress(db: DBSession, user_id: int, routine_id: int, exercise_ids: list[int]) -> dict:
+    """The "overall" and "exercises" parts of the summary (two queries, plus one for custom exercises)."""
+    # ── Overall stats ────────────────────────────────────────────────
+    completed_at = [
+        _utc(row.completed_at)
+        for row in db.query(SessionModel.completed_at).filter(
+            SessionModel.user_id == user_id,
+            SessionModel.routine_id == routine_id,
+            SessionModel.completed_at.isnot(None),
+        )
+    ]
+    total_sessions = len(completed_at)
+
+    # Consistency streak (consecutive weeks, including the current one; max 1 year)
+    calendar = TrainingCalendar.from_datetimes(completed_at)
+    consistency_streak = calendar.streak(datetime.now(timezone.utc), max_weeks=52, current_week_grace=False)
+
+    # Weeks active
+    weeks_active = 0
+    if completed_at:
+        weeks_active = max(1, (datetime.now(timezone.utc) - min(completed_at)).days // 7)
+
     # ── Per-exercise analysis ────────────────────────────────────────
     exercises_summary = []
     recent_prs = []
 
+    per_exercise_sessions = _session_aggregates(db, user_id, routine_id, exercise_ids) if total_sessions else {}
+    exercises_by_id = _exercise_info(db, [eid for eid in exercise_ids if eid in per_exercise_sessions])
+
     for exercise_id in exercise_ids:
-        exercise = db.get(Exercise, exercise_id)
+        exercise = exercises_by_id.get(exercise_id)
         if not exercise:
             continue
 
-        # Get all sets for this exercise across completed sessions of this routine
-        session_ids = [s.id for s in completed_sessions]
-        if not session_ids:
-            continue
-
-        sets_by_session = {}
-        all_sets = (
-            db.query(SetModel)
-            .filter(
-                SetModel.session_id.in_(session_ids),
-                SetModel.exercise_id == exercise_id,
-            )
-            .all()
-        )
-
-        for s in all_sets:
-            sets_by_session.setdefault(s.session_id, []).append(s)
-
-        # Order sessions newest first
-        ordered_sessions = [
-            (sess, sets_by_session.get(sess.id, []))
-            for sess in completed_sessions
-            if sess.id in sets_by_session
-        ]
-
+        # Sessions newest first
+        ordered_sessions = per_exercise_sessions.get(exercise_id)
         if not ordered_sessions:
             continue
 
-        sessions_tracked = len(ordered_sessions)
         ex_type = (exercise.type or "Strength").lower()
 
         if ex_type == "cardio":
@@ -169,7 +165,7 @@ def build_progress_summary(
         summary["exercise_id"] = exercise_id
         summary["name"] = exercise.name
         summary["type"] = exercise.type or "Strength"
-        summary["sessions_tracked"] = sessions_tracked
+        summary["sessions_tracked"] = ordered_sessions[0].sessions_tracked
 
         # Check for recent PRs (in last 2 sessions)
         if summary.get("is_pr"):
@@ -177,16 +173,6 @@ def build_progress_summary(
 
         exercises_summary.append(summary)
 
-    # ── User context ─────────────────────────────────────────────────
-    pref = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
-    user_context = {
-        "goal": pref.primary_goal if pref else None,
-        "experience": pref.experience_level if pref else None,
-        "injuries": pref.injured_areas if pref and pref.has_injuries == "Yes" else [],
-        "equipment": pref.available_equipment if pref else [],
-        "progression_pace": pref.progression_pace if pref else None,
-    }
-
     return {
         "overall": {
             "total_sessions": total_sessions,
@@ -195,35 +181,89 @@ def build_progress_summary(
             "recent_prs": recent_prs,
         },
         "exercises": exercises_summary,
-        "user_context": user_context,
     }
 
 
-def _summarize_strength(exercise: Exercise, ordered_sessions: list) -> dict:
-    """Summarise a strength/bodyweight exercise across sessions."""
-    # Extract per-session aggregates
-    session_stats = []
-    all_time_best_weight = 0
-    all_time_best_reps = 0
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
 
-    for sess, sets in ordered_sessions:
-        if not sets:
-            continue
-        max_weight = max((s.weight_kg or 0) for s in sets)
-        avg_reps = sum((s.reps or 0) for s in sets) / len(sets)
-        max_reps = max((s.reps or 0) for s in sets)
-        session_stats.append({
-            "max_weight": max_weight,
-            "avg_reps": round(avg_reps, 1),
-            "max_reps": max_reps,
-            "num_sets": len(sets),
-            "date": sess.completed_at,
-        })
 
-        if max_weight > all_time_best_weight:
-            all_time_best_weight = max_weight
-        if max_reps > all_time_best_reps:
-            all_time_best_reps = max_reps
+def _session_aggregates(db: DBSession, user_id: int, routine_id: int, exercise_ids: list[int]) -> dict[int, list]:
+    """Per-exercise list of per-session set aggregates, newest session first (one grouped query).
+
+    Every set type counts. Each row also carries the exercise's totals over
+    all its sessions (window functions): sessions tracked and all-time bests.
+    """
+    if not exercise_ids:
+        return {}
+    per_exercise = {"partition_by": SetModel.exercise_id}
+    max_weight = func.max(func.coalesce(SetModel.weight_kg, 0.0))
+    max_reps = func.max(func.coalesce(SetModel.reps, 0))
+    distance = func.sum(func.coalesce(SetModel.distance_km, 0.0))
+    duration = func.sum(func.coalesce(SetModel.duration_sec, 0))
+    rows = (
+        db.query(
+            SetModel.exercise_id,
+            SessionModel.completed_at,
+            func.count(SetModel.id).label("num_sets"),
+            max_weight.label("max_weight"),
+            max_reps.label("max_reps"),
+            func.sum(func.coalesce(SetModel.reps, 0)).label("reps_sum"),
+            distance.label("distance"),
+            duration.label("duration"),
+            func.count().over(**per_exercise).label("sessions_tracked"),
+            func.max(max_weight).over(**per_exercise).label("best_weight"),
+            func.max(max_reps).over(**per_exercise).label("best_reps"),
+            func.max(distance).over(**per_exercise).label("best_distance"),
+            func.max(duration).over(**per_exercise).label("best_duration"),
+        )
+        .join(SessionModel, SetModel.session_id == SessionModel.id)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.routine_id == routine_id,
+            SessionModel.completed_at.isnot(None),
+            SetModel.exercise_id.in_(exercise_ids),
+        )
+        .group_by(SetModel.exercise_id, SetModel.session_id, SessionModel.completed_at)
+        .order_by(SetModel.exercise_id, SessionModel.completed_at.desc(), SetModel.session_id.desc())
+        .all()
+    )
+    result: dict[int, list] = {}
+    for row in rows:
+        result.setdefault(row.exercise_id, []).append(row)
+    return result
+
+
+def _exercise_info(db: DBSession, exercise_ids: list[int]) -> dict:
+    """Name, type and bodyweight flag per exercise: the catalog, then one query for custom exercises."""
+    if not exercise_ids:
+        return {}
+    catalog = get_catalog(db).by_id
+    info = {eid: catalog[eid] for eid in exercise_ids if eid in catalog}
+    missing = [eid for eid in exercise_ids if eid not in info]
+    if missing:
+        for row in (
+            db.query(Exercise.id, Exercise.name, Exercise.type, Exercise.is_bodyweight)
+            .filter(Exercise.id.in_(missing))
+        ):
+            info[row.id] = row
+    return info
+
+
+def _summarize_strength(exercise, ordered_sessions: list) -> dict:
+    """Summarise a strength/bodyweight exercise across sessions."""
+    session_stats = [
+        {
+            "max_weight": float(sess.max_weight),
+            "avg_reps": round(sess.reps_sum / sess.num_sets, 1),
+            "max_reps": int(sess.max_reps),
+            "num_sets": sess.num_sets,
+            "date": _utc(sess.completed_at),
+        }
+        for sess in ordered_sessions
+    ]
+    all_time_best_weight = float(ordered_sessions[0].best_weight) if ordered_sessions else 0
+    all_time_best_reps = int(ordered_sessions[0].best_reps) if ordered_sessions else 0
 
     if not session_stats:
         return {"trend": "stalled", "plateau": False, "weeks_at_current_level": 0}
@@ -295,33 +335,18 @@ def _summarize_strength(exercise: Exercise, ordered_sessions: list) -> dict:
     }
 
 
-def _summarize_cardio(exercise: Exercise, ordered_sessions: list) -> dict:
+def _summarize_cardio(exercise, ordered_sessions: list) -> dict:
     """Summarise a cardio exercise across sessions."""
-    session_stats = []
-    best_distance = 0
-    best_duration = 0
-    best_pace = float("inf")
-
-    for sess, sets in ordered_sessions:
-        if not sets:
-            continue
-        total_dist = sum((s.distance_km or 0) for s in sets)
-        total_dur = sum((s.duration_sec or 0) for s in sets)
-        avg_pace = (total_dur / total_dist) if total_dist > 0 else 0
-
-        session_stats.append({
-            "distance": round(total_dist, 2),
-            "duration": total_dur,
-            "pace": round(avg_pace) if avg_pace else 0,
+    session_stats = [
+        {
+            "distance": round(float(sess.distance), 2),
+            "duration": int(sess.duration),
             "date": sess.completed_at,
-        })
-
-        if total_dist > best_distance:
-            best_distance = total_dist
-        if total_dur > best_duration:
-            best_duration = total_dur
-        if 0 < avg_pace < best_pace:
-            best_pace = avg_pace
+        }
+        for sess in ordered_sessions
+    ]
+    best_distance = float(ordered_sessions[0].best_distance) if ordered_sessions else 0
+    best_duration = int(ordered_sessions[0].best_duration) if ordered_sessions else 0
 
     if not session_stats:
         return {"trend": "stalled", "plateau": False, "weeks_at_current_level": 0}
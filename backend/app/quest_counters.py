@@ -0,0 +1,193 @@
+"""Event-driven quest progress counters (``user_quest_counters``).
+
+Each user has a ``lifetime`` row and one row per training week holding the
+totals quests are measured against (sessions, sets, volume, routine
+sessions, set duration, weight / rep PRs). A completion adds its deltas to
+both rows; editing or deleting a completed session applies the difference.
+Quest progress then reads two rows instead of aggregating the user's
+history.
+
+Users without a lifetime row (created before the table, or whose history
+was written outside the API) are initialised from their history once, on
+their next completion. PR counts start from zero at that point, and
+completions whose gamification job is still pending are left to their job.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session as DBSession
+
+from app.gamification_outbox import without_pending_award
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user_quest_counter import UserQuestCounter
+from app.training_calendar import week_monday
+
+LIFETIME = "lifetime"
+
+COUNTER_FIELDS = ("sessions", "sets", "volume", "routine_sessions", "duration_sec", "weight_prs", "rep_prs")
+
+
+def week_period(d: date | datetime) -> str:
+    """Counter period of a completion timestamp (Monday of its UTC week)."""
+    return week_monday(d).isoformat()
+
+
+def _set_totals(db: DBSession, session_ids: list[int]) -> dict[int, tuple[int, float, int]]:
+    """{session_id: (set count, non-warmup volume, duration_sec)} in one grouped query."""
+    if not session_ids:
+        return {}
+    volume = case(
+        (func.coalesce(SetModel.set_type, "normal") != "warmup", SetModel.weight_kg * SetModel.reps),
+        else_=None,
+    )
+    rows = (
+        db.query(
+            SetModel.session_id,
+            func.count(SetModel.id),
+            func.coalesce(func.sum(volume), 0),
+            func.coalesce(func.sum(SetModel.duration_sec), 0),
+        )
+        .filter(SetModel.session_id.in_(session_ids))
+        .group_by(SetModel.session_id)
+        .all()
+    )
+    return {sid: (int(count or 0), float(vol or 0), int(duration or 0)) for sid, count, vol, duration in rows}
+
+
+def session_deltas(db: DBSession, session: SessionModel) -> dict:
+    """What one completed session contributes to its counters (PRs excluded)."""
+    db.flush()
+    set_count, volume, duration = _set_totals(db, [session.id]).get(session.id, (0, 0.0, 0))
+    return {
+        "sessions": 1,
+        "sets": set_count,
+        "volume": volume,
+        "routine_sessions": 1 if session.routine_id is not None else 0,
+        "duration_sec": duration,
+    }
+
+
+def _counter_rows(db: DBSession, user_id: int, periods: list[str]) -> dict[str, UserQuestCounter]:
+    db.flush()
+    return {
+        row.period: row
+        for row in db.query(UserQuestCounter).filter(
+            UserQuestCounter.user_id == user_id,
+            UserQuestCounter.period.in_(periods),
+        )
+    }
+
+
+def _add(db: DBSession, user_id: int, rows: dict[str, UserQuestCounter], period: str, deltas: dict, sign: int) -> None:
+    row = rows.get(period)
+    if row is None:
+        row = UserQuestCounter(user_id=user_id, period=period, **{f: 0 for f in COUNTER_FIELDS})
+        db.add(row)
+        rows[period] = row
+    for field, value in deltas.items():
+        setattr(row, field, max(0, (getattr(row, field) or 0) + sign * value))
+
+
+def apply_counter_deltas(db: DBSession, user_id: int, completed_at: datetime, deltas: dict, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) deltas on the lifetime and week rows. Caller commits."""
+    if not any(deltas.values()):
+        return
+    period = week_period(completed_at)
+    rows = _counter_rows(db, user_id, [LIFETIME, period])
+    if LIFETIME not in rows:
+        return  # not initialised yet; the next completion rebuilds from history
+    _add(db, user_id, rows, LIFETIME, deltas, sign)
+    _add(db, user_id, rows, period, deltas, sign)
+
+
+def record_session_completion(db: DBSession, session: SessionModel, rep_prs: int = 0, weight_prs: int = 0) -> None:
+    """Advance counters for a newly completed session. Caller commits."""
+    prs = {"rep_prs": rep_prs, "weight_prs": weight_prs}
+    period = week_period(session.completed_at)
+    rows = _counter_rows(db, session.user_id, [LIFETIME, period])
+    if LIFETIME not in rows:
+        # First completion seen by the counters: initialise from the awarded history, then add this one
+        rebuild_user_quest_counters(db, session.user_id)
+        rows = _counter_rows(db, session.user_id, [LIFETIME, period])
+    deltas = {**session_deltas(db, session), **prs}
+    _add(db, session.user_id, rows, LIFETIME, deltas, 1)
+    _add(db, session.user_id, rows, period, deltas, 1)
+
+
+def remove_session_completion(db: DBSession, session: SessionModel, rep_prs: int = 0, weight_prs: int = 0) -> None:
+    """Take a completed session back out of the counters (call before deleting it). Caller commits."""
+    deltas = {**session_deltas(db, session), "rep_prs": rep_prs, "weight_prs": weight_prs}
+    apply_counter_deltas(db, session.user_id, session.completed_at, deltas, sign=-1)
+
+
+def sync_session_counters(db: DBSession, session: SessionModel, before: Optional[dict]) -> None:
+    """Apply the change of a completed session's set totals since ``before`` (no-op for drafts)."""
+    if session is None or session.completed_at is None or before is None:
+        return
+    after = session_deltas(db, session)
+    diff = {field: after[field] - before[field] for field in after}
+    apply_counter_deltas(db, session.user_id, session.completed_at, diff)
+
+
+def completed_session_deltas(db: DBSession, session: SessionModel) -> Optional[dict]:
+    """``session_deltas`` for a completed session, None for drafts (pair with sync_session_counters)."""
+    if session is None or session.completed_at is None:
+        return None
+    return session_deltas(db, session)
+
+
+def load_quest_counters(db: DBSession, user_id: int, today: date | datetime) -> tuple[dict, dict]:
+    """(lifetime, current week) counter values (missing rows read as zeros)."""
+    period = week_period(today)
+    rows = _counter_rows(db, user_id, [LIFETIME, period])
+
+    def values(row: Optional[UserQuestCounter]) -> dict:
+        return {f: (getattr(row, f) or 0) if row is not None else 0 for f in COUNTER_FIELDS}
+
+    return values(rows.get(LIFETIME)), values(rows.get(period))
+
+
+def rebuild_user_quest_counters(db: DBSession, user_id: int) -> int:
+    """Recompute the set-derived counters from history, keeping PR counts. Returns the number of rows kept.
+
+    Completions still waiting for their gamification job are left out; the
+    job adds them when it runs.
+    """
+    db.flush()
+    existing = {row.period: row for row in db.query(UserQuestCounter).filter(UserQuestCounter.user_id == user_id)}
+
+    completed = (
+        db.query(SessionModel.id, SessionModel.completed_at, SessionModel.routine_id)
+        .filter(SessionModel.user_id == user_id, SessionModel.completed_at.isnot(None), without_pending_award())
+        .all()
+    )
+    totals = _set_totals(db, [sid for sid, _, _ in completed])
+
+    by_period: dict[str, dict] = {LIFETIME: {}}
+    for sid, completed_at, routine_id in completed:
+        set_count, volume, duration = totals.get(sid, (0, 0.0, 0))
+        for period in (LIFETIME, week_period(completed_at)):
+            acc = by_period.setdefault(period, {})
+            acc["sessions"] = acc.get("sessions", 0) + 1
+            acc["sets"] = acc.get("sets", 0) + set_count
+            acc["volume"] = acc.get("volume", 0.0) + volume
+            acc["routine_sessions"] = acc.get("routine_sessions", 0) + (1 if routine_id is not None else 0)
+            acc["duration_sec"] = acc.get("duration_sec", 0) + duration
+
+    kept = 0
+    for period in set(by_period) | set(existing):
+        row = existing.get(period)
+        values = by_period.get(period)
+        if values is None and not (row.weight_prs or row.rep_prs):
+            db.delete(row)
+            continue
+        if row is None:
+            row = UserQuestCounter(user_id=user_id, period=period, weight_prs=0, rep_prs=0)
+            db.add(row)
+        for field in ("sessions", "sets", "volume", "routine_sessions", "duration_sec"):
+            setattr(row, field, (values or {}).get(field, 0))
+        kept += 1
+    return kept
@@ -0,0 +1,119 @@
+"""Append-only XP / coin / joker ledger (``reward_ledger``).
+
+Every change to a user's balances is recorded as one entry: session awards
+and their reversals, quest / streak / onboarding / promo rewards, shop and
+AI spending. Call sites take a ``balance_snapshot`` before touching the
+user and ``record_change`` afterwards, so an entry holds exactly what
+changed (level-up coins included) and the ledger sums to the balances.
+
+Session awards keep their breakdown (PR counts, routine completion) in
+``detail``, so deleting a session reverses what was actually granted with
+one indexed lookup instead of re-running the reward rules. Balances that
+predate the ledger are carried in as ``opening_balance`` entries.
+
+``python -m app.reward_ledger`` audits every user's balances against the
+ledger in one aggregate query.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.reward_ledger import RewardLedgerEntry
+from app.models.user import User
+
+# (total experience, coins, joker tokens)
+Balance = tuple[int, int, int]
+
+
+def total_experience(level: int | None, experience: int | None) -> int:
+    """Experience earned across all levels (levels cost ``level * 100``, see exp_for_next_level)."""
+    level = level or 1
+    return 50 * level * (level - 1) + (experience or 0)
+
+
+def balance_snapshot(user: User) -> Balance:
+    return total_experience(user.level, user.experience), user.currency or 0, user.joker_tokens or 0
+
+
+def record_change(db: DBSession, user: User, before: Balance, source: str,
+                  session_id: Optional[int] = None, detail: Optional[dict] = None) -> Optional[RewardLedgerEntry]:
+    """Record the difference between ``before`` and the user's balances now. Caller commits.
+
+    No-op when nothing changed, except for session entries, which are kept
+    so a reversal knows the session was awarded (and what it counted).
+    """
+    after = balance_snapshot(user)
+    xp, coins, jokers = (a - b for a, b in zip(after, before))
+    if not (xp or coins or jokers) and session_id is None:
+        return None
+    if user.id is None:
+        db.flush()
+    entry = RewardLedgerEntry(
+        user_id=user.id, session_id=session_id, source=source,
+        xp=xp, coins=coins, jokers=jokers, detail=detail,
+    )
+    db.add(entry)
+    return entry
+
+
+def record_opening_balance(db: DBSession, user: User) -> Optional[RewardLedgerEntry]:
+    """Carry balances written outside the ledger (new accounts, imports, demo seed) into it."""
+    return record_change(db, user, (0, 0, 0), "opening_balance")
+
+
+def session_award_entry(db: DBSession, user_id: int, session_id: int) -> Optional[RewardLedgerEntry]:
+    """The session's award entry, or None if it was completed before the ledger existed."""
+    return (
+        db.query(RewardLedgerEntry)
+        .filter(
+            RewardLedgerEntry.session_id == session_id,
+            RewardLedgerEntry.user_id == user_id,
+            RewardLedgerEntry.source == "session",
+        )
+        .order_by(RewardLedgerEntry.id.desc())
+        .first()
+    )
+
+
+def ledger_balances(db: DBSession, user_id: Optional[int] = None,
+                    user_ids: Optional[Iterable[int]] = None) -> dict[int, Balance]:
+    """{user_id: (xp, coins, jokers)} summed from the ledger (one grouped query)."""
+    query = db.query(
+        RewardLedgerEntry.user_id,
+        func.coalesce(func.sum(RewardLedgerEntry.xp), 0),
+        func.coalesce(func.sum(RewardLedgerEntry.coins), 0),
+        func.coalesce(func.sum(RewardLedgerEntry.jokers), 0),
+    )
+    if user_id is not None:
+        query = query.filter(RewardLedgerEntry.user_id == user_id)
+    if user_ids is not None:
+        query = query.filter(RewardLedgerEntry.user_id.in_(list(user_ids)))
+    return {uid: (int(xp), int(coins), int(jokers)) for uid, xp, coins, jokers in query.group_by(RewardLedgerEntry.user_id)}
+
+
+def audit_balances(db: DBSession) -> list[tuple[int, Balance, Balance]]:
+    """Users whose balances differ from their ledger: [(user_id, ledger, actual)]."""
+    ledger = ledger_balances(db)
+    mismatches = []
+    for user in db.query(User):
+        actual = balance_snapshot(user)
+        expected = ledger.get(user.id, (0, 0, 0))
+        if actual != expected:
+            mismatches.append((user.id, expected, actual))
+    return mismatches
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        mismatches = audit_balances(db)
+        for uid, expected, actual in mismatches:
+            print(f"user {uid}: ledger xp/coins/jokers={expected}, balances={actual}")
+        print(f"{'❌' if mismatches else '✅'} {len(mismatches)} users out of line with the reward ledger")
+    finally:
+        db.close()
@@ -7,7 +7,9 @@ from app.models.ai_usage_log import AIUsageLog
 from app.models.user import User
 from app.models.session import Session as SessionModel
 from app.models.exercise import Exercise
-from app.schemas import ExerciseCreate, ExerciseResponse, ExerciseUpdateAdmin
+from app.exercise_catalog import bump_catalog_version
+from app.schemas import ExerciseCreate, ExerciseResponse, ExerciseUpdateAdmin, GamificationReplayRequest
+from app.gamification_replay import replay_in_batches
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -99,6 +101,7 @@ def create_global_exercise(
     new_ex = Exercise(**exercise.model_dump(), source="global")
     db.add(new_ex)
     db.commit()
+    bump_catalog_version()
     db.refresh(new_ex)
     return new_ex
 
@@ -119,6 +122,7 @@ def update_global_exercise(
         setattr(db_ex, key, value)
         
     db.commit()
+    bump_catalog_version()
     db.refresh(db_ex)
     return db_ex
 
@@ -135,4 +139,24 @@ def delete_global_exercise(
         
     db.delete(db_ex)
     db.commit()
+    bump_catalog_version()
     return {"message": "Exercise deleted successfully"}
+
+@router.post("/gamification/replay")
+def replay_gamification(
+    request: GamificationReplayRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Replay completed sessions through the current reward rules (Admin only).
+    Dry run by default; without user_ids, covers every non-demo user (use
+    `python -m app.gamification_replay --workers N` for large databases).
+    Users are replayed in batches, one transaction each.
+    """
+    user_ids = request.user_ids
+    if user_ids is None:
+        user_ids = [uid for (uid,) in db.query(User.id).filter(User.is_demo.isnot(True)).order_by(User.id)]
+
+    diffs = replay_in_batches(db, user_ids, dry_run=request.dry_run)
+    return {"dry_run": request.dry_run, "users": len(user_ids), "changed": diffs}
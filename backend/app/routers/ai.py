@@ -1,16 +1,22 @@
 """
 AI-powered endpoints for routine generation.
+
+The endpoints are ``async`` so that waiting on OpenAI doesn't tie up a
+worker thread; all their database work (the coin charge, preferences,
+catalog, usage log) runs in the threadpool through ``_prepare`` and
+``_commit_ai_call``, never on the event loop.
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Callable, Optional, List
 
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.user_preference import UserPreference
-from app.models.exercise import Exercise
+from app.exercise_catalog import get_catalog
 from app.limiter import limiter
 
 router = APIRouter(
@@ -19,6 +25,55 @@ router = APIRouter(
 )
 
 
+def _slider_max_difficulty(preferences) -> float:
+    """Max exercise difficulty from the experience slider ("1".."10"), or a legacy experience string."""
+    # Users using the slider start at '5' visually. If it's literally empty, default to 5.
+    exp_level = preferences.experience_level if (preferences and preferences.experience_level) else "5"
+
+    # Try parsing as a raw numeric slider value (e.g. "5"). If it's a legacy string, fallback.
+    try:
+        return float(exp_level)
+    except (ValueError, TypeError):
+        experience_to_max_level = {
+            "Beginner (0-6 months)": 2.5,
+            "Intermediate (6 months - 2 years)": 3.5,
+            "Advanced (2+ years)": 10.0,
+            "I don't know": 3.0,
+        }
+        return experience_to_max_level.get(exp_level, 3.0)
+
+
+def _tier_max_difficulty(preferences) -> float:
+    experience_to_max_level = {
+        "Beginner (0-6 months)": 4,
+        "Intermediate (6 months - 2 years)": 7,
+        "Advanced (2+ years)": 10,
+        "I don't know": 5,
+    }
+    exp_level = preferences.experience_level if preferences else None
+    return experience_to_max_level.get(exp_level, 5)
+
+
+def _prepare(db: Session, user: User, cost: int, use_joker: bool,
+             max_difficulty: Callable[[Optional[UserPreference]], float]):
+    """Charge the user (flushed; committed with the result) and load preferences and the exercises offered."""
+    from app.gamification import deduct_coins
+
+    deduct_coins(db, user, cost, use_joker=use_joker, source="ai")
+    preferences = db.query(UserPreference).filter(UserPreference.user_id == user.id).first()
+    return preferences, get_catalog(db).up_to_difficulty(max_difficulty(preferences))
+
+
+def _commit_ai_call(db: Session, user: User, usage_log: Optional[dict] = None) -> tuple[Optional[int], int]:
+    """Commit the charge together with the call's usage log. Returns (usage log id, coin balance)."""
+    from app.openai_service import record_ai_usage
+
+    log = record_ai_usage(db, user.id, usage_log) if usage_log is not None else None
+    db.commit()
+    db.refresh(user)
+    return (log.id if log is not None else None), user.currency
+
+
 class GenerateRoutineRequest(BaseModel):
     extra_prompt: Optional[str] = None
     use_joker: bool = False
@@ -46,43 +101,14 @@ async def generate_routine(
     Costs 50 coins (or 1 joker token).
     """
     from app.openai_service import generate_routine_suggestion
-    from app.gamification import deduct_coins
 
-    deduct_coins(db, current_user, 50, use_joker=body.use_joker)
-
-    # Fetch user preferences
-    preferences = (
-        db.query(UserPreference)
-        .filter(UserPreference.user_id == current_user.id)
-        .first()
-    )
-
-    # Users using the slider start at '5' visually. If it's literally empty, default to 5.
-    exp_level = preferences.experience_level if (preferences and preferences.experience_level) else "5"
-    
-    # Try parsing as a raw numeric slider value (e.g. "5"). If it's a legacy string, fallback.
-    try:
-        max_difficulty = float(exp_level)
-    except (ValueError, TypeError):
-        experience_to_max_level = {
-            "Beginner (0-6 months)": 2.5,
-            "Intermediate (6 months - 2 years)": 3.5,
-            "Advanced (2+ years)": 10.0,
-            "I don't know": 3.0,
-        }
-        max_difficulty = experience_to_max_level.get(exp_level, 3.0)
-
-    # Fetch system exercises filtered by difficulty
-    exercises = (
-        db.query(Exercise)
-        .filter(Exercise.user_id == None)  # noqa: E711
-        .filter(Exercise.difficulty_level <= max_difficulty)
-        .all()
+    # System exercises filtered by difficulty
+    preferences, exercises = await run_in_threadpool(
+        _prepare, db, current_user, 50, body.use_joker, _slider_max_difficulty,
     )
 
     try:
-        result = await generate_routine_suggestion(
-            db=db,
+        result, usage_log = await generate_routine_suggestion(
             user=current_user,
             preferences=preferences,
             exercises=exercises,
@@ -103,8 +129,7 @@ async def generate_routine(
             detail=f"AI generation failed: {str(e)}"
         )
 
-    db.refresh(current_user)
-    result["currency"] = current_user.currency
+    result["ai_usage_id"], result["currency"] = await run_in_threadpool(_commit_ai_call, db, current_user, usage_log)
     return result
 
 
@@ -161,35 +186,13 @@ async def replace_exercises(
     Costs 15 coins (or 1 joker token).
     """
     from app.openai_service import replace_exercises_ai
-    from app.gamification import deduct_coins
-
-    deduct_coins(db, current_user, 15, use_joker=body.use_joker)
-
-    preferences = (
-        db.query(UserPreference)
-        .filter(UserPreference.user_id == current_user.id)
-        .first()
-    )
-
-    experience_to_max_level = {
-        "Beginner (0-6 months)": 4,
-        "Intermediate (6 months - 2 years)": 7,
-        "Advanced (2+ years)": 10,
-        "I don't know": 5,
-    }
-    exp_level = preferences.experience_level if preferences else None
-    max_difficulty = experience_to_max_level.get(exp_level, 5)
 
-    exercises = (
-        db.query(Exercise)
-        .filter(Exercise.user_id == None)  # noqa: E711
-        .filter(Exercise.difficulty_level <= max_difficulty)
-        .all()
+    preferences, exercises = await run_in_threadpool(
+        _prepare, db, current_user, 15, body.use_joker, _tier_max_difficulty,
     )
 
     try:
         result = await replace_exercises_ai(
-            db=db,
             user=current_user,
             preferences=preferences,
             exercises=exercises,
@@ -209,8 +212,8 @@ async def replace_exercises(
             detail=f"AI replacement failed: {str(e)}"
         )
 
-    db.refresh(current_user)
-    return {**result, "currency": current_user.currency}
+    _, currency = await run_in_threadpool(_commit_ai_call, db, current_user)
+    return {**result, "currency": currency}
 
 
 # ── AI Fill Day ─────────────────────────────────────────────────────────────
@@ -248,38 +251,13 @@ async def fill_day(
     return exercises scoped to a single day. Costs 25 coins (or 1 joker token).
     """
     from app.openai_service import fill_day_ai
-    from app.gamification import deduct_coins
-
-    deduct_coins(db, current_user, 25, use_joker=body.use_joker)
-
-    preferences = (
-        db.query(UserPreference)
-        .filter(UserPreference.user_id == current_user.id)
-        .first()
-    )
-
-    exp_level = preferences.experience_level if (preferences and preferences.experience_level) else "5"
-    try:
-        max_difficulty = float(exp_level)
-    except (ValueError, TypeError):
-        experience_to_max_level = {
-            "Beginner (0-6 months)": 2.5,
-            "Intermediate (6 months - 2 years)": 3.5,
-            "Advanced (2+ years)": 10.0,
-            "I don't know": 3.0,
-        }
-        max_difficulty = experience_to_max_level.get(exp_level, 3.0)
 
-    exercises = (
-        db.query(Exercise)
-        .filter(Exercise.user_id == None)  # noqa: E711
-        .filter(Exercise.difficulty_level <= max_difficulty)
-        .all()
+    preferences, exercises = await run_in_threadpool(
+        _prepare, db, current_user, 25, body.use_joker, _slider_max_difficulty,
     )
 
     try:
-        result = await fill_day_ai(
-            db=db,
+        result, usage_log = await fill_day_ai(
             user=current_user,
             preferences=preferences,
             exercises=exercises,
@@ -299,5 +277,5 @@ async def fill_day(
             detail=f"AI fill-day failed: {str(e)}"
         )
 
-    db.refresh(current_user)
-    return {**result, "currency": current_user.currency}
+    _, currency = await run_in_threadpool(_commit_ai_call, db, current_user, usage_log)
+    return {**result, "currency": currency}
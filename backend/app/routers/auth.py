@@ -13,6 +13,8 @@ from app.auth import (
 from app.dependencies import get_current_user
 from app.limiter import limiter
 from app.onboarding import mark_onboarding_step, merge_onboarding_progress
+from app.stats_cache import bump_stats_version
+from app.reward_ledger import record_opening_balance
 
 router = APIRouter(
     prefix="/api/auth",
@@ -72,6 +74,7 @@ def register(request: Request, user: UserCreate, db: Session = Depends(get_db)):
     hashed_password = get_password_hash(user.password)
     new_user = User(email=user.email, password_hash=hashed_password, currency=10)
     db.add(new_user)
+    record_opening_balance(db, new_user)
     db.commit()
     db.refresh(new_user)
 
@@ -195,5 +198,8 @@ def update_user_me(
         mark_onboarding_step(current_user, "profile")
 
     db.commit()
+    if profile_touched:
+        # Profile bodyweight / gender feed the NSS bodyweight fallback
+        bump_stats_version(current_user.id)
     db.refresh(current_user)
     return current_user
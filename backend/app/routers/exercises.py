@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Optional
 from app.database import get_db
 from app.models.exercise import Exercise
 from app.schemas import ExerciseResponse, ExerciseCreate
 from app.dependencies import get_current_user
 from app.models.user import User
+from app.exercise_catalog import get_catalog
 
 router = APIRouter(
     prefix="/api/exercises",
@@ -86,17 +86,17 @@ def suggest_exercises(
     if equipment:
         equipment_set = {e.strip().lower() for e in equipment.split(",") if e.strip()}
 
-    # Look up muscles covered by existing exercises
+    catalog = get_catalog(db)
+
+    # Look up muscles covered by existing exercises (custom ones aren't in the catalog)
     covered_muscles = set()
-    if existing_id_set:
-        existing_exercises = (
-            db.query(Exercise)
-            .filter(Exercise.id.in_(existing_id_set))
-            .all()
-        )
-        for ex in existing_exercises:
-            if ex.muscle:
-                covered_muscles.add(ex.muscle)
+    existing_exercises = [catalog.by_id[eid] for eid in existing_id_set if eid in catalog.by_id]
+    custom_ids = existing_id_set.difference(catalog.by_id)
+    if custom_ids:
+        existing_exercises += db.query(Exercise).filter(Exercise.id.in_(custom_ids)).all()
+    for ex in existing_exercises:
+        if ex.muscle:
+            covered_muscles.add(ex.muscle)
 
     # Find complementary muscles that are missing
     missing_muscles = set()
@@ -110,16 +110,11 @@ def suggest_exercises(
     if not missing_muscles:
         missing_muscles = {"Chest", "Lats", "Quadriceps", "Shoulders", "Abdominals"}
 
-    # Query for exercises matching missing muscles
-    query = (
-        db.query(Exercise)
-        .filter(Exercise.user_id == None)  # noqa: E711 — system exercises only
-        .filter(Exercise.muscle.in_(missing_muscles))
-    )
-
-    # Exclude already-added exercises
-    if existing_id_set:
-        query = query.filter(~Exercise.id.in_(existing_id_set))
+    # System exercises matching missing muscles, minus already-added ones
+    candidate_ids = set()
+    for muscle in missing_muscles:
+        candidate_ids.update(ex.id for ex in catalog.by_muscle.get(muscle, ()))
+    candidate_ids -= existing_id_set
 
     # Equipment filter
     bodyweight_aliases = {"none (bodyweight)", "bodyweight", "body weight", "none", ""}
@@ -139,11 +134,12 @@ def suggest_exercises(
             for key, mapped in eq_mapping.items():
                 if key in user_eq:
                     allowed_eq.update(mapped)
-        query = query.filter(
-            func.lower(func.coalesce(Exercise.equipment, "none (bodyweight)")).in_(allowed_eq)
-        )
+        allowed_ids = set()
+        for eq in allowed_eq:
+            allowed_ids |= catalog.by_equipment.get(eq, frozenset())
+        candidate_ids &= allowed_ids
 
-    candidates = query.all()
+    candidates = [catalog.by_id[eid] for eid in sorted(candidate_ids)]
 
     # Diversify: pick at most 2 exercises per missing muscle
     result = []
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.demo_snapshots import demo_response, demo_snapshots
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.quest import Quest, UserQuest
-from app.gamification import _update_quest_progress, claim_quest_reward, assign_quests, exp_for_next_level, compute_streak_weeks, _streak_coins, _current_iso_week_str, _get_week_boundaries, compute_unclaimed_streak_data, get_streak_week_slots
+from app.models.gamification_job import GamificationJob
+from app.gamification import _update_quest_progress, claim_quest_reward, ensure_quests_assigned, exp_for_next_level, compute_streak_weeks, _streak_coins, _current_iso_week_str, _get_week_boundaries, compute_unclaimed_streak_data, get_streak_week_slots
+from app.gamification_outbox import PENDING, job_payload, process_job
+from app.reward_ledger import balance_snapshot, record_change
 from app.onboarding import claim_onboarding_rewards
+from app.stats_cache import bump_stats_version, cached_stats
+from app.training_calendar import load_training_calendar
 
 router = APIRouter(
     prefix="/api/gamification",
@@ -24,8 +30,10 @@ def get_gamification_stats(
     current_user: User = Depends(get_current_user)
 ):
     streak_reward_week = current_user.streak_reward_week or ""
-    unclaimed = compute_unclaimed_streak_data(db, current_user)
-    streak_slots = get_streak_week_slots(db, current_user.id, streak_reward_week)
+    # One calendar serves the unclaimed-week, current-streak and flame-row computations
+    calendar = load_training_calendar(db, current_user.id)
+    unclaimed = compute_unclaimed_streak_data(db, current_user, calendar=calendar)
+    streak_slots = get_streak_week_slots(db, current_user.id, streak_reward_week, calendar=calendar)
     return {
         "level": current_user.level or 1,
         "experience": current_user.experience or 0,
@@ -40,9 +48,36 @@ def get_gamification_stats(
     }
 
 
-@router.get("/stats/demo")
-def get_gamification_stats_demo(db: Session = Depends(get_db)):
-    """Return gamification stats for the demo user (no auth required)."""
+def _list_quests(db: Session, user_id: int) -> list[dict]:
+    """The user's assigned quests with their catalog entries (one joined query)."""
+    rows = db.query(UserQuest, Quest).join(
+        Quest, UserQuest.quest_id == Quest.id
+    ).filter(
+        UserQuest.user_id == user_id
+    ).order_by(UserQuest.id).all()
+
+    return [
+        {
+            "id": uq.id,
+            "quest_id": quest.id,
+            "name": quest.name,
+            "description": quest.description,
+            "icon": quest.icon or "target",
+            "req_type": quest.req_type,
+            "req_value": quest.req_value,
+            "exp_reward": quest.exp_reward,
+            "currency_reward": quest.currency_reward,
+            "progress": uq.progress,
+            "completed": uq.completed,
+            "claimed": uq.claimed,
+            "completed_at": uq.completed_at.isoformat() if uq.completed_at else None,
+            "is_weekly": quest.is_weekly,
+        }
+        for uq, quest in rows
+    ]
+
+
+def _build_gamification_stats_demo(db: Session):
     demo_user = db.query(User).filter(User.is_demo == True).first()
     if not demo_user:
         return {"level": 1, "experience": 0, "exp_to_next": 100, "currency": 0, "joker_tokens": 0}
@@ -55,40 +90,30 @@ def get_gamification_stats_demo(db: Session = Depends(get_db)):
     }
 
 
-@router.get("/quests/demo")
-def get_quests_demo(db: Session = Depends(get_db)):
-    """Return quest progress for the demo user (no auth required)."""
+def _build_quests_demo(db: Session):
     demo_user = db.query(User).filter(User.is_demo == True).first()
     if not demo_user:
         return []
 
-    assign_quests(db, demo_user.id)
+    # Normally rotated by the weekly job; this only writes if it missed the demo user
+    ensure_quests_assigned(db, demo_user)
+    return _list_quests(db, demo_user.id)
 
-    user_quests = db.query(UserQuest).filter(
-        UserQuest.user_id == demo_user.id
-    ).all()
 
-    result = []
-    for uq in user_quests:
-        quest = db.get(Quest, uq.quest_id)
-        if not quest:
-            continue
-        result.append({
-            "id": uq.id,
-            "quest_id": quest.id,
-            "name": quest.name,
-            "description": quest.description,
-            "icon": quest.icon or "target",
-            "req_type": quest.req_type,
-            "req_value": quest.req_value,
-            "exp_reward": quest.exp_reward,
-            "currency_reward": quest.currency_reward,
-            "progress": uq.progress,
-            "completed": uq.completed,
-            "claimed": uq.claimed,
-            "completed_at": uq.completed_at.isoformat() if uq.completed_at else None,
-        })
-    return result
+demo_snapshots.register("gamification.stats", _build_gamification_stats_demo)
+demo_snapshots.register("gamification.quests", _build_quests_demo)
+
+
+@router.get("/stats/demo")
+def get_gamification_stats_demo(request: Request, db: Session = Depends(get_db)):
+    """Return gamification stats for the demo user (no auth required)."""
+    return demo_response(request, db, "gamification.stats")
+
+
+@router.get("/quests/demo")
+def get_quests_demo(request: Request, db: Session = Depends(get_db)):
+    """Return quest progress for the demo user (no auth required)."""
+    return demo_response(request, db, "gamification.quests")
 
 
 @router.get("/quests")
@@ -96,37 +121,15 @@ def get_quests(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Return all quests assigned to the user with their progress."""
-    # Auto-assign any new quests the user doesn't have yet
-    assign_quests(db, current_user.id)
-
-    user_quests = db.query(UserQuest).filter(
-        UserQuest.user_id == current_user.id
-    ).all()
-
-    result = []
-    for uq in user_quests:
-        quest = db.get(Quest, uq.quest_id)
-        if not quest:
-            continue
-        result.append({
-            "id": uq.id,
-            "quest_id": quest.id,
-            "name": quest.name,
-            "description": quest.description,
-            "icon": quest.icon or "target",
-            "req_type": quest.req_type,
-            "req_value": quest.req_value,
-            "exp_reward": quest.exp_reward,
-            "currency_reward": quest.currency_reward,
-            "progress": uq.progress,
-            "completed": uq.completed,
-            "claimed": uq.claimed,
-            "completed_at": uq.completed_at.isoformat() if uq.completed_at else None,
-            "is_weekly": quest.is_weekly,
-        })
+    """Return all quests assigned to the user with their progress.
 
-    return result
+    Read-only once the weekly rotation job has covered the user: the listing
+    is served from the stats cache until a session write or a claim.
+    """
+    week = _current_iso_week_str()
+    if ensure_quests_assigned(db, current_user):
+        bump_stats_version(current_user.id)
+    return cached_stats("quests", current_user.id, (week,), lambda: _list_quests(db, current_user.id))
 
 
 @router.post("/quests/{user_quest_id}/claim")
@@ -139,9 +142,32 @@ def claim_quest(
     result = claim_quest_reward(db, current_user, user_quest_id)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
+    bump_stats_version(current_user.id)
     return result
 
 
+# ── Post-completion jobs ──────────────────────────────────────────────────────
+
+@router.get("/jobs/{job_id}")
+def get_gamification_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll the gamification result of a session completion (handle returned by complete_bulk)."""
+    job = db.query(GamificationJob).filter(
+        GamificationJob.id == job_id,
+        GamificationJob.user_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == PENDING:
+        # Not picked up yet (e.g. the background task was lost on restart): run it now
+        process_job(db, job_id)
+        db.refresh(job)
+    return job_payload(job)
+
+
 # ── Streak Claim ──────────────────────────────────────────────────────────────
 
 @router.post("/streak/claim")
@@ -164,6 +190,7 @@ def claim_streak_reward(
 
     # Claim only the oldest unclaimed week
     oldest_week, week_coins = data["coins_per_week"][0]
+    before = balance_snapshot(current_user)
     current_user.currency = (current_user.currency or 0) + week_coins
     current_user.streak_reward_week = oldest_week
 
@@ -173,6 +200,7 @@ def claim_streak_reward(
         current_user.joker_tokens = (current_user.joker_tokens or 0) + 1
         joker_awarded = True
 
+    record_change(db, current_user, before, "streak", detail={"week": oldest_week})
     db.commit()
     db.refresh(current_user)
 
@@ -192,7 +220,9 @@ def claim_onboarding_reward(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    before = balance_snapshot(current_user)
     result = claim_onboarding_rewards(current_user, step=body.step if body else None)
+    record_change(db, current_user, before, "onboarding", detail={"steps": result["claimed_steps"]})
     db.commit()
     db.refresh(current_user)
     return {
@@ -345,9 +375,7 @@ def get_shop(
     }
 
 
-@router.get("/shop/demo")
-def get_shop_demo(db: Session = Depends(get_db)):
-    """Return shop items for the demo user (no auth required)."""
+def _build_shop_demo(db: Session):
     demo_user = db.query(User).filter(User.is_demo == True).first()
     settings = (demo_user.settings or {}) if demo_user else {}
     purchased = settings.get("purchased_themes", [])
@@ -371,6 +399,15 @@ def get_shop_demo(db: Session = Depends(get_db)):
     }
 
 
+demo_snapshots.register("gamification.shop", _build_shop_demo)
+
+
+@router.get("/shop/demo")
+def get_shop_demo(request: Request, db: Session = Depends(get_db)):
+    """Return shop items for the demo user (no auth required)."""
+    return demo_response(request, db, "gamification.shop")
+
+
 from pydantic import BaseModel, Field as PydanticField
 
 class ShopBuyRequest(BaseModel):
@@ -403,7 +440,9 @@ def buy_shop_item(
     if (current_user.currency or 0) < item["price"]:
         raise HTTPException(status_code=400, detail="Not enough coins")
 
+    before = balance_snapshot(current_user)
     current_user.currency = max(0, (current_user.currency or 0) - item["price"])
+    record_change(db, current_user, before, "shop", detail={"item_id": item["id"]})
 
     if item["type"] == "theme":
         purchased = list(settings.get("purchased_themes", []))
@@ -510,7 +549,9 @@ def redeem_promo_code(
     if code_upper in redeemed:
         raise HTTPException(status_code=400, detail="Code already redeemed")
 
+    before = balance_snapshot(current_user)
     current_user.currency = (current_user.currency or 0) + reward
+    record_change(db, current_user, before, "promo", detail={"code": code_upper})
     redeemed.append(code_upper)
     settings["redeemed_codes"] = redeemed
     current_user.settings = settings
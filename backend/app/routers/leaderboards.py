@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.models.user import User
+from app.leaderboards import around, display_name, set_visibility, top
+
+router = APIRouter(
+    prefix="/api/leaderboards",
+    tags=["leaderboards"]
+)
+
+
+class LeaderboardVisibilityUpdate(BaseModel):
+    visible: bool
+    display_name: str | None = Field(None, max_length=30)
+
+
+@router.get("/me")
+def get_leaderboard_settings(current_user: User = Depends(get_current_user)):
+    return {"visible": bool(current_user.leaderboard_visible), "display_name": display_name(current_user)}
+
+
+@router.put("/me")
+def update_leaderboard_settings(
+    update: LeaderboardVisibilityUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Opt in to (or out of) the leaderboards, optionally setting the name shown."""
+    set_visibility(db, current_user, update.visible, update.display_name)
+    db.commit()
+    return {"visible": bool(current_user.leaderboard_visible), "display_name": display_name(current_user)}
+
+
+@router.get("/{board}")
+def get_leaderboard(
+    board: str,
+    period: str = Query("week", description="'week' (current week) or 'all'"),
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Top of a board (xp, sessions, volume; streak is all-time only). Only opted-in users are listed."""
+    try:
+        entries = top(db, board, period, limit=limit, offset=offset, me_id=current_user.id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return {"board": board, "period": period, "entries": entries}
+
+
+@router.get("/{board}/me")
+def get_my_rank(
+    board: str,
+    period: str = Query("week", description="'week' (current week) or 'all'"),
+    k: int = Query(5, ge=0, le=25, description="neighbours shown above and below"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Your rank on a board with the k opted-in users either side."""
+    try:
+        result = around(db, current_user, board, period, k=k)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return {"board": board, "period": period, **result}
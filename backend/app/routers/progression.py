@@ -2,9 +2,10 @@
 Progression suggestion endpoints.
 
 Mode A: Algorithmic quick suggestions (no AI cost)
-Mode C: Full Progression Report (algorithmic + AI)
+Mode C: Full Progression Report (algorithmic + AI), generated as a
+background job (app.progression_report_jobs)
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
@@ -13,7 +14,8 @@ from app.database import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.routine import Routine
-from app.models.progression import ProgressionReport, ProgressionFeedback
+from app.models.progression import ProgressionReport, ProgressionReportJob, ProgressionFeedback
+from app.progression_report_jobs import enqueue_report, job_payload, run_report_job
 
 class ReportRequest(BaseModel):
     user_context: Optional[str] = None
@@ -50,6 +52,12 @@ def get_exercise_suggestion(
 ):
     """Get algorithmic progression suggestion for a single exercise."""
     from app.progression_engine import analyze_exercise_progression
+    from app.progression_suggestions import routine_day_suggestions
+
+    if day_index is not None:
+        stored = routine_day_suggestions(db, current_user.id, routine_id, day_index)
+        if stored is not None and str(exercise_id) in stored:
+            return {"suggestion": stored[str(exercise_id)]}
 
     suggestion = analyze_exercise_progression(
         user_id=current_user.id,
@@ -70,21 +78,13 @@ def get_routine_suggestions(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get algorithmic suggestions for all exercises in a routine day."""
-    # Verify ownership
-    routine = db.get(Routine, routine_id)
-    if not routine or routine.user_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Routine not found")
-
-    from app.progression_engine import analyze_routine_day
+    """Get algorithmic suggestions for all exercises in a routine day (stored, recomputed on a miss)."""
+    from app.progression_suggestions import routine_day_suggestions
 
-    suggestions = analyze_routine_day(
-        user_id=current_user.id,
-        routine_id=routine_id,
-        day_index=day_index,
-        db=db,
-    )
-    return {"suggestions": suggestions}
+    stored = routine_day_suggestions(db, current_user.id, routine_id, day_index)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Routine not found")
+    return {"suggestions": {ex_id: s for ex_id, s in stored.items() if s}}
 
 
 # ── Mode C: Full Progression Report ─────────────────────────────────────────
@@ -115,100 +115,50 @@ def get_latest_report(
     }
 
 
-@router.post("/report/{routine_id}")
-async def generate_report(
-    request: Request,
+@router.post("/report/{routine_id}", status_code=202)
+def generate_report(
     routine_id: int,
+    background_tasks: BackgroundTasks,
     body: ReportRequest = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Generate a full progression report. Costs 50 coins (or 1 joker token).
+    Request a full progression report. Costs 50 coins (or 1 joker token),
+    charged when the report is ready.
+
+    Returns a job handle; poll ``GET /report/jobs/{job_id}`` for the report.
+    One report is generated at a time per user: 409 while another routine's
+    is unfinished.
     """
     routine = db.get(Routine, routine_id)
     if not routine or routine.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    from app.progression_engine import analyze_routine_day
-    from app.openai_service import generate_report_ai
-    from app.gamification import deduct_coins
-
-    deduct_coins(db, current_user, 50, use_joker=body.use_joker if body else False)
-
-    # 1. Run algorithmic analysis for all days
-    algorithmic_results = {}
-    for day_idx, day in enumerate(routine.days or []):
-        day_suggestions = analyze_routine_day(
-            user_id=current_user.id,
-            routine_id=routine_id,
-            day_index=day_idx,
-            db=db,
-        )
-        if day_suggestions:
-            algorithmic_results[day["day_name"]] = day_suggestions
-
-    # 2. Get AI enrichment
-    try:
-        ai_result = await generate_report_ai(
-            db=db,
-            user=current_user,
-            routine=routine,
-            algorithmic_results=algorithmic_results,
-            user_context=body.user_context if body else None,
-        )
-    except (ValueError, RuntimeError):
-        # AI unavailable — return algorithmic results only
-        ai_result = {
-            "overall_assessment": "AI analysis unavailable. See per-exercise suggestions below.",
-            "periodization_note": None,
-            "exercise_enrichments": {},
-        }
-    except Exception:
-        ai_result = {
-            "overall_assessment": "AI analysis unavailable.",
-            "periodization_note": None,
-            "exercise_enrichments": {},
-        }
-
-    # 3. Combine into report
-    report_data = {
-        "routine_name": routine.name,
-        "overall_assessment": ai_result.get("overall_assessment", ""),
-        "periodization_note": ai_result.get("periodization_note"),
-        "days": {},
-    }
-
-    for day_name, suggestions in algorithmic_results.items():
-        enrichments = ai_result.get("exercise_enrichments", {})
-        day_report = {}
-        for ex_id_str, suggestion in suggestions.items():
-            ex_id = str(ex_id_str)
-            enrichment = enrichments.get(ex_id, {})
-            alt = enrichment.get("alternative")
-            entry = {
-                **suggestion,
-                "ai_note": enrichment.get("note"),
-            }
-            # For exercise_swap, promote the AI-suggested replacement to the primary target
-            if suggestion.get("type") == "exercise_swap" and alt:
-                entry["new_exercise_id"] = alt.get("exercise_id")
-                entry["new_exercise_name"] = alt.get("name")
-            day_report[ex_id] = entry
-        report_data["days"][day_name] = day_report
-
-    # 4. Save report
-    report = ProgressionReport(
-        user_id=current_user.id,
-        routine_id=routine_id,
-        report_data=report_data,
+    job = enqueue_report(
+        db, current_user, routine_id,
+        user_context=body.user_context if body else None,
+        use_joker=body.use_joker if body else False,
     )
-    db.add(report)
     db.commit()
-    db.refresh(report)
+    background_tasks.add_task(run_report_job, db.get_bind(), job.id)
+    return {"job_id": job.id, "status": job.status}
+
 
-    db.refresh(current_user)
-    return {"report_id": report.id, "currency": current_user.currency, **report_data}
+@router.get("/report/jobs/{job_id}")
+def get_report_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Poll a report job (handle returned by POST /report/{routine_id})."""
+    job = db.query(ProgressionReportJob).filter(
+        ProgressionReportJob.id == job_id,
+        ProgressionReportJob.user_id == current_user.id,
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job_payload(job), "currency": current_user.currency}
 
 
 # ── Feedback tracking ───────────────────────────────────────────────────────
@@ -10,6 +10,7 @@ from app.models.user import User
 from app.models.ai_usage_log import AIUsageLog
 from sqlalchemy.sql import func
 from app.onboarding import mark_onboarding_step
+from app.progression_suggestions import invalidate_suggestions
 
 router = APIRouter(
     prefix="/api/routines",
@@ -102,8 +103,13 @@ def update_routine(
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
     
-    for key, value in routine_update.model_dump(exclude_unset=True).items():
+    update_data = routine_update.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(routine, key, value)
+
+    # Stored suggestions follow the day layout and rep targets
+    if "days" in update_data:
+        invalidate_suggestions(db, current_user.id, routine_id)
     
     # If became favorite, unset others
     if routine.is_favorite:
@@ -159,6 +165,7 @@ def delete_routine(
     
     from app.models.session import Session as DBSession
     db.query(DBSession).filter(DBSession.routine_id == routine_id).update({"routine_id": None})
+    invalidate_suggestions(db, current_user.id, routine_id)
     
     db.delete(routine)
     db.commit()
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timezone
@@ -8,6 +9,13 @@ from app.schemas import SessionResponse, SessionCreate, SessionUpdate, SetRespon
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.onboarding import mark_onboarding_step
+from app.demo_snapshots import demo_response, demo_snapshots
+from app.daily_stats import refresh_daily_stats, stat_day, sync_session_day
+from app.gamification_outbox import delete_session_jobs, enqueue_session_award, finish_pending_jobs, job_handle, process_job_in_background
+from app.progression_suggestions import invalidate_session_suggestions
+from app.exercise_bests import refresh_exercise_bests, session_exercise_ids, sync_session_bests
+from app.quest_counters import completed_session_deltas, sync_session_counters
+from app.stats_cache import bump_stats_version
 
 router = APIRouter(
     prefix="/api/sessions",
@@ -58,7 +66,9 @@ def create_session(
             session_data["routine_id"] = None
     db_session = SessionModel(**session_data, user_id=current_user.id)
     db.add(db_session)
+    sync_session_day(db, db_session)
     db.commit()
+    bump_stats_version(current_user.id)
     db.refresh(db_session)
     return db_session
 
@@ -66,6 +76,7 @@ def create_session(
 def update_session(
     session_id: int,
     session_update: SessionUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -84,6 +95,9 @@ def update_session(
             raise HTTPException(status_code=409, detail="Completed sessions cannot be reopened or re-completed")
         update_data.pop("completed_at")
     
+    if was_completed:
+        finish_pending_jobs(db, current_user.id)
+    counters_before = completed_session_deltas(db, db_session) if was_completed else None
     for key, value in update_data.items():
         setattr(db_session, key, value)
 
@@ -96,39 +110,45 @@ def update_session(
         db_session.streak_eligible_at = datetime.now(timezone.utc)
         mark_onboarding_step(current_user, "first_session")
 
-    db.commit()
-    db.refresh(db_session)
+    # Gamification runs after the response; the job is committed with the completion
+    job = None
+    if not was_completed and db_session.completed_at is not None:
+        if db_session.bodyweight_kg is None:
+            db_session.bodyweight_kg = current_user.weight
+        job = enqueue_session_award(db, current_user.id, session_id)
 
     # Recompute effort score when self_rated_effort is updated on an already-completed session
     if was_completed and 'self_rated_effort' in update_data:
         from app.effort_score import compute_effort_score
-        db_session.effort_score = compute_effort_score(db, current_user.id, db_session)
-        db.commit()
-        db.refresh(db_session)
+        db_session.effort_score = compute_effort_score(db, current_user.id, db_session, current_user.settings)
 
-    response = SessionResponse.model_validate(db_session).model_dump()
+    sync_session_day(db, db_session)
+    sync_session_counters(db, db_session, counters_before)
+    db.commit()
+    db.refresh(db_session)
 
-    # Trigger gamification when session is marked complete for the first time
-    if not was_completed and db_session.completed_at is not None:
-        if db_session.bodyweight_kg is None:
-            db_session.bodyweight_kg = current_user.weight
-        from app.gamification import award_session_xp
-        gamification_result = award_session_xp(db, current_user, session_id)
-        response["gamification"] = gamification_result
+    response = SessionResponse.model_validate(db_session).model_dump()
+    if job is not None:
+        response["gamification"] = job_handle(job)
+        background_tasks.add_task(process_job_in_background, db.get_bind(), job.id)
 
+    bump_stats_version(current_user.id)
     return response
 
 @router.post("/{session_id}/complete_bulk")
 def complete_session_bulk(
     session_id: int,
     bulk_data: SessionCompleteBulk,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Called when a user hits finish from the UI.
-    Receives all sets + final timestamps, saves them simultaneously, and
-    calculates + returns gamification directly for instant UI feedback.
+    Receives all sets + final timestamps and saves them simultaneously.
+    Gamification (PRs, effort score, XP, quests) runs after the response:
+    a first completion returns a pending handle to poll at
+    GET /api/gamification/jobs/{job_id}.
     """
     db_session = db.query(SessionModel).filter(
         SessionModel.id == session_id,
@@ -144,6 +164,7 @@ def complete_session_bulk(
         # Keep completion timestamp immutable after first completion.
         if bulk_data.completed_at != db_session.completed_at:
             raise HTTPException(status_code=409, detail="Completed sessions cannot be reopened or re-completed")
+        finish_pending_jobs(db, current_user.id)
 
     db_session.completed_at = bulk_data.completed_at
     if bulk_data.notes is not None:
@@ -165,6 +186,8 @@ def complete_session_bulk(
 
     # Sync Sets: Delete all currently belonging to this session and recreate them
     # Because this is a "bulk sync everything at once", the local is truth.
+    touched_exercises = set(session_exercise_ids(db, session_id)) if was_completed else set()
+    counters_before = completed_session_deltas(db, db_session) if was_completed else None
     db.query(SetModel).filter(SetModel.session_id == session_id).delete()
 
     for s in bulk_data.sets:
@@ -184,20 +207,26 @@ def complete_session_bulk(
             completed_at=s.completed_at or bulk_data.completed_at
         )
         db.add(new_set)
-    
+        touched_exercises.add(s.exercise_id)
+
+    sync_session_day(db, db_session)
+    # A first completion is folded into exercise_bests by PR detection in its job
+    job = None
+    if was_completed:
+        sync_session_bests(db, db_session, touched_exercises)
+        sync_session_counters(db, db_session, counters_before)
+        invalidate_session_suggestions(db, db_session)
+    elif db_session.completed_at is not None:
+        job = enqueue_session_award(db, current_user.id, session_id)
     db.commit()
     db.refresh(db_session)
 
-    # Gamification
-    gamification_result = None
-    if not was_completed and db_session.completed_at is not None:
-        from app.gamification import award_session_xp
-        gamification_result = award_session_xp(db, current_user, session_id)
-
     response = SessionResponse.model_validate(db_session).model_dump()
-    if gamification_result:
-        response["gamification"] = gamification_result
+    if job is not None:
+        response["gamification"] = job_handle(job)
+        background_tasks.add_task(process_job_in_background, db.get_bind(), job.id)
 
+    bump_stats_version(current_user.id)
     return response
 
 @router.delete("/{session_id}")
@@ -214,26 +243,32 @@ def delete_session(
         raise HTTPException(status_code=404, detail="Session not found")
 
     xp_removed = 0
+    stats_day = None
+    touched_exercises = []
     if db_session.completed_at is not None:
         from app.gamification import remove_session_xp
+        # Award first if its job hasn't run yet, so there is something to remove
+        finish_pending_jobs(db, current_user.id)
         xp_removed = remove_session_xp(db, current_user, session_id)
+        stats_day = stat_day(db_session.completed_at)
+        touched_exercises = session_exercise_ids(db, session_id)
 
+    delete_session_jobs(db, session_id)
+    invalidate_session_suggestions(db, db_session)
     db.delete(db_session)
+    if stats_day is not None:
+        refresh_daily_stats(db, current_user.id, stats_day)
+        refresh_exercise_bests(db, current_user.id, touched_exercises)
     db.commit()
+    bump_stats_version(current_user.id)
     return {"ok": True, "xp_removed": xp_removed}
 
 
-@router.get("/demo/history")
-def get_demo_sessions(
-    skip: int = 0,
-    limit: int = 300,
-    db: Session = Depends(get_db),
-):
-    """Return completed sessions for the demo user (no auth required)."""
+def _build_demo_history(db: Session, skip: int, limit: int):
     demo_user = db.query(User).filter(User.is_demo == True).first()
     if not demo_user:
         return []
-        
+
     from app.models.routine import Routine
     sessions = db.query(SessionModel, Routine).outerjoin(
         Routine, SessionModel.routine_id == Routine.id
@@ -242,9 +277,16 @@ def get_demo_sessions(
         SessionModel.completed_at.isnot(None)
     ).order_by(SessionModel.started_at.desc()).offset(skip).limit(limit).all()
 
+    # One grouped count instead of loading every session's sets
+    set_counts = dict(
+        db.query(SetModel.session_id, func.count(SetModel.id))
+        .filter(SetModel.session_id.in_([s.id for s, _ in sessions]))
+        .group_by(SetModel.session_id)
+        .all()
+    ) if sessions else {}
+
     result = []
     for s, r in sessions:
-        sets = db.query(SetModel).filter(SetModel.session_id == s.id).all()
         day_name = "Unknown"
         routine_name = r.name if r else "Unknown Routine"
         if r and r.days and len(r.days) > s.day_index:
@@ -259,6 +301,20 @@ def get_demo_sessions(
             "day_name": day_name,
             "day_index": s.day_index,
             "duration_seconds": s.duration_seconds,
-            "set_count": len(sets),
+            "set_count": set_counts.get(s.id, 0),
         })
     return result
+
+
+demo_snapshots.register("sessions.history", _build_demo_history)
+
+
+@router.get("/demo/history")
+def get_demo_sessions(
+    request: Request,
+    skip: int = 0,
+    limit: int = 300,
+    db: Session = Depends(get_db),
+):
+    """Return completed sessions for the demo user (no auth required)."""
+    return demo_response(request, db, "sessions.history", (skip, limit))
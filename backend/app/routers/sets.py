@@ -7,6 +7,12 @@ from app.models.session import Session as SessionModel, Set as SetModel
 from app.schemas import SetResponse, SetCreate, SetUpdate
 from app.dependencies import get_current_user
 from app.models.user import User
+from app.daily_stats import sync_session_day
+from app.exercise_bests import sync_session_bests
+from app.gamification_outbox import finish_pending_jobs
+from app.progression_suggestions import invalidate_session_suggestions
+from app.quest_counters import completed_session_deltas, sync_session_counters
+from app.stats_cache import bump_stats_version
 
 router = APIRouter(
     prefix="/api/sets",
@@ -65,9 +71,17 @@ def create_set(
         if existing:
             return existing
 
+    if db_session.completed_at is not None:
+        finish_pending_jobs(db, current_user.id)
+    counters_before = completed_session_deltas(db, db_session)
     db_set = SetModel(**set_dict, session_id=session_id)
     db.add(db_set)
     try:
+        db.flush()
+        sync_session_day(db, db_session)
+        sync_session_bests(db, db_session, [db_set.exercise_id])
+        sync_session_counters(db, db_session, counters_before)
+        invalidate_session_suggestions(db, db_session)
         db.commit()
     except IntegrityError:
         # Unique partial index caught a race we didn't catch above —
@@ -79,6 +93,7 @@ def create_set(
         if existing:
             return existing
         raise HTTPException(status_code=409, detail="Set conflict")
+    bump_stats_version(current_user.id)
     db.refresh(db_set)
     return db_set
 
@@ -94,10 +109,20 @@ def update_set(
     if not db_set:
         raise HTTPException(status_code=404, detail="Set not found")
 
+    if db_set.session.completed_at is not None:
+        finish_pending_jobs(db, current_user.id)
+    touched_exercises = {db_set.exercise_id}
+    counters_before = completed_session_deltas(db, db_set.session)
     for key, value in set_update.model_dump(exclude_unset=True).items():
         setattr(db_set, key, value)
+    touched_exercises.add(db_set.exercise_id)
 
+    sync_session_day(db, db_set.session)
+    sync_session_bests(db, db_set.session, touched_exercises)
+    sync_session_counters(db, db_set.session, counters_before)
+    invalidate_session_suggestions(db, db_set.session)
     db.commit()
+    bump_stats_version(current_user.id)
     db.refresh(db_set)
     return db_set
 
@@ -111,6 +136,16 @@ def delete_set(
     if not db_set:
         raise HTTPException(status_code=404, detail="Set not found")
 
+    db_session = db_set.session
+    if db_session.completed_at is not None:
+        finish_pending_jobs(db, current_user.id)
+    exercise_id = db_set.exercise_id
+    counters_before = completed_session_deltas(db, db_session)
     db.delete(db_set)
+    sync_session_day(db, db_session)
+    sync_session_bests(db, db_session, [exercise_id])
+    sync_session_counters(db, db_session, counters_before)
+    invalidate_session_suggestions(db, db_session)
     db.commit()
+    bump_stats_version(current_user.id)
     return {"ok": True}
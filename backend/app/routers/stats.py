@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.demo_snapshots import demo_response, demo_snapshots
 from app.models.session import Session as SessionModel, Set as SetModel
 from app.dependencies import get_current_user
 from app.models.user import User
+from app.models.user_daily_stats import UserDailyStats
+from app.downsample import lttb_indices
+from app.muscle_stats import muscle_volume
+from app.stats_cache import cached_stats
+from app.training_calendar import TrainingCalendar
+from app.training_history import default_bodyweight, load_training_history, nss_per_session
 from sqlalchemy import func, desc
-from typing import List, Dict, Any
-from datetime import datetime, timedelta, date
+from typing import List, Dict, Any, Literal, Optional
+from datetime import datetime, time, timedelta, timezone, date
+import numpy as np
 
 router = APIRouter(
     prefix="/api/stats",
@@ -18,284 +26,174 @@ def get_weekly_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # 1. Total Sessions
-    total_sessions = db.query(SessionModel).filter(
-        SessionModel.user_id == current_user.id,
-        SessionModel.completed_at.isnot(None)
-    ).count()
-
-    # 2. Total Volume (Lifetime)
-    # Join sessions and sets to ensure we only count sets from completed sessions of this user
-    # Volume = sum(weight_kg * reps) where weight_kg > 0
-    total_volume_query = db.query(func.sum(SetModel.weight_kg * SetModel.reps)).join(SessionModel).filter(
-        SessionModel.user_id == current_user.id,
-        SessionModel.completed_at.isnot(None),
-        func.coalesce(SetModel.set_type, "normal") == "normal",
-        SetModel.weight_kg > 0,
-        SetModel.reps > 0
-    )
-    total_volume = total_volume_query.scalar() or 0
-
-    # 3. Fetch session dates for charting and streaks
-    # Get all completed session dates, ordered by date desc
-    sessions_dates = db.query(SessionModel.completed_at).filter(
-        SessionModel.user_id == current_user.id,
-        SessionModel.completed_at.isnot(None)
-    ).order_by(desc(SessionModel.completed_at)).all()
-    
-    # Convert to list of datetime objects
-    dates = [s[0] for s in sessions_dates if s[0]]
-
-    # 4. Weekly Stats (Last 8 weeks)
-    # 0 = Current week, 1 = Last week, etc.
-    weekly_counts = [0] * 8
+    return cached_stats("weekly", current_user.id, (), lambda: _compute_weekly(db, current_user.id))
+
+
+def _compute_weekly(db, user_id: int):
+    # Everything here is answered from the user_daily_stats rollup (one row per
+    # training day) rather than from raw sessions/sets.
+
+    # 1. Lifetime totals: sessions, volume (normal sets only) and tracked duration
+    totals = db.query(
+        func.coalesce(func.sum(UserDailyStats.sessions), 0),
+        func.coalesce(func.sum(UserDailyStats.volume), 0),
+        func.coalesce(func.sum(UserDailyStats.duration_seconds), 0),
+        func.coalesce(func.sum(UserDailyStats.duration_sessions), 0),
+    ).filter(UserDailyStats.user_id == user_id).one()
+    total_sessions, total_volume, total_duration, duration_session_count = totals
+
+    # 2. Session counts per day for the streak lookback window (max 52 weeks)
     today = datetime.now().date()
     # Find start of current week (Monday)
     start_of_week = today - timedelta(days=today.weekday())
-    
-    weekly_counts = []
-    # Fill array [Week-7, ..., Week-0] (left to right = oldest to newest)
-    for i in range(7, -1, -1):
-        target_start = start_of_week - timedelta(weeks=i)
-        target_end = target_start + timedelta(days=6)
-        
-        count = sum(1 for d in dates if target_start <= d.date() <= target_end)
-        weekly_counts.append(count)
-
-    # 5. Daily Stats (Last 7 days)
-    daily_counts = [0] * 7
-    for i in range(7):
-        target_day = today - timedelta(days=6 - i)  # Index 6 is today, 0 is 6 days ago
-        daily_counts[i] = sum(1 for d in dates if d.date() == target_day)
-
-    # 6. Active Streak (Weeks)
-    streak_weeks = 0
-    
-    # Start checking backwards from the current week
-    for i in range(52):  # Max lookback is 52 weeks
-        target_start = start_of_week - timedelta(weeks=i)
-        target_end = target_start + timedelta(days=6)
-        
-        has_session = any(target_start <= d.date() <= target_end for d in dates)
-        
-        if has_session:
-            streak_weeks += 1
-        else:
-            # If current week has no session, it's allowed (streak from last week hasn't died yet)
-            if i == 0:
-                continue
-            break
-
-    # 7. Duration stats
-    duration_sessions = db.query(SessionModel).filter(
-        SessionModel.user_id == current_user.id,
-        SessionModel.completed_at.isnot(None),
-        SessionModel.duration_seconds.isnot(None),
-        SessionModel.duration_seconds > 0
+    lookback_start = start_of_week - timedelta(weeks=51)
+
+    day_rows = db.query(UserDailyStats.day, UserDailyStats.sessions).filter(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.day >= lookback_start,
     ).all()
-    total_duration = sum(s.duration_seconds for s in duration_sessions)
-    avg_duration = int(total_duration / len(duration_sessions)) if duration_sessions else 0
+    sessions_by_day = {day: count for day, count in day_rows}
+    calendar = TrainingCalendar.from_day_counts(sessions_by_day)
+
+    # 3. Weekly Stats (Last 8 weeks)
+    # Fill array [Week-7, ..., Week-0] (left to right = oldest to newest)
+    weekly_counts = [calendar.count(start_of_week - timedelta(weeks=i)) for i in range(7, -1, -1)]
+
+    # 4. Daily Stats (Last 7 days)
+    # Index 6 is today, 0 is 6 days ago
+    daily_counts = [sessions_by_day.get(today - timedelta(days=6 - i), 0) for i in range(7)]
+
+    # 5. Active Streak (Weeks) — an empty current week doesn't break it yet
+    streak_weeks = calendar.streak(today, max_weeks=52)
+
+    # 6. Duration stats
+    avg_duration = int(total_duration / duration_session_count) if duration_session_count else 0
 
     return {
-        "sessions": total_sessions,
+        "sessions": int(total_sessions),
         "volume": int(total_volume),
         "weekly_sessions": weekly_counts,
         "daily_sessions": daily_counts,
         "streak_weeks": streak_weeks,
-        "total_duration_seconds": total_duration,
+        "total_duration_seconds": int(total_duration),
         "avg_duration_seconds": avg_duration,
-        "tracked_duration_sessions": len(duration_sessions)
+        "tracked_duration_sessions": int(duration_session_count)
     }
 
 @router.get("/muscles")
 def get_muscle_stats(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: Literal["total", "week", "month"] = "total",
+    secondary_fraction: Optional[float] = Query(None, ge=0, le=1),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Returns volume and sets breakdown by muscle group."""
-    from app.models.exercise import Exercise
-
-    # Join sets -> sessions -> exercises, filter for completed sessions of this user
-    rows = (
-        db.query(
-            Exercise.muscle_group,
-            func.count(SetModel.id).label("total_sets"),
-            func.sum(
-                func.coalesce(SetModel.weight_kg, Exercise.default_weight_kg) *
-                func.coalesce(SetModel.reps, 0)
-            ).label("total_volume"),
-            func.count(func.distinct(SessionModel.id)).label("total_sessions")
-        )
-        .join(SessionModel, SetModel.session_id == SessionModel.id)
-        .join(Exercise, SetModel.exercise_id == Exercise.id)
-        .filter(
-            SessionModel.user_id == current_user.id,
-            SessionModel.completed_at.isnot(None),
-            func.coalesce(SetModel.set_type, "normal") == "normal",
-            SetModel.reps > 0
-        )
-        .group_by(Exercise.muscle_group)
-        .all()
+    """Returns sets / volume breakdown by muscle over whole weeks in [from, to].
+
+    Secondary muscles are credited at ``secondary_fraction`` (default
+    MUSCLE_SECONDARY_FRACTION). Answered from the weekly muscle rollup.
+    """
+    return cached_stats(
+        "muscles", current_user.id, (from_date, to_date, granularity, secondary_fraction),
+        lambda: muscle_volume(db, current_user.id, from_date, to_date, granularity, secondary_fraction),
     )
 
-    result = []
-    for row in rows:
-        result.append({
-            "muscle_group": row.muscle_group or "Other",
-            "total_sets": row.total_sets or 0,
-            "total_volume": int(row.total_volume or 0),
-            "total_sessions": row.total_sessions or 0,
-        })
 
-    result.sort(key=lambda x: x["total_volume"], reverse=True)
-    return result
+def _compute_progress(db, user_id: int, muscle_group: str = None, muscle: str = None, exercise_id: int = None,
+                      max_points: int = None):
+    """Shared NSS computation for both authenticated and demo progress.
 
-
-def _compute_progress(db, user_id: int, muscle_group: str = None, muscle: str = None, exercise_id: int = None):
-    """Shared NSS computation for both authenticated and demo progress."""
+    Loads every qualifying set (with its exercise attributes and session
+    bodyweight snapshot) in one query, then sums NSS per session with the
+    vectorized kernels in app.training_history.
+    """
     from app.models.exercise import Exercise
 
-    # Get all completed sessions for the user, ordered chronologically
-    sessions = (
-        db.query(SessionModel)
-        .filter(SessionModel.user_id == user_id, SessionModel.completed_at.isnot(None))
-        .order_by(SessionModel.completed_at.asc())
-        .all()
+    # Apply filters via exercise join
+    filters = []
+    if exercise_id:
+        filters.append(Exercise.id == exercise_id)
+    elif muscle:
+        filters.append(Exercise.muscle == muscle)
+    elif muscle_group:
+        filters.append(Exercise.muscle_group == muscle_group)
+
+    # Sessions without a bodyweight snapshot fall back to the profile weight
+    history = load_training_history(
+        db,
+        user_id,
+        filters=filters,
+        require_reps=True,
+        bodyweight_default=default_bodyweight(db, user_id),
     )
+    session_nss = nss_per_session(history)
 
-    # Get user bodyweight for BW exercises
-    user = db.query(User).filter(User.id == user_id).first()
-    if user and user.weight:
-        user_bw = float(user.weight)
-    elif user and user.gender == "female":
-        user_bw = 60.0
-    elif user and user.gender == "male":
-        user_bw = 70.0
-    else:
-        user_bw = 65.0
+    # session_number keeps counting every session when the series is downsampled
+    return [
+        {
+            "session_number": int(idx) + 1,
+            "date": history.session_completed_at[idx].isoformat() if history.session_completed_at[idx] else None,
+            "nss": round(float(session_nss[idx]), 1),
+        }
+        for idx in lttb_indices(session_nss, max_points)
+    ]
 
-    # Build exercise cache
-    exercise_cache = {}
 
-    result = []
-    for idx, session in enumerate(sessions):
-        # Override the base user_bw with the snapshot from the session, if it exists
-        session_bw = float(session.bodyweight_kg) if session.bodyweight_kg else user_bw
+EFFORT_TREND_MAX_RECENT = 40
+EFFORT_TREND_MAX_PAGE = 200
 
-        # Get sets for this session
-        sets_query = db.query(SetModel).filter(
-            SetModel.session_id == session.id,
-            SetModel.reps > 0,
-            func.coalesce(SetModel.set_type, "normal") == "normal",
-        )
 
-        # Apply filters via exercise join
-        if muscle_group or muscle or exercise_id:
-            sets_query = sets_query.join(Exercise, SetModel.exercise_id == Exercise.id)
-            if exercise_id:
-                sets_query = sets_query.filter(Exercise.id == exercise_id)
-            elif muscle:
-                sets_query = sets_query.filter(Exercise.muscle == muscle)
-            elif muscle_group:
-                sets_query = sets_query.filter(Exercise.muscle_group == muscle_group)
-
-        sets = sets_query.all()
-        if not sets:
-            continue
-
-        session_nss = 0.0
-        for s in sets:
-            # Cache exercise data
-            if s.exercise_id not in exercise_cache:
-                ex = db.query(Exercise).filter(Exercise.id == s.exercise_id).first()
-                exercise_cache[s.exercise_id] = ex
-            ex = exercise_cache[s.exercise_id]
-            if not ex:
-                continue
-
-            eff_reps = min(s.reps, 30)
-
-            weight = s.weight_kg or 0
-
-            if ex.is_bodyweight:
-                bw_ratio = ex.bw_ratio or 0.65
-                
-                if 'Assisted' in ex.name:
-                    if weight == 0:
-                        # Logged at 0kg assistance - treat as unassisted
-                        bw_ratio = 0.85 if 'Dip' in ex.name else 1.0
-                        effective_weight = session_bw * bw_ratio
-                    elif weight > 0:
-                        # Logged with assistance > 0. Weight represents reduction.
-                        effective_weight = max(0, session_bw - weight) * bw_ratio
-                    else:
-                        # Logged with negative weight (unusual for Assisted class, but theoretically reduced)
-                        effective_weight = max(0, session_bw + weight) * bw_ratio
-                else:
-                    if weight < 0:
-                        # Normal exercise, but negative weight implies band/assistance
-                        effective_weight = max(0, session_bw + weight) * bw_ratio
-                    else:
-                        # Normal exercise with pos weight = extra weighted plates
-                        effective_weight = (session_bw * bw_ratio) + weight
-
-                est_1rm = effective_weight * (1 + eff_reps / 30.0)
-                session_nss += est_1rm
-            else:
-                if weight <= 0:
-                    continue
-                df = ex.difficulty_factor or 1.0
-                est_1rm = weight * (1 + eff_reps / 30.0) * df
-                session_nss += est_1rm
-
-        result.append({
-            "session_number": len(result) + 1,
-            "date": session.completed_at.isoformat() if session.completed_at else None,
-            "nss": round(session_nss, 1),
-        })
-
-    return result
-
-
-def _compute_effort_trend(db, user_id: int, limit: int = 12) -> List[Dict[str, Any]]:
-    """Reusable effort trend points for any user (0-100 scale)."""
-    safe_limit = max(1, min(limit, 40))
-    rows = (
-        db.query(
-            SessionModel.completed_at,
-            SessionModel.effort_score,
-            SessionModel.self_rated_effort,
-        )
+def _compute_effort_trend(db, user_id: int, limit: int = 12, start: Optional[date] = None,
+                          end: Optional[date] = None, skip: int = 0) -> List[Dict[str, Any]]:
+    """Reusable effort trend points for any user (0-100 scale).
+
+    Default mode returns the last ``limit`` (max 40) scored sessions, oldest
+    first. Passing ``start`` and/or ``end`` switches to range mode: scored
+    sessions completed in [start, end], oldest first, one page of ``limit``
+    (max 200) points after ``skip``. Either way only the returned rows are
+    read, via the (user_id, completed_at) index.
+    """
+    # Self-rating fallback (1-10 -> 0-100) is resolved in SQL so unscored sessions can be skipped there
+    effort = func.coalesce(SessionModel.effort_score, SessionModel.self_rated_effort * 10.0)
+    query = (
+        db.query(SessionModel.completed_at, effort)
         .filter(
             SessionModel.user_id == user_id,
             SessionModel.completed_at.isnot(None),
+            effort.isnot(None),
         )
-        .order_by(SessionModel.completed_at.asc())
-        .all()
     )
 
-    points: List[Dict[str, Any]] = []
-    for completed_at, effort_score, self_rated_effort in rows:
-        effort_value = effort_score
-        if effort_value is None and self_rated_effort is not None:
-            effort_value = float(self_rated_effort) * 10.0
-        if effort_value is None:
-            continue
-
-        clamped = max(0.0, min(100.0, float(effort_value)))
-        points.append({
-            "date": completed_at.date().isoformat() if completed_at else None,
-            "effort": round(clamped, 1),
-        })
+    if start is None and end is None:
+        safe_limit = max(1, min(limit, EFFORT_TREND_MAX_RECENT))
+        rows = (
+            query.order_by(SessionModel.completed_at.desc(), SessionModel.id.desc())
+            .limit(safe_limit)
+            .all()
+        )[::-1]
+        offset = 0
+    else:
+        if start is not None:
+            query = query.filter(SessionModel.completed_at >= datetime.combine(start, time.min, tzinfo=timezone.utc))
+        if end is not None:
+            end_exclusive = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc)
+            query = query.filter(SessionModel.completed_at < end_exclusive)
+        offset = max(0, skip)
+        rows = (
+            query.order_by(SessionModel.completed_at.asc(), SessionModel.id.asc())
+            .offset(offset)
+            .limit(max(1, min(limit, EFFORT_TREND_MAX_PAGE)))
+            .all()
+        )
 
-    points = points[-safe_limit:]
     return [
         {
-            "index": idx + 1,
-            "date": point["date"],
-            "effort": point["effort"],
+            "index": offset + idx + 1,
+            "date": completed_at.date().isoformat() if completed_at else None,
+            "effort": round(max(0.0, min(100.0, float(effort_value))), 1),
         }
-        for idx, point in enumerate(points)
+        for idx, (completed_at, effort_value) in enumerate(rows)
     ]
 
 
@@ -304,32 +202,48 @@ def get_progress(
     muscle_group: str = None,
     muscle: str = None,
     exercise_id: int = None,
+    max_points: int = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Returns per-session NSS for the authenticated user."""
-    return _compute_progress(db, current_user.id, muscle_group, muscle, exercise_id)
+    """Returns per-session NSS for the authenticated user (optionally downsampled to max_points)."""
+    return cached_stats(
+        "progress", current_user.id, (muscle_group, muscle, exercise_id, max_points),
+        lambda: _compute_progress(db, current_user.id, muscle_group, muscle, exercise_id, max_points),
+    )
 
 
 @router.get("/effort")
 def get_effort_trend(
     limit: int = 12,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    skip: int = 0,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Returns recent session effort trend points for the authenticated user."""
-    return _compute_effort_trend(db, current_user.id, limit)
+    """Returns session effort trend points for the authenticated user.
+
+    Without ``from`` / ``to``: the last ``limit`` scored sessions. With a date
+    range: that range, paged by ``skip`` / ``limit``.
+    """
+    params = (limit, from_date, to_date, skip)
+    return cached_stats("effort", current_user.id, params, lambda: _compute_effort_trend(db, current_user.id, *params))
 
 
 @router.get("/cardio")
 def get_cardio_stats(
     days: int = 90,
     exercise_id: int = None,
+    max_points: int = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Returns cardio statistics: totals and trends for distance/pace."""
-    return _compute_cardio_stats(db, current_user.id, days, exercise_id)
+    return cached_stats(
+        "cardio", current_user.id, (days, exercise_id, max_points),
+        lambda: _compute_cardio_stats(db, current_user.id, days, exercise_id, max_points),
+    )
 
 
 def _compute_cardio_exercises(db, user_id: int, days: int = 100):
@@ -360,8 +274,12 @@ def _compute_cardio_exercises(db, user_id: int, days: int = 100):
     return [{"exercise_id": r.exercise_id, "name": r.name, "session_count": r.session_count} for r in rows]
 
 
-def _compute_cardio_stats(db, user_id: int, days: int = 90, exercise_id: int = None):
-    """Reusable cardio stats computation for any user."""
+def _compute_cardio_stats(db, user_id: int, days: int = 90, exercise_id: int = None, max_points: int = None):
+    """Reusable cardio stats computation for any user.
+
+    Totals always cover every set in the window; with ``max_points`` the
+    distance and pace trends are LTTB-downsampled to at most that many points.
+    """
     from app.models.exercise import Exercise
 
     cutoff = datetime.now() - timedelta(days=days)
@@ -391,20 +309,36 @@ def _compute_cardio_stats(db, user_id: int, days: int = 90, exercise_id: int = N
     total_distance = 0.0
     total_duration = 0
     total_sessions_set = set()
-    distance_trend = []
-    pace_trend = []
+    # Trend series as parallel columns; dicts are only built for the kept points
+    dates = []
+    names = []
+    distances = []
+    pace_rows = []
+    paces = []
 
     for row in rows:
         total_distance += row.distance_km
         total_duration += row.duration_sec or 0
         session_date = row.completed_at.date().isoformat() if row.completed_at else None
         total_sessions_set.add(session_date)
-        distance_trend.append({"date": session_date, "distance_km": round(row.distance_km, 2), "exercise": row.exercise_name})
+        dates.append(session_date)
+        names.append(row.exercise_name)
+        distances.append(row.distance_km)
         pace = row.avg_pace
         if not pace and row.duration_sec and row.distance_km > 0:
             pace = row.duration_sec / row.distance_km
         if pace:
-            pace_trend.append({"date": session_date, "avg_pace": round(pace, 1), "exercise": row.exercise_name})
+            pace_rows.append(len(dates) - 1)
+            paces.append(pace)
+
+    distance_trend = [
+        {"date": dates[i], "distance_km": round(distances[i], 2), "exercise": names[i]}
+        for i in lttb_indices(np.array(distances, dtype=np.float64), max_points)
+    ]
+    pace_trend = [
+        {"date": dates[pace_rows[i]], "avg_pace": round(paces[i], 1), "exercise": names[pace_rows[i]]}
+        for i in lttb_indices(np.array(paces, dtype=np.float64), max_points)
+    ]
 
     avg_pace = round(total_duration / total_distance, 1) if total_distance > 0 else None
     return {
@@ -424,52 +358,93 @@ def get_cardio_exercises(
     current_user: User = Depends(get_current_user),
 ):
     """Returns exercises the user has logged cardio sets for, sorted by session count."""
-    return _compute_cardio_exercises(db, current_user.id, days)
+    return cached_stats("cardio_exercises", current_user.id, (days,), lambda: _compute_cardio_exercises(db, current_user.id, days))
+
+
+# --- Demo endpoints (no auth) -------------------------------------------------
+# Served from in-memory snapshots (app.demo_snapshots); the builders below run
+# only at startup, on the scheduled refresh, or on the first request for a new
+# parameter combination.
+
+def _demo_user_id(db) -> Optional[int]:
+    row = db.query(User.id).filter(User.email == "demo@gymtracker.app").first()
+    return row[0] if row else None
+
+
+def _build_cardio_exercises_demo(db, days: int):
+    demo_user_id = _demo_user_id(db)
+    if demo_user_id is None:
+        return []
+    return _compute_cardio_exercises(db, demo_user_id, days)
+
+
+def _build_effort_trend_demo(db, limit: int, start: Optional[date], end: Optional[date], skip: int):
+    demo_user_id = _demo_user_id(db)
+    if demo_user_id is None:
+        return []
+    return _compute_effort_trend(db, demo_user_id, limit, start, end, skip)
+
+
+def _build_cardio_stats_demo(db, days: int, exercise_id: Optional[int], max_points: Optional[int]):
+    demo_user_id = _demo_user_id(db)
+    if demo_user_id is None:
+        return {"total_distance_km": 0, "total_duration_sec": 0, "total_sessions": 0, "avg_pace": None, "distance_trend": [], "pace_trend": []}
+    return _compute_cardio_stats(db, demo_user_id, days, exercise_id, max_points)
+
+
+def _build_progress_demo(db, muscle_group: Optional[str], muscle: Optional[str], exercise_id: Optional[int],
+                         max_points: Optional[int]):
+    demo_user_id = _demo_user_id(db)
+    if demo_user_id is None:
+        return []
+    return _compute_progress(db, demo_user_id, muscle_group, muscle, exercise_id, max_points)
+
+
+demo_snapshots.register("stats.cardio_exercises", _build_cardio_exercises_demo)
+demo_snapshots.register("stats.effort", _build_effort_trend_demo)
+demo_snapshots.register("stats.cardio", _build_cardio_stats_demo)
+demo_snapshots.register("stats.progress", _build_progress_demo)
 
 
 @router.get("/cardio/exercises/demo")
-def get_cardio_exercises_demo(days: int = 100, db: Session = Depends(get_db)):
+def get_cardio_exercises_demo(request: Request, days: int = 100, db: Session = Depends(get_db)):
     """Returns cardio exercises for the demo user (no auth required)."""
-    demo_user = db.query(User).filter(User.email == "demo@gymtracker.app").first()
-    if not demo_user:
-        return []
-    return _compute_cardio_exercises(db, demo_user.id, days)
+    return demo_response(request, db, "stats.cardio_exercises", (days,))
 
 
 @router.get("/effort/demo")
 def get_effort_trend_demo(
+    request: Request,
     limit: int = 12,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    skip: int = 0,
     db: Session = Depends(get_db),
 ):
-    """Returns recent effort trend points for the demo user (no auth required)."""
-    demo_user = db.query(User).filter(User.email == "demo@gymtracker.app").first()
-    if not demo_user:
-        return []
-    return _compute_effort_trend(db, demo_user.id, limit)
+    """Returns effort trend points for the demo user (no auth required)."""
+    return demo_response(request, db, "stats.effort", (limit, from_date, to_date, skip))
 
 
 @router.get("/cardio/demo")
 def get_cardio_stats_demo(
+    request: Request,
     days: int = 90,
     exercise_id: int = None,
+    max_points: int = None,
     db: Session = Depends(get_db),
 ):
     """Returns cardio stats for the demo user (no auth required)."""
-    demo_user = db.query(User).filter(User.email == "demo@gymtracker.app").first()
-    if not demo_user:
-        return {"total_distance_km": 0, "total_duration_sec": 0, "total_sessions": 0, "avg_pace": None, "distance_trend": [], "pace_trend": []}
-    return _compute_cardio_stats(db, demo_user.id, days, exercise_id)
+    return demo_response(request, db, "stats.cardio", (days, exercise_id, max_points))
 
 
 @router.get("/progress/demo")
 def get_progress_demo(
+    request: Request,
     muscle_group: str = None,
     muscle: str = None,
     exercise_id: int = None,
+    max_points: int = None,
     db: Session = Depends(get_db),
 ):
     """Returns per-session NSS for the demo user (no auth required)."""
-    demo_user = db.query(User).filter(User.email == "demo@gymtracker.app").first()
-    if not demo_user:
-        return []
-    return _compute_progress(db, demo_user.id, muscle_group, muscle, exercise_id)
+    return demo_response(request, db, "stats.progress", (muscle_group, muscle, exercise_id, max_points))
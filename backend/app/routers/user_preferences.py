@@ -7,6 +7,7 @@ from app.models.user_preference import UserPreference
 from pydantic import BaseModel
 from typing import Optional, List, Any
 from app.onboarding import apply_questionnaire_level
+from app.progression_suggestions import invalidate_suggestions
 
 router = APIRouter(prefix="/api/preferences", tags=["preferences"])
 
@@ -71,6 +72,10 @@ def update_preferences(
 
     if prefs.context_level is not None:
         apply_questionnaire_level(current_user, prefs.context_level)
+
+    # The experience tier sets how many sessions at the top of the range earn a weight increase
+    if "experience_level" in update_data:
+        invalidate_suggestions(db, current_user.id)
         
     db.commit()
     db.refresh(pref)
@@ -9,6 +9,7 @@ from app.dependencies import get_current_user
 from app.models.user import User
 from app.models.weight_log import WeightLog
 from app.schemas import WeightLogCreate, WeightLogResponse
+from app.stats_cache import bump_stats_version
 
 router = APIRouter(prefix="/api/weight", tags=["weight"])
 
@@ -30,6 +31,7 @@ def log_weight(
     # Keep User.weight in sync (round to int for backward compat)
     current_user.weight = round(data.weight_kg)
     db.commit()
+    bump_stats_version(current_user.id)
     db.refresh(entry)
     return entry
 
@@ -142,6 +144,7 @@ def update_weight_log(
     if data.measured_at:
         entry.measured_at = data.measured_at
     db.commit()
+    bump_stats_version(current_user.id)
     db.refresh(entry)
     return {"id": entry.id, "weight_kg": entry.weight_kg, "measured_at": entry.measured_at.isoformat(), "source": entry.source}
 
@@ -214,4 +217,5 @@ def delete_weight_log(
         raise HTTPException(status_code=404, detail="Weight log not found")
     db.delete(entry)
     db.commit()
+    bump_stats_version(current_user.id)
     return {"message": "Deleted"}
@@ -0,0 +1,195 @@
+"""Routine-cycle progress (``routine_cycle_states``).
+
+A routine cycle is complete once every day of the routine has a completed
+session since the last ``RoutineCompletion``. Instead of re-reading those
+sessions on every completion, each (user, routine) keeps a bitmask of the
+day indices done in the current cycle: a completion ORs in its day and
+checks the mask against the routine's days; closing a cycle records the
+completion and starts an empty mask. Deleting a session clears its bit (a
+point lookup checks no other session of the cycle did that day), and
+deleting the session that closed the latest cycle restores the previous
+mask.
+
+A state is created from the routine's history (one scan) the first time
+one of its sessions is completed after this table was introduced; sessions
+whose award job hasn't run yet are left for that job.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session as DBSession
+
+from app.gamification_outbox import without_pending_award
+from app.models.routine import Routine
+from app.models.routine_completion import RoutineCompletion
+from app.models.routine_cycle_state import RoutineCycleState
+from app.models.session import Session as SessionModel
+
+
+def _bit(day_index: Optional[int]) -> int:
+    return 1 << day_index if day_index is not None and day_index >= 0 else 0
+
+
+def _full_mask(total_days: int) -> int:
+    return (1 << total_days) - 1
+
+
+def _days_mask(db: DBSession, user_id: int, routine_id: int, after: Optional[datetime],
+               until: Optional[datetime] = None, exclude_session_id: Optional[int] = None) -> int:
+    query = db.query(SessionModel.day_index).filter(
+        SessionModel.user_id == user_id,
+        SessionModel.routine_id == routine_id,
+        SessionModel.completed_at.isnot(None),
+        without_pending_award(),
+    )
+    if exclude_session_id is not None:
+        query = query.filter(SessionModel.id != exclude_session_id)
+    if after is not None:
+        query = query.filter(SessionModel.completed_at > after)
+    if until is not None:
+        query = query.filter(SessionModel.completed_at <= until)
+    mask = 0
+    for (day_index,) in query:
+        mask |= _bit(day_index)
+    return mask
+
+
+def rebuild_routine_cycle(db: DBSession, user_id: int, routine_id: int,
+                          exclude_session_id: Optional[int] = None) -> RoutineCycleState:
+    """Recompute a routine's cycle state from its completions and sessions. Caller commits.
+
+    ``exclude_session_id`` leaves out a session that is about to be deleted.
+    Sessions whose gamification job is still pending are left out too: the
+    job folds its day in when it runs.
+    """
+    db.flush()
+    starts = [
+        completed_at for (completed_at,) in db.query(RoutineCompletion.completed_at).filter(
+            RoutineCompletion.user_id == user_id,
+            RoutineCompletion.routine_id == routine_id,
+        ).order_by(RoutineCompletion.completed_at.desc()).limit(2)
+    ]
+    started_at = starts[0] if starts else None
+    prev_started_at = starts[1] if len(starts) > 1 else None
+
+    state = db.get(RoutineCycleState, (user_id, routine_id))
+    if state is None:
+        state = RoutineCycleState(user_id=user_id, routine_id=routine_id)
+        db.add(state)
+    state.day_mask = _days_mask(db, user_id, routine_id, started_at, exclude_session_id=exclude_session_id)
+    state.cycle_started_at = started_at
+    state.prev_cycle_started_at = prev_started_at
+    state.prev_day_mask = (
+        _days_mask(db, user_id, routine_id, prev_started_at, started_at, exclude_session_id)
+        if started_at else None
+    )
+    return state
+
+
+def _load_state(db: DBSession, user_id: int, routine_id: int) -> RoutineCycleState:
+    db.flush()
+    state = db.get(RoutineCycleState, (user_id, routine_id))
+    return state if state is not None else rebuild_routine_cycle(db, user_id, routine_id)
+
+
+def record_cycle_day(db: DBSession, session_obj: SessionModel) -> bool:
+    """Fold a newly completed session into its routine's cycle. Returns True if it closed the cycle.
+
+    Closing records the RoutineCompletion and starts a new cycle. Caller commits.
+    """
+    if not session_obj or not session_obj.routine_id:
+        return False
+    routine = db.get(Routine, session_obj.routine_id)
+    if not routine or not routine.days:
+        return False
+    full = _full_mask(len(routine.days))
+
+    state = _load_state(db, session_obj.user_id, routine.id)
+    mask = state.day_mask | _bit(session_obj.day_index)
+    if mask & full != full:
+        state.day_mask = mask
+        return False
+
+    # All days completed! Record the completion using an explicit Python timestamp
+    # so the microsecond precision is consistent with session completed_at values.
+    completed_at = datetime.now(timezone.utc)
+    db.add(RoutineCompletion(user_id=session_obj.user_id, routine_id=routine.id, completed_at=completed_at))
+    state.prev_day_mask = state.day_mask
+    state.prev_cycle_started_at = state.cycle_started_at
+    state.day_mask = 0
+    state.cycle_started_at = completed_at
+    return True
+
+
+def _same_day_elsewhere(db: DBSession, session_obj: SessionModel,
+                        after: Optional[datetime], until: Optional[datetime] = None) -> bool:
+    """Whether another completed session did this day of the routine within (after, until]."""
+    conditions = [
+        SessionModel.user_id == session_obj.user_id,
+        SessionModel.routine_id == session_obj.routine_id,
+        SessionModel.day_index == session_obj.day_index,
+        SessionModel.completed_at.isnot(None),
+        SessionModel.id != session_obj.id,
+    ]
+    if after is not None:
+        conditions.append(SessionModel.completed_at > after)
+    if until is not None:
+        conditions.append(SessionModel.completed_at <= until)
+    return db.query(exists().where(*conditions)).scalar()
+
+
+def _after(completed_at: datetime, start: Optional[datetime]) -> bool:
+    return start is None or _utc(completed_at) > _utc(start)
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def remove_cycle_day(db: DBSession, session_obj: SessionModel, closed_cycle: bool) -> None:
+    """Take a completed session out of its routine's cycle (call before deleting it). Caller commits.
+
+    ``closed_cycle`` is whether the session's award closed a cycle; that
+    cycle's RoutineCompletion is deleted and, if it was the latest, the cycle
+    is reopened with the other sessions it had.
+    """
+    if session_obj.routine_id is None or session_obj.completed_at is None:
+        return
+    state = db.get(RoutineCycleState, (session_obj.user_id, session_obj.routine_id))
+
+    if closed_cycle:
+        completion = db.query(RoutineCompletion).filter(
+            RoutineCompletion.user_id == session_obj.user_id,
+            RoutineCompletion.routine_id == session_obj.routine_id,
+            RoutineCompletion.completed_at >= _utc(session_obj.completed_at),
+        ).order_by(RoutineCompletion.completed_at.asc()).first()
+        if completion is None:
+            return
+        db.delete(completion)
+        if state is None:
+            return
+        if state.cycle_started_at is not None and _utc(completion.completed_at) == _utc(state.cycle_started_at):
+            if state.prev_day_mask is None:
+                rebuild_routine_cycle(db, session_obj.user_id, session_obj.routine_id, session_obj.id)
+                return
+            # Reopen: the closed cycle's other days plus whatever has been done since
+            state.day_mask |= state.prev_day_mask
+            state.cycle_started_at = state.prev_cycle_started_at
+            state.prev_day_mask = None
+            state.prev_cycle_started_at = None
+        else:
+            state.prev_day_mask = None  # an older cycle merged into the previous one
+        return
+
+    if state is None or session_obj.day_index is None:
+        return
+    if _after(session_obj.completed_at, state.cycle_started_at):
+        if not _same_day_elsewhere(db, session_obj, state.cycle_started_at):
+            state.day_mask &= ~_bit(session_obj.day_index)
+    elif state.prev_day_mask is not None and _after(session_obj.completed_at, state.prev_cycle_started_at):
+        if not _same_day_elsewhere(db, session_obj, state.prev_cycle_started_at, state.cycle_started_at):
+            state.prev_day_mask &= ~_bit(session_obj.day_index)
+
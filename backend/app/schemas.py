@@ -235,3 +235,8 @@ class SyncEventCreate(BaseModel):
     event_type: str = Field(max_length=50)
     payload: Dict[str, Any]
     client_timestamp: datetime
+
+# Admin
+class GamificationReplayRequest(BaseModel):
+    dry_run: bool = True
+    user_ids: Optional[List[int]] = Field(default=None, max_length=1000)
@@ -12,7 +12,12 @@ from app.models.session import Session, Set
 from app.models.routine import Routine
 from app.models.quest import Quest, UserQuest
 from app.models.weight_log import WeightLog
+from app.models.reward_ledger import RewardLedgerEntry
 from app.gamification import exp_for_next_level
+from app.daily_stats import rebuild_user_daily_stats
+from app.exercise_bests import rebuild_user_exercise_bests
+from app.quest_counters import rebuild_user_quest_counters
+from app.reward_ledger import record_opening_balance
 from app.auth import get_password_hash
 
 DEMO_EMAIL = "demo@gymtracker.app"
@@ -70,6 +75,7 @@ def seed_demo():
         db.query(Routine).filter(Routine.user_id == demo_user.id).delete()
         db.query(UserQuest).filter(UserQuest.user_id == demo_user.id).delete()
         db.query(WeightLog).filter(WeightLog.user_id == demo_user.id).delete()
+        db.query(RewardLedgerEntry).filter(RewardLedgerEntry.user_id == demo_user.id).delete()
         db.commit()
         demo_user.is_demo = True
         demo_user.weight = 78
@@ -244,6 +250,10 @@ def seed_demo():
         current_date += timedelta(days=1)
 
     db.commit()
+    rebuild_user_daily_stats(db, demo_user.id)
+    rebuild_user_exercise_bests(db, demo_user.id)
+    rebuild_user_quest_counters(db, demo_user.id)
+    db.commit()
 
     # ── Weekly body weight logs ─────────────────────────────────────────
     # Realistic: starts ~81 kg, slight downward trend to ~77.5 over 6 months
@@ -282,6 +292,8 @@ def seed_demo():
     demo_user.level = level
     demo_user.experience = remaining_xp
     demo_user.currency = coins + 20
+    demo_user.quest_week = None  # every quest is seeded below; the next read rotates to this week's group
+    record_opening_balance(db, demo_user)
     db.commit()
 
     all_quests = db.query(Quest).all()
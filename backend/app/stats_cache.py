@@ -0,0 +1,111 @@
+"""
+In-memory cache for per-user /api/stats responses.
+
+Entries are keyed by (endpoint, query params, user data version) and held in
+an LRU with a TTL. The version is a per-user counter bumped by every write
+that can change what the stats endpoints report (sessions, sets, bodyweight,
+quest claims), so a repeated dashboard load after no writes is answered
+without touching the database, and any write makes the previous entries
+unreachable.
+
+The cache is process-local: the API runs a single uvicorn worker. The TTL
+bounds staleness for inputs that are not versioned (e.g. "today" rolling
+over for the weekly view, admin edits to the exercise catalog).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from prometheus_client import Counter
+
+from app.config import get_env
+
+STATS_CACHE_MAX_ENTRIES = int(get_env("STATS_CACHE_MAX_ENTRIES", "2048"))
+STATS_CACHE_TTL_SECONDS = float(get_env("STATS_CACHE_TTL_SECONDS", "300"))
+
+# Exported on /metrics by the app-wide Prometheus instrumentator (default registry).
+STATS_CACHE_HITS = Counter(
+    "stats_cache_hits_total",
+    "Stats responses served from the in-memory cache",
+    ["endpoint"],
+)
+STATS_CACHE_MISSES = Counter(
+    "stats_cache_misses_total",
+    "Stats responses computed because no fresh cache entry existed",
+    ["endpoint"],
+)
+
+
+class StatsCache:
+    """Thread-safe LRU + TTL map of computed stats responses."""
+
+    def __init__(self, max_entries: int = STATS_CACHE_MAX_ENTRIES, ttl_seconds: float = STATS_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+stats_cache = StatsCache()
+
+
+def bump_stats_version(user_id: int) -> None:
+    """Invalidate every cached stats response of this user.
+
+    Call after the write has been committed, so a concurrent reader can never
+    store pre-write results under the new version.
+    """
+    stats_cache.bump(user_id)
+
+
+def cached_stats(endpoint: str, user_id: int, params: tuple, compute: Callable[[], Any]) -> Any:
+    """Return the cached response for (endpoint, params) at the user's current
+    data version, computing and storing it on a miss."""
+    key = (endpoint, user_id, stats_cache.version(user_id), params)
+    hit, value = stats_cache.get(key)
+    if hit:
+        STATS_CACHE_HITS.labels(endpoint=endpoint).inc()
+        return value
+    STATS_CACHE_MISSES.labels(endpoint=endpoint).inc()
+    value = compute()
+    stats_cache.put(key, value)
+    return value
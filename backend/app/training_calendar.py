@@ -0,0 +1,113 @@
+"""
+Per-user training calendar: ISO week → session count.
+
+Streaks, weekly XP caps, the streak flame row and consistency metrics all
+bucket session timestamps into Monday-based UTC weeks. Building that bucket
+map once (one pass over the timestamps) lets each of them answer with a walk
+over weeks instead of re-scanning every session date per week.
+
+Gamification reads the calendar built from ``streak_eligible_at`` (immutable,
+set once on first completion); stats and progress summaries build theirs
+from ``completed_at`` with the same helpers.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.session import Session as SessionModel
+
+
+def week_monday(d: date | datetime) -> date:
+    """Monday of the ISO week containing ``d`` (datetimes are taken in UTC)."""
+    if isinstance(d, datetime):
+        d = (d.replace(tzinfo=timezone.utc) if d.tzinfo is None else d.astimezone(timezone.utc)).date()
+    return d - timedelta(days=d.weekday())
+
+
+def week_str(d: date | datetime) -> str:
+    """ISO week label, e.g. '2026-W13'."""
+    iso = week_monday(d).isocalendar()
+    return f"{iso[0]}-W{iso[1]:02d}"
+
+
+class TrainingCalendar:
+    """Session counts per ISO week, keyed by the week's Monday."""
+
+    def __init__(self, week_counts: Mapping[date, int]):
+        self.week_counts = {monday: count for monday, count in week_counts.items() if count > 0}
+        self._run_lengths: Optional[dict[date, int]] = None
+
+    @classmethod
+    def from_datetimes(cls, values: Iterable[Optional[datetime]]) -> "TrainingCalendar":
+        return cls(Counter(week_monday(v) for v in values if v is not None))
+
+    @classmethod
+    def from_day_counts(cls, day_counts: Mapping[date, int]) -> "TrainingCalendar":
+        weeks: Counter = Counter()
+        for day, count in day_counts.items():
+            weeks[week_monday(day)] += count
+        return cls(weeks)
+
+    def without(self, d: Optional[date | datetime]) -> "TrainingCalendar":
+        """This calendar minus one session at ``d`` (e.g. one about to be deleted)."""
+        if d is None:
+            return self
+        counts = dict(self.week_counts)
+        monday = week_monday(d)
+        counts[monday] = counts.get(monday, 0) - 1
+        return TrainingCalendar(counts)
+
+    def count(self, d: date | datetime) -> int:
+        """Sessions in the week containing ``d``."""
+        return self.week_counts.get(week_monday(d), 0)
+
+    def has_sessions(self, d: date | datetime) -> bool:
+        return week_monday(d) in self.week_counts
+
+    def week_strs(self) -> list[str]:
+        """All weeks with at least one session, oldest first."""
+        return [week_str(monday) for monday in sorted(self.week_counts)]
+
+    def run_length(self, d: date | datetime) -> int:
+        """Consecutive active weeks ending at the week containing ``d`` (0 if it is empty)."""
+        if self._run_lengths is None:
+            runs: dict[date, int] = {}
+            for monday in sorted(self.week_counts):
+                runs[monday] = runs.get(monday - timedelta(weeks=1), 0) + 1
+            self._run_lengths = runs
+        return self._run_lengths.get(week_monday(d), 0)
+
+    def streak(self, today: date | datetime, max_weeks: int = 52, current_week_grace: bool = True,
+               current_week_covered: bool = False) -> int:
+        """Consecutive active weeks looking back from the week of ``today``.
+
+        With ``current_week_grace`` an empty current week doesn't end the
+        streak (it hasn't died until the week is over); ``current_week_covered``
+        counts it anyway (e.g. saved by a joker). At most ``max_weeks`` weeks
+        are inspected, current week included.
+        """
+        current = week_monday(today)
+        streak = 0
+        for i in range(max_weeks):
+            if current - timedelta(weeks=i) in self.week_counts:
+                streak += 1
+            elif i == 0 and current_week_grace:
+                if current_week_covered:
+                    streak += 1
+            else:
+                break
+        return streak
+
+
+def load_training_calendar(db: DBSession, user_id: int) -> TrainingCalendar:
+    """Calendar of the user's streak-eligible sessions (one single-column query)."""
+    return TrainingCalendar.from_datetimes(
+        d for (d,) in db.query(SessionModel.streak_eligible_at).filter(
+            SessionModel.user_id == user_id,
+            SessionModel.streak_eligible_at.isnot(None),
+        )
+    )
@@ -0,0 +1,307 @@
+"""
+Columnar training history + vectorized scoring kernels.
+
+Loads a user's sets in one query into flat NumPy columns (one entry per set,
+indexed into per-session and per-exercise attribute arrays) so that est-1RM,
+NSS, volume and per-session aggregates are computed as array operations
+instead of loops over thousands of ORM ``Set`` instances.
+
+Shared by stats (NSS progress) and effort scoring (session volume and
+per-session aggregates).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.exercise import Exercise
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user import User
+
+# Reps above this count no further towards est-1RM (Epley beyond ~30 is noise).
+MAX_EFFECTIVE_REPS = 30
+
+# Per-exercise flag bits derived from the exercise name.
+EX_ASSISTED = 1  # "Assisted ..." — logged weight is assistance, not load
+EX_DIP = 2       # dips use a lower unassisted bw_ratio
+
+
+@dataclass
+class TrainingHistory:
+    """Flat, column-oriented view of a user's sets.
+
+    Sessions are ordered chronologically (completed_at, id); sets keep that
+    order, so per-session reductions see sets in the same order a row loop
+    would. Missing numeric values are NaN.
+    """
+    # Per session
+    session_ids: np.ndarray          # int64
+    session_completed_at: list       # datetime | None, parallel to session_ids
+    # Per exercise
+    exercise_ids: np.ndarray         # int64
+    ex_known: np.ndarray             # bool — False when the Exercise row is missing
+    ex_is_bodyweight: np.ndarray     # bool
+    ex_bw_ratio: np.ndarray          # float64 (NaN = unset)
+    ex_difficulty: np.ndarray        # float64 (NaN = unset)
+    ex_flags: np.ndarray             # uint8, EX_* bits
+    # Per set
+    session_idx: np.ndarray          # int32 → session_ids
+    exercise_idx: np.ndarray         # int32 → exercise_ids
+    weight: np.ndarray               # float64
+    reps: np.ndarray                 # float64
+    bodyweight: np.ndarray           # float64, session snapshot or default
+    distance_km: np.ndarray          # float64
+    duration_sec: np.ndarray         # float64
+    to_failure: np.ndarray           # bool
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.session_ids)
+
+    @property
+    def n_exercises(self) -> int:
+        return len(self.exercise_ids)
+
+    @property
+    def n_sets(self) -> int:
+        return len(self.session_idx)
+
+
+def default_bodyweight(db: DBSession, user_id: int) -> float:
+    """Profile bodyweight, or a gender-based fallback when none is recorded."""
+    user = db.query(User.weight, User.gender).filter(User.id == user_id).first()
+    if user and user.weight:
+        return float(user.weight)
+    if user and user.gender == "female":
+        return 60.0
+    if user and user.gender == "male":
+        return 70.0
+    return 65.0
+
+
+def _exercise_flags(name: str | None) -> int:
+    flags = 0
+    if name and "Assisted" in name:
+        flags |= EX_ASSISTED
+    if name and "Dip" in name:
+        flags |= EX_DIP
+    return flags
+
+
+def _floats(values: list) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def load_training_history(
+    db: DBSession,
+    user_id: int,
+    *,
+    session_ids: Optional[Iterable[int]] = None,
+    exercise_ids: Optional[Iterable[int]] = None,
+    routine_id: Optional[int] = None,
+    filters: Iterable = (),
+    normal_only: bool = True,
+    require_reps: bool = False,
+    bodyweight_default: Optional[float] = None,
+) -> TrainingHistory:
+    """Load the user's sets from completed sessions into a TrainingHistory (one query).
+
+    ``filters`` are extra SQLAlchemy criteria (e.g. on ``Exercise.muscle``).
+    ``bodyweight_default`` fills sessions without a bodyweight snapshot.
+    """
+    query = (
+        db.query(
+            SetModel.session_id,
+            SessionModel.completed_at,
+            SessionModel.bodyweight_kg,
+            SetModel.exercise_id,
+            Exercise.id.label("known_exercise_id"),
+            Exercise.name,
+            Exercise.is_bodyweight,
+            Exercise.bw_ratio,
+            Exercise.difficulty_factor,
+            SetModel.weight_kg,
+            SetModel.reps,
+            SetModel.distance_km,
+            SetModel.duration_sec,
+            SetModel.to_failure,
+        )
+        .join(SessionModel, SetModel.session_id == SessionModel.id)
+        .outerjoin(Exercise, SetModel.exercise_id == Exercise.id)
+        .filter(
+            SessionModel.user_id == user_id,
+            SessionModel.completed_at.isnot(None),
+        )
+    )
+    if session_ids is not None:
+        query = query.filter(SetModel.session_id.in_(list(session_ids)))
+    if exercise_ids is not None:
+        query = query.filter(SetModel.exercise_id.in_(list(exercise_ids)))
+    if routine_id is not None:
+        query = query.filter(SessionModel.routine_id == routine_id)
+    if normal_only:
+        query = query.filter(sa_func.coalesce(SetModel.set_type, "normal") == "normal")
+    if require_reps:
+        query = query.filter(SetModel.reps > 0)
+    for criterion in filters:
+        query = query.filter(criterion)
+    query = query.order_by(SessionModel.completed_at.asc(), SessionModel.id.asc(), SetModel.id.asc())
+
+    session_pos: dict[int, int] = {}
+    session_completed_at: list[Optional[datetime]] = []
+    session_bw: list[float] = []
+    exercise_pos: dict[int, int] = {}
+    ex_rows: list[tuple] = []
+
+    set_session: list[int] = []
+    set_exercise: list[int] = []
+    weights: list = []
+    reps: list = []
+    distances: list = []
+    durations: list = []
+    failures: list[bool] = []
+
+    for row in query.yield_per(2000):
+        s_idx = session_pos.get(row.session_id)
+        if s_idx is None:
+            s_idx = session_pos[row.session_id] = len(session_completed_at)
+            session_completed_at.append(row.completed_at)
+            bw = float(row.bodyweight_kg) if row.bodyweight_kg else bodyweight_default
+            session_bw.append(np.nan if bw is None else bw)
+
+        e_idx = exercise_pos.get(row.exercise_id)
+        if e_idx is None:
+            e_idx = exercise_pos[row.exercise_id] = len(ex_rows)
+            ex_rows.append((
+                row.known_exercise_id is not None,
+                bool(row.is_bodyweight),
+                row.bw_ratio,
+                row.difficulty_factor,
+                _exercise_flags(row.name),
+            ))
+
+        set_session.append(s_idx)
+        set_exercise.append(e_idx)
+        weights.append(row.weight_kg)
+        reps.append(row.reps)
+        distances.append(row.distance_km)
+        durations.append(row.duration_sec)
+        failures.append(bool(row.to_failure))
+
+    session_idx = np.array(set_session, dtype=np.int32)
+    return TrainingHistory(
+        session_ids=np.array(list(session_pos), dtype=np.int64),
+        session_completed_at=session_completed_at,
+        exercise_ids=np.array(list(exercise_pos), dtype=np.int64),
+        ex_known=np.array([r[0] for r in ex_rows], dtype=bool),
+        ex_is_bodyweight=np.array([r[1] for r in ex_rows], dtype=bool),
+        ex_bw_ratio=_floats([r[2] for r in ex_rows]),
+        ex_difficulty=_floats([r[3] for r in ex_rows]),
+        ex_flags=np.array([r[4] for r in ex_rows], dtype=np.uint8),
+        session_idx=session_idx,
+        exercise_idx=np.array(set_exercise, dtype=np.int32),
+        weight=_floats(weights),
+        reps=_floats(reps),
+        bodyweight=np.array(session_bw, dtype=np.float64)[session_idx],
+        distance_km=_floats(distances),
+        duration_sec=_floats(durations),
+        to_failure=np.array(failures, dtype=bool),
+    )
+
+
+# ── Kernels ─────────────────────────────────────────────────────────────────
+
+def est_1rm(h: TrainingHistory) -> np.ndarray:
+    """Per-set NSS contribution (Epley est-1RM, difficulty / bodyweight adjusted).
+
+    NaN marks sets that don't contribute: unknown exercise, or a weighted
+    exercise logged at ≤ 0 kg. Bodyweight exercises use the session's
+    bodyweight × ``bw_ratio``; for "Assisted" variants positive weight is
+    assistance, and 0 kg means unassisted (ratio 1.0, or 0.85 for dips).
+    """
+    if h.n_sets == 0:
+        return np.zeros(0)
+
+    ex = h.exercise_idx
+    weight = np.nan_to_num(h.weight, nan=0.0)
+    rep_factor = 1 + np.minimum(np.nan_to_num(h.reps, nan=0.0), MAX_EFFECTIVE_REPS) / 30.0
+    bw = h.bodyweight
+
+    # `ratio or default` semantics: NaN and 0 both fall back.
+    ratio = h.ex_bw_ratio[ex]
+    ratio = np.where(np.isnan(ratio) | (ratio == 0), 0.65, ratio)
+    df = h.ex_difficulty[ex]
+    df = np.where(np.isnan(df) | (df == 0), 1.0, df)
+    flags = h.ex_flags[ex]
+    assisted = (flags & EX_ASSISTED) != 0
+    unassisted_ratio = np.where((flags & EX_DIP) != 0, 0.85, 1.0)
+
+    reduced = np.maximum(0, bw - weight) * ratio   # weight = assistance
+    banded = np.maximum(0, bw + weight) * ratio    # negative weight = band / assistance
+    loaded = (bw * ratio) + weight                 # positive weight = added plates
+
+    assisted_eff = np.where(weight == 0, bw * unassisted_ratio, np.where(weight > 0, reduced, banded))
+    plain_eff = np.where(weight < 0, banded, loaded)
+    bw_est = np.where(assisted, assisted_eff, plain_eff) * rep_factor
+
+    weighted_est = np.where(weight > 0, weight * rep_factor * df, np.nan)
+
+    out = np.where(h.ex_is_bodyweight[ex], bw_est, weighted_est)
+    out[~h.ex_known[ex]] = np.nan
+    return out
+
+
+def nss_per_session(h: TrainingHistory) -> np.ndarray:
+    """Sum of est-1RM per session (float64, aligned with ``h.session_ids``)."""
+    contrib = np.nan_to_num(est_1rm(h), nan=0.0)
+    return np.bincount(h.session_idx, weights=contrib, minlength=h.n_sessions)
+
+
+def session_volume(h: TrainingHistory) -> np.ndarray:
+    """Σ weight × reps per session over sets with reps > 0 (aligned with ``h.session_ids``)."""
+    reps = np.nan_to_num(h.reps, nan=0.0)
+    contrib = np.where(reps > 0, np.nan_to_num(h.weight, nan=0.0) * reps, 0.0)
+    return np.bincount(h.session_idx, weights=contrib, minlength=h.n_sessions)
+
+
+@dataclass
+class SessionExerciseStats:
+    """One entry per (session, exercise) pair that has sets, in chronological order."""
+    session_idx: np.ndarray
+    exercise_idx: np.ndarray
+    set_count: np.ndarray
+    max_weight: np.ndarray   # max(weight or 0)
+    max_reps: np.ndarray     # max(reps or 0)
+    reps_sum: np.ndarray     # Σ (reps or 0)
+    distance_sum: np.ndarray  # Σ (distance_km or 0)
+    duration_sum: np.ndarray  # Σ (duration_sec or 0)
+
+
+def session_exercise_stats(h: TrainingHistory) -> SessionExerciseStats:
+    """Per-(session, exercise) aggregates used by effort scoring."""
+    key = h.session_idx.astype(np.int64) * max(h.n_exercises, 1) + h.exercise_idx
+    groups, group_of_set = np.unique(key, return_inverse=True)
+    n = len(groups)
+
+    weight = np.nan_to_num(h.weight, nan=0.0)
+    reps = np.nan_to_num(h.reps, nan=0.0)
+    max_weight = np.full(n, -np.inf)
+    max_reps = np.full(n, -np.inf)
+    np.maximum.at(max_weight, group_of_set, weight)
+    np.maximum.at(max_reps, group_of_set, reps)
+
+    return SessionExerciseStats(
+        session_idx=(groups // max(h.n_exercises, 1)).astype(np.int32),
+        exercise_idx=(groups % max(h.n_exercises, 1)).astype(np.int32),
+        set_count=np.bincount(group_of_set, minlength=n),
+        max_weight=max_weight,
+        max_reps=max_reps,
+        reps_sum=np.bincount(group_of_set, weights=reps, minlength=n),
+        distance_sum=np.bincount(group_of_set, weights=np.nan_to_num(h.distance_km, nan=0.0), minlength=n),
+        duration_sum=np.bincount(group_of_set, weights=np.nan_to_num(h.duration_sec, nan=0.0), minlength=n),
+    )
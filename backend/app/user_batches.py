@@ -0,0 +1,49 @@
+"""Batching for the per-user maintenance jobs (effort score backfill, gamification replay).
+
+Users are handled in batches of ``batch_size``, each in its own session and
+transaction, either in-process or across a process pool (``--workers``).
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, TypeVar
+
+DEFAULT_BATCH_SIZE = 500
+
+T = TypeVar("T")
+
+
+def batches(user_ids: list[int], batch_size: int) -> Iterable[list[int]]:
+    for start in range(0, len(user_ids), batch_size):
+        yield user_ids[start:start + batch_size]
+
+
+def _init_worker() -> None:
+    # Connections inherited from the parent must not be shared across processes
+    from app.database import engine
+    engine.dispose(close=False)
+
+
+def _run_batch(handle: Callable[..., T], user_ids: list[int], dry_run: bool) -> T:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return handle(db, user_ids, dry_run=dry_run)
+    finally:
+        db.close()
+
+
+def run_in_processes(handle: Callable[..., T], user_ids: list[int], dry_run: bool,
+                     workers: int, batch_size: int = DEFAULT_BATCH_SIZE) -> list[T]:
+    """``handle(db, batch, dry_run=...)`` for each batch, across ``workers`` processes. Results in batch order.
+
+    ``handle`` must be a module-level function so it can be sent to the workers.
+    """
+    chunks = list(batches(user_ids, batch_size))
+    if workers <= 1:
+        return [_run_batch(handle, chunk, dry_run) for chunk in chunks]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(partial(_run_batch, handle), chunks, [dry_run] * len(chunks)))
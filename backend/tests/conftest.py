@@ -33,7 +33,11 @@ def db_engine():
     """Engine + schema for a single test; cleaned up afterwards."""
     eng, db_file = _make_engine()
     Base.metadata.create_all(bind=eng)
+    # The exercise catalog snapshot is process-wide; each test has its own exercises
+    from app.exercise_catalog import clear_catalog
+    clear_catalog()
     yield eng
+    clear_catalog()
     Base.metadata.drop_all(bind=eng)
     eng.dispose()
     try:
@@ -60,10 +64,18 @@ def client(db_engine):
     from app.limiter import limiter
     limiter.enabled = False
 
+    # Per-test databases reuse user ids, so cached stats must not leak across tests
+    from app.stats_cache import stats_cache
+    from app.demo_snapshots import demo_snapshots
+    stats_cache.clear()
+    demo_snapshots.clear()
+
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
     limiter.enabled = True
+    stats_cache.clear()
+    demo_snapshots.clear()
 
 
 # ── Helper: register + login a user and return auth headers ─────────────────
@@ -83,3 +95,15 @@ def register_and_login(client: TestClient, email: str = "test@example.com", pass
             db.commit()
         db.close()
     return {"Authorization": f"Bearer {token}"}
+
+
+# ── Helper: resolve the pending gamification handle of a completion ─────────
+def resolve_gamification(client: TestClient, headers: dict, data: dict) -> dict:
+    """Replace a completion response's ``gamification`` handle with the polled result."""
+    handle = data.get("gamification")
+    if handle and "job_id" in handle:
+        r = client.get(f"/api/gamification/jobs/{handle['job_id']}", headers=headers)
+        assert r.status_code == 200, r.text
+        assert r.json()["status"] == "done"
+        data["gamification"] = r.json()["result"]
+    return data
@@ -46,3 +46,43 @@ def test_admin_email_allowlist_promotes_user_on_auth_me(client, monkeypatch):
 
     assert response.status_code == 200
     assert response.json()["is_admin"] is True
+
+
+def test_gamification_replay_is_admin_only(client, db_engine):
+    headers = register_and_login(client)
+    assert client.post("/api/admin/gamification/replay", json={}, headers=headers).status_code == 403
+
+    _promote_user(db_engine, "test@example.com")
+    resp = client.post("/api/admin/gamification/replay", json={}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["dry_run"] is True
+    assert resp.json()["changed"] == []
+
+
+def test_gamification_replay_of_all_users_runs_in_batches(client, db_engine, monkeypatch):
+    import app.gamification_replay as gamification_replay
+
+    headers = register_and_login(client, email="replay-admin@example.com")
+    register_and_login(client, email="replay-a@example.com")
+    register_and_login(client, email="replay-b@example.com")
+    _promote_user(db_engine, "replay-admin@example.com")
+
+    batches = []
+    replay_users = gamification_replay.replay_users
+
+    def recording_replay_users(db, user_ids, dry_run=True):
+        batches.append(list(user_ids))
+        return replay_users(db, user_ids, dry_run=dry_run)
+
+    monkeypatch.setattr(gamification_replay, "replay_users", recording_replay_users)
+    resp = client.post("/api/admin/gamification/replay", json={"dry_run": False}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["users"] == 3
+    assert [len(batch) for batch in batches] == [3]
+
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    with Session() as db:
+        user_ids = [user.id for user in db.query(User).order_by(User.id)]
+        batches.clear()
+        assert gamification_replay.replay_in_batches(db, user_ids, dry_run=False, batch_size=2) == []
+    assert batches == [user_ids[:2], user_ids[2:]]
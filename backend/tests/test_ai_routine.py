@@ -317,3 +317,67 @@ class TestAIFillDay:
         ids = [ex["exercise_id"] for ex in data["exercises"]]
         assert 1 not in ids
         assert 3 in ids
+
+
+# ── Event loop ───────────────────────────────────────────────────────────────
+
+ROUTINE = {"name": "R", "days": [{"day_name": "Push", "exercises": [{"exercise_id": 1, "sets": 3, "reps": "10", "rest": 60}]}]}
+
+
+def _routine_id(client, headers):
+    return client.post("/api/routines", json={
+        "name": "R", "days": [{"day_name": "Push", "exercises": [{"exercise_id": 1, "sets": 3, "reps": "8-10"}]}],
+    }, headers=headers).json()["id"]
+
+
+class TestEventLoopNotBlocked:
+    """The async AI endpoints must run every query off the event loop's thread."""
+
+    def _queries_on_loop(self, db_engine, method, url, body, headers):
+        """Call the endpoint on an event loop; returns the response and the statements run on the loop's thread."""
+        import asyncio
+        import threading
+        from httpx import ASGITransport, AsyncClient
+        from sqlalchemy import event
+        from app.main import app
+
+        loop_thread = threading.current_thread()
+        on_loop = []
+
+        def record_thread(conn, cursor, statement, *args):
+            if threading.current_thread() is loop_thread:
+                on_loop.append(statement)
+
+        async def run():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+                return await ac.request(method, url, json=body, headers=headers)
+
+        event.listen(db_engine, "before_cursor_execute", record_thread)
+        try:
+            return asyncio.run(run()), on_loop
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record_thread)
+
+    @pytest.mark.parametrize("url, body, ai_response", [
+        ("/api/ai/generate-routine", {"extra_prompt": "chest"}, MOCK_AI_RESPONSE),
+        ("/api/ai/fill-day", {"prompt": "add chest exercises"}, MOCK_FILL_DAY_RESPONSE),
+        ("/api/ai/replace-exercises", {"current_routine": ROUTINE, "rejected_exercise_ids": [1]},
+         {"replacements": [{"original_exercise_id": 1, "exercise_id": 3, "sets": 3, "reps": "10", "rest": 60}]}),
+        ("/api/progression/report/{routine_id}", {}, None),
+    ])
+    def test_endpoint_does_not_block_event_loop(self, client, db_engine, url, body, ai_response):
+        headers = register_and_login(client, initial_coins=1000)
+        _seed_exercises(client, headers)
+        if "{routine_id}" in url:
+            url = url.format(routine_id=_routine_id(client, headers))
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "test-key-123" if ai_response else ""}):
+            with patch("app.openai_service.AsyncOpenAI") as MockClient:
+                MockClient.return_value.chat.completions.create = AsyncMock(
+                    return_value=_mock_openai_response(ai_response or {}))
+                r, on_loop = self._queries_on_loop(db_engine, "POST", url, body, headers)
+
+        assert r.status_code in (200, 202), r.text
+        assert on_loop == [], f"queries ran on the event loop: {on_loop}"
+        me = client.get("/api/auth/me", headers=headers).json()
+        assert me["currency"] < 1000  # the charge was committed
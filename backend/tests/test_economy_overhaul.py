@@ -6,11 +6,13 @@ Tests for the Economy Overhaul features:
   - Weekly streak check-in rewards (tiered coins)
   - Joker token streak-save endpoint
   - Weekly quest progress scoping (current week only)
+  - Weekly quest rotation (once per ISO week, cached listing)
+  - Reward ledger and gamification replay
 """
 import pytest
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import sessionmaker
-from tests.conftest import register_and_login
+from tests.conftest import register_and_login, resolve_gamification
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -70,6 +72,21 @@ def _complete_session(client, headers, exercise_id,
     }
     r = client.post(f"/api/sessions/{session_id}/complete_bulk", json=bulk, headers=headers)
     assert r.status_code == 200
+    return resolve_gamification(client, headers, r.json())
+
+
+def _queue_completion(client, headers, exercise_id, routine_id=None, day_index=0):
+    """Bulk-complete a session without polling its gamification job."""
+    session_data = {"started_at": _now_iso()}
+    if routine_id is not None:
+        session_data["routine_id"] = routine_id
+        session_data["day_index"] = day_index
+    session_id = client.post("/api/sessions", json=session_data, headers=headers).json()["id"]
+    r = client.post(f"/api/sessions/{session_id}/complete_bulk", json={
+        "completed_at": _now_iso(),
+        "sets": [{"exercise_id": exercise_id, "set_number": 1, "weight_kg": 60.0, "reps": 10}],
+    }, headers=headers)
+    assert r.status_code == 200
     return r.json()
 
 
@@ -283,6 +300,178 @@ class TestRoutineCompletion:
         assert me_after_delete["currency"] == me_before["currency"]
 
 
+    def test_cycle_detection_does_not_rescan_sessions(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "cycle-mask@example.com")
+        routine_id = _create_routine(client, headers, num_days=2)
+        ex_id = _create_exercise(client, headers, "RC mask")
+        _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0)
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lower())
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            result = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        assert result["gamification"]["routine_completed"] is True
+        assert not any(st.startswith("select sessions.day_index") for st in statements)
+
+    def test_delete_cycle_closing_session_reopens_cycle(self, client):
+        headers = register_and_login(client, "cycle-reopen@example.com")
+        routine_id = _create_routine(client, headers, num_days=2)
+        ex_id = _create_exercise(client, headers, "RC reopen")
+
+        _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0)
+        closing = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1)
+        assert closing["gamification"]["routine_completed"] is True
+        assert client.delete(f"/api/sessions/{closing['id']}", headers=headers).status_code == 200
+
+        # Day 0 still counts toward the reopened cycle
+        result = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1)
+        assert result["gamification"]["routine_completed"] is True
+
+    def test_delete_day_keeps_it_if_repeated_in_cycle(self, client):
+        headers = register_and_login(client, "cycle-repeat@example.com")
+        routine_id = _create_routine(client, headers, num_days=2)
+        ex_id = _create_exercise(client, headers, "RC repeat")
+
+        first = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0)
+        _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0)
+        assert client.delete(f"/api/sessions/{first['id']}", headers=headers).status_code == 200
+
+        result = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1)
+        assert result["gamification"]["routine_completed"] is True
+
+    def test_delete_only_session_of_day_clears_it(self, client):
+        headers = register_and_login(client, "cycle-clear@example.com")
+        routine_id = _create_routine(client, headers, num_days=2)
+        ex_id = _create_exercise(client, headers, "RC clear")
+
+        day0 = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0)
+        assert client.delete(f"/api/sessions/{day0['id']}", headers=headers).status_code == 200
+
+        result = _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1)
+        assert result["gamification"]["routine_completed"] is not True
+
+    def test_first_cycle_state_skips_days_still_pending(self, client, db_engine, monkeypatch):
+        from app.gamification_outbox import run_pending_jobs
+        from app.models.routine_completion import RoutineCompletion
+        from app.models.routine_cycle_state import RoutineCycleState
+
+        headers = register_and_login(client, "cycle-pending@example.com")
+        routine_id = _create_routine(client, headers, num_days=2)
+        ex_id = _create_exercise(client, headers, "RC pending")
+        # Both days are queued before either job runs
+        monkeypatch.setattr("app.routers.sessions.process_job_in_background", lambda bind, job_id: None)
+        _queue_completion(client, headers, ex_id, routine_id=routine_id, day_index=0)
+        _queue_completion(client, headers, ex_id, routine_id=routine_id, day_index=1)
+
+        s = sessionmaker(bind=db_engine)()
+        try:
+            assert run_pending_jobs(s) == 2
+            assert s.query(RoutineCompletion).count() == 1
+            assert s.query(RoutineCycleState).one().day_mask == 0
+        finally:
+            s.close()
+
+# ── Personal-record index ─────────────────────────────────────────────────────
+
+class TestExerciseBests:
+    """PR detection reads the exercise_bests index, which every write path keeps current."""
+
+    def _best(self, db_engine, ex_id):
+        from app.models.exercise_best import ExerciseBest
+        db = sessionmaker(bind=db_engine)()
+        try:
+            row = db.query(ExerciseBest).filter(ExerciseBest.exercise_id == ex_id).one_or_none()
+            return None if row is None else (row.max_reps, row.max_weight, row.session_count, row.last_session_id)
+        finally:
+            db.close()
+
+    def test_completion_updates_index_and_detects_prs(self, client, db_engine):
+        headers = register_and_login(client, "bests@example.com")
+        ex_id = _create_exercise(client, headers, "Bests Ex A")
+
+        first = _complete_session(client, headers, ex_id, weight=60, reps=10)
+        assert first["gamification"]["weight_prs"] == 0  # baseline only
+        assert self._best(db_engine, ex_id) == (10, 60.0, 1, first["id"])
+
+        second = _complete_session(client, headers, ex_id, weight=70, reps=8)
+        assert second["gamification"]["weight_prs"] == 1
+        assert second["gamification"]["rep_prs"] == 0
+
+        third = _complete_session(client, headers, ex_id, weight=65, reps=12)
+        assert third["gamification"]["rep_prs"] == 1
+        assert third["gamification"]["weight_prs"] == 0
+        assert self._best(db_engine, ex_id) == (12, 70.0, 3, third["id"])
+
+    def test_delete_reverts_pr_xp_and_repairs_index(self, client, db_engine):
+        headers = register_and_login(client, "bests-delete@example.com")
+        ex_id = _create_exercise(client, headers, "Bests Ex B")
+
+        first = _complete_session(client, headers, ex_id, weight=60, reps=10)
+        record = _complete_session(client, headers, ex_id, weight=70, reps=10)
+        assert record["gamification"]["weight_prs"] == 1
+        xp_gained = record["gamification"]["xp_gained"]
+
+        r = client.delete(f"/api/sessions/{record['id']}", headers=headers)
+        assert r.json()["xp_removed"] == xp_gained
+        assert self._best(db_engine, ex_id) == (10, 60.0, 1, first["id"])
+
+        client.delete(f"/api/sessions/{first['id']}", headers=headers)
+        assert self._best(db_engine, ex_id) is None
+
+    def test_set_edit_on_completed_session_repairs_index(self, client, db_engine):
+        headers = register_and_login(client, "bests-edit@example.com")
+        ex_id = _create_exercise(client, headers, "Bests Ex C")
+        other_id = _create_exercise(client, headers, "Bests Ex D")
+
+        done = _complete_session(client, headers, ex_id, weight=60, reps=10)
+        set_id = client.get(f"/api/sessions/{done['id']}", headers=headers).json()["sets"][0]["id"]
+
+        client.put(f"/api/sets/{set_id}", json={"weight_kg": 90.0}, headers=headers)
+        assert self._best(db_engine, ex_id) == (10, 90.0, 1, done["id"])
+
+        client.put(f"/api/sets/{set_id}", json={"exercise_id": other_id}, headers=headers)
+        assert self._best(db_engine, ex_id) is None
+        assert self._best(db_engine, other_id) == (10, 90.0, 1, done["id"])
+
+        # A PR against the edited record
+        nxt = _complete_session(client, headers, other_id, weight=95, reps=10)
+        assert nxt["gamification"]["weight_prs"] == 1
+
+    def test_completion_queries_do_not_grow_with_history(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "bests-scale@example.com")
+        ex_id = _create_exercise(client, headers, "Bests Ex E")
+
+        def completion_statements():
+            statements = []
+
+            def _before_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db_engine, "before_cursor_execute", _before_execute)
+            try:
+                _complete_session(client, headers, ex_id)
+            finally:
+                event.remove(db_engine, "before_cursor_execute", _before_execute)
+            return [st for st in statements if "exercise_bests" in st or "max(sets" in st.lower()]
+
+        short_history = completion_statements()
+        for _ in range(8):
+            _complete_session(client, headers, ex_id)
+        long_history = completion_statements()
+        assert len(long_history) == len(short_history)
+
+
 # ── Streak check-in rewards ───────────────────────────────────────────────────
 
 class TestStreakCheckIn:
@@ -580,3 +769,369 @@ class TestWeeklyQuestScoping:
         assert wk_quest is not None, "Weekly quest should be assigned"
         assert wk_quest["progress"] == 1, "Weekly quest should only count this week's 1 session"
         assert not wk_quest["completed"], "Weekly quest should not be completed yet (needs 2)"
+
+
+class TestQuestCounters:
+    """Quest progress is driven by per-completion counter deltas."""
+
+    def _seed_quest(self, db_engine, req_type, req_value, is_weekly=False):
+        from app.models.quest import Quest
+
+        current_group = ["A", "B", "C", "D"][datetime.now(timezone.utc).isocalendar()[1] % 4]
+        s = sessionmaker(bind=db_engine)()
+        try:
+            q = Quest(
+                name=f"{req_type} quest", description="", req_type=req_type, req_value=req_value,
+                exp_reward=10, currency_reward=5,
+                is_weekly=is_weekly, week_group=current_group if is_weekly else None,
+            )
+            s.add(q)
+            s.commit()
+            return q.id
+        finally:
+            s.close()
+
+    def _counters(self, db_engine):
+        from app.models.user_quest_counter import UserQuestCounter
+        s = sessionmaker(bind=db_engine)()
+        try:
+            row = s.query(UserQuestCounter).filter(UserQuestCounter.period == "lifetime").one()
+            return {"sessions": row.sessions, "sets": row.sets, "volume": row.volume,
+                    "weight_prs": row.weight_prs, "rep_prs": row.rep_prs}
+        finally:
+            s.close()
+
+    def _quest(self, client, headers, quest_id):
+        quests = client.get("/api/gamification/quests", headers=headers).json()
+        return next(q for q in quests if q["quest_id"] == quest_id)
+
+    def test_pr_quests_advance(self, client, db_engine):
+        headers = register_and_login(client, "prquests@example.com")
+        ex_id = _create_exercise(client, headers, "PR quest ex")
+        weight_q = self._seed_quest(db_engine, "weight_pr", 1)
+        rep_q = self._seed_quest(db_engine, "rep_pr", 2, is_weekly=True)
+        client.get("/api/gamification/quests", headers=headers)
+
+        _complete_session(client, headers, ex_id, weight=60, reps=10)
+        assert self._quest(client, headers, weight_q)["progress"] == 0
+
+        _complete_session(client, headers, ex_id, weight=70, reps=11)
+        assert self._quest(client, headers, weight_q)["completed"] is True
+        assert self._quest(client, headers, rep_q)["progress"] == 1
+
+        _complete_session(client, headers, ex_id, weight=70, reps=12)
+        assert self._quest(client, headers, rep_q)["completed"] is True
+        assert self._counters(db_engine)["weight_prs"] == 1
+        assert self._counters(db_engine)["rep_prs"] == 2
+
+    def test_counters_follow_edits_and_deletes(self, client, db_engine):
+        headers = register_and_login(client, "questcounters@example.com")
+        ex_id = _create_exercise(client, headers, "Counter ex")
+        volume_q = self._seed_quest(db_engine, "volume", 5000)
+        client.get("/api/gamification/quests", headers=headers)
+
+        first = _complete_session(client, headers, ex_id, weight=50, reps=10)
+        second = _complete_session(client, headers, ex_id, weight=60, reps=10)
+        assert self._counters(db_engine) == {"sessions": 2, "sets": 2, "volume": 1100.0, "weight_prs": 1, "rep_prs": 0}
+        assert self._quest(client, headers, volume_q)["progress"] == 1100
+
+        client.delete(f"/api/sessions/{second['id']}", headers=headers)
+        assert self._counters(db_engine) == {"sessions": 1, "sets": 1, "volume": 500.0, "weight_prs": 0, "rep_prs": 0}
+
+        set_id = client.get(f"/api/sessions/{first['id']}", headers=headers).json()["sets"][0]["id"]
+        client.put(f"/api/sets/{set_id}", json={"weight_kg": 100.0}, headers=headers)
+        assert self._counters(db_engine)["volume"] == 1000.0
+
+        _complete_session(client, headers, ex_id, weight=50, reps=10)
+        assert self._quest(client, headers, volume_q)["progress"] == 1500
+
+    def test_completion_does_not_aggregate_history(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "questscale@example.com")
+        ex_id = _create_exercise(client, headers, "Quest scale ex")
+        self._seed_quest(db_engine, "sessions", 100)
+        self._seed_quest(db_engine, "sets", 100, is_weekly=True)
+        client.get("/api/gamification/quests", headers=headers)
+        _complete_session(client, headers, ex_id)
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            _complete_session(client, headers, ex_id)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        # No lifetime COUNT over the user's sessions / sets any more
+        assert not any("count(sessions.id)" in st.lower() for st in statements)
+        assert not any("count(sets.id)" in st.lower() and "JOIN sessions" in st for st in statements)
+        assert self._counters(db_engine)["sessions"] == 2
+
+    def test_first_counters_skip_completions_still_pending(self, client, db_engine, monkeypatch):
+        from app.gamification_outbox import run_pending_jobs
+        from app.models.user_quest_counter import UserQuestCounter
+        from app.quest_counters import week_period
+
+        headers = register_and_login(client, "questpending@example.com")
+        ex_id = _create_exercise(client, headers, "Pending quest ex")
+        # Both completions are queued before either job runs
+        monkeypatch.setattr("app.routers.sessions.process_job_in_background", lambda bind, job_id: None)
+        _queue_completion(client, headers, ex_id)
+        _queue_completion(client, headers, ex_id)
+
+        s = sessionmaker(bind=db_engine)()
+        try:
+            assert s.query(UserQuestCounter).count() == 0
+            assert run_pending_jobs(s) == 2
+            week = s.query(UserQuestCounter).filter(
+                UserQuestCounter.period == week_period(datetime.now(timezone.utc))).one()
+            assert week.sessions == 2 and week.sets == 2
+        finally:
+            s.close()
+        assert self._counters(db_engine)["sessions"] == 2
+        assert self._counters(db_engine)["sets"] == 2
+
+
+class TestQuestRotation:
+    """Weekly rotation runs once per ISO week per user; the quest page is otherwise a read."""
+
+    def _seed_quests(self, db_engine):
+        from app.models.quest import Quest
+
+        iso_week = datetime.now(timezone.utc).isocalendar()[1]
+        current_group = ["A", "B", "C", "D"][iso_week % 4]
+        other_group = ["A", "B", "C", "D"][(iso_week + 1) % 4]
+        s = sessionmaker(bind=db_engine)()
+        try:
+            quests = [
+                Quest(name="Lifetime", req_type="sessions", req_value=1, exp_reward=10, currency_reward=5,
+                      is_weekly=False),
+                Quest(name="This week", req_type="sessions", req_value=5, exp_reward=10, currency_reward=5,
+                      is_weekly=True, week_group=current_group),
+                Quest(name="Other week", req_type="sessions", req_value=5, exp_reward=10, currency_reward=5,
+                      is_weekly=True, week_group=other_group),
+            ]
+            s.add_all(quests)
+            s.commit()
+            return [q.id for q in quests]
+        finally:
+            s.close()
+
+    def test_repeat_listing_is_read_only(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "questread@example.com")
+        lifetime_id, weekly_id, other_id = self._seed_quests(db_engine)
+        first = client.get("/api/gamification/quests", headers=headers).json()
+        assert {q["quest_id"] for q in first} == {lifetime_id, weekly_id}
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            second = client.get("/api/gamification/quests", headers=headers).json()
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        assert second == first
+        assert not any(st.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")) for st in statements)
+        assert not any("user_quests" in st for st in statements)
+
+    def test_stale_week_marker_rotates(self, client, db_engine, db_session):
+        from app.models.quest import UserQuest
+
+        headers = register_and_login(client, "questrotate@example.com")
+        lifetime_id, weekly_id, other_id = self._seed_quests(db_engine)
+        client.get("/api/gamification/quests", headers=headers)
+
+        # Simulate a user the weekly job missed: last week's quest still assigned
+        user = _get_user(db_session)
+        db_session.query(UserQuest).filter(UserQuest.quest_id == weekly_id).delete()
+        db_session.add(UserQuest(user_id=user.id, quest_id=other_id))
+        user.quest_week = "2000-W01"
+        db_session.commit()
+
+        quests = client.get("/api/gamification/quests", headers=headers).json()
+        assert {q["quest_id"] for q in quests} == {lifetime_id, weekly_id}
+        db_session.expire_all()
+        assert _get_user(db_session).quest_week != "2000-W01"
+
+    def test_claim_is_reflected_in_listing(self, client, db_engine):
+        headers = register_and_login(client, "questclaim@example.com")
+        ex_id = _create_exercise(client, headers, "Quest claim ex")
+        lifetime_id, _, _ = self._seed_quests(db_engine)
+        client.get("/api/gamification/quests", headers=headers)
+        _complete_session(client, headers, ex_id)
+
+        quest = next(q for q in client.get("/api/gamification/quests", headers=headers).json()
+                     if q["quest_id"] == lifetime_id)
+        assert quest["completed"] and not quest["claimed"]
+
+        r = client.post(f"/api/gamification/quests/{quest['id']}/claim", headers=headers)
+        assert r.status_code == 200
+        quest = next(q for q in client.get("/api/gamification/quests", headers=headers).json()
+                     if q["quest_id"] == lifetime_id)
+        assert quest["claimed"] is True
+
+
+class TestRewardLedger:
+    """Every balance change is a ledger entry; session deletes reverse the recorded award."""
+
+    def _entries(self, db_engine, **filters):
+        from app.models.reward_ledger import RewardLedgerEntry
+        s = sessionmaker(bind=db_engine)()
+        try:
+            return [
+                (e.source, e.session_id, e.xp, e.coins, e.jokers, e.detail)
+                for e in s.query(RewardLedgerEntry).filter_by(**filters).order_by(RewardLedgerEntry.id)
+            ]
+        finally:
+            s.close()
+
+    def _audit(self, db_engine):
+        from app.reward_ledger import audit_balances
+        s = sessionmaker(bind=db_engine)()
+        try:
+            return audit_balances(s)
+        finally:
+            s.close()
+
+    def test_delete_reverses_recorded_award(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "ledger-delete@example.com")
+        ex_id = _create_exercise(client, headers, "Ledger ex")
+        _complete_session(client, headers, ex_id, weight=60, reps=10)
+        record = _complete_session(client, headers, ex_id, weight=70, reps=10)
+
+        [award] = self._entries(db_engine, session_id=record["id"])
+        assert award[0] == "session"
+        assert award[2] == record["gamification"]["xp_gained"]
+        assert award[5]["weight_prs"] == 1
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            r = client.delete(f"/api/sessions/{record['id']}", headers=headers)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        assert r.json()["xp_removed"] == record["gamification"]["xp_gained"]
+        # No PR re-detection over the user's other sessions
+        assert not any("max(sets.reps)" in st.lower() and "sessions.id !=" in st.lower() for st in statements)
+        reversal = self._entries(db_engine, session_id=record["id"])[-1]
+        assert reversal[0] == "session_reversal"
+        assert reversal[2] == -record["gamification"]["xp_gained"]
+        assert self._audit(db_engine) == []
+
+    def test_balances_match_ledger_across_sources(self, client, db_engine):
+        from app.models.quest import Quest
+
+        headers = register_and_login(client, "ledger-audit@example.com")
+        ex_id = _create_exercise(client, headers, "Ledger audit ex")
+        s = sessionmaker(bind=db_engine)()
+        try:
+            s.add(Quest(name="One session", req_type="sessions", req_value=1, exp_reward=500, currency_reward=25,
+                        is_weekly=False))
+            s.commit()
+        finally:
+            s.close()
+        quests = client.get("/api/gamification/quests", headers=headers).json()
+
+        _complete_session(client, headers, ex_id)
+        assert client.post(f"/api/gamification/quests/{quests[0]['id']}/claim", headers=headers).status_code == 200
+        assert client.post("/api/gamification/shop/promo", json={"code": "PACHO"}, headers=headers).status_code == 200
+        assert client.post("/api/gamification/shop/buy", json={"item_id": "theme_gold"}, headers=headers).status_code == 200
+
+        sources = [entry[0] for entry in self._entries(db_engine)]
+        assert sources == ["opening_balance", "session", "quest", "promo", "shop"]
+        assert self._audit(db_engine) == []
+
+
+class TestGamificationReplay:
+    """Replaying history through the reward rules reproduces (or repairs) the live state."""
+
+    def _replay(self, db_engine, dry_run):
+        from app.gamification_replay import replay_users
+        from app.models.user import User
+        s = sessionmaker(bind=db_engine)()
+        try:
+            user_ids = [uid for (uid,) in s.query(User.id)]
+            return replay_users(s, user_ids, dry_run=dry_run)
+        finally:
+            s.close()
+
+    def _history(self, client, headers):
+        ex_id = _create_exercise(client, headers, "Replay ex")
+        routine_id = _create_routine(client, headers, num_days=2)
+        _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=0, weight=60)
+        _complete_session(client, headers, ex_id, routine_id=routine_id, day_index=1, weight=70)
+        _complete_session(client, headers, ex_id, weight=70, reps=12)
+
+    def test_dry_run_matches_live_awards(self, client, db_engine, db_session):
+        headers = register_and_login(client, "replay-same@example.com")
+        self._history(client, headers)
+        before = _get_user(db_session)
+        state = (before.level, before.experience, before.currency)
+
+        assert self._replay(db_engine, dry_run=True) == []
+        db_session.expire_all()
+        after = _get_user(db_session)
+        assert (after.level, after.experience, after.currency) == state
+
+    def test_write_restores_corrupted_state(self, client, db_engine, db_session):
+        from app.models.leaderboard_score import LeaderboardScore
+        from app.models.routine_completion import RoutineCompletion
+        from app.models.routine_cycle_state import RoutineCycleState
+        from app.models.user_quest_counter import UserQuestCounter
+        from app.reward_ledger import audit_balances
+
+        headers = register_and_login(client, "replay-fix@example.com")
+        self._history(client, headers)
+        user = _get_user(db_session)
+        expected = (user.level, user.experience, user.currency)
+        lifetime = db_session.query(UserQuestCounter).filter_by(user_id=user.id, period="lifetime").one()
+        expected_counters = (lifetime.sessions, lifetime.weight_prs, lifetime.rep_prs)
+        expected_scores = sorted(
+            (row.period, row.xp, row.sessions, row.volume)
+            for row in db_session.query(LeaderboardScore).filter_by(user_id=user.id)
+        )
+        assert len(expected_scores) == 2
+
+        # As if awarded under older rules: one level (and its coins) short
+        user.level, user.experience, user.currency = 1, 0, user.currency - 10
+        db_session.query(LeaderboardScore).update({LeaderboardScore.xp: 5})
+        db_session.query(RoutineCompletion).delete()
+        db_session.query(RoutineCycleState).delete()
+        db_session.query(UserQuestCounter).delete()
+        db_session.commit()
+
+        [diff] = self._replay(db_engine, dry_run=True)
+        assert diff["routine_completions"] == [0, 1]
+        assert diff["experience"][1] == expected[1]
+
+        self._replay(db_engine, dry_run=False)
+        db_session.expire_all()
+        user = _get_user(db_session)
+        assert (user.level, user.experience, user.currency) == expected
+        assert db_session.query(RoutineCompletion).count() == 1
+        assert [state.day_mask for state in db_session.query(RoutineCycleState)] == [0]
+        lifetime = db_session.query(UserQuestCounter).filter_by(user_id=user.id, period="lifetime").one()
+        assert (lifetime.sessions, lifetime.weight_prs, lifetime.rep_prs) == expected_counters
+        assert sorted(
+            (row.period, row.xp, row.sessions, row.volume)
+            for row in db_session.query(LeaderboardScore).filter_by(user_id=user.id)
+        ) == expected_scores
+        assert audit_balances(db_session) == []
+        assert self._replay(db_engine, dry_run=True) == []
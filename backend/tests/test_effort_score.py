@@ -1,8 +1,9 @@
 from datetime import datetime, timezone, timedelta
 
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
-from app.effort_score import compute_effort_score
+from app.effort_score import backfill_users, compute_effort_score
 from app.models.exercise import Exercise
 from app.models.routine import Routine
 from app.models.session import Session as SessionModel, Set as SetModel
@@ -274,3 +275,75 @@ class TestEffortScore:
             assert compute_effort_score(db, user.id, current) is None
         finally:
             db.close()
+
+    def _history(self, db, email, sessions=12, exercises=4):
+        """A user with ``sessions`` rated cycles of one routine day, progressing over time."""
+        user = User(email=email, password_hash="x", settings={"failure_tracking_enabled": True})
+        db.add(user)
+        db.flush()
+        routine = _routine(user.id)
+        db.add(routine)
+        exs = [_exercise(f"{email} {i}") for i in range(exercises)]
+        db.add_all(exs)
+        db.flush()
+
+        created = []
+        for n in range(sessions):
+            s = SessionModel(
+                user_id=user.id, routine_id=routine.id, day_index=n % 2,
+                started_at=_now() - timedelta(days=30 - n), completed_at=_now() - timedelta(days=30 - n),
+                self_rated_effort=5 + n % 5,
+            )
+            db.add(s)
+            db.flush()
+            db.add_all([
+                SetModel(session_id=s.id, exercise_id=ex.id, set_number=i + 1, weight_kg=60 + (n * i) % 7,
+                         reps=8 + n % 3, set_type="normal", to_failure=(n + i) % 3 == 0, completed_at=_now())
+                for i, ex in enumerate(exs)
+            ])
+            created.append(s)
+        db.commit()
+        return user, created
+
+    def test_grouped_queries_regardless_of_history_size(self, db_engine):
+        """Prior volumes and per-exercise maxima each come from one grouped query."""
+        Session = sessionmaker(bind=db_engine)
+        db = Session()
+        try:
+            user, sessions = self._history(db, "effort_queries@example.com", sessions=24, exercises=6)
+            session, settings = sessions[-1], user.settings
+            db.refresh(session)
+            statements = []
+
+            def count(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db_engine, "before_cursor_execute", count)
+            try:
+                score = compute_effort_score(db, user.id, session, settings)
+            finally:
+                event.remove(db_engine, "before_cursor_execute", count)
+
+            assert score is not None
+            # paired ids, current sets, volumes per session, maxima per exercise
+            assert len(statements) == 4
+        finally:
+            db.close()
+
+    def test_backfill_matches_single_session_scores(self, db_engine):
+        Session = sessionmaker(bind=db_engine)
+        db = Session()
+        try:
+            user, sessions = self._history(db, "effort_backfill@example.com")
+            expected = {s.id: compute_effort_score(db, user.id, s) for s in sessions}
+            assert sum(score is not None for score in expected.values()) == len(sessions) - 2
+
+            assert backfill_users(db, [user.id], dry_run=True) == len(sessions) - 2
+            assert backfill_users(db, [user.id]) == len(sessions) - 2
+            db.expire_all()
+            assert {s.id: s.effort_score for s in db.query(SessionModel).filter(SessionModel.user_id == user.id)} == expected
+
+            # Nothing left to change on a second run
+            assert backfill_users(db, [user.id]) == 0
+        finally:
+            db.close()
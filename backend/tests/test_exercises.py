@@ -259,3 +259,95 @@ class TestExerciseCatalogFilters:
         # COMPLEMENTARY_MUSCLES["Quadriceps"] = ["Hamstrings", "Glutes", "Calves"]
         assert muscles & {"Hamstrings", "Glutes", "Calves"}, \
             f"Expected Hamstrings/Glutes/Calves suggestions for Quadriceps day, got {muscles}"
+
+
+class TestExerciseCatalogSnapshot:
+    """The system catalog is read once into memory and rebuilt after admin edits."""
+
+    def _admin(self, client, db_engine):
+        from sqlalchemy.orm import sessionmaker
+        from app.models.user import User
+
+        headers = register_and_login(client, "catalog-admin@example.com")
+        with sessionmaker(bind=db_engine)() as db:
+            db.query(User).filter(User.email == "catalog-admin@example.com").update({"is_admin": True})
+            db.commit()
+        return headers
+
+    def test_repeat_suggest_does_not_query_exercises(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client)
+        TestExerciseSuggest()._seed_exercises(client, headers)
+        assert client.get("/api/exercises/suggest?existing_ids=1", headers=headers).status_code == 200
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            r = client.get("/api/exercises/suggest?existing_ids=1,4&equipment=dumbbell", headers=headers)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", record)
+        assert r.status_code == 200
+        assert [ex["id"] for ex in r.json()] == [6]
+        assert not [s for s in statements if "FROM exercises" in s]
+
+    def test_admin_changes_rebuild_the_catalog(self, client, db_engine):
+        headers = self._admin(client, db_engine)
+        r = client.get("/api/exercises/suggest?existing_ids=", headers=headers)
+        assert r.json() == []
+
+        r = client.post("/api/admin/exercises", json={
+            "name": "Push Up", "muscle": "Chest", "equipment": "None (Bodyweight)", "is_bodyweight": True,
+        }, headers=headers)
+        assert r.status_code == 200
+        ex_id = r.json()["id"]
+        assert [ex["name"] for ex in client.get("/api/exercises/suggest", headers=headers).json()] == ["Push Up"]
+
+        assert client.put(f"/api/admin/exercises/{ex_id}", json={"muscle": "Triceps"}, headers=headers).status_code == 200
+        assert client.get("/api/exercises/suggest", headers=headers).json() == []
+        r = client.get("/api/exercises/suggest?existing_ids=" + str(ex_id), headers=headers)
+        # Triceps day -> Chest / Shoulders missing; nothing else in the catalog
+        assert r.json() == []
+
+        assert client.delete(f"/api/admin/exercises/{ex_id}", headers=headers).status_code == 200
+        from app.exercise_catalog import get_catalog
+        from sqlalchemy.orm import sessionmaker
+        with sessionmaker(bind=db_engine)() as db:
+            assert get_catalog(db).exercises == ()
+
+    def test_equipment_filter_for_ai_catalog(self, db_engine):
+        from types import SimpleNamespace
+        from sqlalchemy.orm import sessionmaker
+        from app.exercise_catalog import get_catalog
+        from app.models.exercise import Exercise
+        from app.openai_service import _filter_exercises_by_equipment
+
+        with sessionmaker(bind=db_engine)() as db:
+            db.add_all([
+                Exercise(name="Push Up", equipment="None (Bodyweight)", difficulty_level=1),
+                Exercise(name="Dumbbell Bench", equipment="Dumbbell, Bench", difficulty_level=3),
+                Exercise(name="Dumbbell Curl", equipment="Dumbbell", difficulty_level=2),
+                Exercise(name="Sled Push", equipment="Other", difficulty_level=4),
+                Exercise(name="Barbell Squat", equipment="Barbell", difficulty_level=5),
+                Exercise(name="Muscle Up", equipment=None, difficulty_level=9),
+            ])
+            db.commit()
+            catalog = get_catalog(db)
+
+            assert [ex.name for ex in catalog.up_to_difficulty(2.5)] == ["Push Up", "Dumbbell Curl"]
+            assert catalog.up_to_difficulty(0.5) == ()
+            assert len(catalog.up_to_difficulty(10)) == 6
+
+            def names(equipment):
+                prefs = SimpleNamespace(available_equipment=equipment)
+                return [ex.name for ex in _filter_exercises_by_equipment(catalog.exercises, prefs)]
+
+            assert names(["Dumbbells"]) == ["Push Up", "Dumbbell Curl", "Sled Push", "Muscle Up"]
+            assert names(["Dumbbells", "Bench (flat or adjustable)"]) == [
+                "Push Up", "Dumbbell Bench", "Dumbbell Curl", "Sled Push", "Muscle Up",
+            ]
+            assert names([]) == ["Push Up", "Sled Push", "Muscle Up"]
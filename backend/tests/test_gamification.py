@@ -8,10 +8,11 @@ Tests for gamification endpoints:
   POST /api/gamification/shop/activate
   POST /api/gamification/shop/promo
   POST /api/sessions/{id}/complete_bulk  (gamification integration)
+  GET  /api/gamification/jobs/{id}
 """
 import pytest
 from datetime import datetime, timedelta
-from tests.conftest import register_and_login
+from tests.conftest import register_and_login, resolve_gamification
 
 
 class TestGamificationStats:
@@ -238,8 +239,8 @@ class TestBulkCompletionGamification:
 
         r = client.post(f"/api/sessions/{session_id}/complete_bulk", json=bulk_data, headers=headers)
         assert r.status_code == 200
-        data = r.json()
-        assert "gamification" in data
+        assert r.json()["gamification"]["status"] == "pending"
+        data = resolve_gamification(client, headers, r.json())
         assert data["gamification"]["xp_gained"] > 0
         assert data["completed_at"] is not None
 
@@ -270,7 +271,7 @@ class TestBulkCompletionGamification:
         # First completion
         r1 = client.post(f"/api/sessions/{session_id}/complete_bulk", json=bulk_data, headers=headers)
         assert r1.status_code == 200
-        xp_first = r1.json().get("gamification", {}).get("xp_gained", 0)
+        xp_first = resolve_gamification(client, headers, r1.json()).get("gamification", {}).get("xp_gained", 0)
 
         # Second completion (should not re-award XP)
         r2 = client.post(f"/api/sessions/{session_id}/complete_bulk", json=bulk_data, headers=headers)
@@ -279,3 +280,155 @@ class TestBulkCompletionGamification:
         gam = r2.json().get("gamification")
         if gam:
             assert gam.get("xp_gained", 0) == 0 or gam is None
+
+
+class TestCompletionOutbox:
+    """Completion enqueues the gamification job; it runs after the response and is polled."""
+
+    def _completed_session_with_pending_job(self, db_engine, email):
+        """A completed session whose job is still pending (background task never ran)."""
+        from sqlalchemy.orm import sessionmaker
+        from app.gamification_outbox import enqueue_session_award
+        from app.models.session import Session as SessionModel, Set as SetModel
+        from app.models.user import User
+
+        db = sessionmaker(bind=db_engine)()
+        try:
+            user = db.query(User).filter(User.email == email).one()
+            now = datetime.utcnow()
+            session = SessionModel(user_id=user.id, started_at=now, completed_at=now)
+            db.add(session)
+            db.flush()
+            db.add(SetModel(session_id=session.id, exercise_id=1, set_number=1, weight_kg=50, reps=10, completed_at=now))
+            job = enqueue_session_award(db, user.id, session.id)
+            db.commit()
+            return session.id, job.id
+        finally:
+            db.close()
+
+    def test_completion_returns_pending_handle(self, client):
+        headers = register_and_login(client, "outbox@example.com")
+        session_id = client.post("/api/sessions", json={"started_at": datetime.utcnow().isoformat()}, headers=headers).json()["id"]
+        r = client.post(f"/api/sessions/{session_id}/complete_bulk", json={
+            "completed_at": datetime.utcnow().isoformat(),
+            "sets": [{"exercise_id": 1, "set_number": 1, "weight_kg": 60, "reps": 10}],
+        }, headers=headers)
+        assert r.status_code == 200
+        handle = r.json()["gamification"]
+        assert handle["status"] == "pending"
+
+        job = client.get(f"/api/gamification/jobs/{handle['job_id']}", headers=headers).json()
+        assert job["status"] == "done"
+        assert job["session_id"] == session_id
+        assert job["result"]["xp_gained"] > 0
+        experience = client.get("/api/auth/me", headers=headers).json()["experience"]
+
+        # Polling again is a read; nothing is awarded twice
+        assert client.get(f"/api/gamification/jobs/{handle['job_id']}", headers=headers).json() == job
+        assert client.get("/api/auth/me", headers=headers).json()["experience"] == experience
+
+        other = register_and_login(client, "outbox-other@example.com")
+        assert client.get(f"/api/gamification/jobs/{handle['job_id']}", headers=other).status_code == 404
+
+    def test_worker_sweeps_pending_jobs_once(self, client, db_engine):
+        from sqlalchemy.orm import sessionmaker
+        from app.gamification_outbox import run_pending_jobs
+
+        headers = register_and_login(client, "outbox-sweep@example.com")
+        _, job_id = self._completed_session_with_pending_job(db_engine, "outbox-sweep@example.com")
+
+        db = sessionmaker(bind=db_engine)()
+        try:
+            assert run_pending_jobs(db) == 1
+            assert run_pending_jobs(db) == 0
+        finally:
+            db.close()
+
+        job = client.get(f"/api/gamification/jobs/{job_id}", headers=headers).json()
+        assert job["status"] == "done"
+        assert client.get("/api/auth/me", headers=headers).json()["experience"] == job["result"]["experience"]
+
+    def test_delete_awards_pending_job_before_removing(self, client, db_engine):
+        headers = register_and_login(client, "outbox-delete@example.com")
+        session_id, job_id = self._completed_session_with_pending_job(db_engine, "outbox-delete@example.com")
+
+        r = client.delete(f"/api/sessions/{session_id}", headers=headers)
+        assert r.status_code == 200
+        assert r.json()["xp_removed"] > 0
+        assert client.get("/api/auth/me", headers=headers).json()["experience"] == 0
+        assert client.get(f"/api/gamification/jobs/{job_id}", headers=headers).status_code == 404
+
+    def test_resent_bulk_edit_survives_unclaimed_pending_job(self, client, db_engine, monkeypatch):
+        """A job held by another worker must not roll back the request's own edit."""
+        import app.gamification_outbox as outbox
+
+        headers = register_and_login(client, "outbox-resend@example.com")
+        session_id = client.post("/api/sessions", json={"started_at": datetime.utcnow().isoformat()}, headers=headers).json()["id"]
+        completed_at = datetime.utcnow().isoformat()
+        payload = {
+            "completed_at": completed_at,
+            "notes": "old",
+            "sets": [{"exercise_id": 1, "set_number": 1, "weight_kg": 60, "reps": 10}],
+        }
+        assert client.post(f"/api/sessions/{session_id}/complete_bulk", json=payload, headers=headers).status_code == 200
+        self._completed_session_with_pending_job(db_engine, "outbox-resend@example.com")
+
+        monkeypatch.setattr(outbox, "_claim", lambda db, job_id, wait=False: None)
+        r = client.post(f"/api/sessions/{session_id}/complete_bulk", json={
+            **payload, "notes": "new notes", "duration_seconds": 999,
+        }, headers=headers)
+        assert r.status_code == 200
+        assert r.json()["notes"] == "new notes"
+        assert r.json()["duration_seconds"] == 999
+
+        session = client.get(f"/api/sessions/{session_id}", headers=headers).json()
+        assert session["notes"] == "new notes"
+        assert session["duration_seconds"] == 999
+
+
+class TestTrainingCalendar:
+    """Week bucketing shared by streaks, the weekly XP cap and the flame row."""
+
+    def test_streak_with_current_week_grace_and_joker(self):
+        from datetime import date
+        from app.training_calendar import TrainingCalendar
+
+        today = date(2026, 3, 18)  # Wednesday of 2026-W12
+        weeks_ago = lambda n: datetime(2026, 3, 16, 12) - timedelta(weeks=n)  # noqa: E731
+        cal = TrainingCalendar.from_datetimes([weeks_ago(1), weeks_ago(1), weeks_ago(2), weeks_ago(4)])
+
+        assert cal.count(weeks_ago(1)) == 2
+        assert cal.streak(today) == 2  # empty current week is still alive
+        assert cal.streak(today, current_week_covered=True) == 3
+        assert cal.streak(today, current_week_grace=False) == 0
+        assert cal.run_length(weeks_ago(1)) == 2
+        assert cal.run_length(weeks_ago(4)) == 1
+        assert cal.run_length(weeks_ago(3)) == 0
+        assert cal.week_strs() == ["2026-W08", "2026-W10", "2026-W11"]
+
+    def test_streak_lookback_is_capped(self):
+        from datetime import date
+        from app.training_calendar import TrainingCalendar
+
+        monday = date(2026, 3, 16)
+        cal = TrainingCalendar({monday - timedelta(weeks=i): 1 for i in range(60)})
+        assert cal.streak(monday, max_weeks=52) == 52
+        assert cal.run_length(monday) == 60
+
+    def test_stats_endpoint_reads_one_calendar(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "calendar@example.com")
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            r = client.get("/api/gamification/stats", headers=headers)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        assert r.status_code == 200
+        assert sum("streak_eligible_at" in s for s in statements) == 1
@@ -0,0 +1,128 @@
+"""
+Tests for the leaderboards:
+  GET /api/leaderboards/{board}, GET /api/leaderboards/{board}/me,
+  GET/PUT /api/leaderboards/me (opt-in)
+"""
+from datetime import datetime, timezone
+from tests.conftest import register_and_login, resolve_gamification
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _create_exercise(client, headers, name):
+    r = client.post("/api/exercises", json={
+        "name": name, "muscle": "Chest", "equipment": "Barbell", "type": "weighted"
+    }, headers=headers)
+    assert r.status_code == 200
+    return r.json()["id"]
+
+
+def _complete_session(client, headers, exercise_id, weight=60.0, reps=10):
+    r = client.post("/api/sessions", json={"started_at": _now_iso()}, headers=headers)
+    assert r.status_code == 200
+    ts = _now_iso()
+    r = client.post(f"/api/sessions/{r.json()['id']}/complete_bulk", json={
+        "completed_at": ts,
+        "sets": [{"exercise_id": exercise_id, "set_number": 1, "weight_kg": weight, "reps": reps, "completed_at": ts}],
+    }, headers=headers)
+    assert r.status_code == 200
+    return resolve_gamification(client, headers, r.json())
+
+
+def _athlete(client, email, sessions, name=None):
+    headers = register_and_login(client, email)
+    ex_id = _create_exercise(client, headers, f"LB {email}")
+    for _ in range(sessions):
+        _complete_session(client, headers, ex_id)
+    if name is not None:
+        r = client.put("/api/leaderboards/me", json={"visible": True, "display_name": name}, headers=headers)
+        assert r.status_code == 200
+    return headers
+
+
+class TestLeaderboards:
+    def test_boards_list_only_opted_in_users(self, client):
+        a = _athlete(client, "lb-a@example.com", sessions=3, name="Ana")
+        _athlete(client, "lb-b@example.com", sessions=2, name="Ben")
+        _athlete(client, "lb-c@example.com", sessions=4)  # never opts in
+
+        r = client.get("/api/leaderboards/sessions", params={"period": "week"}, headers=a)
+        assert r.status_code == 200
+        entries = r.json()["entries"]
+        assert [(e["rank"], e["name"], e["score"], e["is_me"]) for e in entries] == [
+            (1, "Ana", 3, True), (2, "Ben", 2, False),
+        ]
+
+        xp = client.get("/api/leaderboards/xp", params={"period": "all"}, headers=a).json()["entries"]
+        assert [e["name"] for e in xp] == ["Ana", "Ben"]
+        assert xp[0]["score"] > xp[1]["score"] > 0
+
+    def test_my_rank_with_neighbours(self, client):
+        _athlete(client, "lb-1@example.com", sessions=4, name="First")
+        _athlete(client, "lb-2@example.com", sessions=3, name="Second")
+        me = _athlete(client, "lb-3@example.com", sessions=2, name="Third")
+        _athlete(client, "lb-4@example.com", sessions=1, name="Fourth")
+
+        r = client.get("/api/leaderboards/sessions/me", params={"period": "all", "k": 1}, headers=me)
+        assert r.status_code == 200
+        body = r.json()
+        assert body["rank"] == 3
+        assert [(e["rank"], e["name"]) for e in body["entries"]] == [(2, "Second"), (3, "Third"), (4, "Fourth")]
+
+        # Hidden users still see where they would rank, but nobody sees them
+        hidden = _athlete(client, "lb-hidden@example.com", sessions=5)
+        mine = client.get("/api/leaderboards/sessions/me", params={"period": "all", "k": 1}, headers=hidden).json()
+        assert mine["rank"] == 1 and mine["visible"] is False
+        top = client.get("/api/leaderboards/sessions", params={"period": "all"}, headers=me).json()["entries"]
+        assert "Athlete" not in " ".join(e["name"] for e in top)
+
+    def test_delete_session_updates_scores(self, client):
+        headers = _athlete(client, "lb-delete@example.com", sessions=0, name="Del")
+        ex_id = _create_exercise(client, headers, "LB delete")
+        _complete_session(client, headers, ex_id)
+        record = _complete_session(client, headers, ex_id)
+
+        before = client.get("/api/leaderboards/xp/me", params={"period": "week"}, headers=headers).json()
+        assert client.delete(f"/api/sessions/{record['id']}", headers=headers).status_code == 200
+        after = client.get("/api/leaderboards/xp/me", params={"period": "week"}, headers=headers).json()
+        assert after["score"] == before["score"] - record["gamification"]["xp_gained"]
+        sessions = client.get("/api/leaderboards/sessions/me", params={"period": "week"}, headers=headers).json()
+        assert sessions["score"] == 1
+
+        streak = client.get("/api/leaderboards/streak/me", params={"period": "all"}, headers=headers).json()
+        assert streak["score"] == 1
+
+    def test_opt_out_hides_user(self, client):
+        headers = _athlete(client, "lb-out@example.com", sessions=1, name="Out")
+        assert client.put("/api/leaderboards/me", json={"visible": False}, headers=headers).status_code == 200
+        assert client.get("/api/leaderboards/me", headers=headers).json() == {"visible": False, "display_name": "Out"}
+        assert client.get("/api/leaderboards/sessions", params={"period": "week"}, headers=headers).json()["entries"] == []
+
+    def test_unknown_board(self, client):
+        headers = register_and_login(client, "lb-unknown@example.com")
+        assert client.get("/api/leaderboards/bench", headers=headers).status_code == 404
+        assert client.get("/api/leaderboards/streak", params={"period": "week"}, headers=headers).status_code == 404
+
+
+def test_benchmark_queries_read_indexes():
+    """Small run of the 100k-user benchmark; top-N and rank reads must not sort."""
+    from sqlalchemy import create_engine, text
+    from app.leaderboards import benchmark
+
+    timings = benchmark(users=2000, samples=2)
+    assert set(timings) == {"top50", "top50_page_20", "rank_k5"}
+
+    engine = create_engine("sqlite://")
+    from app.database import Base
+    from app.models.leaderboard_score import LeaderboardScore
+    from app.models.user import User
+    Base.metadata.create_all(engine, tables=[User.__table__, LeaderboardScore.__table__])
+    with engine.connect() as conn:
+        plan = " ".join(str(row) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT xp, user_id FROM leaderboard_scores "
+            "WHERE period = 'all' AND visible = 1 ORDER BY xp DESC, user_id LIMIT 50"
+        )))
+    assert "ix_leaderboard_scores_xp" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,531 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.exercise import Exercise
+from app.models.progression import RoutineDaySuggestions
+from app.models.routine import Routine
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user import User
+from app.progression_engine import analyze_routine_day, load_progression_context
+from tests.conftest import register_and_login, resolve_gamification
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _setup(db, email, exercises_per_day=3, days=2, sessions=8):
+    """A routine whose every exercise has been done at the top of its rep range for ``sessions`` sessions."""
+    user = User(email=email, password_hash="x", settings={})
+    db.add(user)
+    db.flush()
+    exs = [
+        Exercise(name=f"{email} {i}", muscle="Chest", equipment="Barbell", type="Strength")
+        for i in range(exercises_per_day * days)
+    ]
+    db.add_all(exs)
+    db.flush()
+    routine = Routine(user_id=user.id, name="R", days=[
+        {"day_name": f"Day {d}", "exercises": [
+            {"exercise_id": ex.id, "sets": 2, "reps": "8-10"}
+            for ex in exs[d * exercises_per_day:(d + 1) * exercises_per_day]
+        ]}
+        for d in range(days)
+    ])
+    db.add(routine)
+    db.flush()
+
+    for n in range(sessions):
+        day = n % days
+        s = SessionModel(user_id=user.id, routine_id=routine.id, day_index=day,
+                         started_at=_now() - timedelta(days=sessions - n),
+                         completed_at=_now() - timedelta(days=sessions - n))
+        db.add(s)
+        db.flush()
+        for ex in exs[day * exercises_per_day:(day + 1) * exercises_per_day]:
+            db.add_all([
+                SetModel(session_id=s.id, exercise_id=ex.id, set_number=k, weight_kg=60, reps=10,
+                         set_type="normal", completed_at=_now())
+                for k in (1, 2)
+            ])
+            # Warm-ups never count
+            db.add(SetModel(session_id=s.id, exercise_id=ex.id, set_number=0, weight_kg=20, reps=3,
+                            set_type="warmup", completed_at=_now()))
+    db.commit()
+    return user, routine, exs
+
+
+def _count_queries(db_engine, fn):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        event.remove(db_engine, "before_cursor_execute", count)
+    return result, len(statements)
+
+
+class TestProgressionContext:
+    def test_histories_are_per_exercise_newest_first(self, db_engine):
+        Session = sessionmaker(bind=db_engine)
+        db = Session()
+        try:
+            user, routine, exs = _setup(db, "prog_hist@example.com", sessions=30)
+            ctx = load_progression_context(user.id, routine, db)
+
+            assert set(ctx.exercises) == {ex.id for ex in exs}
+            assert ctx.experience_tier == "beginner"
+            history = ctx.histories[exs[0].id]
+            # The routine's last 20 sessions alternate days: 10 of them contain day 0's exercises
+            assert len(history) == 10
+            assert [h["completed_at"] for h in history] == sorted((h["completed_at"] for h in history), reverse=True)
+            assert all([s["set_number"] for s in h["sets"]] == [1, 2] for h in history)
+
+            suggestions = analyze_routine_day(user.id, routine.id, 0, db, ctx=ctx)
+            assert set(suggestions) == {ex.id for ex in exs[:3]}
+            assert all(s["type"] == "weight_increase" and s["suggested"]["weight"] == 62.5 for s in suggestions.values())
+        finally:
+            db.close()
+
+    def test_query_count_does_not_grow_with_exercises_or_sessions(self, db_engine):
+        Session = sessionmaker(bind=db_engine)
+        db = Session()
+        try:
+            small_user, small, _ = _setup(db, "prog_small@example.com", exercises_per_day=1, sessions=4)
+            big_user, big, _ = _setup(db, "prog_big@example.com", exercises_per_day=6, sessions=20)
+            db.expire_all()
+
+            small_result, small_queries = _count_queries(
+                db_engine, lambda: analyze_routine_day(small_user.id, small.id, 0, db))
+            db.expire_all()
+            big_result, big_queries = _count_queries(
+                db_engine, lambda: analyze_routine_day(big_user.id, big.id, 0, db))
+            assert len(small_result) == 1 and len(big_result) == 6
+            assert big_queries == small_queries
+
+            # A whole report shares one context across days
+            db.expire_all()
+
+            def report():
+                routine = db.get(Routine, big.id)
+                ctx = load_progression_context(big_user.id, routine, db)
+                return [analyze_routine_day(big_user.id, big.id, d, db, ctx=ctx) for d in range(2)]
+
+            days, report_queries = _count_queries(db_engine, report)
+            assert [len(d) for d in days] == [6, 6]
+            assert report_queries == big_queries
+        finally:
+            db.close()
+
+
+def _complete(client, headers, routine_id, exercise_id, weight=60.0, reps=10):
+    ts = _now().isoformat()
+    r = client.post("/api/sessions", json={"routine_id": routine_id, "day_index": 0, "started_at": ts}, headers=headers)
+    assert r.status_code == 200
+    r = client.post(f"/api/sessions/{r.json()['id']}/complete_bulk", json={
+        "completed_at": ts,
+        "sets": [
+            {"exercise_id": exercise_id, "set_number": k, "weight_kg": weight, "reps": reps, "completed_at": ts}
+            for k in (1, 2)
+        ],
+    }, headers=headers)
+    assert r.status_code == 200
+    return resolve_gamification(client, headers, r.json())
+
+
+class TestStoredSuggestions:
+    def _routine(self, client, headers):
+        r = client.post("/api/exercises", json={
+            "name": "Stored Bench", "muscle": "Chest", "equipment": "Barbell", "type": "Strength"
+        }, headers=headers)
+        ex_id = r.json()["id"]
+        r = client.post("/api/routines", json={"name": "Stored", "days": [
+            {"day_name": "A", "exercises": [{"exercise_id": ex_id, "sets": 2, "reps": "8-10"}]},
+            {"day_name": "B", "exercises": []},
+        ]}, headers=headers)
+        assert r.status_code == 200
+        return r.json()["id"], ex_id
+
+    def test_completion_precomputes_every_day_and_views_read_one_row(self, client, db_engine):
+        headers = register_and_login(client, "stored-sugg@example.com")
+        routine_id, ex_id = self._routine(client, headers)
+        _complete(client, headers, routine_id, ex_id)
+        _complete(client, headers, routine_id, ex_id)
+
+        db = sessionmaker(bind=db_engine)()
+        try:
+            rows = db.query(RoutineDaySuggestions).filter(RoutineDaySuggestions.routine_id == routine_id).all()
+            assert sorted(r.day_index for r in rows) == [0, 1]
+        finally:
+            db.close()
+
+        def view():
+            return client.get(f"/api/progression/routine/{routine_id}", params={"day_index": 0}, headers=headers)
+
+        r, queries = _count_queries(db_engine, view)
+        assert r.status_code == 200
+        assert r.json()["suggestions"][str(ex_id)]["type"] == "weight_increase"
+        assert queries == 2  # current user + the stored row
+
+        single = client.get(f"/api/progression/exercise/{ex_id}",
+                            params={"routine_id": routine_id, "day_index": 0}, headers=headers).json()
+        assert single["suggestion"]["suggested"]["weight"] == 62.5
+
+    def test_stale_rows_are_recomputed(self, client):
+        headers = register_and_login(client, "stored-stale@example.com")
+        routine_id, ex_id = self._routine(client, headers)
+        _complete(client, headers, routine_id, ex_id)
+        first = _complete(client, headers, routine_id, ex_id)
+
+        def suggestions():
+            r = client.get(f"/api/progression/routine/{routine_id}", params={"day_index": 0}, headers=headers)
+            assert r.status_code == 200
+            return r.json()["suggestions"]
+
+        assert suggestions()[str(ex_id)]["type"] == "weight_increase"
+
+        # A set edit on a completed session changes the history under the same latest session
+        sets = client.get(f"/api/sessions/{first['id']}", headers=headers).json()["sets"]
+        r = client.put(f"/api/sets/{sets[0]['id']}", json={"reps": 6}, headers=headers)
+        assert r.status_code == 200
+        assert suggestions().get(str(ex_id), {}).get("type") != "weight_increase"
+
+        # Editing the routine's days (rep range now 6-8) is picked up too
+        r = client.put(f"/api/routines/{routine_id}", json={"days": [
+            {"day_name": "A", "exercises": [{"exercise_id": ex_id, "sets": 2, "reps": "4-6"}]},
+        ]}, headers=headers)
+        assert r.status_code == 200
+        assert suggestions()[str(ex_id)]["type"] == "weight_increase"
+
+        # Deleting the latest session changes the key
+        assert client.delete(f"/api/sessions/{first['id']}", headers=headers).status_code == 200
+        assert str(ex_id) not in suggestions()
+
+    def test_resent_completion_recomputes_suggestions(self, client):
+        headers = register_and_login(client, "stored-resend@example.com")
+        routine_id, ex_id = self._routine(client, headers)
+        _complete(client, headers, routine_id, ex_id)
+        latest = _complete(client, headers, routine_id, ex_id)
+
+        def suggestions():
+            r = client.get(f"/api/progression/routine/{routine_id}", params={"day_index": 0}, headers=headers)
+            assert r.status_code == 200
+            return r.json()["suggestions"]
+
+        assert suggestions()[str(ex_id)]["type"] == "weight_increase"
+
+        # The client re-sends the latest completion with different sets
+        r = client.post(f"/api/sessions/{latest['id']}/complete_bulk", json={
+            "completed_at": latest["completed_at"],
+            "sets": [{"exercise_id": ex_id, "set_number": k, "weight_kg": 60.0, "reps": 6} for k in (1, 2)],
+        }, headers=headers)
+        assert r.status_code == 200
+        assert suggestions().get(str(ex_id), {}).get("type") != "weight_increase"
+
+    def test_other_users_routine_is_not_found(self, client):
+        owner = register_and_login(client, "stored-owner@example.com")
+        routine_id, _ = self._routine(client, owner)
+        other = register_and_login(client, "stored-other@example.com")
+        r = client.get(f"/api/progression/routine/{routine_id}", params={"day_index": 0}, headers=other)
+        assert r.status_code == 404
+
+
+class TestChainGraph:
+    def _chains(self, db):
+        from app.models.progression import ExerciseProgression
+
+        names = ["Knee Push Up", "Push Up", "Archer Push Up", "Glute Bridge", "Hyperextension", "Hollow Body Rocks"]
+        exs = {n: Exercise(name=n, muscle="Chest", equipment="None (Bodyweight)", type="Strength", is_bodyweight=True)
+               for n in names}
+        db.add_all(exs.values())
+        db.flush()
+        db.add_all([
+            ExerciseProgression(chain_name="push", exercise_id=exs["Knee Push Up"].id, position=0,
+                                target_reps_to_advance=10, target_sets_to_advance=2, suggested_starting_reps="4-6"),
+            ExerciseProgression(chain_name="push", exercise_id=exs["Push Up"].id, position=1,
+                                target_reps_to_advance=10, target_sets_to_advance=2, suggested_starting_reps="5-7"),
+            # position 2 missing from the catalog: the chain ends at Push Up
+            ExerciseProgression(chain_name="push", exercise_id=exs["Archer Push Up"].id, position=3,
+                                suggested_starting_reps="3-5"),
+            ExerciseProgression(chain_name="hinge", exercise_id=exs["Glute Bridge"].id, position=0),
+            ExerciseProgression(chain_name="hinge", exercise_id=exs["Hyperextension"].id, position=1,
+                                suggested_starting_reps="4-6"),
+            ExerciseProgression(chain_name="core", exercise_id=exs["Hyperextension"].id, position=0,
+                                suggested_starting_reps="6-8"),
+            ExerciseProgression(chain_name="core", exercise_id=exs["Hollow Body Rocks"].id, position=1),
+        ])
+        db.commit()
+        return {n: ex.id for n, ex in exs.items()}
+
+    def test_graph_neighbours(self, db_engine):
+        from app.exercise_catalog import get_catalog
+
+        db = sessionmaker(bind=db_engine)()
+        try:
+            ids = self._chains(db)
+            chains = get_catalog(db).chains
+
+            knee = chains.get(ids["Knee Push Up"])
+            assert (knee.chain_name, knee.position, knee.prev_id, knee.next_id) == ("push", 0, None, ids["Push Up"])
+            push_up = chains.next(knee)
+            assert (push_up.exercise_name, push_up.suggested_starting_reps) == ("Push Up", "5-7")
+            assert chains.next(push_up) is None and chains.prev(push_up) == knee
+
+            # In two chains: looked up by its first entry, reached from each chain with that chain's entry
+            assert chains.get(ids["Hyperextension"]).chain_name == "hinge"
+            assert chains.next(chains.get(ids["Glute Bridge"])).suggested_starting_reps == "4-6"
+            assert chains.prev(chains.get(ids["Hollow Body Rocks"])).suggested_starting_reps == "6-8"
+        finally:
+            db.close()
+
+    def test_bodyweight_advance_reads_no_chain_rows(self, db_engine):
+        from app.exercise_catalog import bump_catalog_version
+
+        db = sessionmaker(bind=db_engine)()
+        try:
+            ids = self._chains(db)
+            user = User(email="chain@example.com", password_hash="x", settings={})
+            db.add(user)
+            db.flush()
+            routine = Routine(user_id=user.id, name="BW", days=[
+                {"day_name": "A", "exercises": [{"exercise_id": ids["Knee Push Up"], "sets": 2, "reps": "8-10"}]},
+            ])
+            db.add(routine)
+            db.flush()
+            for n in range(2):
+                s = SessionModel(user_id=user.id, routine_id=routine.id, day_index=0,
+                                 started_at=_now() - timedelta(days=2 - n), completed_at=_now() - timedelta(days=2 - n))
+                db.add(s)
+                db.flush()
+                db.add_all([
+                    SetModel(session_id=s.id, exercise_id=ids["Knee Push Up"], set_number=k, reps=11,
+                             set_type="normal", completed_at=_now())
+                    for k in (1, 2)
+                ])
+            db.commit()
+
+            analyze_routine_day(user.id, routine.id, 0, db)  # loads the catalog
+            statements = []
+
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db_engine, "before_cursor_execute", record)
+            try:
+                suggestion = analyze_routine_day(user.id, routine.id, 0, db)[ids["Knee Push Up"]]
+            finally:
+                event.remove(db_engine, "before_cursor_execute", record)
+            assert suggestion["type"] == "bw_progression"
+            assert suggestion["new_exercise_id"] == ids["Push Up"]
+            assert suggestion["suggested"] == {"weight": 0, "reps": "5-7", "sets": 3}
+            assert not [s for s in statements if "exercise_progressions" in s]
+
+            # Renames reach the graph once the catalog version moves
+            db.get(Exercise, ids["Push Up"]).name = "Full Push Up"
+            db.commit()
+            bump_catalog_version()
+            suggestion = analyze_routine_day(user.id, routine.id, 0, db)[ids["Knee Push Up"]]
+            assert suggestion["new_exercise_name"] == "Full Push Up"
+        finally:
+            db.close()
+
+
+class TestProgressSummary:
+    def test_aggregates_and_memo(self, db_engine):
+        from app.exercise_catalog import get_catalog
+        from app.progression_summary import build_progress_summary
+        from app.stats_cache import stats_cache
+
+        stats_cache.clear()
+        db = sessionmaker(bind=db_engine)()
+        try:
+            small_user, small, _ = _setup(db, "summary_small@example.com", exercises_per_day=1, sessions=4)
+            user, routine, exs = _setup(db, "summary@example.com", exercises_per_day=4, sessions=16)
+            get_catalog(db)
+            db.expire_all()
+
+            summary, queries = _count_queries(db_engine, lambda: build_progress_summary(user.id, routine.id, db, 0))
+            assert summary["overall"]["total_sessions"] == 16
+            assert [e["exercise_id"] for e in summary["exercises"]] == [ex.id for ex in exs[:4]]
+            bench = summary["exercises"][0]
+            assert bench["sessions_tracked"] == 8
+            assert bench["best_set"] == {"weight": 60.0, "reps": 10}
+            # Warm-ups count towards the per-session averages
+            assert bench["avg_last_3"] == {"weight": 60.0, "reps": 7.7}
+            assert bench["plateau"] is True and bench["trend"] == "stalled"
+
+            db.expire_all()
+            _, small_queries = _count_queries(
+                db_engine, lambda: build_progress_summary(small_user.id, small.id, db, 0))
+            assert small_queries == queries
+
+            # Same latest session: served from the memo
+            db.expire_all()
+            again, memo_queries = _count_queries(db_engine, lambda: build_progress_summary(user.id, routine.id, db, 0))
+            assert again == summary
+            assert memo_queries == queries - 2  # no session dates, no set aggregates
+
+            # A newer session is picked up
+            s = SessionModel(user_id=user.id, routine_id=routine.id, day_index=0, started_at=_now(), completed_at=_now())
+            db.add(s)
+            db.flush()
+            db.add(SetModel(session_id=s.id, exercise_id=exs[0].id, set_number=1, weight_kg=65, reps=8,
+                            set_type="normal", completed_at=_now()))
+            db.commit()
+            fresh = build_progress_summary(user.id, routine.id, db, 0)
+            assert fresh["overall"]["total_sessions"] == 17
+            assert fresh["exercises"][0]["best_set"] == {"weight": 65.0, "reps": 10}
+            assert fresh["overall"]["recent_prs"][0] == {"exercise": exs[0].name, "type": "weight"}
+        finally:
+            db.close()
+
+
+class TestReportJobs:
+    def _routine_with_history(self, client, headers):
+        r = client.post("/api/exercises", json={
+            "name": "Report Bench", "muscle": "Chest", "equipment": "Barbell", "type": "Strength"
+        }, headers=headers)
+        ex_id = r.json()["id"]
+        r = client.post("/api/routines", json={"name": "Report", "days": [
+            {"day_name": "A", "exercises": [{"exercise_id": ex_id, "sets": 2, "reps": "8-10"}]},
+        ]}, headers=headers)
+        routine_id = r.json()["id"]
+        _complete(client, headers, routine_id, ex_id)
+        _complete(client, headers, routine_id, ex_id)
+        return routine_id, ex_id
+
+    def test_report_is_generated_in_the_background_and_charged_once(self, client, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        headers = register_and_login(client, "report-job@example.com", initial_coins=120)
+        routine_id, ex_id = self._routine_with_history(client, headers)
+        coins = client.get("/api/auth/me", headers=headers).json()["currency"]
+
+        r = client.post(f"/api/progression/report/{routine_id}", json={}, headers=headers)
+        assert r.status_code == 202
+        job_id = r.json()["job_id"]
+
+        job = client.get(f"/api/progression/report/jobs/{job_id}", headers=headers).json()
+        assert job["status"] == "done"
+        assert job["currency"] == coins - 50
+        assert job["report"]["overall_assessment"].startswith("AI analysis unavailable")
+        assert job["report"]["days"]["A"][str(ex_id)]["type"] == "weight_increase"
+
+        latest = client.get(f"/api/progression/report/{routine_id}", headers=headers).json()["report"]
+        assert latest["report_id"] == job["report"]["report_id"]
+
+        other = register_and_login(client, "report-job-other@example.com")
+        assert client.get(f"/api/progression/report/jobs/{job_id}", headers=other).status_code == 404
+
+    def test_unaffordable_reports_are_refused_or_not_charged(self, client, db_engine, monkeypatch):
+        import asyncio
+
+        from app.models.ai_usage_log import AIUsageLog
+        from app.models.progression import ProgressionReport, ProgressionReportJob
+        from app.progression_report_jobs import run_report_job
+
+        headers = register_and_login(client, "report-poor@example.com")
+        routine_id, _ = self._routine_with_history(client, headers)
+        db = sessionmaker(bind=db_engine)()
+        try:
+            user = db.query(User).filter(User.email == "report-poor@example.com").one()
+            user_id = user.id
+            user.currency = 0
+            db.commit()
+            assert client.post(f"/api/progression/report/{routine_id}", json={}, headers=headers).status_code == 402
+            assert db.query(ProgressionReportJob).count() == 0
+
+            # Enqueued while affordable, but the coins are spent before the report is stored
+            async def not_started(bind, job_id):
+                return None
+
+            monkeypatch.setattr("app.routers.progression.run_report_job", not_started)
+            user.currency = 50
+            db.commit()
+            job_id = client.post(f"/api/progression/report/{routine_id}", json={}, headers=headers).json()["job_id"]
+            # A second request while it is unfinished returns the same job
+            assert client.post(f"/api/progression/report/{routine_id}", json={}, headers=headers).json()["job_id"] == job_id
+            spent = []
+
+            async def enrich(prompt):
+                assert "Report Bench" in prompt
+                assert db_engine.pool.checkedout() == 0  # no connection held while the AI answers
+                if not spent:
+                    # The coins are spent elsewhere while the AI answers
+                    other = sessionmaker(bind=db_engine)()
+                    other.get(User, user_id).currency = 10
+                    other.commit()
+                    other.close()
+                    spent.append(True)
+                return {"overall_assessment": "Solid", "exercise_enrichments": {}}, {
+                    "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15, "cost_usd": 0.0001}
+
+            monkeypatch.setattr("app.openai_service.generate_report_ai", enrich)
+            db.close()
+            asyncio.run(run_report_job(db_engine, job_id))
+            job = db.get(ProgressionReportJob, job_id)
+            assert (job.status, job.report_id) == ("failed", None)
+            assert job.error.startswith("Not enough coins")
+            assert db.get(User, user_id).currency == 10
+            assert db.query(ProgressionReport).count() == 0 and db.query(AIUsageLog).count() == 0
+
+            # Affordable again: a new job stores report, usage log and charge together
+            user = db.get(User, user_id)
+            user.currency = 60
+            db.commit()
+            job_id = client.post(f"/api/progression/report/{routine_id}", json={}, headers=headers).json()["job_id"]
+            db.close()
+            asyncio.run(run_report_job(db_engine, job_id))
+            asyncio.run(run_report_job(db_engine, job_id))  # already done: a no-op
+            job = db.get(ProgressionReportJob, job_id)
+            assert job.status == "done"
+            assert job.report.report_data["overall_assessment"] == "Solid"
+            assert job.report.ai_usage_log.total_tokens == 15
+            assert db.get(User, user_id).currency == 10
+        finally:
+            db.close()
+
+    def test_one_unfinished_report_per_user(self, client, db_engine, monkeypatch):
+        """With exactly 50 coins, reports for two routines make one AI call and one charge."""
+        import asyncio
+
+        from app.progression_report_jobs import run_report_job
+
+        headers = register_and_login(client, "report-two@example.com")
+        first, _ = self._routine_with_history(client, headers)
+        second, _ = self._routine_with_history(client, headers)
+        db = sessionmaker(bind=db_engine)()
+        db.query(User).filter(User.email == "report-two@example.com").one().currency = 50
+        db.commit()
+        db.close()
+
+        async def not_started(bind, job_id):
+            return None
+
+        calls = []
+
+        async def enrich(prompt):
+            calls.append(prompt)
+            return {"overall_assessment": "Solid", "exercise_enrichments": {}}, None
+
+        monkeypatch.setattr("app.routers.progression.run_report_job", not_started)
+        monkeypatch.setattr("app.openai_service.generate_report_ai", enrich)
+
+        r = client.post(f"/api/progression/report/{first}", json={}, headers=headers)
+        assert r.status_code == 202
+        r2 = client.post(f"/api/progression/report/{second}", json={}, headers=headers)
+        assert r2.status_code == 409
+
+        asyncio.run(run_report_job(db_engine, r.json()["job_id"]))
+        job = client.get(f"/api/progression/report/jobs/{r.json()['job_id']}", headers=headers).json()
+        assert job["status"] == "done"
+        assert len(calls) == 1
+        assert client.get("/api/auth/me", headers=headers).json()["currency"] == 0
+
+        # The first one is finished, but the coins are gone
+        assert client.post(f"/api/progression/report/{second}", json={}, headers=headers).status_code == 402
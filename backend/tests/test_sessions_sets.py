@@ -11,7 +11,7 @@ Tests for session & set endpoints:
 """
 import pytest
 from datetime import datetime, timezone
-from tests.conftest import register_and_login
+from tests.conftest import register_and_login, resolve_gamification
 
 
 def _now_iso():
@@ -80,7 +80,7 @@ class TestSessions:
         complete_at = _now_iso()
         r1 = client.put(f"/api/sessions/{session['id']}", json={"completed_at": complete_at}, headers=headers)
         assert r1.status_code == 200
-        assert r1.json().get("gamification", {}).get("xp_gained", 0) > 0
+        assert resolve_gamification(client, headers, r1.json()).get("gamification", {}).get("xp_gained", 0) > 0
 
         me_before = client.get("/api/auth/me", headers=headers).json()
 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone, timedelta
 
-from tests.conftest import register_and_login
+from tests.conftest import register_and_login, resolve_gamification
 
 
 def _iso(dt: datetime) -> str:
@@ -46,7 +46,7 @@ def _complete_bulk(client, headers, session_id: int, completed_at: datetime, set
         headers=headers,
     )
     assert r.status_code == 200, r.text
-    return r.json()
+    return resolve_gamification(client, headers, r.json())
 
 
 class TestSetTypesAndFailure:
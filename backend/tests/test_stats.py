@@ -114,6 +114,236 @@ class TestWeeklyStats:
         r = client.get("/api/stats/weekly", headers=headers)
         assert r.json()["sessions"] == 0
 
+class TestDailyStatsRollup:
+    """The weekly endpoint reads user_daily_stats; every write path must keep it in step."""
+
+    def _completed_session(self, client, headers, days_ago: int = 0, duration_seconds: int | None = None):
+        started = _now() - timedelta(days=days_ago, hours=1)
+        payload = {"started_at": _iso(started), "completed_at": _iso(started + timedelta(hours=1))}
+        if duration_seconds is not None:
+            payload["duration_seconds"] = duration_seconds
+        r = client.post("/api/sessions/", json=payload, headers=headers)
+        assert r.status_code == 200
+        return r.json()["id"]
+
+    def _add_set(self, client, headers, session_id: int, set_number: int, weight: float, reps: int, set_type: str = "normal"):
+        r = client.post("/api/sets/", json={
+            "session_id": session_id,
+            "exercise_id": 1,
+            "set_number": set_number,
+            "weight_kg": weight,
+            "reps": reps,
+            "set_type": set_type,
+            "completed_at": _iso(_now()),
+        }, headers=headers)
+        assert r.status_code == 200
+        return r.json()["id"]
+
+    def _rollup_rows(self, db_engine):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.models.user_daily_stats import UserDailyStats
+        db = sm(bind=db_engine)()
+        try:
+            return db.query(UserDailyStats).order_by(UserDailyStats.day).all()
+        finally:
+            db.close()
+
+    def test_set_writes_update_volume(self, client, db_engine):
+        headers = register_and_login(client, "rollupsets@example.com")
+        sid = self._completed_session(client, headers)
+        set_id = self._add_set(client, headers, sid, 1, 100.0, 10)
+        self._add_set(client, headers, sid, 2, 60.0, 5, set_type="warmup")
+
+        rows = self._rollup_rows(db_engine)
+        assert len(rows) == 1
+        assert rows[0].sessions == 1
+        assert rows[0].volume == 1000
+        assert rows[0].set_count == 1
+
+        r = client.put(f"/api/sets/{set_id}", json={"weight_kg": 80.0}, headers=headers)
+        assert r.status_code == 200
+        assert client.get("/api/stats/weekly", headers=headers).json()["volume"] == 800
+
+        assert client.delete(f"/api/sets/{set_id}", headers=headers).status_code == 200
+        assert client.get("/api/stats/weekly", headers=headers).json()["volume"] == 0
+
+    def test_delete_session_removes_day(self, client, db_engine):
+        headers = register_and_login(client, "rollupdelete@example.com")
+        keep = self._completed_session(client, headers, days_ago=1, duration_seconds=3000)
+        drop = self._completed_session(client, headers, days_ago=0, duration_seconds=1000)
+        self._add_set(client, headers, keep, 1, 50.0, 10)
+        self._add_set(client, headers, drop, 1, 100.0, 10)
+
+        data = client.get("/api/stats/weekly", headers=headers).json()
+        assert data["sessions"] == 2
+        assert data["volume"] == 1500
+        assert data["total_duration_seconds"] == 4000
+        assert data["avg_duration_seconds"] == 2000
+        assert data["tracked_duration_sessions"] == 2
+
+        assert client.delete(f"/api/sessions/{drop}", headers=headers).status_code == 200
+        data = client.get("/api/stats/weekly", headers=headers).json()
+        assert data["sessions"] == 1
+        assert data["volume"] == 500
+        assert data["total_duration_seconds"] == 3000
+        assert data["tracked_duration_sessions"] == 1
+        assert data["daily_sessions"][6] == 0
+        assert data["daily_sessions"][5] == 1
+        assert len(self._rollup_rows(db_engine)) == 1
+
+    def test_draft_sessions_have_no_rollup(self, client, db_engine):
+        headers = register_and_login(client, "rollupdraft@example.com")
+        r = client.post("/api/sessions/", json={"started_at": _iso(_now())}, headers=headers)
+        self._add_set(client, headers, r.json()["id"], 1, 100.0, 10)
+        assert self._rollup_rows(db_engine) == []
+
+    def test_complete_bulk_and_duration_edit(self, client, db_engine):
+        headers = register_and_login(client, "rollupbulk@example.com")
+        sid = client.post("/api/sessions/", json={"started_at": _iso(_now())}, headers=headers).json()["id"]
+        r = client.post(f"/api/sessions/{sid}/complete_bulk", json={
+            "completed_at": _iso(_now()),
+            "duration_seconds": 1800,
+            "sets": [
+                {"exercise_id": 1, "set_number": 1, "weight_kg": 40, "reps": 10, "completed_at": _iso(_now())},
+                {"exercise_id": 1, "set_number": 2, "weight_kg": 40, "reps": 10, "completed_at": _iso(_now())},
+            ],
+        }, headers=headers)
+        assert r.status_code == 200
+        assert client.get("/api/stats/weekly", headers=headers).json()["volume"] == 800
+
+        r = client.put(f"/api/sessions/{sid}", json={"duration_seconds": 2400}, headers=headers)
+        assert r.status_code == 200
+        rows = self._rollup_rows(db_engine)
+        assert rows[0].duration_seconds == 2400
+        assert rows[0].set_count == 2
+
+    def test_rebuild_matches_incremental(self, client, db_engine):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.daily_stats import rebuild_user_daily_stats
+        from app.models.user import User
+
+        headers = register_and_login(client, "rolluprebuild@example.com")
+        for days_ago in (0, 0, 3, 9):
+            sid = self._completed_session(client, headers, days_ago=days_ago, duration_seconds=600)
+            self._add_set(client, headers, sid, 1, 20.0, 12)
+        before = [(r.day, r.sessions, r.volume, r.set_count, r.duration_seconds) for r in self._rollup_rows(db_engine)]
+
+        db = sm(bind=db_engine)()
+        try:
+            user = db.query(User).filter(User.email == "rolluprebuild@example.com").one()
+            assert rebuild_user_daily_stats(db, user.id) == 3
+            db.commit()
+        finally:
+            db.close()
+
+        after = [(r.day, r.sessions, r.volume, r.set_count, r.duration_seconds) for r in self._rollup_rows(db_engine)]
+        assert after == before
+
+
+class TestMuscleRollup:
+    """/api/stats/muscles reads user_muscle_weekly_stats, credits secondary muscles and filters by range."""
+
+    def _exercise(self, client, headers, name, muscle, secondary=None, group="Chest"):
+        r = client.post("/api/exercises", json={
+            "name": name, "muscle": muscle, "secondary_muscle": secondary, "muscle_group": group, "type": "Strength",
+        }, headers=headers)
+        assert r.status_code == 200, r.text
+        return r.json()["id"]
+
+    def _session(self, client, headers, days_ago, sets):
+        completed = _now() - timedelta(days=days_ago)
+        sid = client.post("/api/sessions/", json={"started_at": _iso(completed - timedelta(hours=1))}, headers=headers).json()["id"]
+        r = client.post(f"/api/sessions/{sid}/complete_bulk", json={
+            "completed_at": _iso(completed),
+            "sets": [
+                {"exercise_id": ex, "set_number": n, "weight_kg": w, "reps": reps, "completed_at": _iso(completed)}
+                for n, (ex, w, reps) in enumerate(sets, start=1)
+            ],
+        }, headers=headers)
+        assert r.status_code == 200
+        return sid
+
+    def test_secondary_muscle_credit(self, client):
+        headers = register_and_login(client, "muscles@example.com")
+        bench = self._exercise(client, headers, "Bench", "Chest", secondary="Triceps")
+        pushdown = self._exercise(client, headers, "Pushdown", "Triceps", group="Arms")
+        self._session(client, headers, 0, [(bench, 100.0, 10), (bench, 100.0, 10), (pushdown, 20.0, 10)])
+
+        rows = {r["muscle"]: r for r in client.get("/api/stats/muscles", headers=headers).json()}
+        assert rows["Chest"]["total_sets"] == 2
+        assert rows["Chest"]["total_volume"] == 2000
+        assert rows["Chest"]["total_sessions"] == 1
+        # Triceps: one direct set (200) + half credit for two bench sets (1000)
+        assert rows["Triceps"]["primary_sets"] == 1
+        assert rows["Triceps"]["secondary_sets"] == 2
+        assert rows["Triceps"]["total_sets"] == 2.0
+        assert rows["Triceps"]["total_volume"] == 1200
+
+        full = {r["muscle"]: r for r in client.get("/api/stats/muscles?secondary_fraction=1", headers=headers).json()}
+        assert full["Triceps"]["total_volume"] == 2200
+        assert client.get("/api/stats/muscles?secondary_fraction=2", headers=headers).status_code == 422
+
+    def test_range_and_granularity(self, client):
+        headers = register_and_login(client, "musclesrange@example.com")
+        bench = self._exercise(client, headers, "Bench", "Chest")
+        self._session(client, headers, 0, [(bench, 50.0, 10)])
+        self._session(client, headers, 14, [(bench, 40.0, 10)])
+        self._session(client, headers, 70, [(bench, 30.0, 10)])
+
+        total = client.get("/api/stats/muscles", headers=headers).json()
+        assert total[0]["total_volume"] == 1200
+        assert total[0]["total_sessions"] == 3
+
+        since = (_now() - timedelta(days=20)).date().isoformat()
+        recent = client.get(f"/api/stats/muscles?from={since}", headers=headers).json()
+        assert recent[0]["total_volume"] == 900
+
+        weekly = client.get(f"/api/stats/muscles?from={since}&granularity=week", headers=headers).json()
+        assert [w["total_volume"] for w in weekly] == [400, 500]
+        assert weekly[0]["period"] < weekly[1]["period"]
+
+        until = (_now() - timedelta(days=60)).date().isoformat()
+        old = client.get(f"/api/stats/muscles?to={until}&granularity=month", headers=headers).json()
+        assert [m["total_volume"] for m in old] == [300]
+        assert len(old[0]["period"]) == 7
+        assert client.get("/api/stats/muscles?granularity=day", headers=headers).status_code == 422
+
+    def test_writes_and_rebuild_keep_rollup_in_step(self, client, db_engine):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.models.user import User
+        from app.models.user_muscle_weekly_stats import UserMuscleWeeklyStats
+        from app.muscle_stats import rebuild_user_muscle_stats
+
+        headers = register_and_login(client, "musclesync@example.com")
+        bench = self._exercise(client, headers, "Bench", "Chest", secondary="Triceps")
+        keep = self._session(client, headers, 3, [(bench, 60.0, 10)])
+        drop = self._session(client, headers, 0, [(bench, 100.0, 10)])
+        assert client.delete(f"/api/sessions/{drop}", headers=headers).status_code == 200
+        r = client.post("/api/sets/", json={
+            "session_id": keep, "exercise_id": bench, "set_number": 2, "weight_kg": 50.0, "reps": 10,
+        }, headers=headers)
+        assert r.status_code == 200
+
+        rows = {r["muscle"]: r for r in client.get("/api/stats/muscles", headers=headers).json()}
+        assert rows["Chest"]["total_volume"] == 1100
+        assert rows["Triceps"]["secondary_sets"] == 2
+
+        db = sm(bind=db_engine)()
+        try:
+            def snapshot():
+                return sorted(
+                    (r.week, r.muscle, r.sessions, r.primary_sets, r.primary_volume, r.secondary_sets, r.secondary_volume)
+                    for r in db.query(UserMuscleWeeklyStats).all()
+                )
+            before = snapshot()
+            user = db.query(User).filter(User.email == "musclesync@example.com").one()
+            rebuild_user_muscle_stats(db, user.id)
+            db.commit()
+            assert snapshot() == before
+        finally:
+            db.close()
+
+
 class TestNSSAlgorithms:
     def _create_session_with_exercise(self, client, headers, ex_name: str, weight: float, reps: int):
         # Create session
@@ -210,6 +440,168 @@ class TestNSSAlgorithms:
         assert pure_override_nss > assisted_nss
 
 
+class TestProgressQueryCount:
+    """/api/stats/progress must cost a fixed number of queries, not one per session."""
+
+    def _log_session(self, client, headers, exercise_id: int, weight: float, days_ago: int):
+        completed = _now() - timedelta(days=days_ago)
+        sid = client.post("/api/sessions/", json={"started_at": _iso(completed - timedelta(hours=1))}, headers=headers).json()["id"]
+        r = client.post(f"/api/sessions/{sid}/complete_bulk", json={
+            "completed_at": _iso(completed),
+            "sets": [
+                {"exercise_id": exercise_id, "set_number": n, "weight_kg": weight, "reps": 8, "completed_at": _iso(completed)}
+                for n in (1, 2, 3)
+            ],
+        }, headers=headers)
+        assert r.status_code == 200
+
+    def _count_queries(self, db_engine, fn):
+        from sqlalchemy import event
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            result = fn()
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+        return result, len(statements)
+
+    def test_query_count_independent_of_history(self, client, db_engine):
+        headers = register_and_login(client, "progressqueries@example.com")
+        bench = client.post("/api/exercises", json={"name": "Bench", "muscle": "Chest", "type": "weighted"}, headers=headers).json()["id"]
+        dips = client.post("/api/exercises", json={
+            "name": "Dip", "muscle": "Chest", "type": "bodyweight", "is_bodyweight": True, "bw_ratio": 0.85,
+        }, headers=headers).json()["id"]
+
+        self._log_session(client, headers, bench, 60.0, days_ago=20)
+        r, small_count = self._count_queries(db_engine, lambda: client.get("/api/stats/progress", headers=headers))
+        assert r.status_code == 200
+        assert len(r.json()) == 1
+
+        for i in range(8):
+            self._log_session(client, headers, bench if i % 2 else dips, 60.0 + i, days_ago=19 - i)
+        r, large_count = self._count_queries(db_engine, lambda: client.get("/api/stats/progress", headers=headers))
+        assert r.status_code == 200
+        points = r.json()
+        assert len(points) == 9
+        assert [p["session_number"] for p in points] == list(range(1, 10))
+
+        # auth lookup + bodyweight fallback + one joined sets query
+        assert large_count == small_count
+        assert large_count <= 3
+
+
+class TestProgressDownsampling:
+    def test_progress_max_points_keeps_shape_and_numbering(self, client):
+        headers = register_and_login(client, "downsample@example.com")
+        bench = client.post("/api/exercises", json={"name": "Bench", "muscle": "Chest", "type": "weighted"}, headers=headers).json()["id"]
+        weights = [60, 61, 62, 63, 100, 64, 65, 66, 67, 68]
+        for i, w in enumerate(weights):
+            completed = _now() - timedelta(days=len(weights) - i)
+            sid = client.post("/api/sessions/", json={"started_at": _iso(completed - timedelta(hours=1))}, headers=headers).json()["id"]
+            client.post(f"/api/sessions/{sid}/complete_bulk", json={
+                "completed_at": _iso(completed),
+                "sets": [{"exercise_id": bench, "set_number": 1, "weight_kg": w, "reps": 5, "completed_at": _iso(completed)}],
+            }, headers=headers)
+
+        full = client.get("/api/stats/progress", headers=headers).json()
+        points = client.get("/api/stats/progress?max_points=5", headers=headers).json()
+        assert len(full) == 10
+        assert len(points) == 5
+        numbers = [p["session_number"] for p in points]
+        assert numbers[0] == 1 and numbers[-1] == 10 and 5 in numbers
+        by_number = {p["session_number"]: p for p in full}
+        assert all(p == by_number[p["session_number"]] for p in points)
+
+        # max_points >= series length (or < 3) returns everything
+        assert client.get("/api/stats/progress?max_points=50", headers=headers).json() == full
+        assert client.get("/api/stats/progress?max_points=2", headers=headers).json() == full
+
+
+class TestStatsCache:
+    """Repeated dashboard loads are served from the per-user stats cache."""
+
+    DASHBOARD = ["/api/stats/weekly", "/api/stats/muscles", "/api/stats/progress", "/api/stats/effort", "/api/stats/cardio"]
+
+    def _log_session(self, client, headers, weight: float = 60.0, days_ago: int = 0):
+        completed = _now() - timedelta(days=days_ago)
+        sid = client.post("/api/sessions/", json={"started_at": _iso(completed - timedelta(hours=1))}, headers=headers).json()["id"]
+        r = client.post(f"/api/sessions/{sid}/complete_bulk", json={
+            "completed_at": _iso(completed),
+            "sets": [{"exercise_id": 1, "set_number": 1, "weight_kg": weight, "reps": 10, "completed_at": _iso(completed)}],
+        }, headers=headers)
+        assert r.status_code == 200
+        return sid
+
+    def _statements(self, db_engine, fn):
+        from sqlalchemy import event
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            fn()
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+        return statements
+
+    def test_repeat_dashboard_load_runs_no_stats_queries(self, client, db_engine):
+        headers = register_and_login(client, "statscache@example.com")
+        self._log_session(client, headers)
+
+        first = {url: client.get(url, headers=headers).json() for url in self.DASHBOARD}
+        second = {}
+        statements = self._statements(
+            db_engine, lambda: second.update({url: client.get(url, headers=headers).json() for url in self.DASHBOARD})
+        )
+
+        assert second == first
+        # Only the per-request auth lookup of the user remains
+        assert len(statements) == len(self.DASHBOARD)
+        assert all("FROM users" in s for s in statements)
+
+    def test_training_writes_invalidate(self, client):
+        headers = register_and_login(client, "statscache2@example.com")
+        sid = self._log_session(client, headers, weight=50.0)
+        assert client.get("/api/stats/weekly", headers=headers).json()["volume"] == 500
+
+        set_id = client.get(f"/api/sessions/{sid}", headers=headers).json()["sets"][0]["id"]
+        client.put(f"/api/sets/{set_id}", json={"weight_kg": 80.0}, headers=headers)
+        assert client.get("/api/stats/weekly", headers=headers).json()["volume"] == 800
+
+        self._log_session(client, headers, weight=10.0, days_ago=1)
+        weekly = client.get("/api/stats/weekly", headers=headers).json()
+        assert weekly["sessions"] == 2
+        assert weekly["volume"] == 900
+
+        client.delete(f"/api/sessions/{sid}", headers=headers)
+        assert client.get("/api/stats/weekly", headers=headers).json()["sessions"] == 1
+
+    def test_cache_is_per_user_and_per_params(self, client):
+        a = register_and_login(client, "statscache_a@example.com")
+        b = register_and_login(client, "statscache_b@example.com")
+        self._log_session(client, a)
+
+        assert client.get("/api/stats/weekly", headers=a).json()["sessions"] == 1
+        assert client.get("/api/stats/weekly", headers=b).json()["sessions"] == 0
+        assert len(client.get("/api/stats/progress", headers=a).json()) == 1
+        assert client.get("/api/stats/progress?exercise_id=999", headers=a).json() == []
+
+    def test_hit_and_miss_counters_exported(self, client):
+        headers = register_and_login(client, "statscache3@example.com")
+        client.get("/api/stats/weekly", headers=headers)
+        client.get("/api/stats/weekly", headers=headers)
+
+        metrics = client.get("/metrics").text
+        assert 'stats_cache_hits_total{endpoint="weekly"}' in metrics
+        assert 'stats_cache_misses_total{endpoint="weekly"}' in metrics
+
+
 class TestCardioStats:
     def _create_cardio_exercise(self, client, headers, name="Running"):
         r = client.post("/api/exercises", json={
@@ -244,6 +636,24 @@ class TestCardioStats:
         }, headers=headers)
         return session_id
 
+    def test_cardio_stats_max_points(self, client):
+        headers = register_and_login(client)
+        ex_id = self._create_cardio_exercise(client, headers)
+        distances = [5.0, 5.2, 4.8, 12.0, 5.1, 5.0, 4.9, 5.3]
+        for i, km in enumerate(distances):
+            self._create_cardio_session(client, headers, ex_id, distance_km=km, pace_sec=360.0 - i, days_ago=len(distances) - i)
+
+        full = client.get("/api/stats/cardio", headers=headers).json()
+        data = client.get("/api/stats/cardio?max_points=4", headers=headers).json()
+        assert len(full["distance_trend"]) == 8
+        assert len(data["distance_trend"]) == 4
+        assert len(data["pace_trend"]) == 4
+        # Endpoints and the 12 km outlier survive; totals still use every set
+        kept = [p["distance_km"] for p in data["distance_trend"]]
+        assert kept[0] == 5.0 and kept[-1] == 5.3 and 12.0 in kept
+        assert data["total_distance_km"] == full["total_distance_km"]
+        assert data["total_sessions"] == 8
+
     def test_cardio_stats_empty(self, client):
         headers = register_and_login(client)
         r = client.get("/api/stats/cardio", headers=headers)
@@ -530,6 +940,65 @@ class TestEffortTrend:
         assert data[1]["index"] == 2
         assert data[1]["effort"] == 65.2
 
+    def _add_effort_sessions(self, db_engine, email: str, days_ago: list):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.models.user import User
+        from app.models.session import Session as SessionModel
+
+        db = sm(bind=db_engine)()
+        try:
+            user = db.query(User).filter(User.email == email).one()
+            db.add_all([
+                SessionModel(
+                    user_id=user.id,
+                    started_at=_now() - timedelta(days=d, hours=1),
+                    completed_at=_now() - timedelta(days=d),
+                    effort_score=None if d % 2 else float(d),
+                    self_rated_effort=d % 10 if d % 2 else None,
+                )
+                for d in days_ago
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    def test_effort_recent_window_is_limited_in_sql(self, client, db_engine):
+        from sqlalchemy import event
+
+        headers = register_and_login(client, "effortsql@example.com")
+        self._add_effort_sessions(db_engine, "effortsql@example.com", list(range(1, 61)))
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            data = client.get("/api/stats/effort?limit=5", headers=headers).json()
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        # Newest five, oldest first; odd days fall back to the self-rating
+        assert [p["effort"] for p in data] == [50.0, 4.0, 30.0, 2.0, 10.0]
+        effort_sql = [s for s in statements if "FROM sessions" in s]
+        assert len(effort_sql) == 1
+        assert "LIMIT" in effort_sql[0] and "DESC" in effort_sql[0]
+
+    def test_effort_date_range_is_paged(self, client, db_engine):
+        headers = register_and_login(client, "effortrange@example.com")
+        self._add_effort_sessions(db_engine, "effortrange@example.com", list(range(2, 102, 2)))
+
+        start = (_now() - timedelta(days=60)).date().isoformat()
+        end = (_now() - timedelta(days=11)).date().isoformat()
+        first = client.get(f"/api/stats/effort?from={start}&to={end}&limit=20", headers=headers).json()
+        second = client.get(f"/api/stats/effort?from={start}&to={end}&limit=20&skip=20", headers=headers).json()
+
+        # Days 60..12 (even) are in range: 25 sessions, oldest first
+        assert len(first) == 20 and len(second) == 5
+        assert first[0]["effort"] == 60.0 and second[-1]["effort"] == 12.0
+        assert [p["index"] for p in second] == [21, 22, 23, 24, 25]
+
     def test_effort_demo_endpoint(self, client, db_engine):
         from sqlalchemy.orm import sessionmaker as sm
         from app.models.user import User
@@ -572,3 +1041,101 @@ class TestEffortTrend:
         r = client.get("/api/stats/effort/demo")
         assert r.status_code == 200
         assert r.json() == []
+
+
+class TestDemoSnapshots:
+    """Anonymous demo endpoints are served from in-memory snapshots."""
+
+    DEMO = [
+        "/api/stats/progress/demo?max_points=120",
+        "/api/stats/effort/demo?limit=12",
+        "/api/stats/cardio/exercises/demo?days=100",
+        "/api/sessions/demo/history",
+        "/api/gamification/stats/demo",
+        "/api/gamification/shop/demo",
+    ]
+
+    def _seed_demo_user(self, db_engine, sessions: int = 2):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.models.user import User
+        from app.models.session import Session as SessionModel, Set as SetModel
+
+        db = sm(bind=db_engine)()
+        try:
+            demo = db.query(User).filter(User.is_demo == True).first()
+            if demo is None:
+                demo = User(email="demo@gymtracker.app", password_hash="h", is_active=True, is_demo=True)
+                db.add(demo)
+                db.flush()
+            for i in range(sessions):
+                s = SessionModel(
+                    user_id=demo.id,
+                    started_at=_now() - timedelta(days=i + 1, hours=1),
+                    completed_at=_now() - timedelta(days=i + 1),
+                    effort_score=60.0,
+                )
+                db.add(s)
+                db.flush()
+                db.add_all([
+                    SetModel(session_id=s.id, exercise_id=1, set_number=n, weight_kg=50.0, reps=10)
+                    for n in range(1, 4)
+                ])
+            db.commit()
+        finally:
+            db.close()
+
+    def test_repeat_loads_run_no_queries(self, client, db_engine):
+        self._seed_demo_user(db_engine)
+        first = {url: client.get(url).json() for url in self.DEMO}
+
+        statements = []
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        from sqlalchemy import event
+        event.listen(db_engine, "before_cursor_execute", _before_execute)
+        try:
+            second = {url: client.get(url).json() for url in self.DEMO}
+        finally:
+            event.remove(db_engine, "before_cursor_execute", _before_execute)
+
+        assert second == first
+        assert statements == []
+
+    def test_etag_and_not_modified(self, client, db_engine):
+        self._seed_demo_user(db_engine)
+        r = client.get("/api/sessions/demo/history")
+        assert r.status_code == 200
+        assert [s["set_count"] for s in r.json()] == [3, 3]
+        assert r.headers["cache-control"].startswith("public, max-age=")
+        etag = r.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith('W/')
+
+        r2 = client.get("/api/sessions/demo/history", headers={"If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.content == b""
+        assert r2.headers["etag"] == etag
+
+        assert client.get("/api/sessions/demo/history", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    def test_scheduled_refresh_picks_up_new_data(self, client, db_engine):
+        from sqlalchemy.orm import sessionmaker as sm
+        from app.demo_snapshots import demo_snapshots
+
+        self._seed_demo_user(db_engine, sessions=1)
+        r = client.get("/api/sessions/demo/history")
+        assert len(r.json()) == 1
+
+        self._seed_demo_user(db_engine, sessions=1)
+        # Still the snapshot until the refresh runs
+        assert len(client.get("/api/sessions/demo/history").json()) == 1
+
+        db = sm(bind=db_engine)()
+        try:
+            assert demo_snapshots.refresh(db) >= 1
+        finally:
+            db.close()
+        r2 = client.get("/api/sessions/demo/history")
+        assert len(r2.json()) == 2
+        assert r2.headers["etag"] != r.headers["etag"]
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models.exercise import Exercise
+from app.models.session import Session as SessionModel, Set as SetModel
+from app.models.user import User
+from app.training_history import (
+    load_training_history,
+    nss_per_session,
+    session_exercise_stats,
+    session_volume,
+)
+
+
+def _seed(db):
+    user = User(email="history@example.com", password_hash="x", weight=80)
+    db.add(user)
+    db.flush()
+
+    bench = Exercise(name="Bench Press", type="Strength", difficulty_factor=1.0)
+    pullup = Exercise(name="Pull Up", type="Strength", is_bodyweight=True, bw_ratio=1.0)
+    db.add_all([bench, pullup])
+    db.flush()
+
+    now = datetime.now(timezone.utc)
+    older = SessionModel(user_id=user.id, completed_at=now - timedelta(days=7), bodyweight_kg=80)
+    newer = SessionModel(user_id=user.id, completed_at=now, bodyweight_kg=80)
+    draft = SessionModel(user_id=user.id, completed_at=None)
+    db.add_all([older, newer, draft])
+    db.flush()
+
+    db.add_all([
+        SetModel(session_id=older.id, exercise_id=bench.id, set_number=1, weight_kg=60, reps=10, set_type="normal"),
+        SetModel(session_id=older.id, exercise_id=bench.id, set_number=2, weight_kg=40, reps=12, set_type="warmup"),
+        SetModel(session_id=newer.id, exercise_id=bench.id, set_number=1, weight_kg=70, reps=8, set_type="normal"),
+        SetModel(session_id=newer.id, exercise_id=pullup.id, set_number=2, weight_kg=None, reps=6, set_type="normal", to_failure=True),
+        SetModel(session_id=draft.id, exercise_id=bench.id, set_number=1, weight_kg=200, reps=5, set_type="normal"),
+    ])
+    db.commit()
+    return user, bench, pullup, older, newer
+
+
+class TestTrainingHistory:
+    def test_loads_completed_normal_sets_in_order(self, db_engine):
+        db = sessionmaker(bind=db_engine)()
+        try:
+            user, bench, pullup, older, newer = _seed(db)
+            h = load_training_history(db, user.id)
+
+            assert h.session_ids.tolist() == [older.id, newer.id]
+            assert h.n_sets == 3  # warm-up and draft sets excluded
+            assert h.to_failure.tolist() == [False, False, True]
+
+            with_warmups = load_training_history(db, user.id, normal_only=False)
+            assert with_warmups.n_sets == 4
+        finally:
+            db.close()
+
+    def test_volume_and_nss_per_session(self, db_engine):
+        db = sessionmaker(bind=db_engine)()
+        try:
+            user, *_ = _seed(db)
+            h = load_training_history(db, user.id)
+
+            assert session_volume(h).tolist() == [600.0, 560.0]
+            nss = nss_per_session(h)
+            assert round(float(nss[0]), 2) == round(60 * (1 + 10 / 30), 2)
+            assert round(float(nss[1]), 2) == round(70 * (1 + 8 / 30) + 80 * (1 + 6 / 30), 2)
+        finally:
+            db.close()
+
+    def test_session_exercise_stats(self, db_engine):
+        db = sessionmaker(bind=db_engine)()
+        try:
+            user, *_ = _seed(db)
+            h = load_training_history(db, user.id, normal_only=False)
+            stats = session_exercise_stats(h)
+
+            assert stats.set_count.tolist() == [2, 1, 1]
+            assert stats.max_weight.tolist() == [60.0, 70.0, 0.0]
+            assert stats.max_reps.tolist() == [12.0, 8.0, 6.0]
+            assert stats.reps_sum.tolist() == [22.0, 8.0, 6.0]
+        finally:
+            db.close()
@@ -3,6 +3,33 @@ import { api } from '../api/client';
 
 let isSyncing = false;
 
+const GAMIFICATION_POLL_INTERVAL_MS = 700;
+const GAMIFICATION_POLL_ATTEMPTS = 20;
+
+// Completion returns a pending handle; the rewards are computed server-side after the response.
+const awaitGamification = async (handle: any, localSessionId?: number) => {
+	if (!handle?.job_id) return;
+	for (let attempt = 0; attempt < GAMIFICATION_POLL_ATTEMPTS; attempt++) {
+		try {
+			const res = await api.get(`/gamification/jobs/${handle.job_id}`);
+			if (res.data?.status === 'done') {
+				const result = res.data.result;
+				if (result) {
+					if (localSessionId !== undefined && result.effort_score !== undefined) {
+						await db.sessions.update(localSessionId, { effort_score: result.effort_score ?? null });
+					}
+					window.dispatchEvent(new CustomEvent('gamification-reward', { detail: result }));
+				}
+				return;
+			}
+			if (res.data?.status === 'failed') return;
+		} catch (err) {
+			console.error("Gamification poll failed", err);
+		}
+		await new Promise(resolve => setTimeout(resolve, GAMIFICATION_POLL_INTERVAL_MS));
+	}
+};
+
 export const processSyncQueue = async () => {
 	if (!navigator.onLine || isSyncing || !db.isOpen()) return;
 	isSyncing = true;
@@ -178,11 +205,9 @@ const syncSessionToServer = async (session: any): Promise<number | null> => {
 
 			const finalRes = await api.post(`/sessions/${serverId}/complete_bulk`, bulkPayload);
 
-			// Dispatch gamification if it was just completed
+			// Dispatch gamification once the server has computed it (don't block the sync loop)
 			if (finalRes.data?.gamification) {
-				window.dispatchEvent(new CustomEvent('gamification-reward', {
-					detail: finalRes.data.gamification
-				}));
+				void awaitGamification(finalRes.data.gamification, session.id!);
 			}
 
 			// Mark everything synced locally
@@ -225,9 +250,7 @@ const syncSessionToServer = async (session: any): Promise<number | null> => {
 				await db.sessions.update(session.id!, { syncStatus: 'synced' });
 
 				if (updateRes.data?.gamification) {
-					window.dispatchEvent(new CustomEvent('gamification-reward', {
-						detail: updateRes.data.gamification
-					}));
+					void awaitGamification(updateRes.data.gamification, session.id!);
 				}
 			}
 
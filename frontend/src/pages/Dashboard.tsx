@@ -23,6 +23,9 @@ interface ProgressPoint {
 
 type FilterLevel = 'total' | 'muscle_group' | 'muscle' | 'exercise';
 
+// Trend charts are downsampled server-side to about the number of points they can show
+const CHART_MAX_POINTS = 120;
+
 // ── Helpers ──────────────────────────────────────────────────────────────────
 function formatPace(secondsPerKm: number): string {
     if (!secondsPerKm || !isFinite(secondsPerKm)) return '--:--';
@@ -192,8 +195,9 @@ export default function Dashboard() {
         if (filterLevel === 'muscle_group' && selectedGroup) params.set('muscle_group', selectedGroup);
         if (filterLevel === 'muscle' && selectedMuscle) params.set('muscle', selectedMuscle);
         if (filterLevel === 'exercise' && selectedExerciseId) params.set('exercise_id', String(selectedExerciseId));
+        params.set('max_points', String(CHART_MAX_POINTS));
 
-        const url = params.toString() ? `${base}?${params}` : base;
+        const url = `${base}?${params}`;
         api.get<ProgressPoint[]>(url)
             .then(r => { setProgressData(r.data); setLoading(false); })
             .catch((err) => {
@@ -245,7 +249,7 @@ export default function Dashboard() {
         if (exId === null) return;
         if (cardioByExercise[exId]) return;
         const base = demoMode ? '/stats/cardio/demo' : '/stats/cardio';
-        api.get(`${base}?days=90&exercise_id=${exId}`).then(res => {
+        api.get(`${base}?days=90&exercise_id=${exId}&max_points=${CHART_MAX_POINTS}`).then(res => {
             setCardioByExercise(prev => ({ ...prev, [exId]: res.data }));
         }).catch(() => {});
     }, [activeCardioTab, otherExerciseId, demoMode]);
@@ -457,7 +461,7 @@ export default function Dashboard() {
                     <span className="mono" style={{ fontSize: 10, color: 'var(--text-3)' }}>{t('Strength trend')}</span>
                     {hasData && (
                         <span className="mono num" style={{ marginLeft: 'auto', fontSize: 9.5, fontWeight: 700, color: lineColor, display: 'inline-flex', alignItems: 'center', gap: 5 }}>
-                            <K.spark width={13} height={13} />{t('Last')} {progressData.length} {t('sessions')}
+                            <K.spark width={13} height={13} />{t('Last')} {progressData[progressData.length - 1].session_number} {t('sessions')}
                         </span>
                     )}
                 </div>
@@ -735,7 +739,7 @@ export default function Dashboard() {
                                             setOtherExerciseId(id);
                                             if (!cardioByExercise[id]) {
                                                 const base = demoMode ? '/stats/cardio/demo' : '/stats/cardio';
-                                                api.get(`${base}?days=90&exercise_id=${id}`).then(res => {
+                                                api.get(`${base}?days=90&exercise_id=${id}&max_points=${CHART_MAX_POINTS}`).then(res => {
                                                     setCardioByExercise(prev => ({ ...prev, [id]: res.data }));
                                                 }).catch(() => {});
                                             }
@@ -30,6 +30,9 @@ interface ReportData {
 	created_at?: string;
 }
 
+const REPORT_POLL_INTERVAL_MS = 1500;
+const REPORT_POLL_ATTEMPTS = 80;
+
 /** up = progress, swap = change/warning (amber), hold = neutral */
 function recKind(type: string): 'up' | 'swap' | 'hold' {
 	if (['weight_increase', 'rep_increase', 'bw_progression', 'cardio_increase'].includes(type)) return 'up';
@@ -128,17 +131,33 @@ export default function ProgressionReport() {
 	// ── Generate ─────────────────────────────────────────────────────────────
 	const canAfford = coinBalance === null || coinBalance >= 50;
 
+	// The report is generated in a background job; poll until it is stored or has failed
+	const awaitReportJob = async (jobId: number, run: number) => {
+		for (let attempt = 0; attempt < REPORT_POLL_ATTEMPTS; attempt++) {
+			await new Promise(resolve => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+			if (genRun.current !== run) return null;
+			const res = await api.get(`/progression/report/jobs/${jobId}`);
+			if (res.data.status === 'done' || res.data.status === 'failed') return res.data;
+		}
+		throw new Error('Report generation timed out');
+	};
+
 	const generateReport = () => {
 		if (!id || genPhase === 'loading' || !canGenerate || !canAfford) return;
 		const run = ++genRun.current;
 		setGenPhase('loading');
 		setError(null);
 		api.post(`/progression/report/${id}`, { user_context: userContext.trim() || undefined })
-			.then(res => {
-				if (genRun.current !== run) return;
-				const r = res.data as ReportData;
-				if (res.data.currency !== undefined) setCoinBalance(res.data.currency);
-				pendingReport.current = r;
+			.then(res => awaitReportJob(res.data.job_id, run))
+			.then(job => {
+				if (!job || genRun.current !== run) return;
+				if (job.currency !== undefined) setCoinBalance(job.currency);
+				if (job.status === 'failed') {
+					setError(job.error?.startsWith('Not enough coins') ? t('Not enough coins.') : t('Failed to generate report'));
+					setGenPhase('error');
+					return;
+				}
+				pendingReport.current = job.report as ReportData;
 				setGenPhase('done');
 			})
 			.catch(e => {
@@ -1,7 +1,86 @@
+import os
 import time
 import signal
 import sys
+from datetime import datetime, timezone
 from apscheduler.schedulers.blocking import BlockingScheduler
+from sqlalchemy import create_engine, text
+
+QUEST_WEEK_GROUPS = ["A", "B", "C", "D"]
+QUEST_ROTATION_BATCH_SIZE = int(os.environ.get("QUEST_ROTATION_BATCH_SIZE", "1000"))
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
+    return _engine
+
+
+# Mirrors app.gamification.assign_quests, set-based over a batch of users.
+# The API only rotates users whose users.quest_week is stale, so once this
+# has run the quest page is a plain read for everyone.
+_DELETE_OUT_OF_SEASON = text("""
+    DELETE FROM user_quests
+    WHERE user_id IN (SELECT id FROM users WHERE id > :after_id AND id <= :last_id)
+      AND quest_id IN (
+          SELECT id FROM quests
+          WHERE is_weekly = :true AND (week_group IS NULL OR week_group <> :week_group)
+      )
+""")
+
+_INSERT_MISSING = text("""
+    INSERT INTO user_quests (user_id, quest_id, progress, completed, claimed)
+    SELECT u.id, q.id, 0, :false, :false
+    FROM users u CROSS JOIN quests q
+    WHERE u.id > :after_id AND u.id <= :last_id
+      AND (q.is_weekly IS NULL OR q.is_weekly = :false OR q.week_group = :week_group)
+      AND NOT EXISTS (
+          SELECT 1 FROM user_quests uq WHERE uq.user_id = u.id AND uq.quest_id = q.id
+      )
+""")
+
+_STAMP_WEEK = text("""
+    UPDATE users SET quest_week = :week
+    WHERE id > :after_id AND id <= :last_id
+""")
+
+
+def rotate_weekly_quests_job(now=None):
+    """Assign this ISO week's quest group to every user, in id-ordered batches."""
+    now = now or datetime.now(timezone.utc)
+    iso = now.isocalendar()
+    params = {
+        "week_group": QUEST_WEEK_GROUPS[iso[1] % 4],
+        "week": f"{iso[0]}-W{iso[1]:02d}",
+        "true": True,
+        "false": False,
+    }
+    engine = get_engine()
+
+    after_id = 0
+    users = 0
+    started = time.monotonic()
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                text("SELECT id FROM users WHERE id > :after_id ORDER BY id LIMIT :limit"),
+                {"after_id": after_id, "limit": QUEST_ROTATION_BATCH_SIZE},
+            ).scalars().all()
+            if not ids:
+                break
+            batch = {**params, "after_id": after_id, "last_id": ids[-1]}
+            conn.execute(_DELETE_OUT_OF_SEASON, batch)
+            conn.execute(_INSERT_MISSING, batch)
+            conn.execute(_STAMP_WEEK, batch)
+        users += len(ids)
+        after_id = ids[-1]
+
+    print(f"Rotated quests to group {params['week_group']} ({params['week']}) for {users} users "
+          f"in {time.monotonic() - started:.1f}s")
+
 
 def weekly_report_job():
     print("Running weekly report generation job...")
@@ -16,9 +95,13 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, cleanup)
     signal.signal(signal.SIGINT, cleanup)
 
-    scheduler = BlockingScheduler()
+    scheduler = BlockingScheduler(timezone="UTC")
     # Run every Monday at 00:00
     scheduler.add_job(weekly_report_job, 'cron', day_of_week='mon', hour=0, minute=0)
+    # ISO week boundary (UTC); also once at startup to pick up catalog changes from deploys
+    scheduler.add_job(rotate_weekly_quests_job, 'cron', day_of_week='mon', hour=0, minute=0,
+                      misfire_grace_time=3600, coalesce=True)
+    scheduler.add_job(rotate_weekly_quests_job, 'date')
 
     print("Scheduler started...")
     try: